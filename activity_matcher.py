@@ -0,0 +1,163 @@
+# activity_matcher.py
+"""
+Reconhecimento do nome da atividade digitado pelo usuário (ex: "vog" -> "Câmara de Cristal").
+
+O catálogo de cada servidor é o embutido (constants.py) mais as atividades cadastradas na
+tabela guild_activities, que têm precedência. O matcher compilado de cada servidor fica em
+cache e só é recompilado quando o catálogo daquele servidor muda: invalidate_guild_matcher
+grava uma nova versão do catálogo em bot_meta, e get_guild_matcher compara a versão do cache
+com a do banco, para que as outras instâncias (ver leader_election.py) também recompilem.
+
+O ActivityMatcher é compilado uma vez a partir do catálogo: todos os nomes oficiais e apelidos
+são normalizados (sem acentos, minúsculos, pontuação removida) num dicionário de acerto exato,
+e um índice invertido de n-gramas permite, quando o limiar é menor que 1.0, ranquear só os
+apelidos que compartilham n-gramas com a entrada antes da comparação completa com SequenceMatcher.
+"""
+import datetime
+import re
+import unicodedata
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import pytz
+
+import database as db
+from metrics import CACHE_REQUESTS
+from constants import (
+    ACTIVITY_CATALOGUE_PT, ACTIVITY_TYPE_SPOTS, SIMILARITY_THRESHOLD,
+    ACTIVITY_NGRAM_SIZE, ACTIVITY_FUZZY_CANDIDATES
+)
+
+_APOSTROPHES = re.compile(r"['’`´]")
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+class ActivityEntry(NamedTuple):
+    name: str
+    activity_type: Optional[str]
+    spots: Optional[int]
+
+
+def normalize_activity_text(text: str) -> str:
+    """'Câmara  de Cristal!' -> 'camara de cristal'; "King's Fall" -> 'kings fall'."""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    folded = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", _APOSTROPHES.sub("", folded)).strip()
+
+
+def _ngrams(text: str, size: int) -> Set[str]:
+    padded = f" {text} "
+    if len(padded) <= size: return {padded}
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+class ActivityMatcher:
+    """
+    Catálogo compilado. `entries` são tuplas (nome oficial, tipo, vagas, apelidos); em caso
+    de apelido repetido vale a primeira entrada, como na varredura sequencial antiga.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, Optional[str], Optional[int], Sequence[str]]],
+                 threshold: float = SIMILARITY_THRESHOLD, ngram_size: int = ACTIVITY_NGRAM_SIZE,
+                 fuzzy_candidates: int = ACTIVITY_FUZZY_CANDIDATES):
+        self.threshold = threshold
+        self.ngram_size = ngram_size
+        self.fuzzy_candidates = fuzzy_candidates
+        self._exact: Dict[str, ActivityEntry] = {}
+        self._alias_keys: List[str] = []
+        self._alias_ngram_counts: List[int] = []
+        self._ngram_index: Dict[str, List[int]] = {}
+
+        for name, activity_type, spots, aliases in entries:
+            entry = ActivityEntry(name, activity_type, spots)
+            for alias in (name, *aliases):
+                key = normalize_activity_text(alias)
+                if not key or key in self._exact: continue
+                self._exact[key] = entry
+                alias_idx = len(self._alias_keys)
+                self._alias_keys.append(key)
+                grams = _ngrams(key, ngram_size)
+                self._alias_ngram_counts.append(len(grams))
+                for gram in grams:
+                    self._ngram_index.setdefault(gram, []).append(alias_idx)
+
+    def __len__(self) -> int:
+        return len(self._alias_keys)
+
+    def _rank_candidates(self, key: str) -> List[int]:
+        """Apelidos que compartilham n-gramas com a entrada, ordenados pelo coeficiente de Dice."""
+        grams = _ngrams(key, self.ngram_size)
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for alias_idx in self._ngram_index.get(gram, ()):
+                shared[alias_idx] = shared.get(alias_idx, 0) + 1
+        scored = sorted(shared.items(), key=lambda item: -2.0 * item[1] / (len(grams) + self._alias_ngram_counts[item[0]]))
+        return [alias_idx for alias_idx, _ in scored[:self.fuzzy_candidates]]
+
+    def match(self, text: str) -> Optional[Tuple[ActivityEntry, float]]:
+        """Retorna (atividade, similaridade) ou None se nada atingir o limiar."""
+        key = normalize_activity_text(text)
+        if not key: return None
+        entry = self._exact.get(key)
+        if entry: return entry, 1.0
+        if self.threshold >= 1.0: return None
+
+        from difflib import SequenceMatcher  # Só a busca aproximada precisa dele.
+        best_entry, best_ratio = None, 0.0
+        for alias_idx in self._rank_candidates(key):
+            alias_key = self._alias_keys[alias_idx]
+            ratio = SequenceMatcher(None, key, alias_key).ratio()
+            if ratio > best_ratio: best_entry, best_ratio = self._exact[alias_key], ratio
+        if best_entry and best_ratio >= self.threshold: return best_entry, best_ratio
+        return None
+
+
+def default_catalogue_entries() -> List[Tuple[str, str, int, List[str]]]:
+    """Catálogo embutido (constants.py) no formato aceito pelo ActivityMatcher."""
+    return [
+        (name, activity_type, ACTIVITY_TYPE_SPOTS.get(activity_type), keywords)
+        for activity_info, activity_type in ACTIVITY_CATALOGUE_PT
+        for name, keywords in activity_info.items()
+    ]
+
+
+def parse_aliases(aliases_str: Optional[str]) -> List[str]:
+    return [alias.strip() for alias in (aliases_str or "").split(',') if alias.strip()]
+
+
+def guild_catalogue_entries(rows: Iterable) -> List[Tuple[str, str, Optional[int], List[str]]]:
+    """Linhas de db_get_guild_activities no formato aceito pelo ActivityMatcher."""
+    return [(row['name'], row['activity_type'], row['default_spots'], parse_aliases(row['aliases'])) for row in rows]
+
+
+_DEFAULT_ENTRIES = default_catalogue_entries()
+DEFAULT_MATCHER = ActivityMatcher(_DEFAULT_ENTRIES)
+
+# guild_id -> (versão do catálogo, matcher compilado). Servidores sem catálogo próprio apontam para DEFAULT_MATCHER.
+_guild_matchers: Dict[int, Tuple[Optional[str], ActivityMatcher]] = {}
+
+
+def _catalogue_version_key(guild_id: int) -> str:
+    """Chave em bot_meta alterada a cada mudança no catálogo do servidor."""
+    return f"atividades_versao:{guild_id}"
+
+
+def get_guild_matcher(guild_id: Optional[int]) -> ActivityMatcher:
+    if guild_id is None: return DEFAULT_MATCHER
+    version = db.db_get_bot_meta(_catalogue_version_key(guild_id))
+    cached = _guild_matchers.get(guild_id)
+    hit = cached is not None and cached[0] == version
+    CACHE_REQUESTS.inc(cache="atividades_servidor", resultado="acerto" if hit else "falta")
+    if hit: return cached[1]
+    rows = db.db_get_guild_activities(guild_id)
+    matcher = ActivityMatcher(guild_catalogue_entries(rows) + _DEFAULT_ENTRIES) if rows else DEFAULT_MATCHER
+    _guild_matchers[guild_id] = (version, matcher)
+    return matcher
+
+
+def invalidate_guild_matcher(guild_id: int):
+    """
+    Descarta o matcher em cache do servidor e grava uma nova versão do catálogo em bot_meta: o
+    próximo uso, nesta ou em outra instância, recompila a partir do banco.
+    """
+    _guild_matchers.pop(guild_id, None)
+    db.db_set_bot_meta(_catalogue_version_key(guild_id), datetime.datetime.now(pytz.utc).isoformat())
@@ -0,0 +1,90 @@
+# benchmarks/bench_activity_matcher.py
+"""
+Microbenchmark: detect_activity_details antigo (varredura com SequenceMatcher) x ActivityMatcher.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_activity_matcher [--repeticoes 2000] [--limiar 0.8]
+
+Mede o tempo médio por chamada para um corpus de títulos reais (acertos exatos, variações
+de caixa/acento e títulos livres que não casam) e confere se, no limiar atual, os dois
+caminhos devolvem o mesmo resultado.
+"""
+import argparse
+import time
+from difflib import SequenceMatcher
+
+from activity_matcher import ActivityMatcher, default_catalogue_entries
+from constants import (
+    ALL_ACTIVITIES_PT, RAID_INFO_PT, MASMORRA_INFO_PT, PVP_ACTIVITY_INFO_PT, SIMILARITY_THRESHOLD
+)
+
+CORPUS = [
+    "vog", "Câmara de Cristal", "camara de cristal", "KF", "kings fall", "Queda do Rei",
+    "Último Desejo", "ultimo desejo", "dsc", "Raiz dos Pesadelos", "se", "limiar",
+    "Poço da Heresia", "poco", "spire", "Doutrina Apartada", "trials", "osiris",
+    "Raid semanal do clã", "Farm de exóticos", "Noite de Gambit", "Ajuda no catalisador",
+    "Cripta da Pedra", "Fantasmas", "Domínio de Vésper", "Câmara de Cristal Mestre",
+]
+
+
+def legacy_detect_activity_details(name_input: str, threshold: float = SIMILARITY_THRESHOLD):
+    """Cópia da implementação anterior de utils.detect_activity_details, como referência."""
+    name_lower = name_input.lower().strip()
+    best_match, best_type, best_spots, highest_sim = name_input.strip(), None, None, 0.0
+    for official, keywords in ALL_ACTIVITIES_PT.items():
+        sim_off = SequenceMatcher(None, name_lower, official.lower()).ratio()
+        if sim_off > highest_sim: highest_sim, best_match = sim_off, official
+        for kw in keywords:
+            sim_kw = SequenceMatcher(None, name_lower, kw.lower()).ratio()
+            if sim_kw > highest_sim: highest_sim, best_match = sim_kw, official
+        if highest_sim == 1.0 and best_match == official: break
+    if highest_sim >= threshold:
+        if best_match in RAID_INFO_PT: best_type, best_spots = "Incursão", 6
+        elif best_match in MASMORRA_INFO_PT: best_type, best_spots = "Masmorra", 3
+        elif best_match in PVP_ACTIVITY_INFO_PT: best_type, best_spots = "PvP - Desafios de Osíris", 3
+        return best_match, best_type, best_spots
+    return name_input.strip(), None, None
+
+
+def matcher_detect_activity_details(matcher: ActivityMatcher, name_input: str):
+    match = matcher.match(name_input)
+    if match: return match[0].name, match[0].activity_type, match[0].spots
+    return name_input.strip(), None, None
+
+
+def time_per_call(func, repetitions: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        for text in CORPUS: func(text)
+    return (time.perf_counter() - start) / (repetitions * len(CORPUS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=2000)
+    parser.add_argument("--limiar", type=float, default=SIMILARITY_THRESHOLD, help="limiar de similaridade (padrão: SIMILARITY_THRESHOLD)")
+    args = parser.parse_args()
+
+    build_start = time.perf_counter()
+    matcher = ActivityMatcher(default_catalogue_entries(), threshold=args.limiar)
+    build_ms = (time.perf_counter() - build_start) * 1000
+
+    legacy_us = time_per_call(lambda text: legacy_detect_activity_details(text, args.limiar), args.repeticoes) * 1e6
+    new_us = time_per_call(lambda text: matcher_detect_activity_details(matcher, text), args.repeticoes) * 1e6
+
+    print(f"Corpus: {len(CORPUS)} títulos x {args.repeticoes} repetições | limiar {args.limiar} | {len(matcher)} apelidos indexados (compilação: {build_ms:.2f} ms)")
+    print(f"  SequenceMatcher (antigo): {legacy_us:10.2f} µs/chamada")
+    print(f"  ActivityMatcher (novo):   {new_us:10.2f} µs/chamada  ({legacy_us / new_us:.0f}x mais rápido)")
+
+    divergences = [(text, legacy_detect_activity_details(text, args.limiar), matcher_detect_activity_details(matcher, text))
+                   for text in CORPUS]
+    divergences = [d for d in divergences if d[1] != d[2]]
+    if divergences:
+        print(f"  {len(divergences)} divergência(s) (o matcher novo também ignora acentos e pontuação):")
+        for text, legacy, new in divergences: print(f"    {text!r}: antigo={legacy} novo={new}")
+    else:
+        print("  Resultados idênticos aos do caminho antigo.")
+
+
+if __name__ == "__main__":
+    main()
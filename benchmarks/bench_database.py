@@ -0,0 +1,191 @@
+# benchmarks/bench_database.py
+"""
+Benchmark das funções db_* dos caminhos quentes sobre um banco sintético (benchmarks/dataset.py).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_database [--guildas 500] [--eventos 100000] [--rsvps 1000000]
+                                        [--operacoes 2000] [--casos rsvp_upsert,rsvps_evento] [--saida resultado.json]
+    python -m benchmarks.bench_database --comparar antes.json depois.json [--limiar 10]
+
+O dataset é gerado uma vez e reaproveitado (arquivo em --dados, por padrão no diretório
+temporário, com os parâmetros no nome). Cada execução trabalha numa cópia, então as escritas
+de um caso não mudam o banco visto pela execução seguinte.
+
+Para cada caso mede-se a latência de cada chamada (após um aquecimento) e reporta-se vazão e
+percentis em JSON (stdout ou --saida). Com --comparar, mostra a variação de vazão e de p50/p99
+entre duas execuções e termina com código 1 se algum caso piorou mais que --limiar %.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from benchmarks import dataset
+import database as db
+
+WARMUP_CALLS = 50
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values: return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(call: Callable[[], object], operations: int) -> dict:
+    for _ in range(min(WARMUP_CALLS, operations)): call()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(operations):
+        t0 = time.perf_counter_ns()
+        call()
+        latencies.append((time.perf_counter_ns() - t0) / 1e6)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "operacoes": operations,
+        "segundos": round(elapsed, 4),
+        "ops_por_segundo": round(operations / elapsed, 1) if elapsed else None,
+        "media_ms": round(statistics.fmean(latencies), 4),
+        "p50_ms": round(percentile(latencies, 0.50), 4),
+        "p90_ms": round(percentile(latencies, 0.90), 4),
+        "p99_ms": round(percentile(latencies, 0.99), 4),
+        "max_ms": round(latencies[-1], 4),
+    }
+
+
+class Samples:
+    """Argumentos realistas para os casos, sorteados do próprio banco."""
+
+    def __init__(self, path: str, rng: random.Random, size: int = 5000):
+        conn = sqlite3.connect(path)
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        self.active_events = [row[0] for row in conn.execute(
+            "SELECT event_id FROM events WHERE status = 'ativo' AND event_time_utc > ? ORDER BY RANDOM() LIMIT ?", (now, size))]
+        self.guild_ids = [row[0] for row in conn.execute("SELECT DISTINCT guild_id FROM events")]
+        # Pares (usuário, servidor) de quem tem RSVP, como no fluxo de saída de membro e no limite de RSVPs.
+        max_rsvp_id = conn.execute("SELECT max(rsvp_id) FROM rsvps").fetchone()[0] or 0
+        rsvp_ids = rng.sample(range(1, max_rsvp_id + 1), min(size, max_rsvp_id))
+        self.user_guilds = conn.execute("""SELECT r.user_id, e.guild_id FROM rsvps r JOIN events e ON e.event_id = r.event_id
+                                           WHERE r.rsvp_id IN (SELECT value FROM json_each(?))""", (json.dumps(rsvp_ids),)).fetchall()
+        self.event_users = conn.execute("""SELECT r.event_id, r.user_id FROM rsvps r JOIN events e ON e.event_id = r.event_id
+                                           WHERE e.status = 'ativo' ORDER BY RANDOM() LIMIT ?""", (size,)).fetchall()
+        conn.close()
+        self.rng = rng
+
+
+def build_cases(samples: Samples) -> Dict[str, Callable[[], object]]:
+    rng = samples.rng
+    statuses = list(dataset.RSVP_STATUS_WEIGHTS)
+
+    def rsvp_upsert():
+        event_id, user_id = rng.choice(samples.event_users)
+        db.db_add_or_update_rsvp(event_id, user_id, rng.choice(statuses))
+
+    def rsvp_new():
+        db.db_add_or_update_rsvp(rng.choice(samples.active_events), rng.getrandbits(60), rng.choice(statuses))
+
+    def digest_window():
+        start = datetime.datetime.now(datetime.timezone.utc)
+        return rng.choice(samples.guild_ids), start, start + datetime.timedelta(days=1)
+
+    def digest_full():
+        # Mesmo acesso de utils.generate_event_list_message_content: a lista já traz as contagens (event_rsvp_counts).
+        for row in db.db_get_events_for_digest_list(*digest_window()): row['vou_count'], row['espera_count']
+
+    return {
+        "rsvp_upsert": rsvp_upsert,
+        "rsvp_novo": rsvp_new,
+        "rsvps_evento": lambda: db.db_get_rsvps_for_event(rng.choice(samples.active_events)),
+        "janela_lembrete": lambda: db.db_get_upcoming_events_for_reminder(),
+        "janela_confirmacao": lambda: db.db_get_events_for_confirmation_reminder(),
+        "lista_digest": lambda: db.db_get_events_for_digest_list(*digest_window()),
+        "lista_digest_completa": digest_full,
+        "rsvps_ativos_usuario": lambda: db.db_get_user_active_rsvps_in_guild(*rng.choice(samples.user_guilds)),
+    }
+
+
+def environment() -> dict:
+    try: commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=dataset.PROJECT_ROOT).stdout.strip()
+    except OSError: commit = ""
+    return {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version, "plataforma": platform.platform(),
+            "commit": commit or None, "data_utc": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")}
+
+
+def run(args) -> dict:
+    path = args.dados or os.path.join(tempfile.gettempdir(), f"bench_db_{args.guildas}_{args.eventos}_{args.rsvps}_{args.semente}.sqlite3")
+    params = dataset.ensure(path, args.guildas, args.eventos, args.rsvps, args.semente, rebuild=args.recriar)
+    work_dir = tempfile.mkdtemp(prefix="bench_db_")
+    work_path = os.path.join(work_dir, "bench.sqlite3")
+    shutil.copyfile(path, work_path)
+    previous_db_name = db.DB_NAME
+    db.DB_NAME = work_path
+    try:
+        cases = build_cases(Samples(work_path, random.Random(args.semente)))
+        selected = args.casos.split(",") if args.casos else list(cases)
+        results = {}
+        for name in selected:
+            if name not in cases: sys.exit(f"Caso desconhecido: {name}. Disponíveis: {', '.join(cases)}")
+            results[name] = measure(cases[name], args.operacoes)
+            print(f"{name:24s} {results[name]['ops_por_segundo']:>10} ops/s  p50 {results[name]['p50_ms']:.3f} ms  p99 {results[name]['p99_ms']:.3f} ms", file=sys.stderr)
+    finally:
+        db.DB_NAME = previous_db_name
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {"ambiente": environment(), "dataset": params, "resultados": results}
+
+
+def compare(before_path: str, after_path: str, threshold: float) -> int:
+    with open(before_path) as f: before = json.load(f)
+    with open(after_path) as f: after = json.load(f)
+    if before.get("dataset") != after.get("dataset"): print("AVISO: as execuções usaram datasets diferentes.")
+    print(f"{'caso':24s} {'ops/s':>22s} {'p50 (ms)':>24s} {'p99 (ms)':>24s}")
+    regressions = []
+    for name, old in before["resultados"].items():
+        new = after["resultados"].get(name)
+        if new is None: continue
+        def delta(key, higher_is_better=False):
+            change = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            worse = -change if higher_is_better else change
+            if worse > threshold: regressions.append(f"{name}.{key}")
+            return f"{old[key]:>8.3f} -> {new[key]:>8.3f} ({change:+5.1f}%)"
+        print(f"{name:24s} {delta('ops_por_segundo', True)} {delta('p50_ms')} {delta('p99_ms')}")
+    if regressions:
+        print(f"Pioraram mais que {threshold:.0f}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--guildas", type=int, default=500)
+    parser.add_argument("--eventos", type=int, default=100_000)
+    parser.add_argument("--rsvps", type=int, default=1_000_000)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--dados", help="arquivo do dataset (reaproveitado se os parâmetros forem os mesmos)")
+    parser.add_argument("--recriar", action="store_true", help="gera o dataset de novo mesmo que já exista")
+    parser.add_argument("--operacoes", type=int, default=2000, help="chamadas medidas por caso")
+    parser.add_argument("--casos", help="lista separada por vírgulas (padrão: todos)")
+    parser.add_argument("--saida", help="grava o JSON neste arquivo em vez do stdout")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DEPOIS"), help="compara dois resultados JSON")
+    parser.add_argument("--limiar", type=float, default=10.0, help="piora percentual tolerada no --comparar")
+    args = parser.parse_args()
+
+    if args.comparar: sys.exit(compare(*args.comparar, args.limiar))
+    report = run(args)
+    if args.saida:
+        with open(args.saida, "w") as f: json.dump(report, f, indent=2, ensure_ascii=False)
+    else: print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_date_parsing.py
+"""
+Benchmark da interpretação de data/hora do AgendarEventoModal: dateparser (caminho antigo,
+duas chamadas por envio) x date_parsing (caminho rápido + memorização).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_date_parsing [--repeticoes 50]
+
+Mostra o custo da primeira chamada ao dateparser (carga de dados de idioma), o tempo médio
+por envio de cada caminho (sem e com cache) e as entradas em que os resultados diferem.
+"""
+import argparse
+import datetime
+import time
+
+import date_parsing
+from constants import BRAZIL_TZ, BRAZIL_TZ_STR
+
+# Entradas reais do formulário (data, hora), incluindo algumas fora dos formatos documentados.
+CORPUS = [
+    ("25/12", "19:00"), ("25/12/2026", "21h30"), ("1/11", "7pm"), ("01/11", "19h"),
+    ("15/11", "10:30am"), ("2/1", "20:00"), ("30/11/2026", "21:00"), ("7/11", "7 PM"),
+    ("24/12", "22h"), ("31/12", "23:30"), ("10-11", "19.30"), ("5/11", "20h15"),
+    ("12/11", "12pm"), ("28/10", "21:45"), ("3/11", "9pm"), ("20/11/2026", "18:00"),
+    ("amanhã", "21:00"), ("sábado", "20h"), ("hoje", "22:00"), ("25/12", "meia noite"),
+]
+
+
+def legacy_parse(date_str: str, time_str: str):
+    """Mesmas duas chamadas que o modal fazia antes."""
+    import dateparser
+    parsed_date_only = dateparser.parse(date_str, languages=['pt'], settings={'PREFER_DATES_FROM': 'future', 'TIMEZONE': BRAZIL_TZ_STR})
+    if not parsed_date_only: return None
+    full = f"{parsed_date_only.strftime('%d/%m/%Y')} {time_str}"
+    parsed = dateparser.parse(full, languages=['pt'], settings={'TIMEZONE': BRAZIL_TZ_STR, 'RETURN_AS_TIMEZONE_AWARE': True, 'PREFER_DATES_FROM': 'future'})
+    return parsed.astimezone(BRAZIL_TZ) if parsed else None
+
+
+def new_parse(date_str: str, time_str: str, today: datetime.date):
+    parsed_date_only = date_parsing.parse_date_input(date_str, today)
+    if not parsed_date_only: return None
+    return date_parsing.parse_datetime_input(parsed_date_only, time_str)
+
+
+def clear_caches():
+    date_parsing._parse_date_input_cached.cache_clear()
+    date_parsing.parse_datetime_input.cache_clear()
+
+
+def time_per_submission(func, repetitions: int, before_each_round=None) -> float:
+    elapsed = 0.0
+    for _ in range(repetitions):
+        if before_each_round: before_each_round()
+        start = time.perf_counter()
+        for date_str, time_str in CORPUS: func(date_str, time_str)
+        elapsed += time.perf_counter() - start
+    return elapsed / (repetitions * len(CORPUS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=50)
+    args = parser.parse_args()
+    today = datetime.datetime.now(BRAZIL_TZ).date()
+    fast_inputs = sum(1 for d, t in CORPUS if date_parsing.parse_date_fast(d, today) and date_parsing.parse_time_fast(t))
+
+    start = time.perf_counter(); legacy_parse(*CORPUS[0]); first_call_ms = (time.perf_counter() - start) * 1000
+
+    legacy_us = time_per_submission(legacy_parse, args.repeticoes) * 1e6
+    cold_us = time_per_submission(lambda d, t: new_parse(d, t, today), args.repeticoes, before_each_round=clear_caches) * 1e6
+    clear_caches()
+    warm_us = time_per_submission(lambda d, t: new_parse(d, t, today), args.repeticoes) * 1e6
+
+    print(f"Corpus: {len(CORPUS)} envios ({fast_inputs} nos formatos documentados) x {args.repeticoes} repetições")
+    print(f"  Primeira chamada ao dateparser:          {first_call_ms:10.1f} ms")
+    print(f"  dateparser (antigo):                     {legacy_us:10.1f} µs/envio")
+    print(f"  date_parsing sem cache (caminho rápido): {cold_us:10.1f} µs/envio  ({legacy_us / cold_us:.0f}x)")
+    print(f"  date_parsing com cache:                  {warm_us:10.1f} µs/envio  ({legacy_us / warm_us:.0f}x)")
+    info = date_parsing.cache_info()
+    print(f"  Cache: data {info['data']['hits']} acertos/{info['data']['misses']} faltas; data+hora {info['data_hora']['hits']}/{info['data_hora']['misses']}")
+
+    divergences = [(d, t, legacy_parse(d, t), new_parse(d, t, today)) for d, t in CORPUS]
+    divergences = [(d, t, old, new) for d, t, old, new in divergences if old != new]
+    if divergences:
+        print(f"  {len(divergences)} divergência(s):")
+        for d, t, old, new in divergences:
+            print(f"    {d!r} {t!r}: antigo={old and old.strftime('%d/%m/%Y %H:%M')} novo={new and new.strftime('%d/%m/%Y %H:%M')}")
+    else:
+        print("  Resultados idênticos aos do caminho antigo.")
+
+
+if __name__ == "__main__":
+    main()
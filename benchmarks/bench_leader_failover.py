@@ -0,0 +1,122 @@
+# benchmarks/bench_leader_failover.py
+"""
+Mede o tempo de failover da eleição de líder (leader_election.py) com dois processos locais.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_leader_failover [--rodadas 5] [--ttl 3] [--renovacao 1] [--modo queda|parada]
+
+Dois processos disputam o mesmo lease num banco temporário. A cada rodada o líder atual é
+encerrado (modo 'queda': SIGKILL, sem liberar o lease; modo 'parada': SIGTERM, que libera o
+lease) e mede-se quanto tempo o processo em espera leva para assumir. O processo encerrado é
+reiniciado como reserva para a rodada seguinte. Limites esperados: queda <= ttl + renovação;
+parada <= renovação. Também confere que os fencing tokens crescem a cada troca de dono.
+"""
+import argparse
+import asyncio
+import os
+import queue
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+
+def worker(db_path: str, instance_id: str, ttl: float, renew_interval: float):
+    """Processo participante: imprime 'ELEITO <id> <time.time()> <token>' ao assumir."""
+    import database as db
+    from leader_election import LeaderElector
+    db.DB_NAME = db_path
+
+    async def run():
+        elector = LeaderElector("bench", instance_id=instance_id, ttl_seconds=ttl, renew_interval=renew_interval)
+        async def on_elected():
+            print(f"ELEITO {instance_id} {time.time():.6f} {elector.fencing_token}", flush=True)
+        elector.add_listener(on_elected=on_elected)
+        stop = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        elector.start()
+        await stop.wait()
+        await elector.stop(release=True)
+
+    asyncio.run(run())
+
+
+class Participant:
+    def __init__(self, instance_id: str, args, db_path: str, events: queue.Queue):
+        self.instance_id = instance_id
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_leader_failover", "--worker", db_path, instance_id,
+             "--ttl", str(args.ttl), "--renovacao", str(args.renovacao)],
+            cwd=PROJECT_ROOT, stdout=subprocess.PIPE, text=True
+        )
+        threading.Thread(target=self._read, args=(events,), daemon=True).start()
+
+    def _read(self, events: queue.Queue):
+        for line in self.proc.stdout:
+            parts = line.split()
+            if len(parts) == 4 and parts[0] == "ELEITO":
+                events.put((parts[1], float(parts[2]), int(parts[3])))
+
+    def terminate(self, mode: str):
+        self.proc.send_signal(signal.SIGKILL if mode == "queda" else signal.SIGTERM)
+        self.proc.wait()
+
+
+def wait_election(events: queue.Queue, timeout: float):
+    try: return events.get(timeout=timeout)
+    except queue.Empty: return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rodadas", type=int, default=5)
+    parser.add_argument("--ttl", type=float, default=3.0, help="duração do lease em segundos")
+    parser.add_argument("--renovacao", type=float, default=1.0, help="intervalo de renovação em segundos")
+    parser.add_argument("--modo", choices=("queda", "parada"), default="queda")
+    parser.add_argument("--worker", nargs=2, metavar=("BANCO", "ID"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker(args.worker[0], args.worker[1], args.ttl, args.renovacao); return
+
+    import database as db
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench_leader_"), "bench.db")
+    db.DB_NAME = db_path
+    db.init_db()
+
+    events: queue.Queue = queue.Queue()
+    timeout = (args.ttl + args.renovacao) * 3
+    participants = {name: Participant(name, args, db_path, events) for name in ("A", "B")}
+    first = wait_election(events, timeout)
+    if not first: sys.exit("Nenhum processo assumiu a liderança.")
+    leader, _, last_token = first
+    print(f"Líder inicial: {leader} (token {last_token}). TTL {args.ttl}s, renovação {args.renovacao}s, modo '{args.modo}'.")
+
+    takeovers = []
+    for round_number in range(1, args.rodadas + 1):
+        time.sleep(args.renovacao * 2) # Deixa o líder renovar algumas vezes antes de encerrá-lo
+        killed_at = time.time()
+        participants[leader].terminate(args.modo)
+        elected = wait_election(events, timeout)
+        if not elected: sys.exit(f"Rodada {round_number}: ninguém assumiu em {timeout:.1f}s.")
+        new_leader, elected_at, token = elected
+        if new_leader == leader or token <= last_token:
+            sys.exit(f"Rodada {round_number}: eleição inconsistente ({new_leader}, token {token} após {last_token}).")
+        takeovers.append(elected_at - killed_at)
+        print(f"Rodada {round_number}: {leader} encerrado, {new_leader} assumiu em {takeovers[-1]:.3f}s (token {token}).")
+        participants[leader] = Participant(leader, args, db_path, events) # Volta como reserva
+        leader, last_token = new_leader, token
+
+    for participant in participants.values(): participant.terminate("parada")
+    bound = args.ttl + args.renovacao if args.modo == "queda" else args.renovacao
+    print(f"\nTempo de failover ({len(takeovers)} rodadas): mín {min(takeovers):.3f}s, mediana {statistics.median(takeovers):.3f}s, "
+          f"máx {max(takeovers):.3f}s (limite esperado {bound:.1f}s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# benchmarks/dataset.py
+"""
+Gerador de um banco sintético com o schema do bot (database.init_db) para os benchmarks.
+
+Uso direto (na raiz do projeto):
+    python -m benchmarks.dataset caminho.sqlite3 [--guildas 500] [--eventos 100000] [--rsvps 1000000]
+
+Distribuições escolhidas para lembrar produção:
+- Tamanho dos servidores segue uma lei de potência: poucos servidores grandes concentram a
+  maior parte dos membros e dos eventos.
+- Eventos espalhados de EVENT_PAST_DAYS dias atrás até EVENT_FUTURE_DAYS dias à frente; os
+  passados estão concluídos (parte já com a mensagem apagada), os futuros ativos, com alguns
+  cancelados. Há eventos nas janelas dos lembretes de 15 min e de 1 hora.
+- RSVPs por evento proporcionais ao tamanho do servidor, sem repetir usuário no mesmo evento,
+  com a mistura de status observada (maioria 'vou').
+
+IDs de servidores e usuários são snowflakes plausíveis, então a fórmula de shard se aplica.
+O gerador é determinístico para a mesma semente, e os parâmetros ficam gravados em bot_meta
+(DATASET_META_KEY) para que um banco já gerado seja reaproveitado.
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from typing import List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import database as db
+
+DATASET_META_KEY = "bench_dataset"
+DISCORD_EPOCH_MS = 1420070400000
+EVENT_PAST_DAYS = 60
+EVENT_FUTURE_DAYS = 30
+RSVP_STATUS_WEIGHTS = {'vou': 0.62, 'talvez': 0.14, 'nao_vou': 0.1, 'lista_espera': 0.14}
+ACTIVITY_SPOTS = [('Incursão', 6), ('Masmorra', 3), ('PvP - Desafios de Osíris', 3), ('PvP', 6), ('Outra Atividade', 4)]
+TITLES = ["Câmara de Cristal", "Queda do Rei", "Último Desejo", "Raiz dos Pesadelos", "Limiar da Salvação",
+          "Poço da Heresia", "Desafios de Osíris", "Farm de exóticos", "Noite de Gambit", "Cripta da Pedra"]
+BATCH_SIZE = 50_000
+
+
+def snowflake(rng: random.Random, start: datetime.datetime, end: datetime.datetime) -> int:
+    ms = rng.randint(int(start.timestamp() * 1000), int(end.timestamp() * 1000)) - DISCORD_EPOCH_MS
+    return (ms << 22) | rng.getrandbits(22)
+
+
+def _params(guilds: int, events: int, rsvps: int, seed: int) -> dict:
+    return {"guildas": guilds, "eventos": events, "rsvps": rsvps, "semente": seed}
+
+
+def existing_params(path: str) -> Optional[dict]:
+    """Parâmetros gravados num banco já gerado (None se não existe ou não é um dataset)."""
+    if not os.path.exists(path): return None
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute("SELECT meta_value FROM bot_meta WHERE meta_key = ?", (DATASET_META_KEY,)).fetchone()
+        return json.loads(row[0]) if row else None
+    except sqlite3.Error: return None
+    finally: conn.close()
+
+
+def ensure(path: str, guilds: int, events: int, rsvps: int, seed: int = 42, rebuild: bool = False) -> dict:
+    """Gera o dataset em `path`, a menos que já exista um com os mesmos parâmetros."""
+    params = _params(guilds, events, rsvps, seed)
+    if not rebuild and existing_params(path) == params: return params
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix): os.remove(path + suffix)
+    with contextlib.redirect_stdout(sys.stderr): generate(path, guilds, events, rsvps, seed) # stdout fica livre para o JSON
+    return params
+
+
+def generate(path: str, guilds: int, events: int, rsvps: int, seed: int = 42):
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    now = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+
+    previous_db_name = db.DB_NAME
+    db.DB_NAME = path
+    try: db.init_db()
+    finally: db.DB_NAME = previous_db_name
+
+    # Pesos de uma lei de potência (Zipf, s=1.1) para o tamanho de cada servidor.
+    weights = [1 / (rank ** 1.1) for rank in range(1, guilds + 1)]
+    total_weight = sum(weights)
+    guild_ids = [snowflake(rng, datetime.datetime(2017, 1, 1, tzinfo=datetime.timezone.utc), now) for _ in range(guilds)]
+    events_per_guild = [max(1, round(events * w / total_weight)) for w in weights]
+    events_per_guild[0] += events - sum(events_per_guild) # Ajuste de arredondamento no maior servidor
+    # Membros ativos: grandes o suficiente para preencher os eventos com usuários distintos.
+    average_rsvps = rsvps / max(events, 1)
+    members: List[List[int]] = []
+    user_start = datetime.datetime(2016, 1, 1, tzinfo=datetime.timezone.utc)
+    for count in events_per_guild:
+        size = max(int(average_rsvps * 3) + 5, int(count ** 0.5 * average_rsvps * 2))
+        members.append([snowflake(rng, user_start, now) for _ in range(size)])
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")
+    statuses, status_weights = list(RSVP_STATUS_WEIGHTS), list(RSVP_STATUS_WEIGHTS.values())
+    event_rows, rsvp_rows = [], []
+    event_id, rsvps_left, events_left = 0, rsvps, events
+
+    def flush():
+        conn.executemany("""INSERT INTO events (event_id, guild_id, channel_id, creator_id, title, description, event_time_utc,
+                            activity_type, max_attendees, created_at_utc, message_id, status, delete_message_after_utc,
+                            reminder_sent, confirmation_reminder_sent, temp_role_id)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", event_rows)
+        conn.executemany("INSERT INTO rsvps (event_id, user_id, status, rsvp_timestamp) VALUES (?, ?, ?, ?)", rsvp_rows)
+        event_rows.clear(); rsvp_rows.clear()
+
+    for guild_index, guild_id in enumerate(guild_ids):
+        guild_members = members[guild_index]
+        channel_id = snowflake(rng, now - datetime.timedelta(days=900), now)
+        for _ in range(events_per_guild[guild_index]):
+            event_id += 1
+            offset_minutes = rng.randint(-EVENT_PAST_DAYS * 1440, EVENT_FUTURE_DAYS * 1440)
+            event_time = now + datetime.timedelta(minutes=offset_minutes)
+            created = event_time - datetime.timedelta(days=rng.uniform(0.1, 10))
+            activity_type, spots = rng.choice(ACTIVITY_SPOTS)
+            delete_after, message_id = None, snowflake(rng, created, created + datetime.timedelta(seconds=5))
+            if offset_minutes < 0:
+                status = 'concluido'
+                delete_after = (event_time + datetime.timedelta(hours=2)).isoformat()
+                if offset_minutes < -180: message_id = None # Mensagem já apagada pela limpeza
+            else:
+                status = 'cancelado' if rng.random() < 0.03 else 'ativo'
+            reminder_sent = 1 if offset_minutes < 15 else 0
+            confirmation_sent = 1 if offset_minutes < 60 else 0
+            event_rows.append((event_id, guild_id, channel_id, rng.choice(guild_members), rng.choice(TITLES), None,
+                               event_time.isoformat(), activity_type, spots, created.isoformat(), message_id, status,
+                               delete_after, reminder_sent, confirmation_sent, snowflake(rng, created, created + datetime.timedelta(seconds=5))))
+            # RSVPs restantes divididos pelos eventos restantes, com variação; limitado aos membros do servidor.
+            expected = rsvps_left / events_left
+            count = min(len(guild_members), max(0, round(rng.expovariate(1 / expected)) if expected > 0 else 0), rsvps_left)
+            events_left -= 1
+            for user_id, status_rsvp in zip(rng.sample(guild_members, count), rng.choices(statuses, status_weights, k=count)):
+                rsvp_time = created + datetime.timedelta(seconds=rng.randint(0, 86400))
+                rsvp_rows.append((event_id, user_id, status_rsvp, rsvp_time.isoformat()))
+            rsvps_left -= count
+            if len(rsvp_rows) >= BATCH_SIZE: flush()
+    flush()
+
+    params = _params(guilds, events, rsvps, seed)
+    params["rsvps_gerados"] = rsvps - rsvps_left
+    conn.execute("INSERT OR REPLACE INTO bot_meta (meta_key, meta_value, updated_at_utc) VALUES (?, ?, ?)",
+                 (DATASET_META_KEY, json.dumps(_params(guilds, events, rsvps, seed)), now.isoformat()))
+    conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    print(f"Dataset gerado em {time.perf_counter() - started:.1f}s: {guilds} servidores, {event_id} eventos, {params['rsvps_gerados']} RSVPs -> {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("caminho")
+    parser.add_argument("--guildas", type=int, default=500)
+    parser.add_argument("--eventos", type=int, default=100_000)
+    parser.add_argument("--rsvps", type=int, default=1_000_000)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+    ensure(args.caminho, args.guildas, args.eventos, args.rsvps, args.semente, rebuild=True)
+
+
+if __name__ == "__main__":
+    main()
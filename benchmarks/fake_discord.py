@@ -0,0 +1,465 @@
+# benchmarks/fake_discord.py
+"""
+Substituto local da API do Discord (REST + gateway) para testes de carga sem rede.
+
+O bot de verdade (main.py, com todos os cogs) conecta a este servidor em vez do Discord:
+    python -m benchmarks.fake_discord bot --api http://127.0.0.1:8199 --banco caminho.sqlite3
+
+O servidor em si é montado pelo driver de carga (benchmarks/load_rsvp.py), que cria o estado
+(servidores, membros, cargos, canais, mensagens dos eventos) e injeta cliques de botão pelo
+gateway. Simula:
+- gateway: HELLO, IDENTIFY/READY, GUILD_CREATE com os membros completos (sem chunking),
+  heartbeat, REQUEST_GUILD_MEMBERS, GUILD_MEMBER_UPDATE quando um cargo muda e INTERACTION_CREATE;
+- REST: login e aplicação, sincronização de comandos, respostas de interação e followups,
+  busca/edição/envio de mensagens, cargos de membros, usuários e DMs;
+- limites de taxa com os cabeçalhos X-RateLimit-* e respostas 429 (global e por rota), que o
+  discord.py respeita como faria em produção. Os limites por rota são aproximações dos
+  observados no Discord (RATE_LIMITS) e podem ser escalados ou desativados.
+
+Cada requisição é contada por rota (método + caminho com IDs trocados por {id}), para o
+relatório de chamadas à API por RSVP.
+"""
+import argparse
+import asyncio
+import collections
+import datetime
+import itertools
+import json
+import os
+import re
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web, WSMsgType
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DISCORD_EPOCH_MS = 1420070400000
+API_PREFIX = "/api/v10"
+HEARTBEAT_INTERVAL_MS = 41250
+GATEWAY_RTT_SECONDS = 0.02
+# (limite, janela em segundos) por balde. O global vale para todas as rotas exceto interações.
+GLOBAL_RATE_LIMIT = (50, 1.0)
+RATE_LIMITS = {
+    "mensagem_canal": (5, 5.0),      # POST/PATCH/DELETE de mensagens, por canal (GET só conta no global)
+    "cargo_membro": (10, 10.0),      # PUT/DELETE de cargo de membro, por servidor
+    "dm_abrir": (10, 10.0),          # POST /users/@me/channels
+    "usuario": (30, 1.0),            # GET /users/{id}
+}
+_ID_PATTERN = re.compile(r"/\d{5,}")
+_TOKEN_PATTERN = re.compile(r"(/interactions/\{id\}|/webhooks/\{id\})/[^/]+")
+
+
+def json_response(data, status: int = 200, headers: Optional[dict] = None) -> web.Response:
+    """O discord.py só decodifica o corpo se o Content-Type for exatamente application/json (sem charset)."""
+    return web.Response(body=json.dumps(data).encode(), status=status, headers=dict(headers or {}, **{"Content-Type": "application/json"}))
+
+
+def now_iso() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+class SnowflakeFactory:
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def __call__(self) -> int:
+        return ((int(time.time() * 1000) - DISCORD_EPOCH_MS) << 22) | (next(self._counter) & 0x3FFFFF)
+
+
+def route_key(method: str, path: str) -> str:
+    """'PATCH /api/v10/channels/123/messages/456' -> 'PATCH /channels/{id}/messages/{id}'."""
+    path = _ID_PATTERN.sub("/{id}", path[len(API_PREFIX):] if path.startswith(API_PREFIX) else path)
+    return f"{method} {_TOKEN_PATTERN.sub(lambda m: m.group(1) + '/{token}', path)}"
+
+
+class RateLimiter:
+    """Janelas fixas por balde, com os cabeçalhos que o discord.py usa para se antecipar."""
+
+    def __init__(self, scale: float = 1.0):
+        self.scale = scale
+        self._windows: Dict[str, List[float]] = {}
+
+    def check(self, bucket: str, limit: int, per: float) -> Tuple[bool, Dict[str, str]]:
+        now = time.time()
+        window = self._windows.get(bucket)
+        if window is None or now >= window[0]:
+            window = self._windows[bucket] = [now + per, 0]
+        window[1] += 1
+        remaining = max(0, limit - window[1])
+        headers = {
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": f"{window[0]:.3f}",
+            "X-RateLimit-Reset-After": f"{max(0.0, window[0] - now):.3f}",
+            "X-RateLimit-Bucket": bucket.split(":", 1)[0],
+        }
+        return window[1] <= limit, headers
+
+    def limits(self, name: str) -> Optional[Tuple[int, float]]:
+        if self.scale <= 0: return None
+        limit, per = RATE_LIMITS[name] if name in RATE_LIMITS else GLOBAL_RATE_LIMIT
+        return max(1, int(limit * self.scale)), per
+
+
+class FakeDiscord:
+    """Estado da API simulada e o aplicativo aiohttp que a serve."""
+
+    def __init__(self, shard_count: int = 1, rate_limit_scale: float = 1.0):
+        self.snowflake = SnowflakeFactory()
+        self.shard_count = shard_count
+        self.limiter = RateLimiter(rate_limit_scale)
+        self.app_id = self.snowflake()
+        self.owner = self.make_user("dono")
+        self.bot_user = dict(self.make_user("EventBot"), id=str(self.app_id), bot=True)
+        self.users: Dict[int, dict] = {int(self.owner["id"]): self.owner, self.app_id: self.bot_user}
+        self.guilds: Dict[int, dict] = {}
+        self.members: Dict[int, Dict[int, dict]] = {}
+        self.messages: Dict[int, dict] = {}
+        self.dm_channels: Dict[int, dict] = {}
+        self.commands: List[dict] = []
+        self.requests = collections.Counter()
+        self.rate_limited = collections.Counter()
+        self.shards: Dict[int, web.WebSocketResponse] = {}
+        self.ready_shards: set = set()
+        self._sequences: Dict[int, int] = {}
+        # Observadores das requisições (o driver de carga mede latências por aqui).
+        self.on_interaction_callback: List[Callable[[int, float], None]] = []
+        self.on_message_edit: List[Callable[[int, float], None]] = []
+        self.app = self._build_app()
+
+    # --- Estado ---
+    def make_user(self, name: str, user_id: Optional[int] = None) -> dict:
+        return {"id": str(user_id or self.snowflake()), "username": name, "discriminator": "0", "global_name": name,
+                "avatar": None, "bot": False, "public_flags": 0}
+
+    def add_guild(self, name: str, member_count: int) -> dict:
+        guild_id = self.snowflake()
+        everyone = {"id": str(guild_id), "name": "@everyone", "color": 0, "hoist": False, "position": 0,
+                    "permissions": "1071698660929", "managed": False, "mentionable": False, "flags": 0}
+        channel = {"id": str(self.snowflake()), "type": 0, "guild_id": str(guild_id), "name": "eventos", "position": 0,
+                   "permission_overwrites": [], "nsfw": False, "parent_id": None, "topic": None, "last_message_id": None,
+                   "rate_limit_per_user": 0}
+        guild = {"id": str(guild_id), "name": name, "icon": None, "owner_id": self.owner["id"], "roles": [everyone],
+                 "channels": [channel], "emojis": [], "stickers": [], "features": [], "threads": [], "stage_instances": [],
+                 "guild_scheduled_events": [], "voice_states": [], "presences": [], "large": member_count > 250,
+                 "unavailable": False, "verification_level": 0, "default_message_notifications": 0,
+                 "explicit_content_filter": 0, "mfa_level": 0, "premium_tier": 0, "preferred_locale": "pt-BR",
+                 "system_channel_id": None, "afk_timeout": 300, "nsfw_level": 0, "premium_progress_bar_enabled": False}
+        self.guilds[guild_id] = guild
+        self.members[guild_id] = {}
+        for user in [self.bot_user, self.owner] + [self.make_user(f"membro{i}") for i in range(member_count)]:
+            self.users[int(user["id"])] = user
+            self.members[guild_id][int(user["id"])] = {"user": user, "roles": [], "joined_at": now_iso(), "nick": None,
+                                                      "deaf": False, "mute": False, "flags": 0, "pending": False,
+                                                      "avatar": None, "premium_since": None, "communication_disabled_until": None}
+        return guild
+
+    def add_role(self, guild_id: int, name: str) -> int:
+        role_id = self.snowflake()
+        self.guilds[guild_id]["roles"].append({"id": str(role_id), "name": name, "color": 0, "hoist": False,
+                                               "position": len(self.guilds[guild_id]["roles"]), "permissions": "0",
+                                               "managed": False, "mentionable": True, "flags": 0})
+        return role_id
+
+    def add_message(self, channel_id: int, guild_id: Optional[int], content: str = "", embeds=None, components=None) -> dict:
+        message = {"id": str(self.snowflake()), "channel_id": str(channel_id), "author": self.bot_user, "content": content,
+                   "timestamp": now_iso(), "edited_timestamp": None, "tts": False, "mention_everyone": False,
+                   "mentions": [], "mention_roles": [], "attachments": [], "embeds": embeds or [], "pinned": False,
+                   "type": 0, "components": components or [], "flags": 0}
+        if guild_id: message["guild_id"] = str(guild_id)
+        self.messages[int(message["id"])] = message
+        return message
+
+    def shard_for_guild(self, guild_id: int) -> int:
+        return (guild_id >> 22) % self.shard_count
+
+    def guild_of_channel(self, channel_id: int) -> Optional[int]:
+        for guild_id, guild in self.guilds.items():
+            if any(int(c["id"]) == channel_id for c in guild["channels"]): return guild_id
+        return None
+
+    # --- Gateway ---
+    async def dispatch(self, shard_id: int, event: str, data: dict):
+        ws = self.shards.get(shard_id)
+        if ws is None or ws.closed: raise ConnectionError(f"Shard {shard_id} não está conectado.")
+        self._sequences[shard_id] = self._sequences.get(shard_id, 0) + 1
+        await ws.send_str(json.dumps({"op": 0, "t": event, "s": self._sequences[shard_id], "d": data}))
+
+    async def dispatch_component_click(self, guild_id: int, user_id: int, message_id: int, custom_id: str, interaction_id: Optional[int] = None) -> int:
+        """Simula o clique de `user_id` no botão `custom_id` da mensagem. Retorna o ID da interação."""
+        interaction_id = interaction_id or self.snowflake()
+        message = self.messages[message_id]
+        payload = {
+            "id": str(interaction_id), "application_id": str(self.app_id), "type": 3, "token": f"tok{interaction_id}",
+            "version": 1, "guild_id": str(guild_id), "channel_id": message["channel_id"],
+            "channel": {"id": message["channel_id"], "type": 0, "guild_id": str(guild_id), "name": "eventos"},
+            "member": dict(self.members[guild_id][user_id], permissions="1071698660929"),
+            "message": message, "data": {"custom_id": custom_id, "component_type": 2},
+            "app_permissions": "1071698660929", "locale": "pt-BR", "guild_locale": "pt-BR", "entitlements": [],
+            "authorizing_integration_owners": {"0": str(guild_id)}, "context": 0,
+        }
+        await self.dispatch(self.shard_for_guild(guild_id), "INTERACTION_CREATE", payload)
+        return interaction_id
+
+    async def _gateway(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        await ws.send_str(json.dumps({"op": 10, "d": {"heartbeat_interval": HEARTBEAT_INTERVAL_MS}}))
+        shard_id = None
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT: continue
+            data = json.loads(msg.data)
+            op = data.get("op")
+            if op == 1:
+                # O ACK sai depois de um "RTT": o discord.py marca o envio do heartbeat só depois que a
+                # escrita termina, e um ACK imediato chegaria antes disso (latência medida errada).
+                asyncio.get_running_loop().call_later(GATEWAY_RTT_SECONDS, lambda: asyncio.ensure_future(ws.send_str(json.dumps({"op": 11}))))
+            elif op == 2:
+                shard_id, shard_count = data["d"].get("shard", [0, 1])
+                self.shards[shard_id], self._sequences[shard_id] = ws, 0
+                guilds = [g for gid, g in self.guilds.items() if (gid >> 22) % shard_count == shard_id]
+                await self.dispatch(shard_id, "READY", {
+                    "v": 10, "user": self.bot_user, "guilds": [{"id": g["id"], "unavailable": True} for g in guilds],
+                    "session_id": f"sessao{shard_id}", "resume_gateway_url": f"ws://{request.host}/gateway",
+                    "shard": [shard_id, shard_count], "application": {"id": str(self.app_id), "flags": 0},
+                    "private_channels": [], "relationships": [], "user_settings": {}, "presences": [],
+                })
+                for guild in guilds:
+                    members = list(self.members[int(guild["id"])].values())
+                    await self.dispatch(shard_id, "GUILD_CREATE", dict(guild, members=members, member_count=len(members),
+                                                                       joined_at=now_iso()))
+                self.ready_shards.add(shard_id)
+            elif op == 6:
+                await ws.send_str(json.dumps({"op": 9, "d": False})) # Sem resume: sessão inválida, novo IDENTIFY
+            elif op == 8:
+                guild_id = int(data["d"]["guild_id"])
+                await self.dispatch(shard_id, "GUILD_MEMBERS_CHUNK", {
+                    "guild_id": str(guild_id), "members": list(self.members.get(guild_id, {}).values()),
+                    "chunk_index": 0, "chunk_count": 1, "nonce": data["d"].get("nonce"), "presences": []})
+        if shard_id is not None and self.shards.get(shard_id) is ws:
+            del self.shards[shard_id]
+            self.ready_shards.discard(shard_id)
+        return ws
+
+    # --- REST ---
+    def _build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/gateway", self._gateway)
+        r = lambda method, path, handler: app.router.add_route(method, API_PREFIX + path, handler)
+        r("GET", "/gateway/bot", self._gateway_bot)
+        r("GET", "/users/@me", lambda req: json_response(self.bot_user))
+        r("GET", "/oauth2/applications/@me", self._application)
+        r("GET", "/applications/{app}/commands", lambda req: json_response(self.commands))
+        r("PUT", "/applications/{app}/commands", self._sync_commands)
+        r("PUT", "/applications/{app}/guilds/{guild}/commands", self._sync_commands)
+        r("POST", "/interactions/{id}/{token}/callback", self._interaction_callback)
+        r("POST", "/webhooks/{app}/{token}", self._followup)
+        r("PATCH", "/webhooks/{app}/{token}/messages/{message}", self._edit_webhook_message)
+        r("DELETE", "/webhooks/{app}/{token}/messages/{message}", lambda req: web.Response(status=204))
+        r("GET", "/channels/{channel}", self._get_channel)
+        r("GET", "/channels/{channel}/messages/{message}", self._get_message)
+        r("PATCH", "/channels/{channel}/messages/{message}", self._edit_message)
+        r("DELETE", "/channels/{channel}/messages/{message}", self._delete_message)
+        r("POST", "/channels/{channel}/messages", self._send_message)
+        r("PUT", "/guilds/{guild}/members/{user}/roles/{role}", self._member_role)
+        r("DELETE", "/guilds/{guild}/members/{user}/roles/{role}", self._member_role)
+        r("GET", "/guilds/{guild}/members/{user}", self._get_member)
+        r("GET", "/users/{user}", self._get_user)
+        r("POST", "/users/@me/channels", self._open_dm)
+        return app
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        if request.path == "/gateway": return await handler(request)
+        key = route_key(request.method, request.path)
+        self.requests[key] += 1
+        headers = {}
+        if "/interactions/" not in request.path and "/webhooks/" not in request.path:
+            limits = self.limiter.limits("global")
+            if limits:
+                allowed, global_headers = self.limiter.check("global", *limits)
+                if not allowed: return self._too_many(key, float(global_headers["X-RateLimit-Reset-After"]), is_global=True)
+            bucket = self._bucket_for(request)
+            if bucket and (limits := self.limiter.limits(bucket[0])):
+                allowed, headers = self.limiter.check(f"{bucket[0]}:{bucket[1]}", *limits)
+                if not allowed: return self._too_many(key, float(headers["X-RateLimit-Reset-After"]), headers=headers)
+        try: response = await handler(request)
+        except web.HTTPNotFound: response = json_response({"message": "Unknown", "code": 10000}, status=404)
+        response.headers.update(headers)
+        return response
+
+    def _bucket_for(self, request: web.Request) -> Optional[Tuple[str, str]]:
+        info = request.match_info
+        if request.method != "GET" and ("message" in info or "channel" in info): return "mensagem_canal", info["channel"]
+        if "role" in info: return "cargo_membro", info["guild"]
+        if request.path.endswith("/users/@me/channels"): return "dm_abrir", "@me"
+        if "user" in info and request.method == "GET" and "guild" not in info: return "usuario", "*"
+        return None
+
+    def _too_many(self, key: str, retry_after: float, is_global: bool = False, headers: Optional[dict] = None) -> web.Response:
+        self.rate_limited[key] += 1
+        # Sem o cabeçalho Via, o discord.py trata o 429 como bloqueio do Cloudflare e não tenta de novo.
+        headers = dict(headers or {}, **{"Retry-After": f"{retry_after:.3f}", "X-RateLimit-Scope": "global" if is_global else "user",
+                                         "Via": "1.1 google"})
+        if is_global: headers["X-RateLimit-Global"] = "true"
+        return json_response({"message": "You are being rate limited.", "retry_after": retry_after, "global": is_global},
+                                 status=429, headers=headers)
+
+    async def _gateway_bot(self, request):
+        return json_response({"url": f"ws://{request.host}/gateway", "shards": self.shard_count,
+                                  "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 16}})
+
+    async def _application(self, request):
+        return json_response({"id": str(self.app_id), "name": "EventBot", "icon": None, "description": "", "summary": "",
+                                  "bot_public": True, "bot_require_code_grant": False, "owner": self.owner, "team": None,
+                                  "verify_key": "0" * 64, "flags": 0, "rpc_origins": [], "interactions_endpoint_url": None,
+                                  "bot": self.bot_user})
+
+    async def _sync_commands(self, request):
+        payload = await request.json()
+        self.commands = [dict(command, id=str(self.snowflake()), application_id=str(self.app_id), version="1",
+                              default_member_permissions=command.get("default_member_permissions"))
+                         for command in payload]
+        return json_response(self.commands)
+
+    async def _interaction_callback(self, request):
+        interaction_id = int(request.match_info["id"])
+        payload = await request.json()
+        arrived = time.perf_counter()
+        for callback in self.on_interaction_callback: callback(interaction_id, arrived)
+        response_type = payload.get("type")
+        ephemeral = bool((payload.get("data") or {}).get("flags", 0) & 64)
+        resource = {"type": response_type}
+        if response_type in (4, 7) and payload.get("data"):
+            resource["message"] = dict(self.add_message(0, None, **self._message_fields(payload["data"])), flags=64 if ephemeral else 0)
+        return json_response({"interaction": {"id": str(interaction_id), "type": 3, "response_message_loading": response_type == 5,
+                                                  "response_message_ephemeral": ephemeral}, "resource": resource})
+
+    @staticmethod
+    def _message_fields(payload: dict) -> dict:
+        return {key: payload[key] for key in ("content", "embeds", "components") if key in payload and payload[key] is not None}
+
+    async def _followup(self, request):
+        payload = await request.json() if request.can_read_body else {}
+        message = self.add_message(0, None, **self._message_fields(payload))
+        message["webhook_id"] = str(self.app_id)
+        return json_response(message)
+
+    async def _edit_webhook_message(self, request):
+        payload = await request.json()
+        message = self.messages.get(int(request.match_info["message"])) if request.match_info["message"].isdigit() else None
+        message = message or self.add_message(0, None)
+        message.update(self._message_fields(payload), edited_timestamp=now_iso())
+        return json_response(message)
+
+    async def _get_channel(self, request):
+        channel_id = int(request.match_info["channel"])
+        for guild in self.guilds.values():
+            for channel in guild["channels"]:
+                if int(channel["id"]) == channel_id: return json_response(channel)
+        for channel in self.dm_channels.values():
+            if int(channel["id"]) == channel_id: return json_response(channel)
+        raise web.HTTPNotFound()
+
+    async def _get_message(self, request):
+        message = self.messages.get(int(request.match_info["message"]))
+        if message is None or message["channel_id"] != request.match_info["channel"]: raise web.HTTPNotFound()
+        return json_response(message)
+
+    async def _edit_message(self, request):
+        message_id = int(request.match_info["message"])
+        message = self.messages.get(message_id)
+        if message is None: raise web.HTTPNotFound()
+        message.update(self._message_fields(await request.json()), edited_timestamp=now_iso())
+        arrived = time.perf_counter()
+        for callback in self.on_message_edit: callback(message_id, arrived)
+        return json_response(message)
+
+    async def _delete_message(self, request):
+        if self.messages.pop(int(request.match_info["message"]), None) is None: raise web.HTTPNotFound()
+        return web.Response(status=204)
+
+    async def _send_message(self, request):
+        channel_id = int(request.match_info["channel"])
+        payload = await request.json() if request.content_type == "application/json" else {}
+        message = self.add_message(channel_id, self.guild_of_channel(channel_id), **self._message_fields(payload))
+        return json_response(message)
+
+    async def _member_role(self, request):
+        guild_id, user_id, role_id = (int(request.match_info[k]) for k in ("guild", "user", "role"))
+        member = self.members.get(guild_id, {}).get(user_id)
+        if member is None or not any(int(r["id"]) == role_id for r in self.guilds[guild_id]["roles"]): raise web.HTTPNotFound()
+        roles = set(member["roles"])
+        if request.method == "PUT": roles.add(str(role_id))
+        else: roles.discard(str(role_id))
+        if roles != set(member["roles"]):
+            member["roles"] = sorted(roles)
+            try: await self.dispatch(self.shard_for_guild(guild_id), "GUILD_MEMBER_UPDATE", dict(member, guild_id=str(guild_id)))
+            except ConnectionError: pass
+        return web.Response(status=204)
+
+    async def _get_member(self, request):
+        member = self.members.get(int(request.match_info["guild"]), {}).get(int(request.match_info["user"]))
+        if member is None: raise web.HTTPNotFound()
+        return json_response(member)
+
+    async def _get_user(self, request):
+        user = self.users.get(int(request.match_info["user"]))
+        if user is None: raise web.HTTPNotFound()
+        return json_response(user)
+
+    async def _open_dm(self, request):
+        user_id = int((await request.json())["recipient_id"])
+        if user_id not in self.users: raise web.HTTPNotFound()
+        if user_id not in self.dm_channels:
+            self.dm_channels[user_id] = {"id": str(self.snowflake()), "type": 1, "recipients": [self.users[user_id]], "last_message_id": None}
+        return json_response(self.dm_channels[user_id])
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Inicia o servidor e retorna a URL base (http://host:porta)."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        return f"http://{host}:{site._server.sockets[0].getsockname()[1]}"
+
+    async def stop(self):
+        for ws in list(self.shards.values()): await ws.close()
+        await self._runner.cleanup()
+
+
+def run_bot(api_url: str, db_path: str):
+    """Roda o main.py apontado para a API simulada: REST em `api_url`, gateway em `api_url`/gateway."""
+    import yarl
+    import discord
+    import discord.gateway
+    sys.path.insert(0, PROJECT_ROOT)
+    os.chdir(PROJECT_ROOT) # load_cogs lista ./cogs
+    os.environ.setdefault("DISCORD_BOT_TOKEN", "token-falso")
+    os.environ.setdefault("METRICS_PORT", "0")
+    discord.http.Route.BASE = api_url + API_PREFIX
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(api_url.replace("http", "ws", 1) + "/gateway")
+    import constants
+    import database
+    constants.DB_NAME = database.DB_NAME = db_path
+    import main
+    main.DB_NAME = db_path
+    try: asyncio.run(main.main_async())
+    except KeyboardInterrupt: pass
+    finally: main.bot_logging.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    bot_parser = sub.add_parser("bot", help="roda o bot contra a API simulada")
+    bot_parser.add_argument("--api", required=True, help="URL base do servidor simulado, ex: http://127.0.0.1:8199")
+    bot_parser.add_argument("--banco", required=True, help="arquivo SQLite usado pelo bot")
+    args = parser.parse_args()
+    run_bot(args.api, args.banco)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/import_audit.py
+"""
+Auditoria do custo de import dos módulos do bot.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.import_audit [modulo ...] [--top 15]
+
+Para cada módulo (padrão: main e cada cog) roda um interpretador novo com
+`python -X importtime`, mostrando o tempo total de import e os pacotes de terceiros mais
+caros. Também confere as dependências declaradas no pyproject.toml que nenhum arquivo do
+projeto importa (custo de instalação sem uso) e avisa se algum módulo pesado que deveria ser
+carregado sob demanda (ex: dateparser) entrou no import de inicialização.
+"""
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+import tomllib
+from typing import Dict, List, Set, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Módulos que só devem ser importados sob demanda (ver date_parsing.py e activity_matcher.py).
+LAZY_MODULES = ("dateparser", "difflib")
+# Nome da distribuição (pyproject) -> nome do módulo importado.
+DIST_TO_MODULE = {"discord-py": "discord", "python-dotenv": "dotenv", "google-generativeai": "google.generativeai"}
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def default_targets() -> List[str]:
+    cogs = sorted(f"cogs.{f[:-3]}" for f in os.listdir(os.path.join(PROJECT_ROOT, "cogs")) if f.endswith(".py") and not f.startswith("__"))
+    return ["main"] + cogs
+
+
+def run_importtime(module: str) -> Tuple[List[Tuple[str, int, int, int]], str]:
+    """Retorna ([(módulo, self_us, cumulativo_us, profundidade)], erro) do import de `module` num processo novo."""
+    env = dict(os.environ, DISCORD_BOT_TOKEN=os.environ.get("DISCORD_BOT_TOKEN", "auditoria"))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=PROJECT_ROOT, capture_output=True, text=True, env=env)
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            entries.append((match.group(4), int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2))
+    error = "" if proc.returncode == 0 else proc.stderr.strip().splitlines()[-1]
+    return entries, error
+
+
+def project_imports() -> Set[str]:
+    """Nomes de módulos importados por algum .py do projeto (inclusive imports tardios dentro de funções)."""
+    imported = set()
+    for dirpath, dirnames, filenames in os.walk(PROJECT_ROOT):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.') and d not in ('__pycache__', '.venv', 'venv')]
+        for filename in filenames:
+            if not filename.endswith(".py"): continue
+            with open(os.path.join(dirpath, filename), encoding="utf-8") as f:
+                try: tree = ast.parse(f.read())
+                except SyntaxError: continue
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import): imported.update(alias.name for alias in node.names)
+                elif isinstance(node, ast.ImportFrom) and node.module and not node.level: imported.add(node.module)
+    return imported
+
+
+def unused_dependencies() -> List[str]:
+    with open(os.path.join(PROJECT_ROOT, "pyproject.toml"), "rb") as f:
+        dependencies = tomllib.load(f).get("project", {}).get("dependencies", [])
+    imported = project_imports()
+    unused = []
+    for requirement in dependencies:
+        dist = re.split(r"[<>=!~ \[;]", requirement, 1)[0].strip().lower()
+        module = DIST_TO_MODULE.get(dist, dist.replace("-", "_"))
+        if not any(name == module or name.startswith(module + ".") for name in imported): unused.append(f"{dist} (módulo '{module}')")
+    return unused
+
+
+def summarize(entries: List[Tuple[str, int, int, int]], top: int) -> List[Tuple[str, int]]:
+    """Soma o tempo próprio por pacote de primeiro nível e retorna os `top` mais caros."""
+    by_package: Dict[str, int] = {}
+    for module, self_us, _, _ in entries:
+        package = module.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    return sorted(by_package.items(), key=lambda item: -item[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modulos", nargs="*", help="módulos a auditar (padrão: main e todos os cogs)")
+    parser.add_argument("--top", type=int, default=10, help="quantos pacotes mais caros listar por módulo")
+    args = parser.parse_args()
+
+    baseline_entries, _ = run_importtime("discord")
+    baseline_us = next((cumulative for name, _, cumulative, _ in reversed(baseline_entries) if name == "discord"), 0)
+    baseline_modules = {name for name, *_ in baseline_entries}
+    print(f"Referência: import discord = {baseline_us / 1000:.1f} ms (pago uma vez pelo processo).")
+
+    for module in args.modulos or default_targets():
+        entries, error = run_importtime(module)
+        if error:
+            print(f"\n{module}: falhou ao importar ({error})"); continue
+        total_us = next((cumulative for name, _, cumulative, depth in reversed(entries) if name == module), sum(e[1] for e in entries))
+        own_us = sum(self_us for name, self_us, _, _ in entries if name not in baseline_modules)
+        print(f"\n{module}: {total_us / 1000:.1f} ms ({len(entries)} módulos; {own_us / 1000:.1f} ms além do discord)")
+        for package, self_us in summarize(entries, args.top):
+            print(f"    {package:<30} {self_us / 1000:8.1f} ms")
+        loaded_lazy = sorted({name.split('.')[0] for name, *_ in entries if name.split('.')[0] in LAZY_MODULES})
+        if loaded_lazy: print(f"    AVISO: módulos que deveriam ser sob demanda foram importados: {', '.join(loaded_lazy)}")
+
+    unused = unused_dependencies()
+    print("\nDependências declaradas no pyproject.toml e nunca importadas pelo projeto:")
+    print("\n".join(f"    {dist}" for dist in unused) if unused else "    nenhuma")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# benchmarks/load_rsvp.py
+"""
+Teste de carga ponta a ponta do RSVP (PersistentRsvpView) contra a API simulada (benchmarks/fake_discord.py).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.load_rsvp [--servidores 10] [--membros 300] [--eventos-por-servidor 5]
+                                   [--cliques 2000] [--concorrencia 200] [--shards 1] [--limites 1.0] [--saida resultado.json]
+
+Monta o estado simulado (servidores, membros, um canal por servidor, eventos com cargo
+temporário e mensagem com os botões de RSVP), grava os eventos num banco temporário e inicia o
+bot de verdade (main.py com todos os cogs) num subprocesso conectado ao servidor simulado.
+Depois de um clique de aquecimento, dispara os cliques pelo gateway, com até --concorrencia em
+andamento ao mesmo tempo, sorteando evento, membro e botão.
+
+Mede, no relógio do servidor simulado:
+- clique -> ACK: até a resposta da interação (defer) chegar;
+- clique -> edição: até chegar a edição da mensagem do evento. Cada clique gera uma edição da
+  mensagem; com cliques simultâneos na mesma mensagem, as edições são atribuídas na ordem dos
+  cliques (a média é exata, os percentis são aproximados);
+- chamadas à API por RSVP, no total e por rota, e as respostas 429 recebidas.
+--limites escala os limites de taxa simulados (0 desativa). O log do bot fica em --log-bot.
+"""
+import argparse
+import asyncio
+import collections
+import contextlib
+import datetime
+import json
+import os
+import random
+import signal
+import statistics
+import sys
+import tempfile
+import time
+from typing import Deque, Dict, List, Tuple
+
+from benchmarks.fake_discord import FakeDiscord, PROJECT_ROOT
+from benchmarks.bench_database import environment, percentile
+import database as db
+
+BUTTONS = [("persistent_rsvp_vou", "✅"), ("persistent_rsvp_nao_vou", "❌"), ("persistent_rsvp_talvez", "🔷"),
+           ("persistent_event_edit", "📝"), ("persistent_event_delete", "🗑️")]
+CLICK_WEIGHTS = {"persistent_rsvp_vou": 0.6, "persistent_rsvp_talvez": 0.2, "persistent_rsvp_nao_vou": 0.2}
+READY_TIMEOUT_SECONDS = 120
+
+
+def summarize(latencies_ms: List[float]) -> dict:
+    values = sorted(latencies_ms)
+    if not values: return {"amostras": 0}
+    return {"amostras": len(values), "media_ms": round(statistics.fmean(values), 2), "p50_ms": round(percentile(values, 0.5), 2),
+            "p90_ms": round(percentile(values, 0.9), 2), "p99_ms": round(percentile(values, 0.99), 2), "max_ms": round(values[-1], 2)}
+
+
+class ClickTracker:
+    """Liga ACKs e edições observados pelo servidor simulado aos cliques que os originaram."""
+
+    def __init__(self, fake: FakeDiscord):
+        self.sent: Dict[int, float] = {}
+        self.ack_ms: List[float] = []
+        self.edit_ms: List[float] = []
+        self._pending_edits: Dict[int, Deque[Tuple[float, asyncio.Future]]] = collections.defaultdict(collections.deque)
+        fake.on_interaction_callback.append(self._on_ack)
+        fake.on_message_edit.append(self._on_edit)
+
+    def register(self, interaction_id: int, message_id: int, sent_at: float) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.sent[interaction_id] = sent_at
+        self._pending_edits[message_id].append((sent_at, future))
+        return future
+
+    def _on_ack(self, interaction_id: int, arrived: float):
+        sent_at = self.sent.pop(interaction_id, None)
+        if sent_at is not None: self.ack_ms.append((arrived - sent_at) * 1000)
+
+    def _on_edit(self, message_id: int, arrived: float):
+        pending = self._pending_edits.get(message_id)
+        while pending:
+            sent_at, future = pending.popleft()
+            if future.done(): continue # Expirou
+            self.edit_ms.append((arrived - sent_at) * 1000)
+            future.set_result(arrived)
+            return
+
+
+def seed(fake: FakeDiscord, args, rng: random.Random) -> List[dict]:
+    """Cria servidores, membros e eventos no estado simulado e no banco. Retorna os alvos dos cliques."""
+    db.init_db()
+    targets = []
+    event_time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=2)
+    components = [{"type": 1, "components": [{"type": 2, "style": 4 if custom_id.endswith("delete") else 2, "custom_id": custom_id,
+                                              "emoji": {"name": emoji}, "disabled": False} for custom_id, emoji in BUTTONS]}]
+    for index in range(args.servidores):
+        guild = fake.add_guild(f"Servidor {index}", args.membros)
+        guild_id, channel_id = int(guild["id"]), int(guild["channels"][0]["id"])
+        members = [uid for uid, member in fake.members[guild_id].items() if not member["user"].get("bot") and uid != int(fake.owner["id"])]
+        for number in range(args.eventos_por_servidor):
+            title = f"Câmara de Cristal #{number}"
+            role_id = fake.add_role(guild_id, f"Evento: {title}")
+            event_id = db.db_create_event(guild_id=guild_id, channel_id=channel_id, creator_id=int(fake.owner["id"]), title=title,
+                                          description=None, event_time_utc=event_time.isoformat(), activity_type="Incursão",
+                                          max_attendees=6, created_at_utc=datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                                          temp_role_id=role_id)
+            message = fake.add_message(channel_id, guild_id, embeds=[{"type": "rich", "title": title, "footer": {"text": f"ID do Evento: {event_id}"}}],
+                                       components=components)
+            db.db_update_event_message_id(event_id, int(message["id"]))
+            targets.append({"guild_id": guild_id, "message_id": int(message["id"]), "members": members})
+    return targets
+
+
+async def wait_ready(fake: FakeDiscord, tracker: ClickTracker, target: dict, proc) -> bool:
+    """Espera os shards conectarem e um clique de aquecimento completar o ciclo inteiro."""
+    deadline = time.monotonic() + READY_TIMEOUT_SECONDS
+    while time.monotonic() < deadline and proc.returncode is None:
+        if len(fake.ready_shards) == fake.shard_count:
+            interaction_id = fake.snowflake()
+            future = tracker.register(interaction_id, target["message_id"], time.perf_counter())
+            await fake.dispatch_component_click(target["guild_id"], target["members"][0], target["message_id"], "persistent_rsvp_talvez", interaction_id)
+            try:
+                await asyncio.wait_for(future, timeout=5)
+                return True
+            except asyncio.TimeoutError: pass
+        await asyncio.sleep(0.5)
+    return False
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.semente)
+    work_dir = tempfile.mkdtemp(prefix="load_rsvp_")
+    db_path = os.path.join(work_dir, "bot.sqlite3")
+    previous_db_name, db.DB_NAME = db.DB_NAME, db_path
+    try:
+        fake = FakeDiscord(shard_count=args.shards, rate_limit_scale=args.limites)
+        with contextlib.redirect_stdout(sys.stderr): targets = seed(fake, args, rng) # stdout fica livre para o JSON
+    finally: db.DB_NAME = previous_db_name
+    api_url = await fake.start()
+    tracker = ClickTracker(fake)
+
+    log_path = args.log_bot or os.path.join(work_dir, "bot.log")
+    env = dict(os.environ, DISCORD_BOT_TOKEN="token-falso", METRICS_PORT="0", LOG_FORMAT="texto", LOG_LEVEL=args.nivel_log_bot, DISCORD_GUILD_ID="")
+    with open(log_path, "w") as log_file:
+        proc = await asyncio.create_subprocess_exec(sys.executable, "-m", "benchmarks.fake_discord", "bot", "--api", api_url, "--banco", db_path,
+                                                    cwd=PROJECT_ROOT, env=env, stdout=log_file, stderr=log_file)
+    try:
+        print(f"Bot iniciado (PID {proc.pid}); log em {log_path}. Aguardando o gateway...", file=sys.stderr)
+        if not await wait_ready(fake, tracker, targets[0], proc):
+            sys.exit(f"O bot não ficou pronto em {READY_TIMEOUT_SECONDS}s. Veja o log em {log_path}.")
+
+        fake.requests.clear(); fake.rate_limited.clear()
+        tracker.ack_ms.clear(); tracker.edit_ms.clear()
+        buttons, weights = list(CLICK_WEIGHTS), list(CLICK_WEIGHTS.values())
+        semaphore = asyncio.Semaphore(args.concorrencia)
+        timeouts = 0
+
+        async def click():
+            nonlocal timeouts
+            target = rng.choice(targets)
+            async with semaphore:
+                interaction_id = fake.snowflake()
+                future = tracker.register(interaction_id, target["message_id"], time.perf_counter())
+                await fake.dispatch_component_click(target["guild_id"], rng.choice(target["members"]), target["message_id"],
+                                                    rng.choices(buttons, weights)[0], interaction_id)
+                try: await asyncio.wait_for(future, timeout=args.timeout)
+                except asyncio.TimeoutError: timeouts += 1
+
+        print(f"Disparando {args.cliques} cliques (concorrência {args.concorrencia})...", file=sys.stderr)
+        started = time.perf_counter()
+        await asyncio.gather(*(click() for _ in range(args.cliques)))
+        elapsed = time.perf_counter() - started
+    finally:
+        if proc.returncode is None:
+            proc.send_signal(signal.SIGINT)
+            try: await asyncio.wait_for(proc.wait(), timeout=15)
+            except asyncio.TimeoutError: proc.kill()
+        await fake.stop()
+
+    total_calls = sum(fake.requests.values())
+    return {
+        "ambiente": environment(),
+        "parametros": {key: value for key, value in vars(args).items() if key not in ("saida", "log_bot")},
+        "resultados": {
+            "cliques": args.cliques,
+            "concluidos": len(tracker.edit_ms),
+            "expirados": timeouts,
+            "duracao_s": round(elapsed, 2),
+            "cliques_por_segundo": round(args.cliques / elapsed, 1),
+            "clique_ate_ack": summarize(tracker.ack_ms),
+            "clique_ate_edicao": summarize(tracker.edit_ms),
+            "chamadas_api_por_rsvp": round(total_calls / args.cliques, 2),
+            "chamadas_por_rota_por_rsvp": {route: round(count / args.cliques, 3) for route, count in fake.requests.most_common()},
+            "respostas_429": dict(fake.rate_limited.most_common()),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servidores", type=int, default=10)
+    parser.add_argument("--membros", type=int, default=300, help="membros por servidor")
+    parser.add_argument("--eventos-por-servidor", type=int, default=5)
+    parser.add_argument("--cliques", type=int, default=2000)
+    parser.add_argument("--concorrencia", type=int, default=200, help="cliques em andamento ao mesmo tempo")
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--limites", type=float, default=1.0, help="escala dos limites de taxa simulados (0 desativa)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="segundos até um clique sem edição contar como expirado")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--nivel-log-bot", default="WARNING")
+    parser.add_argument("--log-bot", help="arquivo para o log do bot (padrão: no diretório temporário)")
+    parser.add_argument("--saida", help="grava o JSON neste arquivo em vez do stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.saida:
+        with open(args.saida, "w") as f: json.dump(report, f, indent=2, ensure_ascii=False)
+    else: print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
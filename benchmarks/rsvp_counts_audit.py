@@ -0,0 +1,52 @@
+# benchmarks/rsvp_counts_audit.py
+"""
+Conferência (e reconstrução) das contagens de RSVP por evento (tabela event_rsvp_counts).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.rsvp_counts_audit [--banco caminho.sqlite3] [--ativos] [--corrigir] [--recriar]
+
+As contagens são mantidas por triggers em rsvps (database.init_db). Um banco alterado com os
+triggers ausentes (cópia antiga, restauração parcial, escrita manual) fica divergente. A
+auditoria recalcula as contagens a partir de rsvps e lista os eventos em que diferem;
+--corrigir recalcula só esses eventos e --recriar refaz a tabela inteira. Sai com código 1 se
+sobrar divergência.
+"""
+import argparse
+import sys
+
+import database as db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--banco", help=f"arquivo do banco (padrão: {db.DB_NAME})")
+    parser.add_argument("--ativos", action="store_true", help="confere só os eventos ativos")
+    parser.add_argument("--corrigir", action="store_true", help="recalcula as contagens dos eventos divergentes")
+    parser.add_argument("--recriar", action="store_true", help="recalcula a tabela inteira, sem conferir antes")
+    parser.add_argument("--mostrar", type=int, default=20, help="quantos eventos divergentes listar")
+    args = parser.parse_args()
+    if args.banco: db.DB_NAME = args.banco
+    db.init_db() # Garante tabela e triggers (num banco antigo, a criação já preenche as contagens)
+
+    if args.recriar:
+        print(f"Contagens recriadas: {db.db_rebuild_rsvp_counts()} evento(s).")
+        return
+
+    mismatches = db.db_check_rsvp_counts(active_only=args.ativos)
+    print(f"{len(mismatches)} evento(s) com contagens divergentes{' (só ativos)' if args.ativos else ''}.")
+    for mismatch in mismatches[:args.mostrar]:
+        diffs = ", ".join(f"{status} {mismatch['registrado'][status]} -> {mismatch['esperado'][status]}"
+                          for status in db.RSVP_COUNT_STATUSES if mismatch['registrado'][status] != mismatch['esperado'][status])
+        print(f"    evento {mismatch['event_id']}: {diffs}")
+    if len(mismatches) > args.mostrar: print(f"    ... e mais {len(mismatches) - args.mostrar}.")
+    if not mismatches: return
+
+    if not args.corrigir: sys.exit(1)
+    rebuilt = db.db_rebuild_rsvp_counts([mismatch['event_id'] for mismatch in mismatches])
+    remaining = db.db_check_rsvp_counts(active_only=args.ativos)
+    print(f"Contagens recalculadas: {rebuilt} evento(s); {len(remaining)} divergência(s) restante(s).")
+    if remaining: sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
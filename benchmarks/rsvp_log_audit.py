@@ -0,0 +1,56 @@
+# benchmarks/rsvp_log_audit.py
+"""
+Conferência do histórico de RSVPs (rsvp_log + rsvp_log_snapshots) contra a tabela rsvps.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.rsvp_log_audit [--banco caminho.sqlite3] [--ativos] [--corrigir]
+
+O histórico é gravado em lote (rsvp_log.RsvpLogWriter): um processo que cai perde as transições
+ainda não gravadas, e com o banco fora por muito tempo as mais antigas são descartadas. Sem
+conferência, o replay diverge de rsvps em silêncio, e a compactação torna a divergência
+permanente no snapshot. A auditoria reconstrói cada evento pelo histórico e lista os usuários
+cujo status difere de rsvps; --corrigir acrescenta ao histórico transições com origem
+"auditoria" que o alinham a rsvps. Sai com código 1 se sobrar divergência.
+
+Com o bot rodando, transições de até RSVP_LOG_FLUSH_SECONDS ainda podem estar só na memória de
+alguma instância: confira de novo antes de corrigir uma divergência recente.
+"""
+import argparse
+import datetime
+import sys
+
+import pytz
+
+import database as db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--banco", help=f"arquivo do banco (padrão: {db.DB_NAME})")
+    parser.add_argument("--ativos", action="store_true", help="confere só os eventos ativos")
+    parser.add_argument("--corrigir", action="store_true", help="acrescenta transições que alinham o histórico a rsvps")
+    parser.add_argument("--mostrar", type=int, default=20, help="quantos eventos divergentes listar")
+    args = parser.parse_args()
+    if args.banco: db.DB_NAME = args.banco
+    db.init_db() # Garante as tabelas (num banco antigo, a criação já guarda os RSVPs como snapshot inicial)
+
+    mismatches = db.db_check_rsvp_log(active_only=args.ativos)
+    print(f"{len(mismatches)} evento(s) com histórico divergente de rsvps{' (só ativos)' if args.ativos else ''}.")
+    for mismatch in mismatches[:args.mostrar]:
+        diffs = ", ".join(f"{user_id}: {mismatch['registrado'][user_id]} -> {mismatch['esperado'][user_id]}" for user_id in mismatch['esperado'])
+        print(f"    evento {mismatch['event_id']}: {diffs}")
+    if len(mismatches) > args.mostrar: print(f"    ... e mais {len(mismatches) - args.mostrar}.")
+    if not mismatches: return
+
+    if not args.corrigir: sys.exit(1)
+    now_utc = datetime.datetime.now(pytz.utc).isoformat()
+    corrections = [(mismatch['event_id'], user_id, status, "auditoria", now_utc)
+                   for mismatch in mismatches for user_id, status in mismatch['esperado'].items()]
+    if not db.db_append_rsvp_log(corrections): sys.exit(1)
+    remaining = db.db_check_rsvp_log(active_only=args.ativos)
+    print(f"Transições de correção gravadas: {len(corrections)}; {len(remaining)} evento(s) ainda divergente(s).")
+    if remaining: sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
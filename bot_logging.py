@@ -0,0 +1,167 @@
+# bot_logging.py
+"""
+Logging estruturado e assíncrono do bot.
+
+Cada módulo usa um logger nomeado (bot.tarefas, bot.cargos, bot.eventos...) com nível
+controlado por LOG_LEVEL / LOG_LEVELS. O handler instalado na raiz só coloca o registro numa
+fila (QueueHandler); a formatação em JSON e a escrita no stdout acontecem na thread do
+QueueListener, fora do event loop. Chamadas num nível desabilitado (ex: log.debug em
+produção) param na checagem de nível, sem interpolar a mensagem.
+
+Os prefixos usados nos print() do projeto correspondem a logger e nível (PREFIX_LOGGERS e
+PREFIX_LEVELS): "WARN_TASKS: ..." equivale a logging.getLogger("bot.tarefas").warning(...).
+Os print() que ainda restam em caminhos frios (inicialização, erros do banco) são capturados
+por _PrintRouter e passam pelo mesmo pipeline, classificados por esse mesmo mapeamento.
+"""
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+import threading
+from typing import Dict, Optional
+
+# Sufixo do prefixo (DEBUG_<SUFIXO>:) -> nome do logger.
+PREFIX_LOGGERS = {
+    "TASKS": "bot.tarefas",
+    "JOBS": "bot.jobs",
+    "ROLE_UTILS": "bot.cargos",
+    "EVENT_COG": "bot.eventos",
+    "LISTENERS": "bot.listeners",
+    "UTILS": "bot.utils",
+    "LEADER": "bot.lider",
+    "LAUNCHER": "bot.launcher",
+    "METRICS": "bot.metricas",
+    "LOOP": "bot.loop",
+}
+# Início do prefixo -> nível. "DEBUG:" sem sufixo vai para o logger "bot".
+PREFIX_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARN": logging.WARNING,
+    "AVISO": logging.WARNING,
+    "ERRO": logging.ERROR,
+}
+_PREFIX_PATTERN = re.compile(r"^(DEBUG|INFO|WARN|AVISO|ERRO)(?:_([A-Z_]+))?(?:\s+CRÍTICO)?:\s*")
+_ERROR_START = re.compile(r"^(?:Erro|ERRO|Error|Falha)\b")
+
+# Atributos padrão de um LogRecord; o resto (passado via extra={...}) vai como campo do JSON.
+_STANDARD_ATTRS = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue: Optional[queue.SimpleQueue] = None
+_original_stdout = sys.stdout
+
+
+def logger_for_prefix(line: str):
+    """'WARN_TASKS: texto' -> (logger 'bot.tarefas', WARNING, 'texto'). Sem prefixo: ('bot.print', INFO/ERROR)."""
+    match = _PREFIX_PATTERN.match(line)
+    if not match:
+        level = logging.ERROR if _ERROR_START.match(line) else logging.INFO
+        return logging.getLogger("bot.print"), level, line
+    suffix = match.group(2)
+    name = PREFIX_LOGGERS.get(suffix, f"bot.{suffix.lower()}") if suffix else "bot"
+    level = logging.CRITICAL if "CRÍTICO" in match.group(0) else PREFIX_LEVELS[match.group(1)]
+    return logging.getLogger(name), level, line[match.end():]
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"): entry[key] = value
+        if record.exc_info: entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text: entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Só interpola a mensagem (para que argumentos mutáveis não mudem depois) e enfileira.
+    A formatação (JSON, traceback) fica para a thread do listener, ao contrário do
+    QueueHandler padrão, que formata o registro inteiro na thread que chamou o log.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class _PrintRouter:
+    """Substitui sys.stdout: cada print() vira um registro de log, classificado pelo prefixo."""
+    def __init__(self):
+        self._buffer = ""
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            self._buffer += text
+            if not self._buffer.endswith("\n"): return len(text)
+            lines, self._buffer = self._buffer.rstrip("\n"), ""
+        if lines.strip():
+            logger, level, message = logger_for_prefix(lines)
+            if logger.isEnabledFor(level): logger.log(level, message)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+
+def parse_levels(levels_str: Optional[str]) -> Dict[str, int]:
+    """'bot.cargos=DEBUG,discord=WARNING' -> {'bot.cargos': 10, 'discord': 30}. Entradas inválidas são ignoradas."""
+    levels = {}
+    for part in (levels_str or "").split(","):
+        name, _, level_name = part.partition("=")
+        level = logging.getLevelName(level_name.strip().upper())
+        if name.strip() and isinstance(level, int): levels[name.strip()] = level
+    return levels
+
+
+def setup_logging(level: str = "INFO", levels: Optional[str] = None, fmt: str = "json", capture_prints: bool = True):
+    """Instala o pipeline (idempotente). `level` vale para os loggers bot.*; `levels` ajusta loggers específicos."""
+    global _listener, _queue
+    if _listener is not None: return
+
+    stream_handler = logging.StreamHandler(_original_stdout)
+    stream_handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter("%(asctime)s %(levelname)-8s %(name)s: %(message)s"))
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=False)
+    _listener.start()
+    atexit.register(shutdown)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers): root.removeHandler(handler)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    root.setLevel(logging.WARNING)
+    bot_level = logging.getLevelName(level.upper())
+    logging.getLogger("bot").setLevel(bot_level if isinstance(bot_level, int) else logging.INFO)
+    logging.getLogger("discord").setLevel(logging.INFO)
+    for name, logger_level in parse_levels(levels).items(): logging.getLogger(name).setLevel(logger_level)
+
+    if capture_prints: sys.stdout = _PrintRouter()
+
+
+def queue_depth() -> int:
+    """Registros ainda na fila, esperando a thread do listener escrevê-los."""
+    return _queue.qsize() if _queue is not None else 0
+
+
+def shutdown():
+    """Esvazia a fila e para o listener (chamado também no atexit)."""
+    global _listener
+    if _listener is None: return
+    _listener.stop()
+    _listener = None
+    if isinstance(sys.stdout, _PrintRouter): sys.stdout = _original_stdout
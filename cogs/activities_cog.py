@@ -0,0 +1,88 @@
+# cogs/activities_cog.py
+import discord
+from discord import app_commands
+from discord.ext import commands
+from typing import Literal, Optional
+
+import database as db
+from activity_matcher import (
+    parse_aliases, normalize_activity_text, invalidate_guild_matcher, default_catalogue_entries
+)
+
+# Os mesmos tipos oferecidos pela SelectActivityDetailsView, para manter cores e listagens consistentes.
+ACTIVITY_TYPES = Literal[
+    'Incursão',
+    'Masmorra',
+    'PvP - Desafios de Osíris',
+    'PvP',
+    'Outra Atividade'
+]
+
+class ActivitiesCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    activities_group = app_commands.Group(
+        name="atividades",
+        description="Gere o catálogo de atividades reconhecidas pelo /agendar neste servidor.",
+        default_permissions=discord.Permissions(administrator=True),
+        guild_only=True
+    )
+
+    @activities_group.command(name="adicionar", description="Adiciona (ou substitui) uma atividade no catálogo do servidor.")
+    @app_commands.describe(
+        nome="Nome oficial da atividade, ex: Limiar da Salvação.",
+        tipo="Tipo da atividade.",
+        vagas="Número padrão de vagas.",
+        apelidos="Apelidos separados por vírgula, ex: limiar, se, salvations edge (opcional)."
+    )
+    async def add_activity(self, interaction: discord.Interaction, nome: app_commands.Range[str, 1, 80], tipo: ACTIVITY_TYPES,
+                           vagas: app_commands.Range[int, 1, 25], apelidos: Optional[str] = None):
+        name = nome.strip()
+        name_key = normalize_activity_text(name)
+        aliases = parse_aliases(apelidos)
+        if not name_key:
+            await interaction.response.send_message("O nome da atividade precisa conter letras ou números.", ephemeral=True); return
+
+        if not db.db_upsert_guild_activity(interaction.guild_id, name, name_key, tipo, vagas, aliases):
+            await interaction.response.send_message("Ocorreu um erro ao salvar a atividade.", ephemeral=True); return
+        invalidate_guild_matcher(interaction.guild_id)
+
+        aliases_str = f" Apelidos: {', '.join(f'`{a}`' for a in aliases)}." if aliases else ""
+        await interaction.response.send_message(f"✅ Atividade **{name}** ({tipo}, {vagas} vagas) salva no catálogo do servidor.{aliases_str}", ephemeral=True)
+
+    @activities_group.command(name="remover", description="Remove uma atividade do catálogo do servidor.")
+    @app_commands.describe(nome="Nome da atividade a remover.")
+    async def remove_activity(self, interaction: discord.Interaction, nome: str):
+        if not db.db_remove_guild_activity(interaction.guild_id, normalize_activity_text(nome)):
+            await interaction.response.send_message(f"Nenhuma atividade personalizada chamada **{nome.strip()}** neste servidor.", ephemeral=True); return
+        invalidate_guild_matcher(interaction.guild_id)
+        await interaction.response.send_message(f"🗑️ Atividade **{nome.strip()}** removida do catálogo do servidor.", ephemeral=True)
+
+    @remove_activity.autocomplete('nome')
+    async def remove_activity_autocomplete(self, interaction: discord.Interaction, current: str):
+        current_key = normalize_activity_text(current)
+        return [
+            app_commands.Choice(name=row['name'], value=row['name'])
+            for row in db.db_get_guild_activities(interaction.guild_id)
+            if current_key in normalize_activity_text(row['name'])
+        ][:25]
+
+    @activities_group.command(name="listar", description="Lista as atividades personalizadas deste servidor.")
+    async def list_activities(self, interaction: discord.Interaction):
+        rows = db.db_get_guild_activities(interaction.guild_id)
+        embed = discord.Embed(title="🎮 Catálogo de Atividades", color=discord.Color.blue())
+        if not rows:
+            embed.description = "Nenhuma atividade personalizada. Apenas o catálogo padrão está em uso."
+        else:
+            lines = []
+            for row in rows:
+                aliases = parse_aliases(row['aliases'])
+                alias_str = f" — apelidos: {', '.join(aliases)}" if aliases else ""
+                lines.append(f"**{row['name']}** ({row['activity_type']}, {row['default_spots']} vagas){alias_str}")
+            embed.description = "\n".join(lines)[:4000]
+        embed.set_footer(text=f"Além destas, {len(default_catalogue_entries())} atividades do catálogo padrão são reconhecidas. As personalizadas têm precedência.")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(ActivitiesCog(bot))
@@ -5,6 +5,9 @@ from discord.ext import commands
 from typing import Optional
 import database as db
 import re
+import pytz
+from digest_scheduler import parse_digest_times, format_digest_times
+from constants import DIGEST_TIMES_BRT, DIGEST_MAX_TIMES_PER_DAY, BRAZIL_TZ_STR
 
 class AdminCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -55,6 +58,7 @@ class AdminCog(commands.Cog):
     @app_commands.describe(canal="O canal de texto para onde o resumo diário será enviado e comandos podem ser usados.")
     async def definir_canal_lista(self, interaction: discord.Interaction, canal: discord.TextChannel):
         db.db_set_digest_channel(interaction.guild_id, canal.id)
+        self._reload_digest_schedule(interaction.guild_id)
         await interaction.response.send_message(f"Canal de resumo diário (e comandos) definido para: {canal.mention}.", ephemeral=True)
 
     @definir_canal_lista.error
@@ -65,6 +69,53 @@ class AdminCog(commands.Cog):
             print(f"Erro no comando /definir_canal_lista: {error}")
             await interaction.response.send_message("Ocorreu um erro ao processar o comando.", ephemeral=True)
 
+    def _reload_digest_schedule(self, guild_id: int):
+        tasks_cog = self.bot.get_cog("TasksCog")
+        if tasks_cog: tasks_cog.reload_digest_schedule(guild_id)
+
+    @app_commands.command(name="definir_horarios_resumo", description="Define os horários (e o fuso) do resumo diário de eventos deste servidor.")
+    @app_commands.checks.has_permissions(administrator=True)
+    @app_commands.guild_only()
+    @app_commands.describe(
+        horarios="Horários separados por vírgula, ex: 08:00, 16:00. Use 'padrao' para voltar ao padrão.",
+        fuso="Fuso horário IANA, ex: America/Sao_Paulo (opcional, padrão: horário de Brasília)."
+    )
+    async def definir_horarios_resumo(self, interaction: discord.Interaction, horarios: str, fuso: Optional[str] = None):
+        default_times_str = format_digest_times([t.replace(tzinfo=None) for t in DIGEST_TIMES_BRT])
+        if horarios.strip().lower() in ('padrao', 'padrão'):
+            db.db_set_digest_schedule(interaction.guild_id, None, None)
+            self._reload_digest_schedule(interaction.guild_id)
+            await interaction.response.send_message(f"Horários do resumo diário restaurados para o padrão ({default_times_str}, {BRAZIL_TZ_STR}).", ephemeral=True)
+            return
+
+        try: times = parse_digest_times(horarios)
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True); return
+        if not times or len(times) > DIGEST_MAX_TIMES_PER_DAY:
+            await interaction.response.send_message(f"Informe de 1 a {DIGEST_MAX_TIMES_PER_DAY} horários, ex: {default_times_str}.", ephemeral=True); return
+
+        tz_name = fuso.strip() if fuso and fuso.strip() else None
+        if tz_name:
+            try: tz_name = pytz.timezone(tz_name).zone
+            except pytz.UnknownTimeZoneError:
+                await interaction.response.send_message(f"Fuso horário desconhecido: `{tz_name}`. Use um nome IANA, ex: `America/Sao_Paulo`.", ephemeral=True); return
+
+        times_str = format_digest_times(times)
+        db.db_set_digest_schedule(interaction.guild_id, times_str, tz_name)
+        self._reload_digest_schedule(interaction.guild_id)
+        msg = f"Resumo diário agendado para {times_str.replace(',', ', ')} ({tz_name or BRAZIL_TZ_STR})."
+        if not db.db_get_digest_channel(interaction.guild_id):
+            msg += "\nAtenção: nenhum canal de resumo definido. Use /definir_canal_lista."
+        await interaction.response.send_message(msg, ephemeral=True)
+
+    @definir_horarios_resumo.error
+    async def definir_horarios_resumo_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        if isinstance(error, app_commands.MissingPermissions):
+            await interaction.response.send_message("Você precisa ser administrador para usar este comando.", ephemeral=True)
+        else:
+            print(f"Erro no comando /definir_horarios_resumo: {error}")
+            await interaction.response.send_message("Ocorreu um erro ao processar o comando.", ephemeral=True)
+
     @app_commands.command(name="configurar_canal_eventos", description="Configura um canal para posts de eventos e o designa para seleção.")
     @app_commands.checks.has_permissions(manage_channels=True)
     @app_commands.guild_only()
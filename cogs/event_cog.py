@@ -4,23 +4,26 @@ from discord import app_commands, ui
 from discord.ext import commands
 import asyncio
 import datetime
+import logging
 import sqlite3
 import pytz
 import re
 from typing import Literal, Optional, List
 
-import dateparser
-
 # Imports customizados
 import database as db
 import utils 
+from metrics import RSVP_SECONDS, RSVP_ACK_SECONDS
 import role_utils 
+import rsvp_store
 from constants import (
     BRAZIL_TZ, BRAZIL_TZ_STR,
     DIAS_SEMANA_PT_FULL, DIAS_SEMANA_PT_SHORT, MESES_PT
 )
 from utils import SelectChannelView, SelectActivityDetailsView, ConfirmActivityView
 
+log = logging.getLogger("bot.eventos")
+
 
 # --- Modals ---
 class EditEventModal(discord.ui.Modal, title="✏️ Editar Detalhes Básicos"):
@@ -44,7 +47,7 @@ class EditEventModal(discord.ui.Modal, title="✏️ Editar Detalhes Básicos"):
             self.event_datetime_input.placeholder = dt_brt.strftime('%d/%m %H:%M')
             self.event_datetime_input.default = dt_brt.strftime('%d/%m %H:%M')
         except Exception as e:
-            print(f"Error parsing date for EditEventModal default: {e}")
+            log.warning("Erro ao interpretar a data padrão do EditEventModal: %s", e)
             self.event_datetime_input.placeholder = "DD/MM HH:MM"
             self.event_datetime_input.default = ""
 
@@ -80,6 +83,7 @@ class EditEventModal(discord.ui.Modal, title="✏️ Editar Detalhes Básicos"):
         if new_datetime_input_str.lower() != 'x' and \
            new_datetime_input_str != '' and \
            new_datetime_input_str != self.event_datetime_input.placeholder:
+            import dateparser  # Import tardio: carregar o dateparser é lento e só a edição de data precisa dele.
             now_brt = utils.get_brazil_now()
             current_year = now_brt.year
             parsed_dt_brt = None
@@ -135,9 +139,9 @@ class EditEventModal(discord.ui.Modal, title="✏️ Editar Detalhes Básicos"):
                     try:
                         new_time_formatted = f"<t:{int(parsed_dt_brt_for_notification.timestamp())}:F>"
                         await event_channel.send(f"📢 {temp_role.mention} Atenção! O evento **'{final_title}'** (anteriormente '{current_event_details['title']}') foi reagendado para: {new_time_formatted}")
-                        print(f"DEBUG: Notificação de reagendamento enviada para evento {self.event_id}, cargo {temp_role_id_to_notify}.")
+                        log.debug("Notificação de reagendamento enviada para evento %s, cargo %s.", self.event_id, temp_role_id_to_notify)
                     except Exception as e_notify:
-                        print(f"Erro ao notificar mudança de horário para evento {self.event_id}: {e_notify}")
+                        log.error("Erro ao notificar mudança de horário para evento %s: %s", self.event_id, e_notify)
 
         if (title_changed or datetime_changed) and temp_role_id_to_notify and interaction.guild:
             temp_role_obj = interaction.guild.get_role(temp_role_id_to_notify)
@@ -146,9 +150,9 @@ class EditEventModal(discord.ui.Modal, title="✏️ Editar Detalhes Básicos"):
                 if temp_role_obj.name != new_role_name_expected:
                     try:
                         await temp_role_obj.edit(name=new_role_name_expected, reason=f"Título/data do evento {self.event_id} alterado.")
-                        print(f"DEBUG: Cargo temporário {temp_role_id_to_notify} renomeado para '{new_role_name_expected}'.")
-                    except discord.Forbidden: print(f"WARN: Sem permissão para renomear cargo temporário {temp_role_id_to_notify}.")
-                    except discord.HTTPException as e_rename: print(f"WARN: Erro HTTP ao renomear cargo temporário {temp_role_id_to_notify}: {e_rename}")
+                        log.debug("Cargo temporário %s renomeado para '%s'.", temp_role_id_to_notify, new_role_name_expected)
+                    except discord.Forbidden: log.warning("Sem permissão para renomear cargo temporário %s.", temp_role_id_to_notify)
+                    except discord.HTTPException as e_rename: log.warning("Erro HTTP ao renomear cargo temporário %s: %s", temp_role_id_to_notify, e_rename)
 
         db.db_update_event_details(event_id=self.event_id, title=final_title, description=final_description, event_time_utc=final_event_time_utc_str)
 
@@ -159,7 +163,7 @@ class EditEventModal(discord.ui.Modal, title="✏️ Editar Detalhes Básicos"):
         await interaction.followup.send("Detalhes básicos do evento atualizados!", ephemeral=True)
 
     async def on_error(self, interaction: discord.Interaction, error: Exception) -> None:
-        print(f"Erro no EditEventModal: {error}"); import traceback; traceback.print_exc()
+        log.error("Erro no EditEventModal: %s", error, exc_info=error)
         msg = "Ocorreu um erro crítico ao processar a edição. Verifique o console."
         if interaction.response.is_done(): await interaction.followup.send(msg, ephemeral=True)
         else: await interaction.response.send_message(msg, ephemeral=True, delete_after=10)
@@ -288,7 +292,7 @@ class ConfirmDeleteView(discord.ui.View):
         guild = self.bot.get_guild(event_details['guild_id'])
         temp_role_id = event_details['temp_role_id']
         role_deleted_msg = ""
-        attendees_to_notify = db.db_get_rsvps_for_event(self.event_id).get('vou', [])
+        attendees_to_notify = rsvp_store.get_event(self.event_id).users('vou')
 
         notification_message = f"ℹ️ O evento **'{event_details['title']}'** para o qual você estava inscrito(a) foi cancelado."
         if attendees_to_notify and guild:
@@ -296,26 +300,27 @@ class ConfirmDeleteView(discord.ui.View):
                 try:
                     member_to_notify = guild.get_member(user_id_notify)
                     if not member_to_notify:
-                        print(f"INFO_EVENT_COG: Não foi possível encontrar o membro {user_id_notify} na guilda para notificar sobre o cancelamento do evento {self.event_id}. Provavelmente saiu do servidor.")
+                        log.info("Não foi possível encontrar o membro %s na guilda para notificar sobre o cancelamento do evento %s. Provavelmente saiu do servidor.", user_id_notify, self.event_id)
                         continue
 
                     if not member_to_notify.bot:
                         await member_to_notify.send(notification_message)
-                        print(f"DEBUG: Notificação de cancelamento enviada para {member_to_notify.display_name} (ID: {user_id_notify}) para evento {self.event_id}")
+                        log.debug("Notificação de cancelamento enviada para %s (ID: %s) para evento %s", member_to_notify.display_name, user_id_notify, self.event_id)
                 except discord.Forbidden:
-                    print(f"WARN: Não foi possível enviar DM de cancelamento para {user_id_notify} (evento {self.event_id}).")
+                    log.warning("Não foi possível enviar DM de cancelamento para %s (evento %s).", user_id_notify, self.event_id)
                 except discord.NotFound:
-                    print(f"INFO_EVENT_COG: Membro {user_id_notify} não encontrado ao tentar notificar sobre o cancelamento do evento {self.event_id}.")
+                    log.info("Membro %s não encontrado ao tentar notificar sobre o cancelamento do evento %s.", user_id_notify, self.event_id)
                 except Exception as e_dm_cancel:
-                    print(f"ERRO: Erro inesperado ao enviar DM de cancelamento para {user_id_notify}: {e_dm_cancel}")
+                    log.error("Erro inesperado ao enviar DM de cancelamento para %s: %s", user_id_notify, e_dm_cancel)
 
         if temp_role_id and guild:
-            role_deleted = await role_utils.delete_event_role(guild, temp_role_id, f"Evento '{event_details['title']}' (ID: {self.event_id}) cancelado.")
-            if role_deleted: role_deleted_msg = " Cargo temporário associado também foi deletado."
-            else: role_deleted_msg = " Tentativa de deletar cargo temporário (verifique logs)."
+            role_deleted = await role_utils.return_event_role(guild, temp_role_id, f"Evento '{event_details['title']}' (ID: {self.event_id}) cancelado.")
+            if role_deleted: role_deleted_msg = " Cargo temporário associado também foi liberado."
+            else: role_deleted_msg = " Tentativa de liberar cargo temporário (verifique logs)."
 
         delete_time = datetime.datetime.now(pytz.utc) + datetime.timedelta(hours=1)
         db.db_update_event_status(self.event_id, 'cancelado', delete_time.isoformat())
+        rsvp_store.discard(self.event_id)
         db.db_update_event_details(event_id=self.event_id, temp_role_id=None)
 
         if event_details['message_id'] and event_details['channel_id'] and self.parent_view_instance:
@@ -363,11 +368,12 @@ class PersistentRsvpView(discord.ui.View):
         return int(match.group(1))
 
     async def _handle_rsvp_logic(self, interaction: discord.Interaction, new_status: str, event_id: int):
-        print(f"DEBUG: _handle_rsvp_logic (EventCog) INICIADA para event_id={event_id}, user='{interaction.user.name}', status='{new_status}'")
+        log.debug("_handle_rsvp_logic (EventCog) INICIADA para event_id=%s, user='%s', status='%s'", event_id, interaction.user.name, new_status)
         user_id = interaction.user.id
         if not interaction.response.is_done():
             try: await interaction.response.defer(ephemeral=True)
-            except discord.HTTPException: print(f"DEBUG: Falha ao deferir RSVP para evento {event_id}"); return
+            except discord.HTTPException: log.debug("Falha ao deferir RSVP para evento %s", event_id); return
+            RSVP_ACK_SECONDS.observe((discord.utils.utcnow() - interaction.created_at).total_seconds())
 
         event_details = db.db_get_event_details(event_id)
         if not event_details:
@@ -393,24 +399,14 @@ class PersistentRsvpView(discord.ui.View):
             except discord.HTTPException: pass
             return
 
-        max_attendees = event_details['max_attendees']
-        current_rsvps = db.db_get_rsvps_for_event(event_id)
-        current_vou_list = current_rsvps.get('vou', [])
-        user_was_confirmed = user_id in current_vou_list
-        user_current_status = None 
-        for status_key, user_ids_in_status in current_rsvps.items():
-            if user_id in user_ids_in_status:
-                user_current_status = status_key
-                break
-
-        final_status_for_user = new_status
-
-        if new_status == 'vou':
-            if user_id in current_vou_list: pass 
-            elif len(current_vou_list) < max_attendees: final_status_for_user = 'vou'
-            else: final_status_for_user = 'lista_espera'
-
-        db.db_add_or_update_rsvp(event_id, user_id, final_status_for_user)
+        # Vagas e promoção decididas no banco, numa transação: a cópia do rsvp_store pode estar atrasada em relação a outra instância.
+        result = rsvp_store.apply_click(event_id, user_id, new_status)
+        if result is None:
+            try: await interaction.followup.send("Ocorreu um erro ao salvar sua resposta. Tente novamente.", ephemeral=True)
+            except discord.HTTPException: pass
+            return
+        user_current_status = result['previous']
+        final_status_for_user = result['status']
 
         temp_role_id = event_details['temp_role_id']
         temp_role: Optional[discord.Role] = None
@@ -427,83 +423,82 @@ class PersistentRsvpView(discord.ui.View):
             if action_for_role: 
                 await role_utils.manage_member_event_role(member, temp_role, action_for_role, event_id)
 
-        user_left_confirmed_spot = user_was_confirmed and final_status_for_user != 'vou'
-        if user_left_confirmed_spot:
-            updated_rsvps = db.db_get_rsvps_for_event(event_id) 
-            if len(updated_rsvps.get('vou', [])) < max_attendees and updated_rsvps.get('lista_espera'):
-                promoted_id = updated_rsvps['lista_espera'][0]
-                db.db_add_or_update_rsvp(event_id, promoted_id, 'vou')
-                if temp_role and interaction.guild: 
-                    promoted_member_obj = interaction.guild.get_member(promoted_id)
-                    if promoted_member_obj:
-                        await role_utils.manage_member_event_role(promoted_member_obj, temp_role, "add", event_id)
-                try:
-                    promoted_user = self.bot.get_user(promoted_id) or await self.bot.fetch_user(promoted_id)
-                    if promoted_user: await promoted_user.send(f"🎉 Vaga aberta para '{event_details['title']}'! Você foi confirmado(a)!")
-                except Exception as e_dm: print(f"DEBUG: Erro DM promoção: {e_dm}")
+        promoted_id = result['promoted']
+        if promoted_id is not None:
+            if temp_role and interaction.guild: 
+                promoted_member_obj = interaction.guild.get_member(promoted_id)
+                if promoted_member_obj:
+                    await role_utils.manage_member_event_role(promoted_member_obj, temp_role, "add", event_id)
+            try:
+                promoted_user = self.bot.get_user(promoted_id) or await self.bot.fetch_user(promoted_id)
+                if promoted_user: await promoted_user.send(f"🎉 Vaga aberta para '{event_details['title']}'! Você foi confirmado(a)!")
+            except Exception as e_dm: log.debug("Erro DM promoção: %s", e_dm)
 
         await self._update_event_message_embed(event_id, event_details['channel_id'], event_details['message_id'])
-        print(f"DEBUG: _handle_rsvp_logic (EventCog) CONCLUÍDA para event_id={event_id}")
+        log.debug("_handle_rsvp_logic (EventCog) CONCLUÍDA para event_id=%s", event_id)
 
     async def _update_event_message_embed(self, event_id: int, channel_id: int, message_id: int | None):
-        print(f"DEBUG: _update_event_message_embed (EventCog) INICIADA event_id={event_id}")
-        if message_id is None: print(f"DEBUG: Evento {event_id} sem message_id."); return
+        log.debug("_update_event_message_embed (EventCog) INICIADA event_id=%s", event_id)
+        if message_id is None: log.debug("Evento %s sem message_id.", event_id); return
 
         event_details = db.db_get_event_details(event_id)
         if not event_details: 
-            print(f"DEBUG: Detalhes do evento {event_id} não encontrados para _update_event_message_embed."); return
+            log.debug("Detalhes do evento %s não encontrados para _update_event_message_embed.", event_id); return
 
         target_channel = self.bot.get_channel(channel_id) or await self.bot.fetch_channel(channel_id) # type: ignore
         if not (target_channel and isinstance(target_channel, discord.TextChannel)):
-            print(f"DEBUG: Canal {channel_id} não encontrado/inválido para evento {event_id}."); return
+            log.debug("Canal %s não encontrado/inválido para evento %s.", channel_id, event_id); return
 
         message_to_edit: Optional[discord.Message] = None
         try: 
             message_to_edit = await target_channel.fetch_message(message_id)
         except (discord.NotFound, discord.Forbidden) as e: 
-            print(f"DEBUG: Erro fetch msg {message_id} para evento {event_id}: {e}"); return
+            log.debug("Erro fetch msg %s para evento %s: %s", message_id, event_id, e); return
         except Exception as e: 
-            print(f"DEBUG: Erro desconhecido fetch msg {message_id} para evento {event_id}: {e}"); return
+            log.debug("Erro desconhecido fetch msg %s para evento %s: %s", message_id, event_id, e); return
 
         if event_details['status'] == 'cancelado':
             embed = discord.Embed(title=f"[CANCELADO] {event_details['title']}", description="Este evento foi cancelado.", color=discord.Color.dark_grey())
             dt_utc = datetime.datetime.fromisoformat(event_details['event_time_utc'].replace('Z', '+00:00'))
             embed.add_field(name="🗓️ Data Original", value=f"<t:{int(dt_utc.timestamp())}:F>", inline=False)
             try: await message_to_edit.edit(content="**EVENTO CANCELADO**", embed=embed, view=None)
-            except Exception as e: print(f"DEBUG: Erro ao editar msg cancelada {event_id}: {e}")
+            except Exception as e: log.debug("Erro ao editar msg cancelada %s: %s", event_id, e)
             return
         elif event_details['status'] == 'concluido':
             embed = discord.Embed(title=f"[CONCLUÍDO] {event_details['title']}", description="Este evento já foi finalizado.", color=discord.Color.light_grey())
             dt_utc = datetime.datetime.fromisoformat(event_details['event_time_utc'].replace('Z', '+00:00'))
             embed.add_field(name="🗓️ Data Original", value=f"<t:{int(dt_utc.timestamp())}:F>", inline=False)
             try: await message_to_edit.edit(content="**EVENTO CONCLUÍDO**", embed=embed, view=None)
-            except Exception as e: print(f"DEBUG: Erro ao editar msg concluída {event_id}: {e}")
+            except Exception as e: log.debug("Erro ao editar msg concluída %s: %s", event_id, e)
             return
 
-        rsvps_data = db.db_get_rsvps_for_event(event_id)
+        rsvps_data = rsvp_store.get_rsvps(event_id)
         active_event_embed = await utils.build_event_embed(event_details, rsvps_data, self.bot)
 
         try: 
             await message_to_edit.edit(embed=active_event_embed, view=self) 
-            print(f"DEBUG: Embed do evento {event_id} ATUALIZADO usando build_event_embed.")
+            log.debug("Embed do evento %s ATUALIZADO usando build_event_embed.", event_id)
         except Exception as e: 
-            print(f"DEBUG: ERRO ao editar msg {event_id} no final do _update_event_message_embed: {e}")
-        print(f"DEBUG: _update_event_message_embed (EventCog) CONCLUÍDA event_id={event_id}")
+            log.debug("ERRO ao editar msg %s no final do _update_event_message_embed: %s", event_id, e)
+        log.debug("_update_event_message_embed (EventCog) CONCLUÍDA event_id=%s", event_id)
 
     @discord.ui.button(label=None, emoji="✅", style=discord.ButtonStyle.secondary, custom_id="persistent_rsvp_vou")
     async def vou_button_callback(self, interaction: discord.Interaction, button: discord.ui.Button):
-        event_id = await self._extract_event_id_from_interaction(interaction)
-        if event_id is not None: await self._handle_rsvp_logic(interaction, "vou", event_id)
+        with RSVP_SECONDS.time(status="vou"):
+            event_id = await self._extract_event_id_from_interaction(interaction)
+            if event_id is not None: await self._handle_rsvp_logic(interaction, "vou", event_id)
 
     @discord.ui.button(label=None, emoji="❌", style=discord.ButtonStyle.secondary, custom_id="persistent_rsvp_nao_vou")
     async def nao_vou_button_callback(self, interaction: discord.Interaction, button: discord.ui.Button):
-        event_id = await self._extract_event_id_from_interaction(interaction)
-        if event_id is not None: await self._handle_rsvp_logic(interaction, "nao_vou", event_id)
+        with RSVP_SECONDS.time(status="nao_vou"):
+            event_id = await self._extract_event_id_from_interaction(interaction)
+            if event_id is not None: await self._handle_rsvp_logic(interaction, "nao_vou", event_id)
 
     @discord.ui.button(label=None, emoji="🔷", style=discord.ButtonStyle.secondary, custom_id="persistent_rsvp_talvez")
     async def talvez_button_callback(self, interaction: discord.Interaction, button: discord.ui.Button):
-        event_id = await self._extract_event_id_from_interaction(interaction)
-        if event_id is not None: await self._handle_rsvp_logic(interaction, "talvez", event_id)
+        with RSVP_SECONDS.time(status="talvez"):
+            event_id = await self._extract_event_id_from_interaction(interaction)
+            if event_id is not None: await self._handle_rsvp_logic(interaction, "talvez", event_id)
 
     @discord.ui.button(label="Editar", emoji="📝", style=discord.ButtonStyle.secondary, custom_id="persistent_event_edit")
     async def edit_button_callback(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -3,82 +3,162 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import traceback 
+import logging
+import asyncio
 
 # Imports customizados
 import database as db
 import utils
 import role_utils
+import rsvp_store
+import rsvp_log
+from constants import MEMBER_CHANGES_BATCH_SECONDS, TASKS_DISCORD_CONCURRENCY
 from cogs.event_cog import PersistentRsvpView # Para recriar a view ao editar o embed
 
+log = logging.getLogger("bot.listeners")
+
 class ListenersCog(commands.Cog):
+    """
+    Mudanças de membros e cargos que afetam eventos (saídas, cargos restritos ganhos, cargos
+    apagados) são acumuladas por MEMBER_CHANGES_BATCH_SECONDS e processadas juntas: uma onda de
+    expulsões ou uma atribuição de cargo em massa vira poucas transações no banco e uma única
+    edição por mensagem de evento afetada.
+    """
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        # Mudanças aguardando o processamento em lote
+        self._pending_departures: dict[int, set[int]] = {}            # {guild_id: {user_id}}
+        self._pending_role_gains: dict[int, dict[int, set[int]]] = {}  # {guild_id: {user_id: {role_id}}}
+        self._pending_deleted_roles: dict[int, set[int]] = {}          # {guild_id: {role_id}}
+        self._batch_flush: asyncio.Task | None = None
+
+    async def cog_unload(self):
+        # Processa na hora as mudanças ainda na janela, para não perdê-las num reload ou desligamento.
+        if self._batch_flush: self._batch_flush.cancel()
+        if self._has_pending(): await self._process_batch(*self._take_pending())
+
+    def _has_pending(self) -> bool:
+        return bool(self._pending_departures or self._pending_role_gains or self._pending_deleted_roles)
+
+    def _take_pending(self) -> tuple[dict, dict, dict]:
+        pending = (self._pending_departures, self._pending_role_gains, self._pending_deleted_roles)
+        self._pending_departures, self._pending_role_gains, self._pending_deleted_roles = {}, {}, {}
+        return pending
+
+    def _schedule_flush(self):
+        if self._batch_flush is None or self._batch_flush.done():
+            self._batch_flush = asyncio.create_task(self._flush_after_window(), name="mudancas-de-membros")
+
+    async def _flush_after_window(self):
+        # Mudanças que chegam durante o processamento de um lote entram no lote seguinte.
+        while self._has_pending():
+            await asyncio.sleep(MEMBER_CHANGES_BATCH_SECONDS)
+            try: await self._process_batch(*self._take_pending())
+            except Exception as e: log.error("Erro ao processar o lote de mudanças de membros/cargos: %s", e, exc_info=e)
 
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member):
         """
         Este evento é acionado quando um membro sai ou é removido do servidor.
-        Ele limpa todos os RSVPs ativos do membro.
+        Os RSVPs ativos do membro são limpos no próximo lote.
         """
-        print(f"INFO_LISTENERS: Membro {member.display_name} (ID: {member.id}) saiu/foi removido da guild {member.guild.id}. Verificando RSVPs ativos...")
-
-        # 1. Obter todos os eventos ativos nos quais o membro estava inscrito nesta guilda
-        active_event_ids = db.db_get_user_active_rsvps_in_guild(member.id, member.guild.id)
-        
-        if not active_event_ids:
-            print(f"INFO_LISTENERS: Nenhum RSVP ativo encontrado para o membro que saiu {member.id}.")
-            return
-
-        print(f"INFO_LISTENERS: Membro {member.id} tem RSVPs em {len(active_event_ids)} evento(s) ativo(s). Removendo...")
-
-        for event_id in active_event_ids:
-            # Obter detalhes do evento para atualizar o embed mais tarde
-            event_details = db.db_get_event_details(event_id)
-            if not event_details:
-                continue
-
-            # Remover o RSVP do membro do banco de dados
-            db.db_remove_rsvp(event_id, member.id)
-            print(f"DEBUG_LISTENERS: RSVP do membro {member.id} removido do evento {event_id}.")
-            
-            # Verificar se é necessário promover alguém da lista de espera
-            rsvps_after_removal = db.db_get_rsvps_for_event(event_id)
-            max_attendees = event_details['max_attendees']
-            
-            if len(rsvps_after_removal.get('vou', [])) < max_attendees and rsvps_after_removal.get('lista_espera'):
-                promoted_user_id = rsvps_after_removal['lista_espera'][0]
-                db.db_add_or_update_rsvp(event_id, promoted_user_id, 'vou')
-                print(f"DEBUG_LISTENERS: Usuário {promoted_user_id} promovido para 'Vou' no evento {event_id} após a saída de {member.id}.")
-
-                # Adicionar o membro promovido ao cargo temporário, se houver
-                promoted_member = member.guild.get_member(promoted_user_id)
-                temp_role_id = event_details['temp_role_id']
-                if promoted_member and temp_role_id:
-                    temp_role = member.guild.get_role(temp_role_id)
-                    if temp_role:
-                        await role_utils.manage_member_event_role(promoted_member, temp_role, "add", event_id)
-
-            # Atualizar a mensagem do evento para refletir a mudança
-            if event_details['channel_id'] and event_details['message_id']:
-                target_channel = self.bot.get_channel(event_details['channel_id'])
-                if target_channel and isinstance(target_channel, discord.TextChannel):
-                    try:
-                        msg_to_edit = await target_channel.fetch_message(event_details['message_id'])
-                        
-                        # Re-buscar dados atualizados para construir o embed
-                        updated_event_details = db.db_get_event_details(event_id)
-                        updated_rsvps = db.db_get_rsvps_for_event(event_id)
-
-                        if updated_event_details:
-                            new_embed = await utils.build_event_embed(updated_event_details, updated_rsvps, self.bot)
-                            new_view = PersistentRsvpView(bot_instance=self.bot)
-                            await msg_to_edit.edit(embed=new_embed, view=new_view)
-                            print(f"DEBUG_LISTENERS: Embed do evento {event_id} atualizado devido à saída do membro {member.id}.")
-                    except (discord.NotFound, discord.Forbidden) as e:
-                        print(f"WARN_LISTENERS: Não foi possível atualizar o embed do evento {event_id} após a saída do membro: {e}")
-                    except Exception as e:
-                        print(f"ERRO_LISTENERS: Erro inesperado ao atualizar embed do evento {event_id}: {e}")
-            
+        log.info("Membro %s (ID: %s) saiu/foi removido da guild %s. RSVPs serão limpos no próximo lote.", member.display_name, member.id, member.guild.id)
+        self._pending_departures.setdefault(member.guild.id, set()).add(member.id)
+        self._schedule_flush()
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        """Um membro que ganha um cargo restrito perde os RSVPs dos eventos que o restringem (no próximo lote)."""
+        gained_role_ids = {role.id for role in after.roles} - {role.id for role in before.roles}
+        # Os cargos temporários que o próprio bot dá a cada RSVP não restringem nada: nem entram no lote.
+        gained_role_ids -= role_utils.EVENT_ROLE_IDS
+        if not gained_role_ids: return
+        self._pending_role_gains.setdefault(after.guild.id, {}).setdefault(after.id, set()).update(gained_role_ids)
+        self._schedule_flush()
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        """Cargos apagados saem das restrições, menções e do cargo temporário dos eventos que os citam (no próximo lote)."""
+        self._pending_deleted_roles.setdefault(role.guild.id, set()).add(role.id)
+        self._schedule_flush()
+
+    async def _process_batch(self, departures: dict[int, set[int]], role_gains: dict[int, dict[int, set[int]]], deleted_roles: dict[int, set[int]]):
+        """Aplica um lote de mudanças no banco e atualiza cada evento afetado uma única vez."""
+        events_to_refresh: dict[int, dict] = {}
+
+        if deleted_roles:
+            pruned_events = db.db_prune_deleted_roles({guild_id: sorted(role_ids) for guild_id, role_ids in deleted_roles.items()})
+            log.info("Lote de cargos apagados: %s cargo(s); %s evento(s) ativo(s) com restrições atualizadas.",
+                     sum(map(len, deleted_roles.values())), len(pruned_events))
+            events_to_refresh.update((event['event_id'], event) for event in pruned_events)
+
+        affected_events: list[dict] = []
+        if departures:
+            departed_events = db.db_remove_departed_members_rsvps({guild_id: sorted(user_ids) for guild_id, user_ids in departures.items()})
+            log.info("Lote de saídas: %s membro(s) em %s servidor(es); %s evento(s) ativo(s) afetado(s).",
+                     sum(map(len, departures.values())), len(departures), len(departed_events))
+            rsvp_log.record_batch_changes(departed_events, "saida")
+            affected_events.extend(departed_events)
+
+        # Cargos ganhos por quem já saiu ou que foram apagados no mesmo lote não restringem mais nada.
+        role_gains = {guild_id: {user_id: sorted(role_ids - deleted_roles.get(guild_id, set())) for user_id, role_ids in gains.items()
+                                 if user_id not in departures.get(guild_id, set()) and role_ids - deleted_roles.get(guild_id, set())}
+                      for guild_id, gains in role_gains.items()}
+        # Só cargos que restringem algo (restritos padrão ou de eventos ativos): uma consulta por servidor, sobre a união dos cargos ganhos.
+        for guild_id, gains in role_gains.items():
+            restricting = db.db_filter_restricting_roles(guild_id, set().union(*gains.values()))
+            role_gains[guild_id] = {user_id: [role_id for role_id in role_ids if role_id in restricting] for user_id, role_ids in gains.items()
+                                    if not restricting.isdisjoint(role_ids)}
+        role_gains = {guild_id: gains for guild_id, gains in role_gains.items() if gains}
+        if role_gains:
+            restricted_events = db.db_remove_restricted_members_rsvps(role_gains)
+            rsvp_log.record_batch_changes(restricted_events, "cargo_restrito")
+            if restricted_events:
+                log.info("Cargos restritos: %s RSVP(s) removido(s) em %s evento(s) ativo(s).",
+                         sum(len(event['removed']) for event in restricted_events), len(restricted_events))
+            for event in restricted_events:
+                # Quem perdeu a vaga sai do cargo temporário
+                guild = self.bot.get_guild(event['guild_id'])
+                temp_role = guild.get_role(event['temp_role_id']) if guild and event['temp_role_id'] else None
+                if not temp_role: continue
+                for user_id in event['removed']:
+                    removed_member = guild.get_member(user_id)
+                    if removed_member: await role_utils.manage_member_event_role(removed_member, temp_role, "remove", event['event_id'])
+            affected_events.extend(restricted_events)
+
+        rsvp_store.discard(*(event['event_id'] for event in affected_events))
+        for event in affected_events:
+            log.debug("Evento %s: RSVPs removidos %s, promovidos para 'Vou' %s.", event['event_id'], event['removed'], event['promoted'])
+            events_to_refresh[event['event_id']] = event
+            # Adicionar os membros promovidos ao cargo temporário, se houver
+            guild = self.bot.get_guild(event['guild_id'])
+            temp_role = guild.get_role(event['temp_role_id']) if guild and event['temp_role_id'] else None
+            if not temp_role: continue
+            for promoted_user_id in event['promoted']:
+                promoted_member = guild.get_member(promoted_user_id)
+                if promoted_member: await role_utils.manage_member_event_role(promoted_member, temp_role, "add", event['event_id'])
+
+        events_to_refresh = {event_id: event for event_id, event in events_to_refresh.items() if event['channel_id'] and event['message_id']}
+        await utils.gather_with_concurrency(TASKS_DISCORD_CONCURRENCY, *(self._refresh_event_message(event) for event in events_to_refresh.values()))
+
+    async def _refresh_event_message(self, event: dict):
+        """Atualiza a mensagem do evento para refletir a mudança (edição direta, sem buscar a mensagem antes)."""
+        event_id = event['event_id']
+        target_channel = self.bot.get_channel(event['channel_id'])
+        if not (target_channel and isinstance(target_channel, discord.TextChannel)): return
+        try:
+            updated_event_details = db.db_get_event_details(event_id)
+            if not updated_event_details: return
+            updated_rsvps = rsvp_store.get_rsvps(event_id)
+            new_embed = await utils.build_event_embed(updated_event_details, updated_rsvps, self.bot)
+            new_view = PersistentRsvpView(bot_instance=self.bot)
+            await target_channel.get_partial_message(event['message_id']).edit(embed=new_embed, view=new_view)
+            log.debug("Embed do evento %s atualizado após mudanças de membros/cargos.", event_id)
+        except (discord.NotFound, discord.Forbidden) as e:
+            log.warning("Não foi possível atualizar o embed do evento %s após mudanças de membros/cargos: %s", event_id, e)
+        except Exception as e:
+            log.error("Erro inesperado ao atualizar embed do evento %s: %s", event_id, e)
+
     @commands.Cog.listener()
     async def on_command_error(self, ctx: commands.Context, error: commands.CommandError):
         """Trata erros para comandos de prefixo tradicionais."""
@@ -126,9 +206,9 @@ class ListenersCog(commands.Cog):
             else:
                 await interaction.response.send_message(user_message, ephemeral=True)
         except discord.NotFound:
-            print("DEBUG: Interação não encontrada ao tentar enviar mensagem de erro (on_app_command_error).")
+            log.debug("Interação não encontrada ao tentar enviar mensagem de erro (on_app_command_error).")
         except Exception as e_resp_err:
-            print(f"DEBUG: Erro adicional ao tentar enviar mensagem de erro para interação: {e_resp_err}")
+            log.debug("Erro adicional ao tentar enviar mensagem de erro para interação: %s", e_resp_err)
 
 
 async def setup(bot: commands.Bot):
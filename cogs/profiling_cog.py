@@ -0,0 +1,116 @@
+# cogs/profiling_cog.py
+import asyncio
+import datetime
+import io
+import logging
+from typing import Literal, Optional
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+import profiling
+from constants import PROFILE_MAX_SECONDS
+
+log = logging.getLogger("bot.perfil")
+
+
+def _as_file(text: str, prefix: str, extension: str = "txt") -> discord.File:
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d-%H%M%S")
+    return discord.File(io.BytesIO(text.encode("utf-8")), filename=f"{prefix}-{stamp}.{extension}")
+
+
+class ProfilingCog(commands.Cog):
+    """Diagnóstico do processo em produção. Restrito ao dono da aplicação (bot.is_owner)."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.memory = profiling.MemoryTracker()
+        self._cpu_stop: Optional[asyncio.Event] = None # Existe enquanto há um perfil de CPU em andamento
+
+    async def cog_load(self):
+        profiling.install_task_age_tracking(asyncio.get_running_loop())
+
+    async def cog_unload(self):
+        profiling.uninstall_task_age_tracking()
+        if self._cpu_stop: self._cpu_stop.set()
+        if self.memory.running: self.memory.stop()
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await self.bot.is_owner(interaction.user)
+
+    async def cog_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        if isinstance(error, app_commands.CheckFailure): message = "Este comando é restrito ao dono do bot."
+        else:
+            log.error("Erro no comando /%s: %s", interaction.command.qualified_name if interaction.command else "perfil", error, exc_info=error)
+            message = "Ocorreu um erro ao processar o comando."
+        if interaction.response.is_done(): await interaction.followup.send(message, ephemeral=True)
+        else: await interaction.response.send_message(message, ephemeral=True)
+
+    profile_group = app_commands.Group(
+        name="perfil",
+        description="Diagnóstico de desempenho do bot (restrito ao dono).",
+        default_permissions=discord.Permissions(administrator=True)
+    )
+
+    @profile_group.command(name="cpu", description="Perfila a CPU do event loop por alguns segundos e envia o relatório.")
+    @app_commands.describe(
+        segundos="Duração do perfil (pode ser encerrado antes com /perfil parar).",
+        modo="amostragem: custo baixo, bom para produção. deterministico: cProfile, mede toda chamada (mais lento)."
+    )
+    async def cpu(self, interaction: discord.Interaction, segundos: app_commands.Range[int, 1, PROFILE_MAX_SECONDS],
+                  modo: Literal['amostragem', 'deterministico'] = 'amostragem'):
+        if self._cpu_stop is not None:
+            await interaction.response.send_message("Já existe um perfil de CPU em andamento. Use /perfil parar.", ephemeral=True); return
+        self._cpu_stop = asyncio.Event()
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        log.info("Perfil de CPU (%s) por %ss iniciado por %s.", modo, segundos, interaction.user.id)
+        try:
+            if modo == 'deterministico':
+                report = await profiling.profile_cpu_deterministic(segundos, self._cpu_stop)
+                files = [_as_file(report, "perfil-cprofile")]
+            else:
+                report, stacks = await profiling.profile_cpu_sampling(segundos, self._cpu_stop)
+                files = [_as_file(report, "perfil-amostragem"), _as_file(stacks, "perfil-pilhas", "folded")]
+        finally:
+            self._cpu_stop = None
+        await interaction.followup.send(f"Perfil de CPU ({modo}) concluído.", files=files, ephemeral=True)
+
+    @profile_group.command(name="parar", description="Encerra antes do tempo o perfil de CPU em andamento.")
+    async def stop_cpu(self, interaction: discord.Interaction):
+        if self._cpu_stop is None:
+            await interaction.response.send_message("Nenhum perfil de CPU em andamento.", ephemeral=True); return
+        self._cpu_stop.set()
+        await interaction.response.send_message("Perfil encerrado; o relatório será enviado em instantes.", ephemeral=True)
+
+    @profile_group.command(name="memoria", description="Controla o tracemalloc: iniciar, tirar snapshot (com diferença) ou parar.")
+    @app_commands.describe(acao="snapshot compara com o snapshot anterior (ou com o início do rastreamento).")
+    async def memory_command(self, interaction: discord.Interaction, acao: Literal['iniciar', 'snapshot', 'parar']):
+        if acao == 'iniciar':
+            if self.memory.running:
+                await interaction.response.send_message("O rastreamento de memória já está ativo.", ephemeral=True); return
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            await asyncio.to_thread(self.memory.start)
+            await interaction.followup.send("Rastreamento de memória iniciado. Alocações ficam mais lentas enquanto ele estiver ativo.", ephemeral=True)
+        elif acao == 'snapshot':
+            if not self.memory.running:
+                await interaction.response.send_message("Inicie o rastreamento com `/perfil memoria iniciar` primeiro.", ephemeral=True); return
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            # take_snapshot e compare_to rodam numa thread; o tracemalloc é seguro para isso.
+            report = await asyncio.to_thread(self.memory.snapshot_diff)
+            await interaction.followup.send(f"Snapshot {self.memory.snapshot_count}.", file=_as_file(report, "perfil-memoria"), ephemeral=True)
+        else:
+            if not self.memory.running:
+                await interaction.response.send_message("O rastreamento de memória não está ativo.", ephemeral=True); return
+            self.memory.stop()
+            await interaction.response.send_message("Rastreamento de memória encerrado.", ephemeral=True)
+
+    @profile_group.command(name="tarefas", description="Lista as tasks do asyncio mais antigas, com a pilha de cada uma.")
+    @app_commands.describe(limite="Quantas tasks listar.")
+    async def tasks_command(self, interaction: discord.Interaction, limite: app_commands.Range[int, 1, 500] = 50):
+        report = profiling.dump_tasks(limite)
+        await interaction.response.send_message(file=_as_file(report, "perfil-tarefas"), ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(ProfilingCog(bot))
@@ -4,14 +4,14 @@ from discord import app_commands, ui
 from discord.ext import commands
 import datetime
 import pytz
-import dateparser
 from typing import Optional, List
 
 # Imports de outros módulos do projeto
 import database as db
 import utils 
 import role_utils
-from constants import BRAZIL_TZ, BRAZIL_TZ_STR
+import date_parsing
+from constants import BRAZIL_TZ
 # Views agora vêm de utils
 from utils import SelectActivityDetailsView, SelectChannelView, ConfirmActivityView
 from cogs.event_cog import PersistentRsvpView
@@ -62,12 +62,13 @@ class AgendarEventoModal(discord.ui.Modal, title="📅 Agendar Novo Evento"):
         time_str_input = self.hora_input.value.strip()
 
         now_brt = utils.get_brazil_now()
-        parsed_date_only = dateparser.parse(date_str, languages=['pt'], settings={'PREFER_DATES_FROM': 'future', 'TIMEZONE': BRAZIL_TZ_STR})
+        # Formatos documentados (DD/MM, 19:00, 21h30, 7pm) têm caminho rápido; o resto cai no dateparser.
+        parsed_date_only = date_parsing.parse_date_input(date_str, now_brt.date())
         if not parsed_date_only:
             await interaction.followup.send(f"Não consegui entender a data: '{date_str}'.", ephemeral=True); return
 
         full_datetime_str_for_parse = f"{parsed_date_only.strftime('%d/%m/%Y')} {time_str_input}"
-        event_dt_brt = dateparser.parse(full_datetime_str_for_parse, languages=['pt'], settings={'TIMEZONE': BRAZIL_TZ_STR, 'RETURN_AS_TIMEZONE_AWARE': True, 'PREFER_DATES_FROM': 'future'})
+        event_dt_brt = date_parsing.parse_datetime_input(parsed_date_only, time_str_input)
 
         if not event_dt_brt:
             await interaction.followup.send(f"Não entendi data/hora: '{full_datetime_str_for_parse}'.", ephemeral=True); return
@@ -89,7 +90,7 @@ class AgendarEventoModal(discord.ui.Modal, title="📅 Agendar Novo Evento"):
             "created_at_utc": datetime.datetime.now(pytz.utc).isoformat()
         }
 
-        detected_title, detected_activity_type, detected_max_attendees = utils.detect_activity_details(event_name_original_input)
+        detected_title, detected_activity_type, detected_max_attendees = utils.detect_activity_details(event_name_original_input, interaction.guild_id)
 
         user_confirmed_detection = False
         final_title = event_name_original_input
@@ -156,7 +157,7 @@ class AgendarEventoModal(discord.ui.Modal, title="📅 Agendar Novo Evento"):
 
         created_temp_role_id: Optional[int] = None
         if interaction.guild and 'event_date_obj_for_role' in event_data:
-            temp_role = await role_utils.create_event_role(interaction.guild, event_data['title'], event_data['event_date_obj_for_role'])
+            temp_role = await role_utils.checkout_event_role(interaction.guild, event_data['title'], event_data['event_date_obj_for_role'])
             if temp_role:
                 created_temp_role_id = temp_role.id
 
@@ -173,7 +174,7 @@ class AgendarEventoModal(discord.ui.Modal, title="📅 Agendar Novo Evento"):
         if not event_id:
             await interaction.followup.send("Falha crítica ao salvar evento no DB.", ephemeral=True)
             if created_temp_role_id and interaction.guild:
-                await role_utils.delete_event_role(interaction.guild, created_temp_role_id, "Falha ao salvar evento no DB.")
+                await role_utils.return_event_role(interaction.guild, created_temp_role_id, "Falha ao salvar evento no DB.")
             return
 
         target_channel = self.bot.get_channel(event_data['channel_id'])
@@ -3,252 +3,562 @@ import discord
 from discord.ext import commands, tasks
 import asyncio 
 import datetime
+import logging
 import pytz
 import database as db
 import utils 
 import role_utils 
-from constants import BRAZIL_TZ, DIGEST_TIMES_BRT # Importar a nova lista de horários
+import rsvp_store
+import rsvp_log
+import job_queue
+import recurrence
+from digest_scheduler import DigestScheduler
+from role_reconciler import RoleReconciler
+from job_queue import JobDiscarded
+from metrics import REGISTRY, task_timed
+from constants import (
+    BRAZIL_TZ, TASKS_DISCORD_CONCURRENCY,
+    BULK_DELETE_MAX_AGE, BULK_DELETE_MAX_MESSAGES,
+    REMINDER_LEAD_TIME, CONFIRMATION_REMINDER_LEAD_TIME, JOB_PLANNING_LOOKAHEAD,
+    REMINDER_DM_SPACING_SECONDS, JOB_RETENTION, RECURRENCE_HORIZON, ROLE_RECONCILE_INTERVAL_MINUTES
+)
 from utils import ConfirmAttendanceView 
 from cogs.event_cog import PersistentRsvpView 
 
+log = logging.getLogger("bot.tarefas")
+
+# Chave em bot_meta alterada a cada mudança de agenda de digest, para que a instância líder
+# recarregue o heap mesmo quando o comando de configuração foi atendido por outra instância.
+DIGEST_SCHEDULE_VERSION_KEY = "digest_agenda_versao"
+
+# Tipos de job da fila durável (tabela scheduled_jobs).
+JOB_LEMBRETE = "lembrete_evento"            # Lembrete de ~15 min (menção ao cargo ou fan-out de DMs)
+JOB_LEMBRETE_DM = "lembrete_dm"             # DM de lembrete para um participante
+JOB_CONFIRMACAO = "confirmacao_evento"      # Lembrete de confirmação de ~1h (fan-out de DMs)
+JOB_CONFIRMACAO_DM = "confirmacao_dm"       # DM de confirmação para um participante
+JOB_APAGAR_MSG = "apagar_msg_evento"        # Deleção da mensagem de evento cancelado/concluído
+
+def _parse_utc(dt_str: str) -> datetime.datetime:
+    dt_utc = datetime.datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
+    return pytz.utc.localize(dt_utc) if dt_utc.tzinfo is None else dt_utc
+
 class TasksCog(commands.Cog):
+    """
+    Tarefas em segundo plano. Lembretes e deleções de mensagens são jobs persistidos em
+    scheduled_jobs: o planejador enfileira (com chave de idempotência) o trabalho que vence
+    nas próximas horas e o worker executa os jobs vencidos com lease e novas tentativas,
+    de forma que nada se perde nem se repete num reinício.
+
+    Com várias instâncias sobre o mesmo banco, as tarefas só rodam na que detém o lease de
+    liderança (bot.leader_elector); as demais ficam em espera e assumem se a líder cair.
+    """
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        # A lógica do self.digest_time_brt não é mais necessária aqui
-
-        self.delete_canceled_events_messages_task.start()
-        self.event_reminder_task.start() 
-        self.confirmation_reminder_task.start() 
+        self.job_queue = job_queue.JobQueue()
+        self.job_queue.register(JOB_LEMBRETE, self._handle_reminder_job)
+        self.job_queue.register(JOB_LEMBRETE_DM, self._handle_reminder_dm_job)
+        self.job_queue.register(JOB_CONFIRMACAO, self._handle_confirmation_job)
+        self.job_queue.register(JOB_CONFIRMACAO_DM, self._handle_confirmation_dm_job)
+        self.job_queue.register_batch(JOB_APAGAR_MSG, self._handle_delete_message_jobs)
+        self._pending_confirmations: set[asyncio.Task] = set()
+        self.digest_scheduler = DigestScheduler()
+        self.role_reconciler = RoleReconciler(bot)
+        self._digest_schedule_version = None
+        self._leader_recovery: asyncio.Task | None = None
+        self.leader = getattr(bot, "leader_elector", None)
+        if self.leader: self.leader.add_listener(on_elected=self._on_elected)
+        self._register_metrics()
+
+        self.job_planner_task.start()
+        self.job_worker_task.start()
         self.daily_event_digest_task.start()
         self.cleanup_completed_events_task.start()
+        self.recurring_events_task.start()
+        self.role_reconciliation_task.start()
 
     def cog_unload(self):
-        self.delete_canceled_events_messages_task.cancel()
-        self.event_reminder_task.cancel()
-        self.confirmation_reminder_task.cancel()
+        self.job_planner_task.cancel()
+        self.job_worker_task.cancel()
         self.daily_event_digest_task.cancel()
         self.cleanup_completed_events_task.cancel()
+        self.recurring_events_task.cancel()
+        self.role_reconciliation_task.cancel()
+        for pending in self._pending_confirmations: pending.cancel()
+        if self._leader_recovery: self._leader_recovery.cancel()
+        if self.leader: self.leader.remove_listener(on_elected=self._on_elected)
+
+    def _register_metrics(self):
+        """Profundidade das filas e estado das tarefas, lidos no momento da coleta."""
+        REGISTRY.register_callback("bot_jobs_overdue", "Jobs vencidos (pendentes ou com lease expirado) na fila durável.", db.db_count_overdue_jobs)
+        REGISTRY.register_callback("bot_digest_scheduled_guilds", "Servidores no heap do agendador de digest.", lambda: len(self.digest_scheduler))
+        REGISTRY.register_callback("bot_pending_confirmations", "Confirmações de presença aguardando resposta por DM.", lambda: len(self._pending_confirmations))
+        REGISTRY.register_callback("bot_is_leader", "1 se esta instância roda as tarefas agendadas (líder), 0 se está em espera.", lambda: int(self._is_leader()))
+        REGISTRY.register_callback("bot_role_drift_last_run", "Membros com cargo temporário divergente do RSVP na última reconciliação.",
+                                   lambda: self.role_reconciler.last_drift)
+
+    # --- Liderança entre instâncias ---
+    def _is_leader(self) -> bool:
+        return self.leader is None or self.leader.is_leader
+
+    async def _on_elected(self):
+        # Chamado pelo elector (possivelmente antes do on_ready): a recuperação roda à parte.
+        if self._leader_recovery and not self._leader_recovery.done(): return
+        self._leader_recovery = asyncio.create_task(self._recover_as_leader())
+
+    async def _recover_as_leader(self):
+        """Ao assumir: processa o que venceu enquanto ninguém era líder e recarrega as agendas de digest."""
+        await self.bot.wait_until_ready()
+        if not self._is_leader(): return
+        self._load_digest_schedules()
+        self._plan_jobs()
+        await self.job_queue.recover()
+        log.info("Tarefas assumidas por esta instância (owner %s).", self.job_queue.owner_id)
+
+    # --- Fila de trabalhos: planejamento e execução ---
+    def _plan_jobs(self) -> int:
+        """Enfileira os lembretes e deleções que vencem dentro de JOB_PLANNING_LOOKAHEAD. Idempotente."""
+        now_utc = datetime.datetime.now(pytz.utc)
+        jobs = []
+        for event_row in db.db_get_upcoming_events_for_reminder(JOB_PLANNING_LOOKAHEAD):
+            event_time_utc = _parse_utc(event_row['event_time_utc'])
+            jobs.append(job_queue.make_job(
+                JOB_LEMBRETE, f"{JOB_LEMBRETE}:{event_row['event_id']}:{event_row['event_time_utc']}", event_time_utc - REMINDER_LEAD_TIME,
+                guild_id=event_row['guild_id'], event_id=event_row['event_id'], payload={"event_time_utc": event_row['event_time_utc']}
+            ))
+        for event_row in db.db_get_events_for_confirmation_reminder(JOB_PLANNING_LOOKAHEAD):
+            event_time_utc = _parse_utc(event_row['event_time_utc'])
+            jobs.append(job_queue.make_job(
+                JOB_CONFIRMACAO, f"{JOB_CONFIRMACAO}:{event_row['event_id']}:{event_row['event_time_utc']}", event_time_utc - CONFIRMATION_REMINDER_LEAD_TIME,
+                guild_id=event_row['guild_id'], event_id=event_row['event_id'], payload={"event_time_utc": event_row['event_time_utc']}
+            ))
+        for event_row in db.db_get_events_to_delete_message(now_utc + JOB_PLANNING_LOOKAHEAD):
+            jobs.append(job_queue.make_job(
+                JOB_APAGAR_MSG, f"{JOB_APAGAR_MSG}:{event_row['event_id']}:{event_row['delete_message_after_utc']}", _parse_utc(event_row['delete_message_after_utc']),
+                guild_id=event_row['guild_id'], event_id=event_row['event_id']
+            ))
+        return self.job_queue.enqueue(jobs)
 
-    @tasks.loop(minutes=5.0)
-    async def delete_canceled_events_messages_task(self):
-        # print("DEBUG_TASKS: Tarefa 'delete_canceled_events_messages_task' rodando...")
-        events_to_process = db.db_get_events_to_delete_message()
-        if not events_to_process: return
-
-        for event_row in events_to_process:
+    @tasks.loop(minutes=1.0)
+    @task_timed("job_planner_task")
+    async def job_planner_task(self):
+        if not self._is_leader(): return
+        created = self._plan_jobs()
+        if created: log.debug("%s novo(s) job(s) agendado(s).", created)
+
+    @job_planner_task.before_loop
+    async def before_job_planner_task(self):
+        await self.bot.wait_until_ready(); log.info("Tarefa de planejamento de jobs pronta.")
+
+    @tasks.loop(seconds=15.0)
+    @task_timed("job_worker_task")
+    async def job_worker_task(self):
+        if not self._is_leader(): return
+        await self.job_queue.run_once()
+
+    @job_worker_task.before_loop
+    async def before_job_worker_task(self):
+        await self.bot.wait_until_ready()
+        # Recuperação: planeja o que venceu enquanto o bot estava parado e processa tudo em lote.
+        # Com eleição de líder, isso é feito em _recover_as_leader sempre que esta instância assume.
+        if self.leader is None:
+            self._plan_jobs()
+            await self.job_queue.recover()
+        log.info("Worker da fila de jobs pronto (owner %s).", self.job_queue.owner_id)
+
+    def _job_event_if_current(self, event_row, payload: dict):
+        """Retorna o evento se ele ainda está ativo e no mesmo horário para o qual o job foi criado."""
+        if not event_row or event_row['status'] != 'ativo': return None
+        if payload.get('event_time_utc') and payload['event_time_utc'] != event_row['event_time_utc']: return None
+        return event_row
+
+    # --- Lembrete de ~15 minutos ---
+    async def _handle_reminder_job(self, job, payload: dict):
+        event_row = self._job_event_if_current(db.db_get_event_details(job['event_id']), payload)
+        if not event_row or event_row['reminder_sent']: return
+        event_id, event_title = event_row['event_id'], event_row['title']
+        event_time_utc = _parse_utc(event_row['event_time_utc'])
+        if event_time_utc <= datetime.datetime.now(pytz.utc):
+            log.info("Evento %s já começou; lembrete atrasado descartado.", event_id)
+            db.db_mark_reminder_sent(event_id, reminder_type="standard"); return
+
+        temp_role_id = event_row['temp_role_id']
+        guild = self.bot.get_guild(event_row['guild_id'])
+        mention_target = ""
+        if temp_role_id and guild:
+            temp_role = guild.get_role(temp_role_id)
+            if temp_role: mention_target = temp_role.mention
+
+        link_to_event = f"https://discord.com/channels/{event_row['guild_id']}/{event_row['channel_id']}/{event_row['message_id']}" if all([event_row['guild_id'], event_row['channel_id'], event_row['message_id']]) else "Link indisponível"
+        message_content_base = f"🔔 **Lembrete!** O evento **'{event_title}'** começa <t:{int(event_time_utc.timestamp())}:R>!\nLink: {link_to_event}"
+
+        if mention_target:
+            event_channel = self.bot.get_channel(event_row['channel_id'])
+            if event_channel and isinstance(event_channel, discord.TextChannel):
+                await event_channel.send(f"{mention_target} {message_content_base}")  # Falha -> nova tentativa pela fila
+            else: log.warning("Canal do evento %s não encontrado para lembrete %s.", event_row['channel_id'], event_id)
+        else:
+            # Sem cargo: uma DM por participante, cada uma como job próprio (espaçadas, com retry individual).
+            now_utc = datetime.datetime.now(pytz.utc)
+            attendees_ids = rsvp_store.get_event(event_id).users('vou')
+            self.job_queue.enqueue([
+                job_queue.make_job(
+                    JOB_LEMBRETE_DM, f"{JOB_LEMBRETE_DM}:{event_id}:{event_row['event_time_utc']}:{user_id}",
+                    now_utc + datetime.timedelta(seconds=i * REMINDER_DM_SPACING_SECONDS),
+                    guild_id=event_row['guild_id'], event_id=event_id,
+                    payload={"event_time_utc": event_row['event_time_utc'], "user_id": user_id, "content": message_content_base}
+                ) for i, user_id in enumerate(attendees_ids)
+            ])
+        db.db_mark_reminder_sent(event_id, reminder_type="standard")
+
+    async def _handle_reminder_dm_job(self, job, payload: dict):
+        event_row = self._job_event_if_current(db.db_get_event_details(job['event_id']), payload)
+        user_id = payload.get('user_id')
+        if not event_row or not user_id: return
+        if rsvp_store.get_status(event_row['event_id'], user_id) != 'vou': return
+        try:
+            user = self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
+            if user: await user.send(payload.get('content') or f"🔔 **Lembrete!** O evento **'{event_row['title']}'** começa em breve!")
+        except (discord.Forbidden, discord.NotFound) as e:
+            raise JobDiscarded(f"DM de lembrete impossível para {user_id}: {e}")
+
+    # --- Lembrete de confirmação de ~1 hora ---
+    async def _handle_confirmation_job(self, job, payload: dict):
+        event_row = self._job_event_if_current(db.db_get_event_details(job['event_id']), payload)
+        if not event_row or event_row['confirmation_reminder_sent']: return
+        event_id, event_title, guild_id, creator_id = event_row['event_id'], event_row['title'], event_row['guild_id'], event_row['creator_id']
+        if _parse_utc(event_row['event_time_utc']) - datetime.datetime.now(pytz.utc) < REMINDER_LEAD_TIME:
+            log.info("Evento %s começa em menos de %s; lembrete de confirmação atrasado descartado.", event_id, REMINDER_LEAD_TIME)
+            db.db_mark_reminder_sent(event_id, reminder_type="confirmation"); return
+        if not self.bot.get_guild(guild_id):
+            log.warning("Guilda %s não encontrada para evento %s. Pulando lembrete.", guild_id, event_id); db.db_mark_reminder_sent(event_id, reminder_type="confirmation"); return
+
+        attendees_vou = [uid for uid in rsvp_store.get_event(event_id).users('vou') if uid != creator_id]
+        if not attendees_vou:
+            log.info("Evento %s ('%s') sem 'Vou' (além do organizador). Pulando lembrete.", event_id, event_title); db.db_mark_reminder_sent(event_id, reminder_type="confirmation"); return
+
+        log.debug("Agendando lembretes de confirmação para %s do evento %s ('%s').", len(attendees_vou), event_id, event_title)
+        now_utc = datetime.datetime.now(pytz.utc)
+        self.job_queue.enqueue([
+            job_queue.make_job(
+                JOB_CONFIRMACAO_DM, f"{JOB_CONFIRMACAO_DM}:{event_id}:{event_row['event_time_utc']}:{user_id}",
+                now_utc + datetime.timedelta(seconds=i * REMINDER_DM_SPACING_SECONDS),
+                guild_id=guild_id, event_id=event_id, payload={"event_time_utc": event_row['event_time_utc'], "user_id": user_id}
+            ) for i, user_id in enumerate(attendees_vou)
+        ])
+        db.db_mark_reminder_sent(event_id, reminder_type="confirmation")
+
+    async def _handle_confirmation_dm_job(self, job, payload: dict):
+        event_row = self._job_event_if_current(db.db_get_event_details(job['event_id']), payload)
+        user_id = payload.get('user_id')
+        if not event_row or not user_id: return
+        event_id, event_title = event_row['event_id'], event_row['title']
+        if rsvp_store.get_status(event_id, user_id) != 'vou': return
+        guild = self.bot.get_guild(event_row['guild_id'])
+        member = guild.get_member(user_id) if guild else None
+        if not member: log.warning("Membro %s não encontrado na guilda %s para lembrete evento %s.", user_id, event_row['guild_id'], event_id); return
+        try:
+            dm_channel = await member.create_dm()
+            confirmation_view = ConfirmAttendanceView(user_id, event_id, self.bot)
+            event_time_utc = _parse_utc(event_row['event_time_utc'])
+            reminder_msg_content = f"⏳ Lembrete: Evento **'{event_title}'** <t:{int(event_time_utc.timestamp())}:R>. Ainda pretende comparecer?"
+            sent_msg = await dm_channel.send(reminder_msg_content, view=confirmation_view)
+            confirmation_view.message = sent_msg
+        except discord.Forbidden:
+            raise JobDiscarded(f"Não enviou DM de lembrete de confirmação para {user_id} ({member.display_name}) (evento {event_id}).")
+        # A resposta pode levar até 1h: aguardada fora do worker para não bloquear a fila.
+        pending = asyncio.create_task(self._await_confirmation_response(confirmation_view, event_id, member))
+        self._pending_confirmations.add(pending)
+        pending.add_done_callback(self._pending_confirmations.discard)
+
+    async def _await_confirmation_response(self, confirmation_view: ConfirmAttendanceView, event_id: int, member: discord.Member):
+        await confirmation_view.wait()
+        user_id = member.id
+        if confirmation_view.confirmed_attendance is True:
+            log.info("Usuário %s (%s) confirmou presença para evento %s via lembrete.", user_id, member.display_name, event_id); return
+        if confirmation_view.confirmed_attendance is not False: return
+
+        log.info("Usuário %s (%s) removeu RSVP para evento %s via lembrete.", user_id, member.display_name, event_id)
+        rsvp_store.set_status(event_id, user_id, "nao_vou", origin="lembrete")
+        event_row = db.db_get_event_details(event_id)
+        if not event_row: log.warning("Não buscou detalhes atualizados do evento %s para embed.", event_id); return
+        temp_role_id = event_row['temp_role_id']
+        if temp_role_id:
+            temp_role = member.guild.get_role(temp_role_id)
+            if temp_role: await role_utils.manage_member_event_role(member, temp_role, "remove", event_id)
+
+        target_channel_id = event_row['channel_id']
+        message_id_to_update = event_row['message_id']
+        event_channel_obj = self.bot.get_channel(target_channel_id)
+        if event_channel_obj and isinstance(event_channel_obj, discord.TextChannel) and message_id_to_update:
+            try:
+                updated_rsvps_fetch = rsvp_store.get_rsvps(event_id)
+                new_embed = await utils.build_event_embed(event_row, updated_rsvps_fetch, self.bot)
+                new_view_instance = PersistentRsvpView(bot_instance=self.bot) 
+                await event_channel_obj.get_partial_message(message_id_to_update).edit(embed=new_embed, view=new_view_instance)
+                log.debug("Embed do evento %s atualizado após remoção de RSVP via lembrete.", event_id)
+            except discord.NotFound: log.warning("Msg original do evento %s (ID: %s) no canal %s não encontrada para atualizar embed.", event_id, message_id_to_update, target_channel_id)
+            except discord.Forbidden: log.warning("Sem permissão para editar msg do evento %s no canal %s.", event_id, target_channel_id)
+            except Exception as e_embed_upd: log.error("Erro ao atualizar embed do evento %s via lembrete: %s", event_id, e_embed_upd)
+        else: 
+            log.warning("Canal do evento %s não encontrado/inválido ou message_id ausente para evento %s ao tentar atualizar embed.", target_channel_id, event_id)
+
+    # --- Deleção de mensagens de eventos cancelados/concluídos ---
+    async def _handle_delete_message_jobs(self, jobs: list) -> dict:
+        """Handler em lote: agrupa as deleções por canal (deleção em massa) e finaliza as linhas do DB num único UPDATE."""
+        events = db.db_get_events_by_ids([job['event_id'] for job in jobs])
+        jobs_by_event = {job['event_id']: job for job in jobs}
+        events_by_channel: dict[int, list] = {}
+        for event_id in jobs_by_event:
+            event_row = events.get(event_id)
+            # Evento apagado, já processado ou reativado: nada a fazer.
+            if not event_row or event_row['status'] not in ('cancelado', 'concluido') or not event_row['delete_message_after_utc']: continue
+            events_by_channel.setdefault(event_row['channel_id'], []).append(event_row)
+
+        results = await utils.gather_with_concurrency(
+            TASKS_DISCORD_CONCURRENCY,
+            *(self._delete_channel_event_messages(channel_id, rows) for channel_id, rows in events_by_channel.items())
+        )
+
+        failures: dict[int, Exception] = {}
+        done_events = []
+        for (channel_id, rows), result in zip(events_by_channel.items(), results):
+            if isinstance(result, Exception):
+                for row in rows: failures[jobs_by_event[row['event_id']]['job_id']] = result
+                continue
+            done_ids = {row['event_id'] for row in result}
+            done_events.extend((row['event_id'], row['status']) for row in result)
+            for row in rows:
+                if row['event_id'] not in done_ids:
+                    failures[jobs_by_event[row['event_id']]['job_id']] = RuntimeError(f"Mensagem {row['message_id']} do evento {row['event_id']} não foi apagada.")
+        if not db.db_bulk_clear_message_ids_after_delete(done_events):
+            for event_id, _ in done_events: failures[jobs_by_event[event_id]['job_id']] = RuntimeError("Falha ao atualizar o DB após a deleção.")
+        return failures
+
+    async def _delete_channel_event_messages(self, channel_id: int, event_rows: list) -> list:
+        """
+        Apaga as mensagens dos eventos de um único canal. Mensagens recentes vão pelo endpoint
+        de deleção em massa (até 100 por chamada); as mais antigas, ou um lote que falhou,
+        são apagadas uma a uma. Retorna as linhas cujo estado no DB pode ser finalizado.
+        """
+        rows_with_msg = [row for row in event_rows if row['message_id']]
+        done_rows = [row for row in event_rows if not row['message_id']]
+        if not rows_with_msg: return done_rows
+
+        try:
+            channel = self.bot.get_channel(channel_id) or await self.bot.fetch_channel(channel_id)
+        except discord.NotFound:
+            log.debug("Canal %s não encontrado; limpando %s evento(s) sem deletar mensagens.", channel_id, len(rows_with_msg))
+            return event_rows
+        if not (channel and isinstance(channel, discord.TextChannel)):
+            return event_rows
+
+        bulk_cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        recent_rows = [row for row in rows_with_msg if discord.utils.snowflake_time(row['message_id']) > bulk_cutoff]
+        single_rows = [row for row in rows_with_msg if discord.utils.snowflake_time(row['message_id']) <= bulk_cutoff]
+
+        for i in range(0, len(recent_rows), BULK_DELETE_MAX_MESSAGES):
+            chunk = recent_rows[i:i + BULK_DELETE_MAX_MESSAGES]
+            if len(chunk) < 2:
+                single_rows.extend(chunk); continue
+            try:
+                await channel.delete_messages([discord.Object(id=row['message_id']) for row in chunk], reason="Limpeza de eventos encerrados.")
+                done_rows.extend(chunk)
+                log.debug("%s mensagens de eventos apagadas em massa no canal %s.", len(chunk), channel_id)
+            except discord.HTTPException as e:
+                log.debug("Deleção em massa falhou no canal %s (%s); usando deleção individual.", channel_id, e)
+                single_rows.extend(chunk)
+
+        for event_row in single_rows:
             try:
-                channel = self.bot.get_channel(event_row['channel_id']) or await self.bot.fetch_channel(event_row['channel_id'])
-                if not (channel and isinstance(channel, discord.TextChannel)):
-                    db.db_clear_message_id_and_update_status_after_delete(event_row['event_id'], event_row['status']); continue
-                if event_row['message_id']:
-                    msg_to_del = await channel.fetch_message(event_row['message_id']); await msg_to_del.delete()
-                db.db_clear_message_id_and_update_status_after_delete(event_row['event_id'], event_row['status'])
+                await channel.get_partial_message(event_row['message_id']).delete()
+                done_rows.append(event_row)
             except discord.NotFound:
-                print(f"DEBUG_TASKS: Mensagem {event_row['message_id']} para evento {event_row['event_id']} não encontrada para deleção (já deletada?).")
-                db.db_clear_message_id_and_update_status_after_delete(event_row['event_id'], event_row['status'])
-            except Exception as e: print(f"DEBUG_TASKS: Erro ao deletar msg do evento {event_row['event_id']}: {e}")
-
-    @delete_canceled_events_messages_task.before_loop
-    async def before_delete_canceled_task(self):
-        await self.bot.wait_until_ready(); print("Tarefa de deleção de mensagens agendadas pronta.")
-
-    @tasks.loop(minutes=1.0)
-    async def event_reminder_task(self): # Lembrete de ~15 minutos antes
-        upcoming_events = db.db_get_upcoming_events_for_reminder()
-        if not upcoming_events: return
-
-        for event_row in upcoming_events:
-            event_id, event_title = event_row['event_id'], event_row['title']
-            temp_role_id = event_row['temp_role_id']
-            guild = self.bot.get_guild(event_row['guild_id'])
-            mention_target = ""
-
-            if temp_role_id and guild:
-                temp_role = guild.get_role(temp_role_id)
-                if temp_role: mention_target = temp_role.mention
-
-            if not mention_target and not db.db_get_rsvps_for_event(event_id).get('vou'):
-                db.db_mark_reminder_sent(event_id, reminder_type="standard"); continue
-
-            link_to_event = f"https://discord.com/channels/{event_row['guild_id']}/{event_row['channel_id']}/{event_row['message_id']}" if all([event_row['guild_id'], event_row['channel_id'], event_row['message_id']]) else "Link indisponível"
-            message_content_base = f"🔔 **Lembrete!** O evento **'{event_title}'** começa em aproximadamente 15 minutos!\nLink: {link_to_event}"
-
-            if mention_target:
-                event_channel = self.bot.get_channel(event_row['channel_id'])
-                if event_channel and isinstance(event_channel, discord.TextChannel):
-                    try: await event_channel.send(f"{mention_target} {message_content_base}")
-                    except Exception as e: print(f"ERRO_TASKS: Falha ao enviar lembrete para canal {event_row['channel_id']} evento {event_id}: {e}")
-                else: print(f"WARN_TASKS: Canal do evento {event_row['channel_id']} não encontrado para lembrete {event_id}.")
-            else: 
-                rsvps = db.db_get_rsvps_for_event(event_id)
-                attendees_ids = rsvps.get('vou', [])
-                for user_id in attendees_ids:
-                    try:
-                        user = self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
-                        if user: await user.send(message_content_base)
-                    except Exception as e: print(f"DEBUG_TASKS: Erro ao enviar DM de lembrete para {user_id}: {e}")
-                    await asyncio.sleep(10) # Pausa de 10 segundos entre cada DM
-
-            db.db_mark_reminder_sent(event_id, reminder_type="standard")
-
-    @event_reminder_task.before_loop
-    async def before_event_reminder_task(self):
-        await self.bot.wait_until_ready(); print("Tarefa de lembrete de eventos (~15min) pronta.")
-
-    @tasks.loop(minutes=1.0)
-    async def confirmation_reminder_task(self):
-        # print("DEBUG_TASKS: Verificando eventos para lembrete de confirmação de 1 hora...")
-        events_for_confirmation = db.db_get_events_for_confirmation_reminder()
-        if not events_for_confirmation: return
-
-        print(f"DEBUG_TASKS: {len(events_for_confirmation)} evento(s) encontrado(s) para lembrete de confirmação de 1h.")
-        for event_row in events_for_confirmation:
-            event_id, event_title, guild_id, creator_id = event_row['event_id'], event_row['title'], event_row['guild_id'], event_row['creator_id']
-            guild = self.bot.get_guild(guild_id)
-            if not guild:
-                print(f"WARN_TASKS: Guilda {guild_id} não encontrada para evento {event_id}. Pulando lembrete."); db.db_mark_reminder_sent(event_id, reminder_type="confirmation"); continue
-
-            rsvps = db.db_get_rsvps_for_event(event_id)
-            attendees_vou = rsvps.get('vou', [])
-            if not attendees_vou:
-                print(f"INFO_TASKS: Evento {event_id} ('{event_title}') sem 'Vou'. Pulando lembrete."); db.db_mark_reminder_sent(event_id, reminder_type="confirmation"); continue
-
-            print(f"DEBUG_TASKS: Enviando lembretes de confirmação para {len(attendees_vou)} do evento {event_id} ('{event_title}').")
-            at_least_one_dm_sent = False
-            for user_id in attendees_vou:
-                if user_id == creator_id:
-                    print(f"INFO_TASKS: Pulando lembrete de confirmação para o organizador {user_id} do evento {event_id}.")
-                    continue 
-
-                member = guild.get_member(user_id)
-                if not member: print(f"WARN_TASKS: Membro {user_id} não encontrado na guilda {guild_id} para lembrete evento {event_id}."); continue
-                try:
-                    dm_channel = await member.create_dm()
-                    confirmation_view = ConfirmAttendanceView(user_id, event_id, self.bot)
-                    reminder_msg_content = f"⏳ Lembrete: Evento **'{event_title}'** em ~1 hora. Ainda pretende comparecer?"
-                    sent_msg = await dm_channel.send(reminder_msg_content, view=confirmation_view)
-                    confirmation_view.message = sent_msg 
-                    at_least_one_dm_sent = True
-                    await confirmation_view.wait()
-
-                    if confirmation_view.confirmed_attendance is False:
-                        print(f"INFO_TASKS: Usuário {user_id} ({member.display_name}) removeu RSVP para evento {event_id} via lembrete.")
-                        db.db_add_or_update_rsvp(event_id, user_id, "nao_vou")
-                        temp_role_id = event_row['temp_role_id']
-                        if temp_role_id and guild:
-                            temp_role = guild.get_role(temp_role_id)
-                            if temp_role: await role_utils.manage_member_event_role(member, temp_role, "remove", event_id)
-
-                        target_channel_id = event_row['channel_id']
-                        message_id_to_update = event_row['message_id']
-                        event_channel_obj = self.bot.get_channel(target_channel_id)
-
-                        if event_channel_obj and isinstance(event_channel_obj, discord.TextChannel) and message_id_to_update:
-                            try:
-                                msg_to_edit = await event_channel_obj.fetch_message(message_id_to_update)
-                                updated_event_details_fetch = db.db_get_event_details(event_id) 
-                                updated_rsvps_fetch = db.db_get_rsvps_for_event(event_id)
-                                if updated_event_details_fetch:
-                                    new_embed = await utils.build_event_embed(updated_event_details_fetch, updated_rsvps_fetch, self.bot)
-                                    new_view_instance = PersistentRsvpView(bot_instance=self.bot) 
-                                    await msg_to_edit.edit(embed=new_embed, view=new_view_instance)
-                                    print(f"DEBUG_TASKS: Embed do evento {event_id} atualizado após remoção de RSVP via lembrete.")
-                                else: print(f"WARN_TASKS: Não buscou detalhes atualizados do evento {event_id} para embed.")
-                            except discord.NotFound: print(f"WARN_TASKS: Msg original do evento {event_id} (ID: {message_id_to_update}) no canal {target_channel_id} não encontrada para atualizar embed.")
-                            except discord.Forbidden: print(f"WARN_TASKS: Sem permissão para editar msg do evento {event_id} no canal {target_channel_id}.")
-                            except Exception as e_embed_upd: print(f"ERRO_TASKS: Erro ao atualizar embed do evento {event_id} via lembrete: {e_embed_upd}")
-                        else: 
-                            print(f"WARN_TASKS: Canal do evento {target_channel_id} não encontrado/inválido ou message_id ausente para evento {event_id} ao tentar atualizar embed.")
-                    elif confirmation_view.confirmed_attendance is True:
-                        print(f"INFO_TASKS: Usuário {user_id} ({member.display_name}) confirmou presença para evento {event_id} via lembrete.")
-                except discord.Forbidden: print(f"WARN_TASKS: Não enviou DM de lembrete de confirmação para {user_id} ({member.display_name}) (evento {event_id}).")
-                except Exception as e: print(f"ERRO_TASKS: Erro ao enviar/processar lembrete de confirmação para {user_id} ({member.display_name}) (evento {event_id}): {e}")
-
-                await asyncio.sleep(10)
-
-            if at_least_one_dm_sent:
-                db.db_mark_reminder_sent(event_id, reminder_type="confirmation")
-            else:
-                print(f"INFO_TASKS: Nenhuma DM de confirmação foi efetivamente enviada para o evento {event_id}, mas marcando como 'enviado' para evitar reenvios.")
-                db.db_mark_reminder_sent(event_id, reminder_type="confirmation")
-
-    @confirmation_reminder_task.before_loop
-    async def before_confirmation_reminder_task(self):
-        await self.bot.wait_until_ready(); print("Tarefa de lembrete de confirmação de presença (~1h) pronta.")
-
-    # --- TAREFA DO RESUMO DIÁRIO ATUALIZADA ---
-    @tasks.loop(time=DIGEST_TIMES_BRT) # Agora usa a lista de horários
+                log.debug("Mensagem %s para evento %s não encontrada para deleção (já deletada?).", event_row['message_id'], event_row['event_id'])
+                done_rows.append(event_row)
+            except Exception as e: log.debug("Erro ao deletar msg do evento %s: %s", event_row['event_id'], e)
+        return done_rows
+
+
+    # --- Resumo diário por servidor ---
+    def reload_digest_schedule(self, guild_id: int):
+        """Reaplica a agenda de digest de um servidor após mudança de canal, horários ou fuso."""
+        rows = db.db_get_digest_schedules(guild_id)
+        self.digest_scheduler.update_guild(rows[0] if rows else None, guild_id, datetime.datetime.now(pytz.utc))
+        self._digest_schedule_version = datetime.datetime.now(pytz.utc).isoformat()
+        db.db_set_bot_meta(DIGEST_SCHEDULE_VERSION_KEY, self._digest_schedule_version)
+
+    def _load_digest_schedules(self):
+        self._digest_schedule_version = db.db_get_bot_meta(DIGEST_SCHEDULE_VERSION_KEY)
+        self.digest_scheduler.load(db.db_get_digest_schedules(), datetime.datetime.now(pytz.utc))
+
+    @tasks.loop(seconds=30.0)
+    @task_timed("daily_event_digest_task")
     async def daily_event_digest_task(self):
-        now_brt_display = utils.get_brazil_now().strftime('%H:%M:%S %Z')
-        print(f"DEBUG: Tarefa 'daily_event_digest_task' rodando às {now_brt_display}...")
-        for guild in self.bot.guilds:
-            digest_channel_id = db.db_get_digest_channel(guild.id)
-            if digest_channel_id:
-                channel = self.bot.get_channel(digest_channel_id)
-                if channel and isinstance(channel, discord.TextChannel):
-                    print(f"DEBUG: Gerando digest de eventos para o servidor '{guild.name}' no canal '{channel.name}'")
-                    try:
-                        content = await utils.generate_event_list_message_content(guild.id, 3, self.bot)
-                        header = f"**Eventos Agendados (Próximos 3 Dias):**\n"
-                        full_message = header + content; max_chars = 1980
-                        if len(full_message) > max_chars:
-                            current_part = header; first_part = True
-                            for line in content.splitlines():
-                                if len(current_part) + len(line) + 1 > max_chars:
-                                    await channel.send(current_part); current_part = "" if first_part else "(Continuação)\n"; first_part = False
-                                current_part += line + "\n"
-                            if current_part.strip(): await channel.send(current_part)
-                        else: await channel.send(full_message)
-                        print(f"DEBUG: Digest enviado para '{guild.name}'.")
-                    except Exception as e: print(f"DEBUG: Erro ao enviar digest para o servidor {guild.id} ({guild.name}): {e}")
-                else: print(f"DEBUG: Canal de digest ({digest_channel_id}) não encontrado ou inválido no servidor '{guild.name}'.")
+        if not self._is_leader(): return
+        if db.db_get_bot_meta(DIGEST_SCHEDULE_VERSION_KEY) != self._digest_schedule_version:
+            self._load_digest_schedules() # Alguma agenda mudou (talvez por comando atendido em outra instância)
+        # Só o topo do heap é examinado; os servidores vencidos já saem reagendados para o próximo horário.
+        due = self.digest_scheduler.pop_due(datetime.datetime.now(pytz.utc))
+        if not due: return
+        log.debug("Enviando digest para %s servidor(es).", len(due))
+        await utils.gather_with_concurrency(
+            TASKS_DISCORD_CONCURRENCY,
+            *(self._send_guild_digest(guild_id, slot_utc) for guild_id, slot_utc in due)
+        )
+
+    async def _send_guild_digest(self, guild_id: int, slot_utc: datetime.datetime):
+        guild = self.bot.get_guild(guild_id)
+        if not guild: return
+        digest_channel_id = db.db_get_digest_channel(guild.id)
+        if not digest_channel_id: return
+        channel = self.bot.get_channel(digest_channel_id)
+        if not (channel and isinstance(channel, discord.TextChannel)):
+            log.debug("Canal de digest (%s) não encontrado ou inválido no servidor '%s'.", digest_channel_id, guild.name); return
+        log.debug("Gerando digest de eventos para o servidor '%s' no canal '%s'", guild.name, channel.name)
+        try:
+            content = await utils.generate_event_list_message_content(guild.id, 3, self.bot)
+            header = f"**Eventos Agendados (Próximos 3 Dias):**\n"
+            full_message = header + content; max_chars = 1980
+            if len(full_message) > max_chars:
+                current_part = header; first_part = True
+                for line in content.splitlines():
+                    if len(current_part) + len(line) + 1 > max_chars:
+                        await channel.send(current_part); current_part = "" if first_part else "(Continuação)\n"; first_part = False
+                    current_part += line + "\n"
+                if current_part.strip(): await channel.send(current_part)
+            else: await channel.send(full_message)
+            db.db_mark_digest_sent(guild.id, slot_utc.isoformat())
+            log.debug("Digest enviado para '%s'.", guild.name)
+        except Exception as e: log.debug("Erro ao enviar digest para o servidor %s (%s): %s", guild.id, guild.name, e)
 
     @daily_event_digest_task.before_loop
     async def before_daily_digest_task(self):
         await self.bot.wait_until_ready()
-        digest_times_str = ", ".join([t.strftime('%H:%M') for t in DIGEST_TIMES_BRT])
-        print(f"Tarefa de Digest Diário pronta (agendada para {digest_times_str} BRT).")
+        self._load_digest_schedules()
+        next_due = self.digest_scheduler.next_due_utc()
+        next_due_str = next_due.astimezone(BRAZIL_TZ).strftime('%d/%m %H:%M:%S BRT') if next_due else "nenhum"
+        log.info("Tarefa de Digest Diário pronta (%s servidor(es) agendado(s); próximo envio: %s).", len(self.digest_scheduler), next_due_str)
 
     @tasks.loop(hours=1.0)
+    @task_timed("cleanup_completed_events_task")
     async def cleanup_completed_events_task(self):
+        if not self._is_leader(): return
         # print("DEBUG: Tarefa 'cleanup_completed_events_task' rodando...")
+        purged_jobs = db.db_purge_finished_jobs(datetime.datetime.now(pytz.utc) - JOB_RETENTION)
+        if purged_jobs: log.debug("%s job(s) concluído(s) antigo(s) removido(s) da fila.", purged_jobs)
+        compacted_events, compacted_entries = rsvp_log.compact()
+        if compacted_entries: log.debug("Histórico de RSVPs: %s transição(ões) de %s evento(s) compactada(s) em snapshots.", compacted_entries, compacted_events)
+
         events_to_cleanup = db.db_get_events_for_cleanup()
         if not events_to_cleanup: return
 
-        for event_row in events_to_cleanup:
-            event_id, event_title, channel_id, message_id, guild_id, temp_role_id = event_row['event_id'], event_row['title'], event_row['channel_id'], event_row['message_id'], event_row['guild_id'], event_row['temp_role_id']
-            print(f"DEBUG: Evento {event_id} ('{event_title}') encontrado para marcar como concluído.")
-            if channel_id and message_id:
-                try:
-                    channel = self.bot.get_channel(channel_id) or await self.bot.fetch_channel(channel_id)
-                    if channel and isinstance(channel, discord.TextChannel):
-                        msg = await channel.fetch_message(message_id)
-                        completed_embed = discord.Embed(title=f"[CONCLUÍDO] {event_title}", description="Este evento já foi finalizado.", color=discord.Color.light_grey())
-                        dt_utc_obj_completed = datetime.datetime.fromisoformat(event_row['event_time_utc'].replace('Z', '+00:00'))
-                        completed_embed.add_field(name="🗓️ Data Original do Evento", value=f"<t:{int(dt_utc_obj_completed.timestamp())}:F>", inline=False)
-                        await msg.edit(content=f"**EVENTO CONCLUÍDO**", embed=completed_embed, view=None)
-                        print(f"DEBUG: Mensagem do evento {event_id} ('{event_title}') editada para o estado [CONCLUÍDO].")
-                except discord.NotFound: print(f"DEBUG: Mensagem do evento {event_id} ('{event_title}') não encontrada.")
-                except discord.Forbidden: print(f"DEBUG: Sem permissão para editar a mensagem do evento {event_id} ('{event_title}').")
-                except Exception as e: print(f"DEBUG: Erro ao editar a mensagem do evento {event_id} ('{event_title}') para concluído: {e}")
-
-            role_deleted_msg_part = ""
-            if temp_role_id and guild_id:
-                guild = self.bot.get_guild(guild_id)
-                if guild:
-                    role_deleted = await role_utils.delete_event_role(guild, temp_role_id, f"Evento '{event_title}' (ID: {event_id}) concluído.")
-                    if role_deleted: role_deleted_msg_part = " Cargo temporário deletado."
-                    else: role_deleted_msg_part = " Falha ao deletar cargo temporário (ver logs)."
-                else: print(f"WARN_TASKS: Guilda {guild_id} não encontrada para deletar cargo do evento {event_id}."); role_deleted_msg_part = " Guilda não encontrada para deletar cargo."
-
-            delete_at_utc = (datetime.datetime.now(pytz.utc) + datetime.timedelta(hours=24)).isoformat()
-            db.db_update_event_status(event_id, 'concluido', delete_after_utc=delete_at_utc)
-            db.db_update_event_details(event_id=event_id, temp_role_id=None) 
-            print(f"DEBUG_TASKS: Evento {event_id} ('{event_title}') marcado como 'concluido'. Deleção msg: {delete_at_utc}.{role_deleted_msg_part}")
+        # 1. Transição de estado em lote: todos os eventos expirados numa única transação.
+        delete_at_utc = (datetime.datetime.now(pytz.utc) + datetime.timedelta(hours=24)).isoformat()
+        if not db.db_bulk_mark_events_concluded([row['event_id'] for row in events_to_cleanup], delete_at_utc):
+            log.error("Falha ao marcar %s evento(s) como 'concluido'. Nova tentativa na próxima execução.", len(events_to_cleanup))
+            return
+        rsvp_store.discard(*(row['event_id'] for row in events_to_cleanup))
+        log.debug("%s evento(s) marcados como 'concluido' em lote. Deleção msg: %s.", len(events_to_cleanup), delete_at_utc)
+
+        # 2. Lado do Discord (edição das mensagens e deleção dos cargos) com paralelismo limitado.
+        await utils.gather_with_concurrency(
+            TASKS_DISCORD_CONCURRENCY,
+            *(self._finalize_completed_event_on_discord(event_row) for event_row in events_to_cleanup)
+        )
+
+    async def _finalize_completed_event_on_discord(self, event_row):
+        event_id, event_title, channel_id, message_id, guild_id, temp_role_id = event_row['event_id'], event_row['title'], event_row['channel_id'], event_row['message_id'], event_row['guild_id'], event_row['temp_role_id']
+        if channel_id and message_id:
+            try:
+                channel = self.bot.get_channel(channel_id) or await self.bot.fetch_channel(channel_id)
+                if channel and isinstance(channel, discord.TextChannel):
+                    # PartialMessage evita um fetch_message só para editar.
+                    msg = channel.get_partial_message(message_id)
+                    completed_embed = discord.Embed(title=f"[CONCLUÍDO] {event_title}", description="Este evento já foi finalizado.", color=discord.Color.light_grey())
+                    dt_utc_obj_completed = datetime.datetime.fromisoformat(event_row['event_time_utc'].replace('Z', '+00:00'))
+                    completed_embed.add_field(name="🗓️ Data Original do Evento", value=f"<t:{int(dt_utc_obj_completed.timestamp())}:F>", inline=False)
+                    await msg.edit(content=f"**EVENTO CONCLUÍDO**", embed=completed_embed, view=None)
+                    log.debug("Mensagem do evento %s ('%s') editada para o estado [CONCLUÍDO].", event_id, event_title)
+            except discord.NotFound: log.debug("Mensagem do evento %s ('%s') não encontrada.", event_id, event_title)
+            except discord.Forbidden: log.debug("Sem permissão para editar a mensagem do evento %s ('%s').", event_id, event_title)
+            except Exception as e: log.debug("Erro ao editar a mensagem do evento %s ('%s') para concluído: %s", event_id, event_title, e)
+
+        if temp_role_id and guild_id:
+            guild = self.bot.get_guild(guild_id)
+            if guild:
+                role_deleted = await role_utils.return_event_role(guild, temp_role_id, f"Evento '{event_title}' (ID: {event_id}) concluído.")
+                if not role_deleted: log.warning("Falha ao liberar cargo temporário %s do evento %s (ver logs).", temp_role_id, event_id)
+            else: log.warning("Guilda %s não encontrada para liberar o cargo do evento %s.", guild_id, event_id)
 
     @cleanup_completed_events_task.before_loop
     async def before_cleanup_completed_events_task(self):
-        await self.bot.wait_until_ready(); print("Tarefa de Cleanup de Eventos Concluídos pronta.")
+        await self.bot.wait_until_ready(); log.info("Tarefa de Cleanup de Eventos Concluídos pronta.")
+
+    # --- Materialização de eventos recorrentes ---
+    @tasks.loop(minutes=30.0)
+    @task_timed("recurring_events_task")
+    async def recurring_events_task(self):
+        if not self._is_leader(): return
+        now_utc = datetime.datetime.now(pytz.utc)
+        created_at_utc = now_utc.isoformat()
+        instances, template_progress = [], []
+        for template in db.db_get_recurring_templates():
+            to_create, high_water_mark, consumed = recurrence.plan_template_instances(template, now_utc, RECURRENCE_HORIZON)
+            if not consumed: continue
+            template_progress.append((template['event_id'], high_water_mark.isoformat(), consumed))
+            instances.extend({
+                "guild_id": template['guild_id'], "channel_id": template['channel_id'], "creator_id": template['creator_id'],
+                "title": template['title'], "description": template['description'], "event_time_utc": occurrence_utc.isoformat(),
+                "activity_type": template['activity_type'], "max_attendees": template['max_attendees'], "created_at_utc": created_at_utc,
+                "role_mentions": template['role_mentions'], "restricted_role_ids": template['restricted_role_ids'],
+                "parent_template_id": template['event_id']
+            } for occurrence_utc in to_create)
+        if template_progress:
+            created_ids = db.db_create_recurring_instances(instances, template_progress)
+            if created_ids: log.debug("%s instância(s) de eventos recorrentes criada(s) a partir de %s template(s).", len(created_ids), len(template_progress))
+
+        # Posta as instâncias sem mensagem: as recém-criadas e as que falharam em execuções anteriores.
+        unposted = db.db_get_unposted_recurring_instances()
+        if not unposted: return
+        await utils.gather_with_concurrency(
+            TASKS_DISCORD_CONCURRENCY,
+            *(self._post_recurring_instance(event_row) for event_row in unposted)
+        )
+
+    async def _post_recurring_instance(self, event_row):
+        event_id = event_row['event_id']
+        guild = self.bot.get_guild(event_row['guild_id'])
+        target_channel = self.bot.get_channel(event_row['channel_id'])
+        if not guild or not (target_channel and isinstance(target_channel, discord.TextChannel)):
+            log.warning("Guilda/canal não encontrado para postar a instância recorrente %s.", event_id); return
+
+        if not event_row['temp_role_id']:
+            event_date_brt = _parse_utc(event_row['event_time_utc']).astimezone(BRAZIL_TZ).date()
+            temp_role = await role_utils.checkout_event_role(guild, event_row['title'], event_date_brt)
+            if temp_role: db.db_update_event_details(event_id=event_id, temp_role_id=temp_role.id)
+
+        try:
+            embed = await utils.build_event_embed(event_row, {'vou': [], 'nao_vou': [], 'talvez': [], 'lista_espera': []}, self.bot)
+            event_msg = await target_channel.send(embed=embed, view=PersistentRsvpView(bot_instance=self.bot))
+            db.db_update_event_message_id(event_id, event_msg.id)
+            log.debug("Instância recorrente %s ('%s') postada em #%s.", event_id, event_row['title'], target_channel.name)
+        except discord.Forbidden: log.warning("Sem permissão para postar a instância recorrente %s no canal %s.", event_id, event_row['channel_id'])
+        except Exception as e: log.error("Erro ao postar a instância recorrente %s: %s", event_id, e)
+
+    @recurring_events_task.before_loop
+    async def before_recurring_events_task(self):
+        await self.bot.wait_until_ready(); log.info("Tarefa de eventos recorrentes pronta.")
+
+    # --- Reconciliação dos cargos temporários com os RSVPs ---
+    @tasks.loop(minutes=ROLE_RECONCILE_INTERVAL_MINUTES)
+    @task_timed("role_reconciliation_task")
+    async def role_reconciliation_task(self):
+        if not self._is_leader(): return
+        await self.role_reconciler.run()
+
+    @role_reconciliation_task.before_loop
+    async def before_role_reconciliation_task(self):
+        await self.bot.wait_until_ready(); log.info("Tarefa de reconciliação de cargos pronta.")
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(TasksCog(bot))
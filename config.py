@@ -1,6 +1,7 @@
 # config.py
 import os
 from dotenv import load_dotenv # Import for .env file handling (optional for Replit secrets)
+from sharding import parse_shard_ids
 
 # Load .env file if it exists (useful for local development, Replit handles secrets differently)
 load_dotenv()
@@ -14,6 +15,57 @@ if GUILD_ID_STR and GUILD_ID_STR.isdigit():
 elif GUILD_ID_STR:
     print(f"AVISO: GUILD_ID ('{GUILD_ID_STR}') no ambiente não é um ID numérico válido.")
 
+# Força o tree.sync na inicialização mesmo que a árvore de comandos não tenha mudado
+# (normalmente só sincroniza quando o hash da árvore difere do último sincronizado).
+FORCE_COMMAND_SYNC = os.environ.get("FORCE_COMMAND_SYNC", "").lower() in ("1", "true", "sim")
+
+# --- Logging (ver bot_logging.py) ---
+# LOG_LEVEL: nível dos loggers bot.* (DEBUG, INFO, WARNING, ERROR). LOG_LEVELS ajusta loggers
+# específicos, ex: "bot.cargos=DEBUG,discord=WARNING". LOG_FORMAT: "json" (padrão) ou "texto".
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.environ.get("LOG_LEVELS", "")
+LOG_FORMAT = "texto" if os.environ.get("LOG_FORMAT", "json").lower() in ("texto", "text") else "json"
+
+# --- Métricas (ver metrics.py) ---
+# Porta local (127.0.0.1) do endpoint /metrics no formato do Prometheus. 0 desativa.
+METRICS_PORT = 9108
+METRICS_PORT_STR = os.environ.get("METRICS_PORT")
+if METRICS_PORT_STR and METRICS_PORT_STR.isdigit():
+    METRICS_PORT = int(METRICS_PORT_STR)
+elif METRICS_PORT_STR:
+    print(f"AVISO: METRICS_PORT ('{METRICS_PORT_STR}') no ambiente não é um número. Usando {METRICS_PORT}.")
+
+# --- Monitor do Event Loop (ver loop_monitor.py) ---
+# LOOP_STRICT: flagra I/O bloqueante na thread do event loop. "registrar" loga cada ponto de
+# chamada uma vez; "erro" levanta exceção (para testes). Vazio (padrão) desativa.
+LOOP_STRICT = os.environ.get("LOOP_STRICT", "").strip().lower() or None
+if LOOP_STRICT and LOOP_STRICT not in ("registrar", "erro"):
+    print(f"AVISO: LOOP_STRICT ('{LOOP_STRICT}') no ambiente não é 'registrar' nem 'erro'. Modo estrito desativado.")
+    LOOP_STRICT = None
+
+# Identificador desta instância na eleição de líder (cluster_leases). Vazio = host:pid:aleatório.
+INSTANCE_ID = os.environ.get("INSTANCE_ID") or None
+
+# --- Sharding ---
+# SHARD_COUNT: total de shards da aplicação (vazio = o recomendado pelo Discord, num único processo).
+# SHARD_IDS: shards atendidos por ESTE processo, ex: "0,1" ou "0-3" (vazio = todos). Usado pelo
+# launcher.py para rodar grupos de shards em processos separados sobre o mesmo banco.
+SHARD_COUNT = None
+SHARD_COUNT_STR = os.environ.get("SHARD_COUNT")
+if SHARD_COUNT_STR and SHARD_COUNT_STR.isdigit() and int(SHARD_COUNT_STR) > 0:
+    SHARD_COUNT = int(SHARD_COUNT_STR)
+elif SHARD_COUNT_STR:
+    print(f"AVISO: SHARD_COUNT ('{SHARD_COUNT_STR}') no ambiente não é um número positivo. Usando o recomendado pelo Discord.")
+
+SHARD_IDS = None
+try:
+    SHARD_IDS = parse_shard_ids(os.environ.get("SHARD_IDS"))
+except ValueError:
+    print(f"AVISO: SHARD_IDS ('{os.environ.get('SHARD_IDS')}') inválido. Atendendo todos os shards.")
+if SHARD_IDS is not None and (SHARD_COUNT is None or any(sid >= SHARD_COUNT for sid in SHARD_IDS)):
+    print(f"AVISO: SHARD_IDS {list(SHARD_IDS)} exige um SHARD_COUNT maior que todos os IDs. Atendendo todos os shards.")
+    SHARD_IDS = None
+
 # You can add a check here to ensure TOKEN is loaded
 if not TOKEN:
     print("ERRO CRÍTICO EM CONFIG.PY: DISCORD_BOT_TOKEN não encontrado nos segredos/variáveis de ambiente.")
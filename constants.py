@@ -44,6 +44,103 @@ PVP_ACTIVITY_INFO_PT = {
 ALL_ACTIVITIES_PT = {**RAID_INFO_PT, **MASMORRA_INFO_PT, **PVP_ACTIVITY_INFO_PT}
 SIMILARITY_THRESHOLD = 1.0  # Limiar rigoroso para evitar falsos positivos
 
+# Tipo de atividade e vagas padrão de cada lista acima (usados pelo activity_matcher).
+ACTIVITY_TYPE_SPOTS = {"Incursão": 6, "Masmorra": 3, "PvP - Desafios de Osíris": 3}
+ACTIVITY_CATALOGUE_PT = (
+    (RAID_INFO_PT, "Incursão"),
+    (MASMORRA_INFO_PT, "Masmorra"),
+    (PVP_ACTIVITY_INFO_PT, "PvP - Desafios de Osíris"),
+)
+# Busca aproximada (só usada com SIMILARITY_THRESHOLD < 1.0): tamanho dos n-gramas do índice
+# e quantos candidatos mais bem ranqueados pelo índice passam pela comparação completa.
+ACTIVITY_NGRAM_SIZE = 3
+ACTIVITY_FUZZY_CANDIDATES = 5
+
+# --- Concorrência das Tarefas em Segundo Plano ---
+# Número máximo de chamadas simultâneas à API do Discord (edições de mensagem,
+# deleção de cargos) durante o processamento em lote das tarefas.
+TASKS_DISCORD_CONCURRENCY = 5
+
+# O endpoint de deleção em massa do Discord só aceita mensagens com menos de 14 dias
+# e no máximo 100 mensagens por chamada. A margem evita corridas no limite de idade.
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=10)
+BULK_DELETE_MAX_MESSAGES = 100
+
+# Saídas de membros, cargos restritos ganhos e cargos apagados (ListenersCog) são acumulados por
+# esta janela e processados em lote: uma transação por tipo de mudança (remoção de RSVPs e
+# promoção da lista de espera, limpeza dos cargos apagados), uma edição por evento afetado.
+MEMBER_CHANGES_BATCH_SECONDS = 2.0
+
+# --- Pool de Cargos Temporários (role_utils) ---
+# Cargos de eventos encerrados voltam, sem membros, para um pool por servidor e são renomeados
+# para o próximo evento em vez de deletar um e criar outro. Acima de ROLE_POOL_MAX_PER_GUILD
+# cargos livres, ou com mais de ROLE_POOL_MAX_MEMBERS_TO_STRIP membros, o cargo é deletado.
+ROLE_POOL_MAX_PER_GUILD = 10
+ROLE_POOL_MAX_MEMBERS_TO_STRIP = 12
+
+# --- Reconciliação de Cargos Temporários (role_reconciler.py) ---
+# A cada ROLE_RECONCILE_INTERVAL_MINUTES, compara quem tem RSVP 'vou'/'lista_espera' com quem tem
+# o cargo do evento e corrige a diferença, a no máximo ROLE_RECONCILE_OPS_PER_SECOND operações por
+# segundo (sobra limite de taxa para os cliques de RSVP).
+ROLE_RECONCILE_INTERVAL_MINUTES = 15.0
+ROLE_RECONCILE_OPS_PER_SECOND = 2.0
+
+# --- Cache de RSVPs em Memória (rsvp_store.py) ---
+# Limite de defasagem das entradas em relação a escritas feitas por outros processos (instância em
+# espera, outro grupo de shards); as deste processo passam pelo cache e nunca o deixam defasado.
+RSVP_STORE_MAX_AGE_SECONDS = 30.0
+
+# --- Histórico de RSVPs (rsvp_log.py) ---
+RSVP_LOG_FLUSH_SECONDS = 2.0      # Intervalo máximo entre gravações em lote das transições
+RSVP_LOG_BATCH_SIZE = 200         # Grava antes do intervalo ao juntar esta quantidade
+RSVP_LOG_MAX_PENDING = 50_000     # Com o banco fora, acima disso as transições mais antigas são descartadas
+RSVP_LOG_HISTORY = datetime.timedelta(days=30)   # Transições mais antigas que isso são dobradas no snapshot do evento
+RSVP_LOG_COMPACT_MAX_ROWS = 50_000  # Transições compactadas por execução (limita o tempo com o loop ocupado)
+
+# --- Fila de Trabalhos Durável (scheduled_jobs) ---
+JOB_LEASE_SECONDS = 300           # Tempo que um worker "segura" um job antes de ele voltar a ser reivindicável
+JOB_BATCH_SIZE = 100              # Máximo de jobs reivindicados por execução do worker
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_SECONDS = 30       # Backoff exponencial: base * 2^(tentativa-1), com jitter
+JOB_RETRY_MAX_SECONDS = 3600
+JOB_RETENTION = datetime.timedelta(days=7)   # Jobs concluídos mais antigos que isso são removidos
+
+# Antecedência dos lembretes e janela de planejamento (quanto à frente os jobs são criados).
+REMINDER_LEAD_TIME = datetime.timedelta(minutes=15)
+CONFIRMATION_REMINDER_LEAD_TIME = datetime.timedelta(hours=1)
+JOB_PLANNING_LOOKAHEAD = datetime.timedelta(hours=2)
+# Espaçamento entre DMs de um mesmo lembrete (substitui o asyncio.sleep(10) dentro do loop).
+REMINDER_DM_SPACING_SECONDS = 10
+
+# --- Eleição de Líder entre Instâncias (cluster_leases) ---
+# O líder renova o lease a cada LEADER_RENEW_INTERVAL_SECONDS; se ele cair, uma instância em
+# espera assume em até LEADER_LEASE_SECONDS + LEADER_RENEW_INTERVAL_SECONDS. O líder deixa de
+# se considerar líder LEADER_RENEW_INTERVAL_SECONDS antes de o lease expirar no banco.
+LEADER_LEASE_SECONDS = 30
+LEADER_RENEW_INTERVAL_SECONDS = 10
+
+# --- Diagnóstico sob Demanda (/perfil) ---
+# O perfil por amostragem lê a pilha do event loop a cada PROFILE_SAMPLING_INTERVAL_SECONDS.
+PROFILE_SAMPLING_INTERVAL_SECONDS = 0.005
+PROFILE_MAX_SECONDS = 600 # Abaixo dos 15 min de validade do token da interação
+PROFILE_REPORT_TOP_N = 40
+TRACEMALLOC_FRAMES = 10 # Profundidade das pilhas guardadas pelo tracemalloc (custo de memória cresce com ela)
+
+# --- Monitor do Event Loop (loop_monitor.py) ---
+# A cada LOOP_LAG_INTERVAL_SECONDS mede-se o atraso do loop; se ele passar de
+# LOOP_BLOCK_THRESHOLD_SECONDS, a pilha da thread do loop é registrada no log.
+LOOP_LAG_INTERVAL_SECONDS = 0.25
+LOOP_BLOCK_THRESHOLD_SECONDS = 0.25
+LOOP_STACK_LIMIT = 25 # Quadros da pilha registrados por travamento
+
+# --- Interpretação de Data/Hora do /agendar ---
+# Quantas entradas distintas de data e de data+hora ficam memorizadas (date_parsing).
+DATE_PARSE_CACHE_SIZE = 1024
+
+# --- Eventos Recorrentes ---
+# Instâncias de templates recorrentes só são materializadas dentro deste horizonte móvel.
+RECURRENCE_HORIZON = datetime.timedelta(days=14)
+
 # --- Horários para a Tarefa de Resumo Diário ---
 # A tarefa irá rodar em todos os horários desta lista.
 # Os horários são definidos no fuso horário de Brasília/São Paulo.
@@ -51,3 +148,10 @@ DIGEST_TIMES_BRT = [
     datetime.time(hour=8, minute=0, tzinfo=BRAZIL_TZ),
     datetime.time(hour=16, minute=0, tzinfo=BRAZIL_TZ)
 ]
+# Os horários acima são o padrão; cada servidor pode definir os seus (e o fuso) com /definir_horarios_resumo.
+# O envio de cada servidor é deslocado por um jitter determinístico de até DIGEST_JITTER_SECONDS,
+# para espalhar a carga na API em vez de todos os servidores enviarem no mesmo segundo.
+DIGEST_JITTER_SECONDS = 600
+# Se o bot estava parado num horário de digest, ele ainda é enviado se o atraso for menor que isto.
+DIGEST_CATCHUP_WINDOW = datetime.timedelta(minutes=30)
+DIGEST_MAX_TIMES_PER_DAY = 6
@@ -5,11 +5,71 @@ import pytz
 import json
 from constants import DB_NAME
 from typing import List, Dict, Set
+from sharding import ShardFilter
+from metrics import db_timed
+
+# Filtro de shards deste processo (None = todos os servidores). Definido por set_shard_filter
+# na inicialização quando o bot roda com um grupo de shards; aplicado nas consultas das tarefas.
+_shard_filter: ShardFilter | None = None
+
+def set_shard_filter(shard_filter: ShardFilter | None):
+    global _shard_filter
+    _shard_filter = shard_filter
+
+def _shard_sql(column: str = "guild_id") -> tuple[str, tuple]:
+    return _shard_filter.sql(column) if _shard_filter else ("", ())
+
+# Tipos de referência em event_role_refs -> coluna de events de onde vêm.
+ROLE_REF_COLUMNS = {'restrito': 'restricted_role_ids', 'mencao': 'role_mentions'}
+
+def _role_refs_insert_sql(row: str, source: str = "") -> str:
+    """
+    INSERTs que indexam os cargos de um evento em event_role_refs. `row` é NEW (nos triggers) ou
+    `events` com `source` = "FROM events" (na criação do índice). A lista CSV de IDs vira um array
+    JSON; listas malformadas são ignoradas em vez de abortar a escrita do evento.
+    """
+    statements = []
+    for kind, column in ROLE_REF_COLUMNS.items():
+        ids_json = f"'[' || COALESCE({row}.{column}, '') || ']'"
+        statements.append(
+            f"INSERT OR IGNORE INTO event_role_refs (role_id, event_id, kind) SELECT ids.value, {row}.event_id, '{kind}' {source}"
+            f"{',' if source else ' FROM'} json_each(CASE WHEN json_valid({ids_json}) THEN {ids_json} ELSE '[]' END) AS ids"
+            f" WHERE ids.type = 'integer';"
+        )
+    statements.append(
+        f"INSERT OR IGNORE INTO event_role_refs (role_id, event_id, kind) SELECT {row}.temp_role_id, {row}.event_id, 'temporario' {source}"
+        f" WHERE {row}.temp_role_id IS NOT NULL;"
+    )
+    return "\n".join(statements)
+
+# Colunas de event_rsvp_counts, uma por status de RSVP.
+RSVP_COUNT_STATUSES = ('vou', 'nao_vou', 'talvez', 'lista_espera')
+
+# Cria a linha de contagens do evento de NEW. Sem INSERT OR IGNORE: num trigger, o tratamento de
+# conflito do comando externo (ex: o upsert de db_add_or_update_rsvp) prevaleceria sobre o IGNORE.
+_RSVP_COUNTS_ENSURE_ROW_SQL = ("INSERT INTO event_rsvp_counts (event_id) SELECT NEW.event_id"
+                               " WHERE NOT EXISTS (SELECT 1 FROM event_rsvp_counts WHERE event_id = NEW.event_id);")
+
+def _rsvp_counts_delta_sql(row: str, sign: str) -> str:
+    """UPDATE (nos triggers) que soma (`sign` '+') ou subtrai ('-') o RSVP `row` (NEW/OLD) das contagens do evento dele."""
+    assignments = ", ".join(f"{status} = {status} {sign} ({row}.status = '{status}')" for status in RSVP_COUNT_STATUSES)
+    return f"UPDATE event_rsvp_counts SET {assignments} WHERE event_id = {row}.event_id;"
+
+def _rsvp_counts_aggregate_sql(where: str = "") -> str:
+    """Contagens recalculadas a partir de rsvps (event_id + uma coluna por status), para a criação, o verificador e a reconstrução."""
+    sums = ", ".join(f"SUM(status = '{status}') AS {status}" for status in RSVP_COUNT_STATUSES)
+    return f"SELECT event_id, {sums} FROM rsvps {where} GROUP BY event_id"
+
+def _csv_without(csv_ids: str | None, role_ids: set[int]) -> str | None:
+    kept = [rid.strip() for rid in (csv_ids or "").split(',') if rid.strip().isdigit() and int(rid) not in role_ids]
+    return ",".join(kept) or None
 
 def init_db():
     print("DEBUG: init_db - Iniciando")
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
+    # WAL: vários processos (grupos de shards) leem e escrevem no mesmo arquivo sem bloquear os leitores.
+    cursor.execute("PRAGMA journal_mode=WAL")
 
     # --- Tabela server_configs ---
     cursor.execute("PRAGMA table_info(server_configs)")
@@ -28,6 +88,13 @@ def init_db():
             cursor.execute("ALTER TABLE server_configs ADD COLUMN onboarding_role_id INTEGER")
             print("DEBUG: Coluna onboarding_role_id adicionada à tabela server_configs.")
         except sqlite3.OperationalError: pass
+    # Agenda do resumo diário por servidor (NULL = padrão DIGEST_TIMES_BRT no fuso de Brasília).
+    for column_name in ('digest_times', 'digest_timezone', 'digest_last_sent_utc'):
+        if column_name not in server_configs_columns:
+            try:
+                cursor.execute(f"ALTER TABLE server_configs ADD COLUMN {column_name} TEXT")
+                print(f"DEBUG: Coluna {column_name} adicionada à tabela server_configs.")
+            except sqlite3.OperationalError: pass
 
     # --- Tabela event_permissions ---
     cursor.execute('''
@@ -85,6 +152,17 @@ def init_db():
         )
     ''')
 
+    cursor.execute("PRAGMA table_info(events)")
+    events_columns = [column[1] for column in cursor.fetchall()]
+    if 'recurrence_last_generated_utc' not in events_columns:
+        try:
+            # High-water mark da expansão de recorrência: última ocorrência já processada do template.
+            cursor.execute("ALTER TABLE events ADD COLUMN recurrence_last_generated_utc TEXT")
+            print("DEBUG: Coluna recurrence_last_generated_utc adicionada à tabela events.")
+        except sqlite3.OperationalError: pass
+    # Impede instâncias duplicadas de um mesmo template no mesmo horário.
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_events_template_instance ON events (parent_template_id, event_time_utc) WHERE parent_template_id IS NOT NULL")
+
     # --- Outras Tabelas ---
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS rsvps (
@@ -96,12 +174,160 @@ def init_db():
         CREATE TABLE IF NOT EXISTS designated_event_channels (
             guild_id INTEGER NOT NULL, channel_id INTEGER NOT NULL, PRIMARY KEY (guild_id, channel_id)
         )''')
+
+    # --- Tabela bot_meta (chave/valor de estado do próprio bot, ex: hash da última sincronização de comandos) ---
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bot_meta (
+            meta_key TEXT PRIMARY KEY,
+            meta_value TEXT,
+            updated_at_utc TEXT
+        )''')
+
+    # --- Tabela cluster_leases (eleição de líder entre instâncias do bot que compartilham o banco) ---
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cluster_leases (
+            lease_name TEXT PRIMARY KEY,
+            holder_id TEXT,
+            fencing_token INTEGER NOT NULL DEFAULT 0,
+            acquired_at_utc TEXT,
+            renewed_at_utc TEXT,
+            expires_at_utc TEXT
+        )''')
+
+    # --- Tabela guild_activities (catálogo de atividades personalizado de cada servidor) ---
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS guild_activities (
+            activity_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            name_key TEXT NOT NULL,
+            activity_type TEXT NOT NULL,
+            default_spots INTEGER,
+            aliases TEXT,
+            UNIQUE (guild_id, name_key)
+        )''')
+
+    # --- Tabela scheduled_jobs (fila de trabalhos durável das tarefas) ---
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scheduled_jobs (
+            job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_type TEXT NOT NULL,
+            idempotency_key TEXT NOT NULL UNIQUE,
+            guild_id INTEGER,
+            event_id INTEGER,
+            payload_json TEXT,
+            due_at_utc TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pendente',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            lease_owner TEXT,
+            lease_expires_at_utc TEXT,
+            last_error TEXT,
+            created_at_utc TEXT NOT NULL,
+            completed_at_utc TEXT
+        )''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_scheduled_jobs_status_due ON scheduled_jobs (status, due_at_utc)")
+
+    # --- Tabela event_role_pool (cargos temporários livres, reaproveitados pelos próximos eventos; ver role_utils) ---
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS event_role_pool (
+            role_id INTEGER PRIMARY KEY,
+            guild_id INTEGER NOT NULL,
+            returned_at_utc TEXT NOT NULL
+        )''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_event_role_pool_guild ON event_role_pool (guild_id, returned_at_utc)")
+
+    # --- Tabela event_role_refs (índice cargo -> eventos que o referenciam) ---
+    # Mantida por triggers a partir das colunas CSV restricted_role_ids/role_mentions e de temp_role_id,
+    # para que as mudanças de cargo (ListenersCog) toquem só os eventos que citam o cargo alterado.
+    role_refs_existed = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'event_role_refs'").fetchone()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS event_role_refs (
+            role_id INTEGER NOT NULL,
+            event_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            PRIMARY KEY (role_id, kind, event_id)
+        ) WITHOUT ROWID''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_event_role_refs_event ON event_role_refs (event_id)")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_event_role_refs_insert AFTER INSERT ON events BEGIN {_role_refs_insert_sql('NEW')} END")
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_event_role_refs_update AFTER UPDATE OF restricted_role_ids, role_mentions, temp_role_id ON events BEGIN
+            DELETE FROM event_role_refs WHERE event_id = OLD.event_id;
+            {_role_refs_insert_sql('NEW')}
+        END''')
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS trg_event_role_refs_delete AFTER DELETE ON events BEGIN DELETE FROM event_role_refs WHERE event_id = OLD.event_id; END")
+    if not role_refs_existed:
+        cursor.executescript(_role_refs_insert_sql("events", "FROM events"))
+        print("DEBUG: Índice event_role_refs criado a partir dos eventos existentes.")
+
+    # --- Tabela event_rsvp_counts (contagem de RSVPs por evento e status, mantida por triggers em rsvps) ---
+    # Listas e checagens de vagas leem inteiros em vez de carregar todas as linhas de rsvps do evento.
+    # Conferência e reconstrução: python -m benchmarks.rsvp_counts_audit.
+    rsvp_counts_existed = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'event_rsvp_counts'").fetchone()
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS event_rsvp_counts (
+            event_id INTEGER PRIMARY KEY,
+            {", ".join(f"{status} INTEGER NOT NULL DEFAULT 0" for status in RSVP_COUNT_STATUSES)}
+        )''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_event_rsvp_counts_insert AFTER INSERT ON rsvps BEGIN
+            {_RSVP_COUNTS_ENSURE_ROW_SQL}
+            {_rsvp_counts_delta_sql('NEW', '+')}
+        END''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_event_rsvp_counts_update AFTER UPDATE OF event_id, status ON rsvps
+        WHEN OLD.status IS NOT NEW.status OR OLD.event_id IS NOT NEW.event_id BEGIN
+            {_rsvp_counts_delta_sql('OLD', '-')}
+            {_RSVP_COUNTS_ENSURE_ROW_SQL}
+            {_rsvp_counts_delta_sql('NEW', '+')}
+        END''')
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_event_rsvp_counts_delete AFTER DELETE ON rsvps BEGIN {_rsvp_counts_delta_sql('OLD', '-')} END")
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS trg_event_rsvp_counts_event_delete AFTER DELETE ON events BEGIN DELETE FROM event_rsvp_counts WHERE event_id = OLD.event_id; END")
+    if not rsvp_counts_existed:
+        cursor.execute(f"INSERT INTO event_rsvp_counts (event_id, {', '.join(RSVP_COUNT_STATUSES)}) {_rsvp_counts_aggregate_sql()}")
+        print("DEBUG: Contagens event_rsvp_counts criadas a partir dos RSVPs existentes.")
+
+    # --- Tabelas rsvp_log e rsvp_log_snapshots (histórico de RSVPs, só acréscimos; ver rsvp_log.py) ---
+    # Cada transição (status NULL = RSVP removido) é uma linha. A compactação dobra as linhas antigas
+    # no snapshot do evento (lista [user_id, status, changed_at_utc] em ordem de inscrição) e as apaga.
+    # AUTOINCREMENT: log_id nunca é reutilizado, mesmo depois de a compactação apagar as últimas linhas.
+    rsvp_log_existed = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rsvp_log'").fetchone()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rsvp_log (
+            log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            status TEXT,
+            origin TEXT NOT NULL,
+            changed_at_utc TEXT NOT NULL
+        )''')
+    # Ordem das transições: changed_at_utc (o mesmo rsvp_timestamp gravado em rsvps), desempatada por log_id.
+    # log_id sozinho não serve: é atribuído quando o lote de cada instância é gravado, não quando a mudança aconteceu.
+    cursor.execute("DROP INDEX IF EXISTS idx_rsvp_log_event")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_rsvp_log_event_time ON rsvp_log (event_id, changed_at_utc, log_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_rsvp_log_time ON rsvp_log (changed_at_utc, log_id)")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rsvp_log_snapshots (
+            event_id INTEGER PRIMARY KEY,
+            upto_log_id INTEGER NOT NULL,
+            upto_utc TEXT NOT NULL,
+            state_json TEXT NOT NULL
+        )''')
+    if not rsvp_log_existed:
+        # Os RSVPs anteriores ao histórico entram como snapshot inicial, para o replay chegar ao estado atual.
+        cursor.execute('''
+            INSERT INTO rsvp_log_snapshots (event_id, upto_log_id, upto_utc, state_json)
+            SELECT event_id, 0, MAX(rsvp_timestamp), json_group_array(json_array(user_id, status, rsvp_timestamp))
+            FROM (SELECT event_id, user_id, status, rsvp_timestamp FROM rsvps ORDER BY event_id, rsvp_timestamp)
+            GROUP BY event_id''')
+        print("DEBUG: Histórico rsvp_log criado; RSVPs existentes guardados como snapshot inicial.")
     conn.commit()
     if conn: conn.close()
     print("DEBUG: init_db - Concluído, schema verificado/atualizado.")
 
 
 # --- Funções de Permissões de Evento ---
+@db_timed
 def db_add_event_permission(guild_id: int, role_id: int, permission: str):
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -113,6 +339,7 @@ def db_add_event_permission(guild_id: int, role_id: int, permission: str):
     finally:
         if conn: conn.close()
 
+@db_timed
 def db_remove_event_permission(guild_id: int, role_id: int, permission: str):
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -124,6 +351,7 @@ def db_remove_event_permission(guild_id: int, role_id: int, permission: str):
     finally:
         if conn: conn.close()
 
+@db_timed
 def db_get_roles_with_permission(guild_id: int, permission: str) -> List[int]:
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -136,6 +364,7 @@ def db_get_roles_with_permission(guild_id: int, permission: str) -> List[int]:
     finally:
         if conn: conn.close()
 
+@db_timed
 def db_get_all_event_permissions(guild_id: int) -> Dict[int, List[str]]:
     permissions_by_role: Dict[int, List[str]] = {}
     conn = sqlite3.connect(DB_NAME)
@@ -152,6 +381,7 @@ def db_get_all_event_permissions(guild_id: int) -> Dict[int, List[str]]:
         if conn: conn.close()
     return permissions_by_role
 
+@db_timed
 def db_check_user_permission(guild_id: int, user_roles_ids: Set[int], permission: str) -> bool:
     """Verifica se algum dos cargos do usuário possui a permissão especificada."""
     roles_with_perm = db_get_roles_with_permission(guild_id, permission)
@@ -161,6 +391,7 @@ def db_check_user_permission(guild_id: int, user_roles_ids: Set[int], permission
 
 
 # --- Funções de Onboarding ---
+@db_timed
 def db_set_onboarding_role(guild_id: int, role_id: int):
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -171,6 +402,7 @@ def db_set_onboarding_role(guild_id: int, role_id: int):
     finally:
         if conn: conn.close()
 
+@db_timed
 def db_get_onboarding_role(guild_id: int) -> int | None:
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -184,6 +416,7 @@ def db_get_onboarding_role(guild_id: int) -> int | None:
     finally:
         if conn: conn.close()
 
+@db_timed
 def db_add_user_onboarding(user_id: int, guild_id: int, answers: dict):
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -202,6 +435,7 @@ def db_add_user_onboarding(user_id: int, guild_id: int, answers: dict):
     finally:
         if conn: conn.close()
 
+@db_timed
 def db_has_user_completed_onboarding(user_id: int, guild_id: int) -> bool:
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -216,6 +450,7 @@ def db_has_user_completed_onboarding(user_id: int, guild_id: int) -> bool:
 
 
 # --- Funções para Designated Event Channels ---
+@db_timed
 def db_add_designated_event_channel(guild_id: int, channel_id: int):
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -226,6 +461,7 @@ def db_add_designated_event_channel(guild_id: int, channel_id: int):
     finally:
         if conn: conn.close()
 
+@db_timed
 def db_remove_designated_event_channel(guild_id: int, channel_id: int):
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -236,6 +472,7 @@ def db_remove_designated_event_channel(guild_id: int, channel_id: int):
     finally:
         if conn: conn.close()
 
+@db_timed
 def db_get_designated_event_channels(guild_id: int) -> list[int]:
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -247,7 +484,9 @@ def db_get_designated_event_channels(guild_id: int) -> list[int]:
         if conn: conn.close()
 
 # --- Funções de RSVP ---
-def db_add_or_update_rsvp(event_id: int, user_id: int, status: str):
+@db_timed
+def db_add_or_update_rsvp(event_id: int, user_id: int, status: str) -> str | None:
+    """Grava o RSVP. Retorna o rsvp_timestamp gravado (o changed_at_utc da transição no rsvp_log) ou None em erro."""
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
     timestamp_utc = datetime.datetime.now(pytz.utc).isoformat()
@@ -257,20 +496,70 @@ def db_add_or_update_rsvp(event_id: int, user_id: int, status: str):
             ON CONFLICT(event_id, user_id) DO UPDATE SET status = excluded.status, rsvp_timestamp = excluded.rsvp_timestamp
         ''', (event_id, user_id, status, timestamp_utc))
         conn.commit()
-    except sqlite3.Error as e: print(f"Erro DB ao adicionar/atualizar RSVP: {e}")
+        return timestamp_utc
+    except sqlite3.Error as e: print(f"Erro DB ao adicionar/atualizar RSVP: {e}"); return None
     finally:
         if conn: conn.close()
 
-def db_remove_rsvp(event_id: int, user_id: int):
+@db_timed
+def db_remove_rsvp(event_id: int, user_id: int) -> str | None:
+    """Remove o RSVP. Retorna o horário da remoção (o changed_at_utc da transição no rsvp_log) ou None em erro."""
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
+    timestamp_utc = datetime.datetime.now(pytz.utc).isoformat()
     try:
         cursor.execute("DELETE FROM rsvps WHERE event_id = ? AND user_id = ?", (event_id, user_id))
         conn.commit()
-    except sqlite3.Error as e: print(f"Erro DB ao remover RSVP: {e}")
+        return timestamp_utc
+    except sqlite3.Error as e: print(f"Erro DB ao remover RSVP: {e}"); return None
     finally:
         if conn: conn.close()
 
+@db_timed
+def db_apply_rsvp_click(event_id: int, user_id: int, status: str) -> dict | None:
+    """
+    Grava o RSVP de um clique com a decisão de vagas tomada no banco, numa única transação
+    (BEGIN IMMEDIATE: instâncias que atendem o mesmo evento não decidem com a mesma contagem).
+    'vou' vira 'lista_espera' se as vagas (event_rsvp_counts) estão cheias; se o usuário deixou
+    uma vaga confirmada, o primeiro da lista de espera (ordem de inscrição) é promovido.
+    Retorna {'previous', 'status', 'promoted' (user_id ou None), 'changed_at_utc'} ou None em erro.
+    """
+    conn = sqlite3.connect(DB_NAME, isolation_level=None)
+    cursor = conn.cursor()
+    timestamp_utc = datetime.datetime.now(pytz.utc).isoformat()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        event = cursor.execute("SELECT max_attendees FROM events WHERE event_id = ?", (event_id,)).fetchone()
+        if not event:
+            cursor.execute("ROLLBACK"); return None
+        max_attendees = event[0]
+        confirmed_sql = "SELECT COALESCE((SELECT vou FROM event_rsvp_counts WHERE event_id = ?), 0)"
+        row = cursor.execute("SELECT status FROM rsvps WHERE event_id = ? AND user_id = ?", (event_id, user_id)).fetchone()
+        previous = row[0] if row else None
+        final_status = status
+        if status == 'vou' and previous != 'vou' and cursor.execute(confirmed_sql, (event_id,)).fetchone()[0] >= max_attendees:
+            final_status = 'lista_espera'
+        cursor.execute('''
+            INSERT INTO rsvps (event_id, user_id, status, rsvp_timestamp) VALUES (?, ?, ?, ?)
+            ON CONFLICT(event_id, user_id) DO UPDATE SET status = excluded.status, rsvp_timestamp = excluded.rsvp_timestamp
+        ''', (event_id, user_id, final_status, timestamp_utc))
+        promoted = None
+        if previous == 'vou' and final_status != 'vou' and cursor.execute(confirmed_sql, (event_id,)).fetchone()[0] < max_attendees:
+            row = cursor.execute("SELECT user_id FROM rsvps WHERE event_id = ? AND status = 'lista_espera' ORDER BY rsvp_timestamp ASC LIMIT 1",
+                                 (event_id,)).fetchone()
+            if row:
+                promoted = row[0]
+                cursor.execute("UPDATE rsvps SET status = 'vou', rsvp_timestamp = ? WHERE event_id = ? AND user_id = ?", (timestamp_utc, event_id, promoted))
+        cursor.execute("COMMIT")
+        return {'previous': previous, 'status': final_status, 'promoted': promoted, 'changed_at_utc': timestamp_utc}
+    except sqlite3.Error as e:
+        if conn.in_transaction: conn.rollback()
+        print(f"Erro DB ao gravar o RSVP do usuário {user_id} no evento {event_id}: {e}")
+        return None
+    finally:
+        if conn: conn.close()
+
+@db_timed
 def db_get_rsvps_for_event(event_id: int) -> dict:
     rsvps = {'vou': [], 'nao_vou': [], 'talvez': [], 'lista_espera': []}
     conn = sqlite3.connect(DB_NAME)
@@ -285,6 +574,21 @@ def db_get_rsvps_for_event(event_id: int) -> dict:
         if conn: conn.close()
     return rsvps
 
+@db_timed
+def db_load_event_rsvps(event_id: int) -> tuple[str | None, list[tuple[int, str]]]:
+    """Status do evento (None se não existir) e os RSVPs dele, (user_id, status) em ordem de inscrição. Usado pelo rsvp_store."""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        row = cursor.execute("SELECT status FROM events WHERE event_id = ?", (event_id,)).fetchone()
+        if not row: return None, []
+        cursor.execute("SELECT user_id, status FROM rsvps WHERE event_id = ? ORDER BY rsvp_timestamp ASC", (event_id,))
+        return row[0], cursor.fetchall()
+    except sqlite3.Error as e: print(f"Erro DB ao carregar RSVPs do evento {event_id}: {e}"); return None, []
+    finally:
+        if conn: conn.close()
+
+@db_timed
 def db_get_user_active_rsvps_in_guild(user_id: int, guild_id: int) -> list[int]:
     """Busca todos os IDs de eventos ativos para os quais um usuário tem um RSVP em um servidor específico."""
     conn = sqlite3.connect(DB_NAME)
@@ -302,8 +606,408 @@ def db_get_user_active_rsvps_in_guild(user_id: int, guild_id: int) -> list[int]:
     finally:
         if conn: conn.close()
 
+@db_timed
+def db_check_rsvp_counts(active_only: bool = False) -> list[dict]:
+    """
+    Compara event_rsvp_counts com as contagens recalculadas de rsvps. Retorna um dict por evento
+    divergente: event_id, registrado e esperado ({status: contagem}). Com `active_only`, só eventos ativos.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    scope = "WHERE event_id IN (SELECT event_id FROM events WHERE status = 'ativo')" if active_only else ""
+    recorded = ", ".join(f"COALESCE(c.{status}, 0)" for status in RSVP_COUNT_STATUSES)
+    expected = ", ".join(f"COALESCE(a.{status}, 0)" for status in RSVP_COUNT_STATUSES)
+    try:
+        cursor.execute(f'''
+            WITH actual AS ({_rsvp_counts_aggregate_sql(scope)})
+            SELECT ids.event_id, {recorded}, {expected}
+            FROM (SELECT event_id FROM event_rsvp_counts {scope} UNION SELECT event_id FROM actual) ids
+            LEFT JOIN event_rsvp_counts c ON c.event_id = ids.event_id
+            LEFT JOIN actual a ON a.event_id = ids.event_id
+            WHERE {" OR ".join(f"COALESCE(c.{status}, 0) != COALESCE(a.{status}, 0)" for status in RSVP_COUNT_STATUSES)}
+            ORDER BY ids.event_id''')
+        width = len(RSVP_COUNT_STATUSES)
+        return [{'event_id': row[0], 'registrado': dict(zip(RSVP_COUNT_STATUSES, row[1:1 + width])),
+                 'esperado': dict(zip(RSVP_COUNT_STATUSES, row[1 + width:]))} for row in cursor.fetchall()]
+    except sqlite3.Error as e: print(f"Erro DB ao conferir as contagens de RSVP: {e}"); return []
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_rebuild_rsvp_counts(event_ids: list[int] | None = None) -> int:
+    """Recalcula event_rsvp_counts a partir de rsvps, numa transação: só dos `event_ids` ou, com None, a tabela inteira. Retorna as linhas gravadas."""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    columns = ", ".join(RSVP_COUNT_STATUSES)
+    written = 0
+    try:
+        if event_ids is None:
+            cursor.execute("DELETE FROM event_rsvp_counts")
+            written = cursor.execute(f"INSERT INTO event_rsvp_counts (event_id, {columns}) {_rsvp_counts_aggregate_sql()}").rowcount
+        else:
+            for start in range(0, len(event_ids), 500):
+                chunk = event_ids[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f"DELETE FROM event_rsvp_counts WHERE event_id IN ({placeholders})", chunk)
+                written += cursor.execute(f"INSERT INTO event_rsvp_counts (event_id, {columns}) {_rsvp_counts_aggregate_sql(f'WHERE event_id IN ({placeholders})')}",
+                                          chunk).rowcount
+        conn.commit()
+        return written
+    except sqlite3.Error as e:
+        print(f"Erro DB ao reconstruir as contagens de RSVP: {e}")
+        conn.rollback(); return 0
+    finally:
+        if conn: conn.close()
+
+_AFFECTED_EVENT_COLUMNS ="e.event_id, e.guild_id, e.channel_id, e.message_id, e.temp_role_id, e.max_attendees"
+
+def _collect_affected_rsvps(affected: dict[int, dict], rows: list[sqlite3.Row]):
+    """Agrupa por evento as linhas (colunas de _AFFECTED_EVENT_COLUMNS + user_id) dos RSVPs a remover."""
+    for row in rows:
+        event = affected.setdefault(row['event_id'], {
+            'event_id': row['event_id'], 'guild_id': row['guild_id'], 'channel_id': row['channel_id'],
+            'message_id': row['message_id'], 'temp_role_id': row['temp_role_id'],
+            'max_attendees': row['max_attendees'], 'removed': [], 'promoted': []
+        })
+        if row['user_id'] not in event['removed']: event['removed'].append(row['user_id'])
+
+def _delete_rsvps_and_promote(cursor: sqlite3.Cursor, affected: dict[int, dict]) -> list[dict]:
+    """
+    Remove os RSVPs agrupados por _collect_affected_rsvps e promove a lista de espera (ordem de
+    inscrição) até preencher as vagas. O horário das mudanças vai em changed_at_utc de cada evento.
+    """
+    timestamp_utc = datetime.datetime.now(pytz.utc).isoformat()
+    cursor.executemany("DELETE FROM rsvps WHERE event_id = ? AND user_id = ?",
+                       [(event_id, user_id) for event_id, event in affected.items() for user_id in event['removed']])
+    for event_id, event in affected.items():
+        event['changed_at_utc'] = timestamp_utc
+        confirmed = cursor.execute("SELECT COUNT(*) FROM rsvps WHERE event_id = ? AND status = 'vou'", (event_id,)).fetchone()[0]
+        open_spots = event.pop('max_attendees') - confirmed
+        if open_spots <= 0: continue
+        cursor.execute("SELECT user_id FROM rsvps WHERE event_id = ? AND status = 'lista_espera' ORDER BY rsvp_timestamp ASC LIMIT ?",
+                       (event_id, open_spots))
+        event['promoted'] = [row[0] for row in cursor.fetchall()]
+        cursor.executemany("UPDATE rsvps SET status = 'vou', rsvp_timestamp = ? WHERE event_id = ? AND user_id = ?",
+                           [(timestamp_utc, event_id, user_id) for user_id in event['promoted']])
+    return list(affected.values())
+
+@db_timed
+def db_remove_departed_members_rsvps(departures: dict[int, list[int]]) -> list[dict]:
+    """
+    Remove, numa única transação, os RSVPs dos membros que saíram ({guild_id: [user_id, ...]}) em
+    eventos ativos e promove a lista de espera (ordem de inscrição) até preencher as vagas abertas.
+    Retorna um dict por evento afetado: event_id, guild_id, channel_id, message_id, temp_role_id,
+    removed (usuários removidos), promoted (usuários promovidos para 'vou') e changed_at_utc.
+    """
+    if not departures: return []
+    conn = sqlite3.connect(DB_NAME)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    affected: dict[int, dict] = {}
+    try:
+        for guild_id, user_ids in departures.items():
+            for i in range(0, len(user_ids), 500):
+                chunk = list(user_ids[i:i + 500])
+                cursor.execute(f'''
+                    SELECT {_AFFECTED_EVENT_COLUMNS}, r.user_id
+                    FROM rsvps r JOIN events e ON e.event_id = r.event_id
+                    WHERE e.guild_id = ? AND e.status = 'ativo' AND r.user_id IN ({','.join('?' * len(chunk))})
+                ''', (guild_id, *chunk))
+                _collect_affected_rsvps(affected, cursor.fetchall())
+        result = _delete_rsvps_and_promote(cursor, affected)
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Erro DB ao remover RSVPs de {sum(len(ids) for ids in departures.values())} membro(s) que saíram: {e}")
+        return []
+    finally:
+        if conn: conn.close()
+    return result
+
+@db_timed
+def db_filter_restricting_roles(guild_id: int, role_ids: set[int]) -> set[int]:
+    """
+    Dos `role_ids`, só os que podem restringir algum RSVP: restritos padrão do servidor ou
+    restritos de algum evento ativo dele (event_role_refs). Cargos temporários de eventos e
+    outros cargos sem restrição ficam de fora.
+    """
+    if not role_ids: return set()
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        row = cursor.execute("SELECT default_restricted_role_ids FROM server_configs WHERE guild_id = ?", (guild_id,)).fetchone()
+        restricting = {int(rid) for rid in row[0].split(',') if rid.strip().isdigit()} & role_ids if row and row[0] else set()
+        remaining = list(role_ids - restricting)
+        if remaining:
+            cursor.execute(f'''
+                SELECT DISTINCT ref.role_id FROM event_role_refs ref JOIN events e ON e.event_id = ref.event_id
+                WHERE ref.kind = 'restrito' AND ref.role_id IN ({','.join('?' * len(remaining))}) AND e.guild_id = ? AND e.status = 'ativo'
+            ''', (*remaining, guild_id))
+            restricting.update(row[0] for row in cursor.fetchall())
+        return restricting
+    except sqlite3.Error as e:
+        print(f"Erro DB ao filtrar cargos restritos do servidor {guild_id}: {e}")
+        return set(role_ids) # Na dúvida, o lote confere todos
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_remove_restricted_members_rsvps(role_gains: dict[int, dict[int, list[int]]]) -> list[dict]:
+    """
+    Remove, numa única transação, os RSVPs em eventos ativos que passaram a ser proibidos porque o
+    membro ganhou um cargo restrito ({guild_id: {user_id: [cargos ganhos]}}), e promove a lista de
+    espera. Só são consultados os eventos que restringem esses cargos (event_role_refs), ou todos
+    os eventos ativos do servidor quando o cargo está nos restritos padrão. Mesmo retorno de
+    db_remove_departed_members_rsvps.
+    """
+    if not role_gains: return []
+    conn = sqlite3.connect(DB_NAME)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    affected: dict[int, dict] = {}
+    try:
+        for guild_id, gains in role_gains.items():
+            row = cursor.execute("SELECT default_restricted_role_ids FROM server_configs WHERE guild_id = ?", (guild_id,)).fetchone()
+            default_restricted = {int(rid) for rid in row[0].split(',') if rid.strip().isdigit()} if row and row[0] else set()
+            for user_id, role_ids in gains.items():
+                role_ids = list(role_ids)
+                all_events = not default_restricted.isdisjoint(role_ids)
+                cursor.execute(f'''
+                    SELECT {_AFFECTED_EVENT_COLUMNS}, r.user_id
+                    FROM events e JOIN rsvps r ON r.event_id = e.event_id AND r.user_id = ?
+                    WHERE e.guild_id = ? AND e.status = 'ativo' AND (? OR e.event_id IN (
+                        SELECT event_id FROM event_role_refs WHERE kind = 'restrito' AND role_id IN ({','.join('?' * len(role_ids))})))
+                ''', (user_id, guild_id, all_events, *role_ids))
+                _collect_affected_rsvps(affected, cursor.fetchall())
+        result = _delete_rsvps_and_promote(cursor, affected)
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Erro DB ao remover RSVPs de membros com cargos restritos: {e}")
+        return []
+    finally:
+        if conn: conn.close()
+    return result
+
+@db_timed
+def db_prune_deleted_roles(deleted_roles: dict[int, list[int]]) -> list[dict]:
+    """
+    Remove os IDs de cargos apagados ({guild_id: [role_id, ...]}) das colunas CSV dos eventos que os
+    citam (via event_role_refs), de temp_role_id, dos restritos padrão, das permissões de evento e
+    do pool de cargos, numa única transação. Retorna os eventos ativos cuja lista de restrições mudou (event_id,
+    channel_id, message_id), que precisam ter a mensagem atualizada.
+    """
+    if not deleted_roles: return []
+    conn = sqlite3.connect(DB_NAME)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    to_refresh: list[dict] = []
+    try:
+        for guild_id, role_ids in deleted_roles.items():
+            dead = set(role_ids)
+            placeholders = ','.join('?' * len(dead))
+            cursor.execute(f'''
+                SELECT event_id, status, channel_id, message_id, restricted_role_ids, role_mentions, temp_role_id FROM events
+                WHERE guild_id = ? AND event_id IN (SELECT event_id FROM event_role_refs WHERE role_id IN ({placeholders}))
+            ''', (guild_id, *dead))
+            for event in cursor.fetchall():
+                restricted = _csv_without(event['restricted_role_ids'], dead)
+                mentions = _csv_without(event['role_mentions'], dead)
+                temp_role_id = None if event['temp_role_id'] in dead else event['temp_role_id']
+                cursor.execute("UPDATE events SET restricted_role_ids = ?, role_mentions = ?, temp_role_id = ? WHERE event_id = ?",
+                               (restricted, mentions, temp_role_id, event['event_id']))
+                if restricted != event['restricted_role_ids'] and event['status'] == 'ativo' and event['message_id']:
+                    to_refresh.append({'event_id': event['event_id'], 'channel_id': event['channel_id'], 'message_id': event['message_id']})
+            row = cursor.execute("SELECT default_restricted_role_ids FROM server_configs WHERE guild_id = ?", (guild_id,)).fetchone()
+            if row and row[0]:
+                cursor.execute("UPDATE server_configs SET default_restricted_role_ids = ? WHERE guild_id = ?", (_csv_without(row[0], dead), guild_id))
+            cursor.execute(f"DELETE FROM event_permissions WHERE guild_id = ? AND role_id IN ({placeholders})", (guild_id, *dead))
+            cursor.execute(f"DELETE FROM event_role_pool WHERE guild_id = ? AND role_id IN ({placeholders})", (guild_id, *dead))
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Erro DB ao remover {sum(len(ids) for ids in deleted_roles.values())} cargo(s) apagado(s) dos eventos: {e}")
+        return []
+    finally:
+        if conn: conn.close()
+    return to_refresh
+
+
+@db_timed
+def db_get_rsvp_status(event_id: int, user_id: int) -> str | None:
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT status FROM rsvps WHERE event_id = ? AND user_id = ?", (event_id, user_id))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    except sqlite3.Error as e: print(f"Erro DB ao buscar o RSVP do usuário {user_id} no evento {event_id}: {e}"); return None
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_get_event_role_holders(statuses: tuple[str, ...] = ('vou', 'lista_espera')) -> dict[int, dict]:
+    """
+    Eventos ativos com cargo temporário (dos shards deste processo) e, para cada um, quem deveria
+    ter o cargo (RSVP num dos `statuses`): {event_id: {'guild_id', 'temp_role_id', 'holders': set}}.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    shard_clause, shard_params = _shard_sql("e.guild_id")
+    events: dict[int, dict] = {}
+    try:
+        cursor.execute(f'''
+            SELECT e.event_id, e.guild_id, e.temp_role_id, r.user_id FROM events e
+            LEFT JOIN rsvps r ON r.event_id = e.event_id AND r.status IN ({','.join('?' * len(statuses))})
+            WHERE e.status = 'ativo' AND e.temp_role_id IS NOT NULL AND (e.is_recurring_template = 0 OR e.is_recurring_template IS NULL)''' + shard_clause,
+            (*statuses, *shard_params))
+        for event_id, guild_id, temp_role_id, user_id in cursor.fetchall():
+            event = events.setdefault(event_id, {'guild_id': guild_id, 'temp_role_id': temp_role_id, 'holders': set()})
+            if user_id is not None: event['holders'].add(user_id)
+    except sqlite3.Error as e: print(f"Erro DB ao buscar os participantes dos cargos temporários: {e}"); return {}
+    finally:
+        if conn: conn.close()
+    return events
+
+# --- Funções do Histórico de RSVPs (rsvp_log) ---
+def _fold_rsvp_log(state: dict[int, tuple[str, str]], rows) -> dict[int, tuple[str, str]]:
+    """
+    Aplica transições (user_id, status, changed_at_utc), já na ordem (changed_at_utc, log_id), a
+    `state` ({user_id: (status, changed_at_utc)} em ordem de inscrição). Como no upsert de
+    db_add_or_update_rsvp, cada mudança leva o usuário para o fim; status None remove o RSVP.
+    """
+    for user_id, status, changed_at_utc in rows:
+        state.pop(user_id, None)
+        if status is not None: state[user_id] = (status, changed_at_utc)
+    return state
+
+def _snapshot_state(state_json: str | None) -> dict[int, tuple[str, str]]:
+    return {user_id: (status, changed_at_utc) for user_id, status, changed_at_utc in json.loads(state_json or "[]")}
+
+@db_timed
+def db_append_rsvp_log(entries: list[tuple[int, int, str | None, str, str]]) -> bool:
+    """Acrescenta ao histórico, numa única transação, as transições (event_id, user_id, status, origin, changed_at_utc)."""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.executemany("INSERT INTO rsvp_log (event_id, user_id, status, origin, changed_at_utc) VALUES (?, ?, ?, ?, ?)", entries)
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Erro DB ao gravar {len(entries)} transição(ões) no histórico de RSVPs: {e}")
+        conn.rollback(); return False
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_get_rsvp_log(event_id: int, until_utc: str | None = None) -> list[sqlite3.Row]:
+    """Transições ainda não compactadas do evento (log_id, user_id, status, origin, changed_at_utc), em ordem de changed_at_utc."""
+    conn = sqlite3.connect(DB_NAME)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT log_id, user_id, status, origin, changed_at_utc FROM rsvp_log WHERE event_id = ? AND (? IS NULL OR changed_at_utc <= ?) "
+                       "ORDER BY changed_at_utc, log_id", (event_id, until_utc, until_utc))
+        return cursor.fetchall()
+    except sqlite3.Error as e: print(f"Erro DB ao buscar o histórico de RSVPs do evento {event_id}: {e}"); return []
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_replay_rsvp_log(event_id: int, until_utc: str | None = None) -> dict[int, tuple[str, str]] | None:
+    """
+    Reconstrói os RSVPs do evento (até `until_utc`, ou atuais) a partir do snapshot e das transições
+    seguintes: {user_id: (status, changed_at_utc)} em ordem de inscrição. None se `until_utc` é
+    anterior ao snapshot (esse trecho do histórico já foi compactado) ou em caso de erro.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN") # Snapshot e transições lidos na mesma transação, sem a compactação no meio
+        snapshot = cursor.execute("SELECT upto_utc, state_json FROM rsvp_log_snapshots WHERE event_id = ?", (event_id,)).fetchone()
+        if snapshot and until_utc is not None and until_utc < snapshot[0]: return None
+        # As transições dobradas no snapshot já foram apagadas (na mesma transação da compactação).
+        cursor.execute("SELECT user_id, status, changed_at_utc FROM rsvp_log WHERE event_id = ? AND (? IS NULL OR changed_at_utc <= ?) ORDER BY changed_at_utc, log_id",
+                       (event_id, until_utc, until_utc))
+        return _fold_rsvp_log(_snapshot_state(snapshot[1] if snapshot else None), cursor.fetchall())
+    except sqlite3.Error as e: print(f"Erro DB ao reconstruir os RSVPs do evento {event_id}: {e}"); return None
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_check_rsvp_log(active_only: bool = False) -> list[dict]:
+    """
+    Compara o estado reconstruído pelo histórico (snapshot + transições) com a tabela rsvps, numa
+    leitura consistente. Retorna um dict por evento divergente: event_id, registrado (status no
+    histórico) e esperado (status em rsvps), só dos usuários que diferem ({user_id: status ou None}).
+    Com `active_only`, só eventos ativos. Transições de outra instância ainda não gravadas (até
+    RSVP_LOG_FLUSH_SECONDS) aparecem como divergência passageira.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    scope = "WHERE event_id IN (SELECT event_id FROM events WHERE status = 'ativo')" if active_only else ""
+    try:
+        cursor.execute("BEGIN")
+        replayed: dict[int, dict[int, tuple[str, str]]] = {
+            event_id: _snapshot_state(state_json) for event_id, state_json in cursor.execute(f"SELECT event_id, state_json FROM rsvp_log_snapshots {scope}")}
+        cursor.execute(f"SELECT event_id, user_id, status, changed_at_utc FROM rsvp_log {scope} ORDER BY event_id, changed_at_utc, log_id")
+        for event_id, user_id, status, changed_at_utc in cursor.fetchall():
+            _fold_rsvp_log(replayed.setdefault(event_id, {}), ((user_id, status, changed_at_utc),))
+        actual: dict[int, dict[int, str]] = {}
+        for event_id, user_id, status in cursor.execute(f"SELECT event_id, user_id, status FROM rsvps {scope}"):
+            actual.setdefault(event_id, {})[user_id] = status
+        mismatches = []
+        for event_id in sorted(replayed.keys() | actual.keys()):
+            recorded = {user_id: status for user_id, (status, _) in replayed.get(event_id, {}).items()}
+            expected = actual.get(event_id, {})
+            differing = sorted(user_id for user_id in recorded.keys() | expected.keys() if recorded.get(user_id) != expected.get(user_id))
+            if differing:
+                mismatches.append({'event_id': event_id, 'registrado': {user_id: recorded.get(user_id) for user_id in differing},
+                                   'esperado': {user_id: expected.get(user_id) for user_id in differing}})
+        return mismatches
+    except sqlite3.Error as e: print(f"Erro DB ao conferir o histórico de RSVPs: {e}"); return []
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_compact_rsvp_log(before_utc: str, max_rows: int) -> tuple[int, int]:
+    """
+    Dobra no snapshot de cada evento as transições mais antigas que `before_utc` (no máximo `max_rows`
+    por chamada, na ordem changed_at_utc, log_id) e as apaga, numa transação. Retorna
+    (eventos com snapshot atualizado, transições compactadas).
+    """
+    conn = sqlite3.connect(DB_NAME, isolation_level=None)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT log_id, event_id, user_id, status, changed_at_utc FROM rsvp_log WHERE changed_at_utc < ? ORDER BY changed_at_utc, log_id LIMIT ?",
+                       (before_utc, max_rows))
+        rows = cursor.fetchall()
+        if not rows:
+            cursor.execute("COMMIT"); return 0, 0
+        rows_by_event: dict[int, list[tuple]] = {}
+        for log_id, event_id, user_id, status, changed_at_utc in rows:
+            rows_by_event.setdefault(event_id, []).append((log_id, user_id, status, changed_at_utc))
+        for event_id, event_rows in rows_by_event.items():
+            snapshot = cursor.execute("SELECT upto_log_id, upto_utc, state_json FROM rsvp_log_snapshots WHERE event_id = ?", (event_id,)).fetchone()
+            state = _fold_rsvp_log(_snapshot_state(snapshot[2] if snapshot else None), (row[1:] for row in event_rows))
+            cursor.execute('''
+                INSERT INTO rsvp_log_snapshots (event_id, upto_log_id, upto_utc, state_json) VALUES (?, ?, ?, ?)
+                ON CONFLICT(event_id) DO UPDATE SET upto_log_id = excluded.upto_log_id, upto_utc = excluded.upto_utc, state_json = excluded.state_json
+            ''', (event_id, max(max(row[0] for row in event_rows), snapshot[0] if snapshot else 0), max(event_rows[-1][3], snapshot[1] if snapshot else ""),
+                  json.dumps([[user_id, status, changed_at_utc] for user_id, (status, changed_at_utc) in state.items()])))
+        cursor.executemany("DELETE FROM rsvp_log WHERE log_id = ?", [(row[0],) for row in rows])
+        cursor.execute("COMMIT")
+        return len(rows_by_event), len(rows)
+    except sqlite3.Error as e:
+        if conn.in_transaction: conn.rollback()
+        print(f"Erro DB ao compactar o histórico de RSVPs: {e}")
+        return 0, 0
+    finally:
+        if conn: conn.close()
 
 # --- Funções de Eventos ---
+@db_timed
 def db_get_event_details(event_id: int) -> sqlite3.Row | None:
     conn = sqlite3.connect(DB_NAME)
     conn.row_factory = sqlite3.Row
@@ -315,6 +1019,26 @@ def db_get_event_details(event_id: int) -> sqlite3.Row | None:
     finally:
         if conn: conn.close()
 
+@db_timed
+def db_get_events_by_ids(event_ids: list[int]) -> dict[int, sqlite3.Row]:
+    """Busca vários eventos numa única consulta. Retorna {event_id: linha}; IDs inexistentes são omitidos."""
+    if not event_ids: return {}
+    conn = sqlite3.connect(DB_NAME)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    events: dict[int, sqlite3.Row] = {}
+    unique_ids = list(dict.fromkeys(event_ids))
+    try:
+        for i in range(0, len(unique_ids), 500):
+            chunk = unique_ids[i:i + 500]
+            cursor.execute(f"SELECT * FROM events WHERE event_id IN ({','.join('?' * len(chunk))})", chunk)
+            events.update({row['event_id']: row for row in cursor.fetchall()})
+    except sqlite3.Error as e: print(f"Erro DB ao buscar {len(unique_ids)} eventos por ID: {e}")
+    finally:
+        if conn: conn.close()
+    return events
+
+@db_timed
 def db_update_event_status(event_id: int, status: str, delete_after_utc: str | None = None):
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -328,6 +1052,7 @@ def db_update_event_status(event_id: int, status: str, delete_after_utc: str | N
     finally:
         if conn: conn.close()
 
+@db_timed
 def db_update_event_details(event_id: int, **kwargs):
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -348,30 +1073,60 @@ def db_update_event_details(event_id: int, **kwargs):
     finally:
         if conn: conn.close()
 
+@db_timed
 def db_get_events_for_cleanup() -> list[sqlite3.Row]:
     conn = sqlite3.connect(DB_NAME)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     two_hours_ago = datetime.datetime.now(pytz.utc) - datetime.timedelta(hours=2)
+    shard_clause, shard_params = _shard_sql()
     try:
-        cursor.execute("SELECT * FROM events WHERE status = 'ativo' AND (is_recurring_template = 0 OR is_recurring_template IS NULL) AND event_time_utc < ?", (two_hours_ago.isoformat(),))
+        cursor.execute("SELECT * FROM events WHERE status = 'ativo' AND (is_recurring_template = 0 OR is_recurring_template IS NULL) AND event_time_utc < ?" + shard_clause, (two_hours_ago.isoformat(), *shard_params))
         return cursor.fetchall()
     except sqlite3.Error as e: print(f"Erro DB ao buscar eventos para cleanup: {e}"); return []
     finally:
         if conn: conn.close()
 
-def db_get_events_to_delete_message() -> list[sqlite3.Row]:
+@db_timed
+def db_bulk_mark_events_concluded(event_ids: list[int], delete_after_utc: str) -> bool:
+    """
+    Marca vários eventos como 'concluido' numa única transação, agendando a deleção
+    da mensagem e limpando o temp_role_id. Eventos que já não estão 'ativo' são ignorados.
+    Retorna True se a transação foi confirmada.
+    """
+    if not event_ids: return True
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(
+            "UPDATE events SET status = 'concluido', delete_message_after_utc = ?, temp_role_id = NULL WHERE event_id = ? AND status = 'ativo'",
+            [(delete_after_utc, event_id) for event_id in event_ids]
+        )
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Erro DB ao concluir eventos em lote ({len(event_ids)} eventos): {e}")
+        return False
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_get_events_to_delete_message(until_utc: datetime.datetime | None = None) -> list[sqlite3.Row]:
+    """Eventos cancelados/concluídos cuja mensagem deve ser apagada até `until_utc` (padrão: agora)."""
     conn = sqlite3.connect(DB_NAME)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
-    now_utc = datetime.datetime.now(pytz.utc).isoformat()
+    until_utc_str = (until_utc or datetime.datetime.now(pytz.utc)).isoformat()
     try:
-        cursor.execute("SELECT event_id, guild_id, channel_id, message_id, status FROM events WHERE (status = 'cancelado' OR status = 'concluido') AND delete_message_after_utc IS NOT NULL AND delete_message_after_utc <= ?", (now_utc,))
+        shard_clause, shard_params = _shard_sql()
+        cursor.execute("SELECT event_id, guild_id, channel_id, message_id, status, delete_message_after_utc FROM events WHERE (status = 'cancelado' OR status = 'concluido') AND delete_message_after_utc IS NOT NULL AND delete_message_after_utc <= ?" + shard_clause, (until_utc_str, *shard_params))
         return cursor.fetchall()
     except sqlite3.Error as e: print(f"Erro DB ao buscar eventos para deletar msg: {e}"); return []
     finally:
         if conn: conn.close()
 
+@db_timed
 def db_clear_message_id_and_update_status_after_delete(event_id: int, original_status: str):
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -383,20 +1138,44 @@ def db_clear_message_id_and_update_status_after_delete(event_id: int, original_s
     finally:
         if conn: conn.close()
 
-def db_get_upcoming_events_for_reminder() -> list[sqlite3.Row]: # Lembrete de ~15 min
+@db_timed
+def db_bulk_clear_message_ids_after_delete(events: list[tuple[int, str]]) -> bool:
+    """Versão em lote de db_clear_message_id_and_update_status_after_delete. Recebe pares (event_id, status_original)."""
+    if not events: return True
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(
+            "UPDATE events SET message_id = NULL, status = ?, delete_message_after_utc = NULL WHERE event_id = ?",
+            [(f"msg_{original_status}_deletada", event_id) for event_id, original_status in events]
+        )
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Erro DB ao limpar message_id em lote ({len(events)} eventos): {e}")
+        return False
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_get_upcoming_events_for_reminder(lookahead: datetime.timedelta = datetime.timedelta(minutes=16)) -> list[sqlite3.Row]: # Lembrete de ~15 min
+    """Eventos ativos, ainda sem lembrete, que começam entre agora e agora + `lookahead`."""
     conn = sqlite3.connect(DB_NAME)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     now_utc = datetime.datetime.now(pytz.utc)
-    start_window = (now_utc + datetime.timedelta(minutes=14)).isoformat()
-    end_window = (now_utc + datetime.timedelta(minutes=16)).isoformat()
+    start_window = now_utc.isoformat()
+    end_window = (now_utc + lookahead).isoformat()
+    shard_clause, shard_params = _shard_sql()
     try:
-        cursor.execute("SELECT * FROM events WHERE status = 'ativo' AND (is_recurring_template = 0 OR is_recurring_template IS NULL) AND reminder_sent = 0 AND event_time_utc > ? AND event_time_utc <= ?", (start_window, end_window ))
+        cursor.execute("SELECT * FROM events WHERE status = 'ativo' AND (is_recurring_template = 0 OR is_recurring_template IS NULL) AND reminder_sent = 0 AND event_time_utc > ? AND event_time_utc <= ?" + shard_clause, (start_window, end_window, *shard_params))
         return cursor.fetchall()
     except sqlite3.Error as e: print(f"Erro DB ao buscar eventos para lembrete: {e}"); return []
     finally:
         if conn: conn.close()
 
+@db_timed
 def db_mark_reminder_sent(event_id: int, reminder_type: str = "standard"):
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -410,20 +1189,24 @@ def db_mark_reminder_sent(event_id: int, reminder_type: str = "standard"):
     finally:
         if conn: conn.close()
 
-def db_get_events_for_confirmation_reminder() -> list[sqlite3.Row]: # Lembrete de ~1 hora
+@db_timed
+def db_get_events_for_confirmation_reminder(lookahead: datetime.timedelta = datetime.timedelta(minutes=61)) -> list[sqlite3.Row]: # Lembrete de ~1 hora
+    """Eventos ativos, ainda sem lembrete de confirmação, que começam entre agora e agora + `lookahead`."""
     conn = sqlite3.connect(DB_NAME)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     now_utc = datetime.datetime.now(pytz.utc)
-    start_window = (now_utc + datetime.timedelta(minutes=59)).isoformat()
-    end_window = (now_utc + datetime.timedelta(minutes=61)).isoformat()
+    start_window = now_utc.isoformat()
+    end_window = (now_utc + lookahead).isoformat()
+    shard_clause, shard_params = _shard_sql()
     try:
-        cursor.execute("SELECT * FROM events WHERE status = 'ativo' AND (is_recurring_template = 0 OR is_recurring_template IS NULL) AND confirmation_reminder_sent = 0 AND event_time_utc > ? AND event_time_utc <= ?", (start_window, end_window ))
+        cursor.execute("SELECT * FROM events WHERE status = 'ativo' AND (is_recurring_template = 0 OR is_recurring_template IS NULL) AND confirmation_reminder_sent = 0 AND event_time_utc > ? AND event_time_utc <= ?" + shard_clause, (start_window, end_window, *shard_params))
         return cursor.fetchall()
     except sqlite3.Error as e: print(f"Erro DB ao buscar eventos para lembrete de confirmação: {e}"); return []
     finally:
         if conn: conn.close()
 
+@db_timed
 def db_create_event(**kwargs) -> int | None:
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -445,6 +1228,7 @@ def db_create_event(**kwargs) -> int | None:
         if conn: conn.close()
     return event_id
 
+@db_timed
 def db_update_event_message_id(event_id: int, message_id: int):
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -455,6 +1239,7 @@ def db_update_event_message_id(event_id: int, message_id: int):
     finally:
         if conn: conn.close()
 
+@db_timed
 def db_get_event_temp_role_id(event_id: int) -> int | None:
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -466,6 +1251,59 @@ def db_get_event_temp_role_id(event_id: int) -> int | None:
     finally:
         if conn: conn.close()
 
+# --- Funções do Pool de Cargos Temporários (event_role_pool) ---
+@db_timed
+def db_checkout_pooled_role(guild_id: int) -> int | None:
+    """Retira do pool o cargo livre há mais tempo no servidor (atomicamente: dois eventos nunca recebem o mesmo). None se vazio."""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            DELETE FROM event_role_pool WHERE role_id = (
+                SELECT role_id FROM event_role_pool WHERE guild_id = ? ORDER BY returned_at_utc ASC LIMIT 1
+            ) RETURNING role_id
+        ''', (guild_id,))
+        row = cursor.fetchone()
+        conn.commit()
+        return row[0] if row else None
+    except sqlite3.Error as e: print(f"Erro DB ao retirar cargo do pool da guild {guild_id}: {e}"); return None
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_count_pooled_roles(guild_id: int) -> int:
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM event_role_pool WHERE guild_id = ?", (guild_id,))
+        return cursor.fetchone()[0]
+    except sqlite3.Error as e: print(f"Erro DB ao contar cargos do pool da guild {guild_id}: {e}"); return 0
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_return_role_to_pool(guild_id: int, role_id: int, max_pool_size: int) -> bool:
+    """
+    Devolve o cargo ao pool se o servidor ainda tem menos de `max_pool_size` cargos livres (checado
+    no próprio INSERT). Eventos encerrados que ainda apontam para o cargo deixam de apontar, já que
+    ele será reaproveitado. Retorna False se o pool está cheio (o cargo deve ser deletado).
+    """
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            INSERT OR IGNORE INTO event_role_pool (role_id, guild_id, returned_at_utc)
+            SELECT ?, ?, ? WHERE (SELECT COUNT(*) FROM event_role_pool WHERE guild_id = ?) < ?
+        ''', (role_id, guild_id, datetime.datetime.now(pytz.utc).isoformat(), guild_id, max_pool_size))
+        pooled = cursor.rowcount > 0
+        if pooled: cursor.execute("UPDATE events SET temp_role_id = NULL WHERE temp_role_id = ? AND status != 'ativo'", (role_id,))
+        conn.commit()
+        return pooled
+    except sqlite3.Error as e: print(f"Erro DB ao devolver o cargo {role_id} ao pool: {e}"); return False
+    finally:
+        if conn: conn.close()
+
+@db_timed
 def db_set_default_restricted_roles(guild_id: int, role_ids: list[int]):
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -477,6 +1315,7 @@ def db_set_default_restricted_roles(guild_id: int, role_ids: list[int]):
     finally:
         if conn: conn.close()
 
+@db_timed
 def db_get_default_restricted_roles(guild_id: int) -> list[int]:
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -489,6 +1328,7 @@ def db_get_default_restricted_roles(guild_id: int) -> list[int]:
         if conn: conn.close()
     return []
 
+@db_timed
 def db_set_digest_channel(guild_id: int, channel_id: int | None):
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -499,6 +1339,7 @@ def db_set_digest_channel(guild_id: int, channel_id: int | None):
     finally:
         if conn: conn.close()
 
+@db_timed
 def db_get_digest_channel(guild_id: int) -> int | None:
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -510,13 +1351,407 @@ def db_get_digest_channel(guild_id: int) -> int | None:
     finally:
         if conn: conn.close()
 
+@db_timed
+def db_set_digest_schedule(guild_id: int, digest_times: str | None, digest_timezone: str | None):
+    """digest_times: CSV de horários 'HH:MM'. None volta ao padrão."""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("INSERT INTO server_configs (guild_id, digest_times, digest_timezone) VALUES (?, ?, ?) ON CONFLICT(guild_id) DO UPDATE SET digest_times = excluded.digest_times, digest_timezone = excluded.digest_timezone", (guild_id, digest_times, digest_timezone))
+        conn.commit()
+    except sqlite3.Error as e: print(f"Erro DB ao definir horários do digest: {e}")
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_get_digest_schedules(guild_id: int | None = None) -> list[sqlite3.Row]:
+    """Agendas de digest dos servidores com canal de digest definido (ou só de guild_id)."""
+    conn = sqlite3.connect(DB_NAME)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        query = "SELECT guild_id, digest_channel_id, digest_times, digest_timezone, digest_last_sent_utc FROM server_configs WHERE digest_channel_id IS NOT NULL"
+        if guild_id is not None:
+            cursor.execute(query + " AND guild_id = ?", (guild_id,))
+        else:
+            shard_clause, shard_params = _shard_sql()
+            cursor.execute(query + shard_clause, shard_params)
+        return cursor.fetchall()
+    except sqlite3.Error as e: print(f"Erro DB ao buscar agendas de digest: {e}"); return []
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_mark_digest_sent(guild_id: int, slot_utc: str):
+    """Registra o horário nominal (sem jitter) do último digest enviado, para não repetir após um reinício."""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("UPDATE server_configs SET digest_last_sent_utc = ? WHERE guild_id = ?", (slot_utc, guild_id))
+        conn.commit()
+    except sqlite3.Error as e: print(f"Erro DB ao registrar envio do digest: {e}")
+    finally:
+        if conn: conn.close()
+
+@db_timed
 def db_get_events_for_digest_list(guild_id: int, start_utc: datetime.datetime, end_utc: datetime.datetime) -> list[sqlite3.Row]:
     conn = sqlite3.connect(DB_NAME)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM events WHERE guild_id = ? AND status = 'ativo' AND event_time_utc BETWEEN ? AND ? ORDER BY event_time_utc ASC", (guild_id, start_utc.isoformat(), end_utc.isoformat()))
+        # vou_count/espera_count vêm de event_rsvp_counts: a lista não lê as linhas de rsvps.
+        cursor.execute('''
+            SELECT e.*, COALESCE(c.vou, 0) AS vou_count, COALESCE(c.lista_espera, 0) AS espera_count
+            FROM events e LEFT JOIN event_rsvp_counts c ON c.event_id = e.event_id
+            WHERE e.guild_id = ? AND e.status = 'ativo' AND e.event_time_utc BETWEEN ? AND ? ORDER BY e.event_time_utc ASC''',
+            (guild_id, start_utc.isoformat(), end_utc.isoformat()))
         return cursor.fetchall()
     except sqlite3.Error as e: print(f"Erro DB ao buscar eventos para digest: {e}"); return []
     finally:
         if conn: conn.close()
+
+
+# --- Funções da Fila de Trabalhos (scheduled_jobs) ---
+# Estados: 'pendente' -> 'em_execucao' (com lease) -> 'concluido' | 'falhou'.
+# Um job 'em_execucao' cujo lease expirou (processo caiu) volta a ser reivindicável.
+@db_timed
+def db_enqueue_jobs(jobs: list[dict]) -> int:
+    """
+    Insere vários jobs numa única transação. Jobs cuja idempotency_key já existe são ignorados.
+    Cada dict deve ter job_type, idempotency_key e due_at_utc; guild_id, event_id, payload e max_attempts são opcionais.
+    Retorna o número de jobs realmente inseridos.
+    """
+    if not jobs: return 0
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    created_at = datetime.datetime.now(pytz.utc).isoformat()
+    try:
+        changes_before = conn.total_changes
+        cursor.executemany('''
+            INSERT OR IGNORE INTO scheduled_jobs (job_type, idempotency_key, guild_id, event_id, payload_json, due_at_utc, max_attempts, created_at_utc)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(job['job_type'], job['idempotency_key'], job.get('guild_id'), job.get('event_id'),
+               json.dumps(job.get('payload') or {}), job['due_at_utc'], job.get('max_attempts', 5), created_at) for job in jobs])
+        conn.commit()
+        return conn.total_changes - changes_before
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Erro DB ao enfileirar {len(jobs)} job(s): {e}")
+        return 0
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_claim_due_jobs(owner: str, lease_seconds: int, limit: int) -> list[sqlite3.Row]:
+    """
+    Reivindica atomicamente até `limit` jobs vencidos (pendentes, ou em execução com lease expirado),
+    atribuindo-lhes um lease em nome de `owner`. Jobs com lease expirado que já esgotaram as
+    tentativas são marcados como 'falhou'.
+    """
+    conn = sqlite3.connect(DB_NAME, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    now_utc = datetime.datetime.now(pytz.utc)
+    now_str = now_utc.isoformat()
+    lease_expires = (now_utc + datetime.timedelta(seconds=lease_seconds)).isoformat()
+    claimed: list[sqlite3.Row] = []
+    shard_clause, shard_params = _shard_sql()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute('''
+            UPDATE scheduled_jobs SET status = 'falhou', lease_owner = NULL, lease_expires_at_utc = NULL,
+                last_error = COALESCE(last_error, 'lease expirado após a última tentativa')
+            WHERE status = 'em_execucao' AND lease_expires_at_utc < ? AND attempts >= max_attempts''' + shard_clause,
+            (now_str, *shard_params))
+        cursor.execute('''
+            SELECT job_id FROM scheduled_jobs
+            WHERE ((status = 'pendente' AND due_at_utc <= ?) OR (status = 'em_execucao' AND lease_expires_at_utc < ?))''' + shard_clause + '''
+            ORDER BY due_at_utc ASC LIMIT ?
+        ''', (now_str, now_str, *shard_params, limit))
+        job_ids = [row['job_id'] for row in cursor.fetchall()]
+        if job_ids:
+            cursor.executemany(
+                "UPDATE scheduled_jobs SET status = 'em_execucao', lease_owner = ?, lease_expires_at_utc = ?, attempts = attempts + 1 WHERE job_id = ?",
+                [(owner, lease_expires, job_id) for job_id in job_ids]
+            )
+            cursor.execute(f"SELECT * FROM scheduled_jobs WHERE job_id IN ({','.join('?' * len(job_ids))}) ORDER BY due_at_utc ASC", job_ids)
+            claimed = cursor.fetchall()
+        cursor.execute("COMMIT")
+    except sqlite3.Error as e:
+        if conn.in_transaction: conn.rollback()
+        print(f"Erro DB ao reivindicar jobs: {e}")
+        claimed = []
+    finally:
+        if conn: conn.close()
+    return claimed
+
+@db_timed
+def db_complete_jobs(job_ids: list[int], owner: str):
+    """Marca como concluídos, numa única transação, os jobs cujo lease ainda pertence a `owner`."""
+    if not job_ids: return
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    completed_at = datetime.datetime.now(pytz.utc).isoformat()
+    try:
+        cursor.executemany(
+            "UPDATE scheduled_jobs SET status = 'concluido', completed_at_utc = ?, lease_owner = NULL, lease_expires_at_utc = NULL WHERE job_id = ? AND lease_owner = ?",
+            [(completed_at, job_id, owner) for job_id in job_ids]
+        )
+        conn.commit()
+    except sqlite3.Error as e: print(f"Erro DB ao concluir {len(job_ids)} job(s): {e}")
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_fail_job(job_id: int, owner: str, error: str, retry_at_utc: str | None):
+    """Registra a falha de um job: volta a 'pendente' em `retry_at_utc`, ou vai para 'falhou' se retry_at_utc for None."""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        if retry_at_utc:
+            cursor.execute("UPDATE scheduled_jobs SET status = 'pendente', due_at_utc = ?, last_error = ?, lease_owner = NULL, lease_expires_at_utc = NULL WHERE job_id = ? AND lease_owner = ?", (retry_at_utc, error[:1000], job_id, owner))
+        else:
+            cursor.execute("UPDATE scheduled_jobs SET status = 'falhou', last_error = ?, lease_owner = NULL, lease_expires_at_utc = NULL WHERE job_id = ? AND lease_owner = ?", (error[:1000], job_id, owner))
+        conn.commit()
+    except sqlite3.Error as e: print(f"Erro DB ao registrar falha do job {job_id}: {e}")
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_count_overdue_jobs() -> int:
+    """Conta os jobs vencidos e ainda não concluídos (incluindo os com lease expirado)."""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    now_str = datetime.datetime.now(pytz.utc).isoformat()
+    shard_clause, shard_params = _shard_sql()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM scheduled_jobs WHERE ((status = 'pendente' AND due_at_utc <= ?) OR (status = 'em_execucao' AND lease_expires_at_utc < ?))" + shard_clause, (now_str, now_str, *shard_params))
+        return cursor.fetchone()[0]
+    except sqlite3.Error as e: print(f"Erro DB ao contar jobs vencidos: {e}"); return 0
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_purge_finished_jobs(older_than_utc: datetime.datetime) -> int:
+    """Remove jobs concluídos antes de `older_than_utc`. Jobs que falharam são mantidos para inspeção."""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM scheduled_jobs WHERE status = 'concluido' AND completed_at_utc < ?", (older_than_utc.isoformat(),))
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e: print(f"Erro DB ao limpar jobs concluídos: {e}"); return 0
+    finally:
+        if conn: conn.close()
+
+
+# --- Funções de Eventos Recorrentes ---
+@db_timed
+def db_get_recurring_templates() -> list[sqlite3.Row]:
+    conn = sqlite3.connect(DB_NAME)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    shard_clause, shard_params = _shard_sql()
+    try:
+        cursor.execute("SELECT * FROM events WHERE is_recurring_template = 1 AND status = 'ativo' AND recurrence_type IS NOT NULL" + shard_clause, shard_params)
+        return cursor.fetchall()
+    except sqlite3.Error as e: print(f"Erro DB ao buscar templates recorrentes: {e}"); return []
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_create_recurring_instances(instances: list[dict], template_progress: list[tuple[int, str, int]]) -> list[int]:
+    """
+    Insere as instâncias geradas e avança o high-water mark dos templates numa única transação.
+    `template_progress` contém (template_id, recurrence_last_generated_utc, ocorrências consumidas).
+    Instâncias já existentes (mesmo template e horário) são ignoradas. Retorna os IDs criados.
+    """
+    if not instances and not template_progress: return []
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    columns = [
+        "guild_id", "channel_id", "creator_id", "title", "description", "event_time_utc",
+        "activity_type", "max_attendees", "created_at_utc", "role_mentions", "restricted_role_ids",
+        "parent_template_id"
+    ]
+    insert_sql = f"INSERT OR IGNORE INTO events ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})"
+    created_ids: list[int] = []
+    try:
+        for instance in instances:
+            cursor.execute(insert_sql, tuple(instance.get(col) for col in columns))
+            if cursor.rowcount: created_ids.append(cursor.lastrowid)
+        cursor.executemany(
+            "UPDATE events SET recurrence_last_generated_utc = ?, recurrence_count_generated = COALESCE(recurrence_count_generated, 0) + ? WHERE event_id = ?",
+            [(hwm_utc, consumed, template_id) for template_id, hwm_utc, consumed in template_progress]
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Erro DB ao criar {len(instances)} instância(s) recorrente(s): {e}")
+        created_ids = []
+    finally:
+        if conn: conn.close()
+    return created_ids
+
+@db_timed
+def db_get_unposted_recurring_instances() -> list[sqlite3.Row]:
+    """Instâncias futuras de templates que ainda não têm mensagem postada (recém-criadas ou cuja postagem falhou)."""
+    conn = sqlite3.connect(DB_NAME)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    now_utc = datetime.datetime.now(pytz.utc).isoformat()
+    shard_clause, shard_params = _shard_sql()
+    try:
+        cursor.execute("SELECT * FROM events WHERE parent_template_id IS NOT NULL AND status = 'ativo' AND message_id IS NULL AND event_time_utc > ?" + shard_clause + " ORDER BY event_time_utc ASC", (now_utc, *shard_params))
+        return cursor.fetchall()
+    except sqlite3.Error as e: print(f"Erro DB ao buscar instâncias recorrentes não postadas: {e}"); return []
+    finally:
+        if conn: conn.close()
+
+
+# --- Funções do Catálogo de Atividades por Servidor ---
+@db_timed
+def db_upsert_guild_activity(guild_id: int, name: str, name_key: str, activity_type: str, default_spots: int | None, aliases: list[str]) -> bool:
+    """
+    Cria ou substitui uma atividade do catálogo do servidor. name_key é o nome normalizado
+    (activity_matcher.normalize_activity_text), de modo que 'Poço' e 'poco' são a mesma atividade.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO guild_activities (guild_id, name, name_key, activity_type, default_spots, aliases) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(guild_id, name_key) DO UPDATE SET name = excluded.name, activity_type = excluded.activity_type, "
+            "default_spots = excluded.default_spots, aliases = excluded.aliases",
+            (guild_id, name, name_key, activity_type, default_spots, ",".join(aliases) if aliases else None)
+        )
+        conn.commit()
+        return True
+    except sqlite3.Error as e: print(f"Erro DB ao salvar atividade '{name}' do servidor {guild_id}: {e}"); return False
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_remove_guild_activity(guild_id: int, name_key: str) -> bool:
+    """Retorna True se a atividade existia e foi removida."""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM guild_activities WHERE guild_id = ? AND name_key = ?", (guild_id, name_key))
+        conn.commit()
+        return cursor.rowcount > 0
+    except sqlite3.Error as e: print(f"Erro DB ao remover atividade '{name_key}' do servidor {guild_id}: {e}"); return False
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_get_guild_activities(guild_id: int) -> list[sqlite3.Row]:
+    conn = sqlite3.connect(DB_NAME)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT activity_id, name, activity_type, default_spots, aliases FROM guild_activities WHERE guild_id = ? ORDER BY name", (guild_id,))
+        return cursor.fetchall()
+    except sqlite3.Error as e: print(f"Erro DB ao buscar atividades do servidor {guild_id}: {e}"); return []
+    finally:
+        if conn: conn.close()
+
+
+# --- Funções de Metadados do Bot (bot_meta) ---
+@db_timed
+def db_get_bot_meta(meta_key: str) -> str | None:
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT meta_value FROM bot_meta WHERE meta_key = ?", (meta_key,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    except sqlite3.Error as e: print(f"Erro DB ao buscar metadado '{meta_key}': {e}"); return None
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_set_bot_meta(meta_key: str, meta_value: str | None):
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO bot_meta (meta_key, meta_value, updated_at_utc) VALUES (?, ?, ?) "
+            "ON CONFLICT(meta_key) DO UPDATE SET meta_value = excluded.meta_value, updated_at_utc = excluded.updated_at_utc",
+            (meta_key, meta_value, datetime.datetime.now(pytz.utc).isoformat())
+        )
+        conn.commit()
+    except sqlite3.Error as e: print(f"Erro DB ao salvar metadado '{meta_key}': {e}")
+    finally:
+        if conn: conn.close()
+
+
+# --- Funções de Eleição de Líder (cluster_leases) ---
+@db_timed
+def db_acquire_lease(lease_name: str, holder_id: str, ttl_seconds: float) -> int | None:
+    """
+    Adquire ou renova, atomicamente, o lease `lease_name` para `holder_id` por `ttl_seconds`.
+    Só tem sucesso se o lease está livre, expirado ou já é de `holder_id`. Retorna o fencing
+    token (cresce a cada troca de dono) ou None se outra instância tem o lease válido.
+    """
+    conn = sqlite3.connect(DB_NAME, isolation_level=None)
+    cursor = conn.cursor()
+    now_utc = datetime.datetime.now(pytz.utc)
+    now_str = now_utc.isoformat()
+    expires_str = (now_utc + datetime.timedelta(seconds=ttl_seconds)).isoformat()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT holder_id, fencing_token, expires_at_utc FROM cluster_leases WHERE lease_name = ?", (lease_name,))
+        row = cursor.fetchone()
+        if row is None:
+            token = 1
+            cursor.execute(
+                "INSERT INTO cluster_leases (lease_name, holder_id, fencing_token, acquired_at_utc, renewed_at_utc, expires_at_utc) VALUES (?, ?, ?, ?, ?, ?)",
+                (lease_name, holder_id, token, now_str, now_str, expires_str)
+            )
+        elif row[0] == holder_id and row[2] and row[2] > now_str:
+            token = row[1]
+            cursor.execute("UPDATE cluster_leases SET renewed_at_utc = ?, expires_at_utc = ? WHERE lease_name = ?", (now_str, expires_str, lease_name))
+        elif row[0] is None or not row[2] or row[2] <= now_str:
+            token = row[1] + 1
+            cursor.execute(
+                "UPDATE cluster_leases SET holder_id = ?, fencing_token = ?, acquired_at_utc = ?, renewed_at_utc = ?, expires_at_utc = ? WHERE lease_name = ?",
+                (holder_id, token, now_str, now_str, expires_str, lease_name)
+            )
+        else:
+            token = None
+        cursor.execute("COMMIT")
+        return token
+    except sqlite3.Error as e:
+        if conn.in_transaction: conn.rollback()
+        print(f"Erro DB ao adquirir lease '{lease_name}': {e}"); return None
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_release_lease(lease_name: str, holder_id: str) -> bool:
+    """Libera o lease se ainda pertence a `holder_id`, para que outra instância assuma sem esperar a expiração."""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "UPDATE cluster_leases SET holder_id = NULL, expires_at_utc = ? WHERE lease_name = ? AND holder_id = ?",
+            (datetime.datetime.now(pytz.utc).isoformat(), lease_name, holder_id)
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+    except sqlite3.Error as e: print(f"Erro DB ao liberar lease '{lease_name}': {e}"); return False
+    finally:
+        if conn: conn.close()
+
+@db_timed
+def db_get_lease(lease_name: str) -> sqlite3.Row | None:
+    conn = sqlite3.connect(DB_NAME)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT * FROM cluster_leases WHERE lease_name = ?", (lease_name,))
+        return cursor.fetchone()
+    except sqlite3.Error as e: print(f"Erro DB ao buscar lease '{lease_name}': {e}"); return None
+    finally:
+        if conn: conn.close()
@@ -0,0 +1,113 @@
+# date_parsing.py
+"""
+Interpretação da data e da hora digitadas no AgendarEventoModal.
+
+Os formatos documentados nos rótulos do modal (DD/MM, DD/MM/AAAA; 19:00, 21h30, 7pm,
+10:30am) são reconhecidos por expressões regulares em poucos microssegundos. Só o que
+fugir desses formatos (ex: "amanhã", "sábado") vai para o dateparser, importado sob
+demanda por ser lento de carregar. Os resultados ficam memorizados: a data é chaveada
+também pelo dia atual (o ano implícito de "25/12" depende de hoje), a hora não depende do dia.
+"""
+import datetime
+import re
+from functools import lru_cache
+from typing import Optional
+
+from constants import BRAZIL_TZ, BRAZIL_TZ_STR, DATE_PARSE_CACHE_SIZE
+from metrics import REGISTRY
+
+_DATE_PATTERN = re.compile(r"^\s*(\d{1,2})\s*[/.\-]\s*(\d{1,2})(?:\s*[/.\-]\s*(\d{4}|\d{2}))?\s*$")
+_TIME_PATTERN = re.compile(r"^\s*(\d{1,2})(?:\s*(?:[:.hH])\s*(\d{2})?)?\s*(?:([aApP])\.?\s*[mM]\.?)?\s*$")
+
+
+def parse_date_fast(date_str: str, today: datetime.date) -> Optional[datetime.date]:
+    """
+    DD/MM[/AAAA] (também com '-' ou '.'). Sem ano, usa a próxima ocorrência a partir de hoje,
+    como o PREFER_DATES_FROM='future' do dateparser. Ano com dois dígitos vira 20AA.
+    Retorna None se o texto não estiver nesse formato ou a data não existir.
+    """
+    match = _DATE_PATTERN.match(date_str)
+    if not match: return None
+    day, month = int(match.group(1)), int(match.group(2))
+    year_str = match.group(3)
+    try:
+        if year_str:
+            year = int(year_str) + (2000 if len(year_str) == 2 else 0)
+            return datetime.date(year, month, day)
+        candidate = datetime.date(today.year, month, day) if _is_valid_date(today.year, month, day) else None
+        if candidate and candidate >= today: return candidate
+        # Já passou este ano (ou 29/02 fora de ano bissexto): próxima ocorrência válida.
+        for year in range(today.year + 1, today.year + 9):
+            if _is_valid_date(year, month, day): return datetime.date(year, month, day)
+    except ValueError:
+        return None
+    return None
+
+
+def _is_valid_date(year: int, month: int, day: int) -> bool:
+    try: datetime.date(year, month, day); return True
+    except ValueError: return False
+
+
+def parse_time_fast(time_str: str) -> Optional[datetime.time]:
+    """19:00, 19h, 21h30, 19.30, 19, 7pm, 7 PM, 10:30am. Retorna None fora desses formatos."""
+    match = _TIME_PATTERN.match(time_str)
+    if not match: return None
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    meridiem = (match.group(3) or "").lower()
+    if meridiem:
+        if not 1 <= hour <= 12: return None
+        hour = hour % 12 + (12 if meridiem == 'p' else 0)
+    if hour > 23 or minute > 59: return None
+    return datetime.time(hour=hour, minute=minute)
+
+
+def _dateparser_parse(text: str, settings: dict):
+    import dateparser  # Import tardio: só entradas fora dos formatos documentados precisam dele.
+    return dateparser.parse(text, languages=['pt'], settings=settings)
+
+
+def warm_up():
+    """
+    Importa o dateparser e carrega os dados do idioma 'pt' (a primeira chamada leva centenas de ms).
+    Feito numa thread em segundo plano após a conexão, para que o primeiro /agendar com
+    entrada livre não pague esse custo.
+    """
+    _dateparser_parse("amanhã 21:00", {'PREFER_DATES_FROM': 'future', 'TIMEZONE': BRAZIL_TZ_STR})
+
+
+@lru_cache(maxsize=DATE_PARSE_CACHE_SIZE)
+def _parse_date_input_cached(date_str: str, today: datetime.date) -> Optional[datetime.date]:
+    fast = parse_date_fast(date_str, today)
+    if fast: return fast
+    parsed = _dateparser_parse(date_str, {'PREFER_DATES_FROM': 'future', 'TIMEZONE': BRAZIL_TZ_STR})
+    return parsed.date() if parsed else None
+
+
+def parse_date_input(date_str: str, today: Optional[datetime.date] = None) -> Optional[datetime.date]:
+    """Data do campo 'Data do Evento'. `today` (padrão: hoje em Brasília) faz parte da chave do cache."""
+    if today is None: today = datetime.datetime.now(BRAZIL_TZ).date()
+    return _parse_date_input_cached(date_str.strip(), today)
+
+
+@lru_cache(maxsize=DATE_PARSE_CACHE_SIZE)
+def parse_datetime_input(event_date: datetime.date, time_str: str) -> Optional[datetime.datetime]:
+    """Data já interpretada + campo 'Hora do Evento' -> datetime com fuso de Brasília."""
+    fast = parse_time_fast(time_str)
+    if fast: return BRAZIL_TZ.localize(datetime.datetime.combine(event_date, fast))
+    parsed = _dateparser_parse(f"{event_date.strftime('%d/%m/%Y')} {time_str.strip()}",
+                               {'TIMEZONE': BRAZIL_TZ_STR, 'RETURN_AS_TIMEZONE_AWARE': True, 'PREFER_DATES_FROM': 'future'})
+    return parsed.astimezone(BRAZIL_TZ) if parsed else None
+
+
+def cache_info() -> dict:
+    """Estatísticas dos caches (acertos/faltas), úteis em diagnóstico e no benchmark."""
+    return {"data": _parse_date_input_cached.cache_info()._asdict(), "data_hora": parse_datetime_input.cache_info()._asdict()}
+
+
+def _cache_requests_metric() -> dict:
+    return {(cache, result): info[key] for cache, info in cache_info().items() for result, key in (("acerto", "hits"), ("falta", "misses"))}
+
+
+REGISTRY.register_callback("bot_date_parse_cache_requests_total", "Consultas aos caches de data/hora do /agendar, por resultado.",
+                           _cache_requests_metric, ("cache", "resultado"), metric_type="counter")
@@ -0,0 +1,165 @@
+# digest_scheduler.py
+"""
+Agendador dos resumos diários por servidor.
+
+Cada servidor tem seus próprios horários (server_configs.digest_times, CSV 'HH:MM') e fuso
+(server_configs.digest_timezone); sem configuração, valem DIGEST_TIMES_BRT no fuso de Brasília.
+O agendador mantém um heap com o próximo envio de cada servidor, então verificar o que
+venceu custa O(1) e reagendar um servidor O(log n), independente de quantos horários
+distintos existam. O envio real é deslocado por um jitter determinístico por servidor
+(até DIGEST_JITTER_SECONDS), o que espalha os envios em vez de concentrá-los no mesmo segundo.
+"""
+import datetime
+import heapq
+import logging
+import re
+import sqlite3
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import pytz
+
+from constants import BRAZIL_TZ, BRAZIL_TZ_STR, DIGEST_TIMES_BRT, DIGEST_JITTER_SECONDS, DIGEST_CATCHUP_WINDOW
+
+log = logging.getLogger("bot.tarefas")
+
+_TIME_PATTERN = re.compile(r"^\s*([01]?\d|2[0-3])[:hH]([0-5]\d)\s*$")
+
+
+def parse_digest_times(times_str: Optional[str]) -> List[datetime.time]:
+    """
+    Converte 'HH:MM, HH:MM' em uma lista ordenada e sem repetições de horários.
+    Levanta ValueError se algum item for inválido.
+    """
+    parsed = set()
+    for item in (times_str or "").replace(';', ',').split(','):
+        if not item.strip(): continue
+        match = _TIME_PATTERN.match(item)
+        if not match: raise ValueError(f"Horário inválido: '{item.strip()}'. Use o formato HH:MM.")
+        parsed.add(datetime.time(hour=int(match.group(1)), minute=int(match.group(2))))
+    return sorted(parsed)
+
+
+def format_digest_times(times: List[datetime.time]) -> str:
+    return ",".join(t.strftime('%H:%M') for t in times)
+
+
+def resolve_timezone(tz_name: Optional[str]) -> pytz.BaseTzInfo:
+    """Fuso configurado do servidor; um nome desconhecido cai no fuso de Brasília."""
+    if not tz_name: return BRAZIL_TZ
+    try: return pytz.timezone(tz_name)
+    except pytz.UnknownTimeZoneError:
+        log.warning("Fuso de digest desconhecido '%s', usando %s.", tz_name, BRAZIL_TZ_STR)
+        return BRAZIL_TZ
+
+
+def guild_jitter(guild_id: int) -> datetime.timedelta:
+    """Deslocamento estável (entre reinícios e processos) do envio do servidor dentro da janela de jitter."""
+    if DIGEST_JITTER_SECONDS <= 0: return datetime.timedelta(0)
+    return datetime.timedelta(seconds=zlib.crc32(str(guild_id).encode()) % DIGEST_JITTER_SECONDS)
+
+
+class GuildDigestSchedule:
+    __slots__ = ('guild_id', 'times', 'timezone', 'last_sent_slot_utc')
+
+    def __init__(self, guild_id: int, times: List[datetime.time], timezone: pytz.BaseTzInfo,
+                 last_sent_slot_utc: Optional[datetime.datetime] = None):
+        self.guild_id = guild_id
+        self.times = times
+        self.timezone = timezone
+        self.last_sent_slot_utc = last_sent_slot_utc
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "GuildDigestSchedule":
+        try: times = parse_digest_times(row['digest_times']) if row['digest_times'] else []
+        except ValueError as e:
+            log.warning("Horários de digest inválidos no servidor %s (%s). Usando o padrão.", row['guild_id'], e)
+            times = []
+        if not times: times = [t.replace(tzinfo=None) for t in DIGEST_TIMES_BRT]
+        timezone = resolve_timezone(row['digest_timezone'])
+        last_sent = None
+        if row['digest_last_sent_utc']:
+            last_sent = datetime.datetime.fromisoformat(row['digest_last_sent_utc']).astimezone(pytz.utc)
+        return cls(row['guild_id'], times, timezone, last_sent)
+
+    def next_slot_after(self, after_utc: datetime.datetime) -> datetime.datetime:
+        """Primeiro horário nominal (em UTC, sem jitter) estritamente depois de after_utc."""
+        local_date = after_utc.astimezone(self.timezone).date()
+        for day_offset in range(0, 3):
+            day = local_date + datetime.timedelta(days=day_offset)
+            for slot_time in self.times:
+                slot_utc = self.timezone.localize(datetime.datetime.combine(day, slot_time)).astimezone(pytz.utc)
+                if slot_utc > after_utc: return slot_utc
+        raise RuntimeError("Agenda de digest sem horários.")
+
+    def first_slot(self, now_utc: datetime.datetime) -> datetime.datetime:
+        """
+        Próximo horário a enviar. Um horário que passou enquanto o bot estava parado ainda é
+        enviado se estiver dentro de DIGEST_CATCHUP_WINDOW e não constar como já enviado.
+        """
+        after_utc = now_utc - DIGEST_CATCHUP_WINDOW - guild_jitter(self.guild_id)
+        if self.last_sent_slot_utc and self.last_sent_slot_utc > after_utc:
+            after_utc = self.last_sent_slot_utc
+        return self.next_slot_after(after_utc)
+
+
+class DigestScheduler:
+    """
+    Heap de (envio_utc, guild_id, versão, horário_nominal_utc). Reagendar um servidor só
+    incrementa sua versão e empurra uma nova entrada; entradas de versões antigas são
+    descartadas quando chegam ao topo.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime.datetime, int, int, datetime.datetime]] = []
+        self._schedules: Dict[int, GuildDigestSchedule] = {}
+        self._versions: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._schedules)
+
+    def _push(self, schedule: GuildDigestSchedule, slot_utc: datetime.datetime):
+        version = self._versions.get(schedule.guild_id, 0)
+        heapq.heappush(self._heap, (slot_utc + guild_jitter(schedule.guild_id), schedule.guild_id, version, slot_utc))
+
+    def load(self, rows: List[sqlite3.Row], now_utc: datetime.datetime):
+        """(Re)constrói o heap inteiro a partir das linhas de db_get_digest_schedules."""
+        self._heap.clear(); self._schedules.clear(); self._versions.clear()
+        for row in rows:
+            schedule = GuildDigestSchedule.from_row(row)
+            self._schedules[schedule.guild_id] = schedule
+            self._versions[schedule.guild_id] = 0
+            slot_utc = schedule.first_slot(now_utc)
+            self._heap.append((slot_utc + guild_jitter(schedule.guild_id), schedule.guild_id, 0, slot_utc))
+        heapq.heapify(self._heap)
+
+    def update_guild(self, row: Optional[sqlite3.Row], guild_id: int, now_utc: datetime.datetime):
+        """Aplica a configuração atual de um servidor (row None = servidor sem digest)."""
+        self._versions[guild_id] = self._versions.get(guild_id, 0) + 1
+        if row is None:
+            self._schedules.pop(guild_id, None)
+            return
+        schedule = GuildDigestSchedule.from_row(row)
+        self._schedules[guild_id] = schedule
+        self._push(schedule, schedule.first_slot(now_utc))
+
+    def next_due_utc(self) -> Optional[datetime.datetime]:
+        while self._heap and self._heap[0][2] != self._versions.get(self._heap[0][1]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now_utc: datetime.datetime) -> List[Tuple[int, datetime.datetime]]:
+        """
+        Remove e retorna (guild_id, horário_nominal_utc) de todos os envios vencidos,
+        já reagendando cada servidor para o horário seguinte.
+        """
+        due = []
+        while self._heap and self._heap[0][0] <= now_utc:
+            _, guild_id, version, slot_utc = heapq.heappop(self._heap)
+            schedule = self._schedules.get(guild_id)
+            if schedule is None or version != self._versions.get(guild_id): continue
+            due.append((guild_id, slot_utc))
+            schedule.last_sent_slot_utc = slot_utc
+            self._push(schedule, schedule.next_slot_after(slot_utc))
+        return due
+
@@ -0,0 +1,145 @@
+# job_queue.py
+import asyncio
+import datetime
+import json
+import logging
+import os
+import random
+import socket
+import sqlite3
+import traceback
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import pytz
+
+import database as db
+from metrics import JOBS_PROCESSED
+from constants import (
+    JOB_LEASE_SECONDS, JOB_BATCH_SIZE, JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BASE_SECONDS, JOB_RETRY_MAX_SECONDS, TASKS_DISCORD_CONCURRENCY
+)
+
+log = logging.getLogger("bot.jobs")
+
+# Handler de um único job: recebe a linha do job e o payload já decodificado.
+JobHandler = Callable[[sqlite3.Row, dict], Awaitable[None]]
+# Handler em lote: recebe todos os jobs reivindicados do mesmo tipo e retorna {job_id: exceção} para os que falharam.
+BatchJobHandler = Callable[[List[sqlite3.Row]], Awaitable[Dict[int, Exception]]]
+
+
+class JobDiscarded(Exception):
+    """Levantada por um handler quando o job falhou de forma definitiva e não deve ser repetido."""
+
+
+def make_job(job_type: str, idempotency_key: str, due_at_utc: datetime.datetime, guild_id: Optional[int] = None,
+             event_id: Optional[int] = None, payload: Optional[dict] = None, max_attempts: int = JOB_MAX_ATTEMPTS) -> dict:
+    """Monta o dict aceito por db.db_enqueue_jobs."""
+    return {
+        "job_type": job_type, "idempotency_key": idempotency_key,
+        "due_at_utc": due_at_utc.astimezone(pytz.utc).isoformat(),
+        "guild_id": guild_id, "event_id": event_id, "payload": payload, "max_attempts": max_attempts,
+    }
+
+
+def job_payload(job: sqlite3.Row) -> dict:
+    try: return json.loads(job['payload_json']) if job['payload_json'] else {}
+    except (TypeError, ValueError): return {}
+
+
+class JobQueue:
+    """
+    Fila de trabalhos persistida na tabela scheduled_jobs.
+
+    Cada execução de `run_once` reivindica os jobs vencidos com um lease, despacha-os
+    para os handlers registrados e registra o resultado. Um job cujo processo caiu no
+    meio da execução volta a ser reivindicável quando o lease expira; a idempotency_key
+    garante que o mesmo trabalho não é enfileirado duas vezes.
+    """
+
+    def __init__(self, owner_id: Optional[str] = None, lease_seconds: int = JOB_LEASE_SECONDS,
+                 batch_size: int = JOB_BATCH_SIZE, concurrency: int = TASKS_DISCORD_CONCURRENCY):
+        self.owner_id = owner_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._handlers: Dict[str, JobHandler] = {}
+        self._batch_handlers: Dict[str, BatchJobHandler] = {}
+
+    def register(self, job_type: str, handler: JobHandler):
+        self._handlers[job_type] = handler
+
+    def register_batch(self, job_type: str, handler: BatchJobHandler):
+        self._batch_handlers[job_type] = handler
+
+    def enqueue(self, jobs: List[dict]) -> int:
+        return db.db_enqueue_jobs(jobs)
+
+    def _retry_delay(self, attempts: int) -> float:
+        delay = min(JOB_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), JOB_RETRY_MAX_SECONDS)
+        return delay * random.uniform(0.8, 1.2)
+
+    async def _run_single(self, semaphore: asyncio.Semaphore, handler: JobHandler, job: sqlite3.Row) -> Optional[Exception]:
+        async with semaphore:
+            try:
+                await handler(job, job_payload(job))
+                return None
+            except Exception as e:
+                return e
+
+    async def _dispatch(self, job_type: str, jobs: List[sqlite3.Row]) -> Dict[int, Exception]:
+        if job_type in self._batch_handlers:
+            try:
+                return await self._batch_handlers[job_type](jobs)
+            except Exception as e:
+                traceback.print_exc()
+                return {job['job_id']: e for job in jobs}
+        handler = self._handlers.get(job_type)
+        if not handler:
+            return {job['job_id']: JobDiscarded(f"Nenhum handler registrado para '{job_type}'") for job in jobs}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._run_single(semaphore, handler, job) for job in jobs))
+        return {job['job_id']: error for job, error in zip(jobs, results) if error is not None}
+
+    async def run_once(self, limit: Optional[int] = None) -> int:
+        """Reivindica e executa um lote de jobs vencidos. Retorna quantos jobs foram reivindicados."""
+        claimed = db.db_claim_due_jobs(self.owner_id, self.lease_seconds, limit or self.batch_size)
+        if not claimed: return 0
+
+        jobs_by_type: Dict[str, List[sqlite3.Row]] = {}
+        for job in claimed:
+            jobs_by_type.setdefault(job['job_type'], []).append(job)
+
+        failures: Dict[int, Exception] = {}
+        for result in await asyncio.gather(*(self._dispatch(job_type, jobs) for job_type, jobs in jobs_by_type.items())):
+            failures.update(result)
+
+        db.db_complete_jobs([job['job_id'] for job in claimed if job['job_id'] not in failures], self.owner_id)
+        for job in claimed:
+            error = failures.get(job['job_id'])
+            if error is None:
+                JOBS_PROCESSED.inc(tipo=job['job_type'], resultado="concluido"); continue
+            retry_at = None
+            if not isinstance(error, JobDiscarded) and job['attempts'] < job['max_attempts']:
+                retry_at = (datetime.datetime.now(pytz.utc) + datetime.timedelta(seconds=self._retry_delay(job['attempts']))).isoformat()
+            JOBS_PROCESSED.inc(tipo=job['job_type'], resultado="nova_tentativa" if retry_at else "falhou")
+            log.warning("Job %s (%s, tentativa %s/%s) falhou: %s: %s. %s", job['job_id'], job['job_type'], job['attempts'], job['max_attempts'],
+                        type(error).__name__, error, f"Nova tentativa em {retry_at}." if retry_at else "Sem novas tentativas.")
+            db.db_fail_job(job['job_id'], self.owner_id, f"{type(error).__name__}: {error}", retry_at)
+        return len(claimed)
+
+    async def recover(self) -> int:
+        """
+        Passada de recuperação na inicialização: processa em lotes todos os jobs que venceram
+        enquanto o bot estava parado (ou cujo lease expirou). Retorna o total processado.
+        """
+        overdue = db.db_count_overdue_jobs()
+        if not overdue: return 0
+        log.info("Recuperação: %s job(s) vencido(s) encontrados. Processando em lotes de %s...", overdue, self.batch_size)
+        total = 0
+        while True:
+            processed = await self.run_once()
+            total += processed
+            if processed < self.batch_size: break
+        log.info("Recuperação concluída: %s job(s) processados.", total)
+        return total
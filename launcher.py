@@ -0,0 +1,135 @@
+# launcher.py
+"""
+Roda o bot em vários processos, cada um atendendo um grupo de shards, sobre o mesmo banco.
+
+Uso (na raiz do projeto):
+    python launcher.py --processos 2 [--shards 4]
+
+Sem --shards, usa o número de shards recomendado pelo Discord (GET /gateway/bot).
+Cada processo filho é o main.py com SHARD_COUNT e SHARD_IDS no ambiente: ele conecta só os
+seus shards e as tarefas em segundo plano (lembretes, resumos, limpezas) filtram, no SQL,
+apenas os servidores desses shards. Os processos iniciam escalonados para respeitar o limite
+de IDENTIFY do gateway, e um processo que termina com erro é reiniciado com espera crescente.
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+RESTART_BACKOFF_MAX_SECONDS = 300
+# Processo que ficou de pé por esse tempo volta a reiniciar sem espera acumulada.
+RESTART_BACKOFF_RESET_SECONDS = 600
+
+
+def recommended_shard_count(token: str) -> int:
+    request = urllib.request.Request("https://discord.com/api/v10/gateway/bot",
+                                     headers={"Authorization": f"Bot {token}", "User-Agent": "DiscordBot (launcher, 1.0)"})
+    with urllib.request.urlopen(request, timeout=15) as response:
+        return int(json.load(response)["shards"])
+
+
+def split_shards(shard_count: int, processes: int) -> List[List[int]]:
+    """Divide os shards em grupos contíguos de tamanho o mais igual possível: 5 em 2 -> [0,1,2], [3,4]."""
+    processes = max(1, min(processes, shard_count))
+    base, extra = divmod(shard_count, processes)
+    groups, start = [], 0
+    for index in range(processes):
+        size = base + (1 if index < extra else 0)
+        groups.append(list(range(start, start + size)))
+        start += size
+    return groups
+
+
+class ShardProcess:
+    def __init__(self, index: int, shard_count: int, shard_ids: List[int]):
+        self.index = index
+        self.shard_count = shard_count
+        self.shard_ids = shard_ids
+        self.proc: Optional[subprocess.Popen] = None
+        self.started_at = 0.0
+        self.restart_at = 0.0
+        self.failures = 0
+
+    @property
+    def label(self) -> str:
+        return f"grupo {self.index} (shards {self.shard_ids[0]}-{self.shard_ids[-1]} de {self.shard_count})"
+
+    def start(self):
+        env = dict(os.environ, SHARD_COUNT=str(self.shard_count), SHARD_IDS=",".join(map(str, self.shard_ids)))
+        base_port = int(os.environ.get("METRICS_PORT") or 9108)
+        if base_port: env["METRICS_PORT"] = str(base_port + self.index) # Um endpoint de métricas por processo
+        self.proc = subprocess.Popen([sys.executable, os.path.join(PROJECT_ROOT, "main.py")], cwd=PROJECT_ROOT, env=env)
+        self.started_at = time.monotonic()
+        print(f"INFO_LAUNCHER: {self.label} iniciado (PID {self.proc.pid}).")
+
+    def check(self, now: float):
+        """Reinicia o processo se ele terminou; com erro, espera 5s, 10s, 20s... até o máximo."""
+        if self.proc is None:
+            if now >= self.restart_at: self.start()
+            return
+        returncode = self.proc.poll()
+        if returncode is None: return
+        if now - self.started_at >= RESTART_BACKOFF_RESET_SECONDS: self.failures = 0
+        self.failures += 1
+        delay = min(RESTART_BACKOFF_MAX_SECONDS, 5 * 2 ** (self.failures - 1))
+        print(f"WARN_LAUNCHER: {self.label} terminou com código {returncode}. Reiniciando em {delay}s.")
+        self.proc, self.restart_at = None, now + delay
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None: self.proc.send_signal(signal.SIGINT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processos", type=int, default=1, help="quantos processos (grupos de shards) iniciar")
+    parser.add_argument("--shards", type=int, default=None, help="total de shards (padrão: o recomendado pelo Discord)")
+    parser.add_argument("--intervalo-identify", type=float, default=5.0,
+                        help="segundos entre IDENTIFYs; o início de cada processo é escalonado por isso x shards do grupo anterior")
+    args = parser.parse_args()
+
+    shard_count = args.shards
+    if shard_count is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+        token = os.environ.get("DISCORD_BOT_TOKEN")
+        if not token: sys.exit("ERRO_LAUNCHER: informe --shards ou defina DISCORD_BOT_TOKEN para consultar o recomendado.")
+        shard_count = recommended_shard_count(token)
+        print(f"INFO_LAUNCHER: Discord recomenda {shard_count} shard(s).")
+
+    groups = split_shards(shard_count, args.processos)
+    workers, delay = [], 0.0
+    now = time.monotonic()
+    for index, shard_ids in enumerate(groups):
+        worker = ShardProcess(index, shard_count, shard_ids)
+        worker.restart_at = now + delay
+        workers.append(worker)
+        delay += args.intervalo_identify * len(shard_ids)
+
+    stopping = False
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    while not stopping:
+        now = time.monotonic()
+        for worker in workers: worker.check(now)
+        time.sleep(1)
+
+    print("INFO_LAUNCHER: Encerrando processos...")
+    for worker in workers: worker.stop()
+    for worker in workers:
+        if worker.proc:
+            try: worker.proc.wait(timeout=30)
+            except subprocess.TimeoutExpired: worker.proc.kill()
+
+
+if __name__ == "__main__":
+    main()
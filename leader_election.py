@@ -0,0 +1,111 @@
+# leader_election.py
+"""
+Eleição de líder entre instâncias do bot que compartilham o mesmo banco SQLite.
+
+Várias instâncias (ex: uma ativa e uma em espera para failover) atendem interações
+normalmente, mas só a líder roda as tarefas agendadas do TasksCog. A liderança é um lease
+na tabela cluster_leases: a líder o renova periodicamente (heartbeat) e, se parar de
+renovar, outra instância o adquire depois que ele expira. Cada troca de dono incrementa o
+fencing token.
+
+A instância considera-se líder só até `ttl - renew_interval` após o início da última
+renovação bem-sucedida, ou seja, deixa de agir antes de o lease expirar no banco e outra
+instância poder assumi-lo.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, List, Optional
+
+import database as db
+from constants import LEADER_LEASE_SECONDS, LEADER_RENEW_INTERVAL_SECONDS
+
+log = logging.getLogger("bot.lider")
+
+LeadershipListener = Callable[[], Awaitable[None]]
+
+
+def default_instance_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderElector:
+    def __init__(self, lease_name: str, instance_id: Optional[str] = None,
+                 ttl_seconds: float = LEADER_LEASE_SECONDS, renew_interval: float = LEADER_RENEW_INTERVAL_SECONDS):
+        if renew_interval >= ttl_seconds:
+            raise ValueError("O intervalo de renovação precisa ser menor que a duração do lease.")
+        self.lease_name = lease_name
+        self.instance_id = instance_id or default_instance_id()
+        self.ttl_seconds = ttl_seconds
+        self.renew_interval = renew_interval
+        self.fencing_token: Optional[int] = None
+        self._valid_until = 0.0
+        self._was_leader = False
+        self._on_elected: List[LeadershipListener] = []
+        self._on_demoted: List[LeadershipListener] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.fencing_token is not None and time.monotonic() < self._valid_until
+
+    def add_listener(self, on_elected: Optional[LeadershipListener] = None, on_demoted: Optional[LeadershipListener] = None):
+        if on_elected: self._on_elected.append(on_elected)
+        if on_demoted: self._on_demoted.append(on_demoted)
+
+    def remove_listener(self, on_elected: Optional[LeadershipListener] = None, on_demoted: Optional[LeadershipListener] = None):
+        if on_elected in self._on_elected: self._on_elected.remove(on_elected)
+        if on_demoted in self._on_demoted: self._on_demoted.remove(on_demoted)
+
+    def heartbeat(self) -> bool:
+        """Uma tentativa de adquirir/renovar o lease (síncrona, acessa o banco). Retorna is_leader."""
+        started = time.monotonic()
+        token = db.db_acquire_lease(self.lease_name, self.instance_id, self.ttl_seconds)
+        self.fencing_token = token
+        if token is not None: self._valid_until = started + self.ttl_seconds - self.renew_interval
+        return self.is_leader
+
+    async def _notify(self, listeners: List[LeadershipListener]):
+        for listener in list(listeners):
+            try: await listener()
+            except Exception as e: log.error("Erro num listener de liderança: %s", e)
+
+    async def poll(self) -> bool:
+        """Heartbeat numa thread (o BEGIN IMMEDIATE pode esperar pelo lock) e aviso das transições."""
+        is_leader = await asyncio.to_thread(self.heartbeat)
+        if is_leader != self._was_leader:
+            self._was_leader = is_leader
+            if is_leader:
+                log.info("Instância %s assumiu a liderança de '%s' (token %s).", self.instance_id, self.lease_name, self.fencing_token)
+                await self._notify(self._on_elected)
+            else:
+                log.warning("Instância %s perdeu a liderança de '%s'.", self.instance_id, self.lease_name)
+                await self._notify(self._on_demoted)
+        return is_leader
+
+    async def run(self):
+        while True:
+            try: await self.poll()
+            except Exception as e: log.error("Falha no heartbeat do lease '%s': %s", self.lease_name, e)
+            await asyncio.sleep(self.renew_interval)
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run(), name=f"leader-election:{self.lease_name}")
+        return self._task
+
+    async def stop(self, release: bool = True):
+        """Para o heartbeat e, se `release`, libera o lease para que a instância em espera assuma de imediato."""
+        if self._task:
+            self._task.cancel()
+            try: await self._task
+            except asyncio.CancelledError: pass
+            self._task = None
+        if release and self.fencing_token is not None:
+            await asyncio.to_thread(db.db_release_lease, self.lease_name, self.instance_id)
+        was_leader = self._was_leader
+        self.fencing_token, self._valid_until, self._was_leader = None, 0.0, False
+        if was_leader: await self._notify(self._on_demoted)
@@ -0,0 +1,178 @@
+# loop_monitor.py
+"""
+Monitor de atraso (lag) do event loop e detector de chamadas bloqueantes.
+
+Todo o acesso ao banco e o código síncrono mais pesado (dateparser, montagem de embeds)
+rodam na thread do event loop; enquanto um callback não devolve o controle, nenhum outro
+avança, nem o heartbeat do gateway.
+
+- LoopMonitor: uma task dorme LOOP_LAG_INTERVAL_SECONDS e mede quanto acordou atrasada
+  (bot_event_loop_lag_seconds). Uma thread de vigia confere o último tique; se ele atrasar
+  mais que LOOP_BLOCK_THRESHOLD_SECONDS, lê a pilha da thread do loop ENQUANTO ela ainda está
+  presa (sys._current_frames), registra no log e conta em bot_event_loop_stalls_total.
+- Modo estrito (LOOP_STRICT): um audit hook (sys.addaudithook) flagra I/O bloqueante feito na
+  thread do loop enquanto ele roda (time.sleep, sqlite3.connect, open de arquivo, socket
+  bloqueante, resolução de nome). "registrar" loga cada ponto de chamada uma vez; "erro"
+  levanta BlockingCallError, para os testes falharem. allow_blocking() isenta um trecho.
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Optional, Set, Tuple
+
+import metrics
+from constants import LOOP_LAG_INTERVAL_SECONDS, LOOP_BLOCK_THRESHOLD_SECONDS, LOOP_STACK_LIMIT
+
+log = logging.getLogger("bot.loop")
+
+STRICT_MODES = ("registrar", "erro")
+# Eventos de auditoria tratados como I/O bloqueante. "open" inclui io.open_code, usado pelos imports.
+_BLOCKING_EVENTS = {"time.sleep", "sqlite3.connect", "open", "socket.connect", "socket.getaddrinfo", "socket.gethostbyname"}
+_CODE_SUFFIXES = (".py", ".pyc", ".so", ".pth")
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+
+class BlockingCallError(RuntimeError):
+    """Chamada bloqueante na thread do event loop com o modo estrito em 'erro'."""
+
+
+def _format_frame_stack(frame, limit: int = LOOP_STACK_LIMIT) -> str:
+    """Pilha a partir do callback em execução: os quadros do próprio asyncio (run_forever, _run_once...) são omitidos."""
+    summary = traceback.extract_stack(frame, limit=limit)
+    start = max((i + 1 for i, entry in enumerate(summary) if entry.filename.startswith(_ASYNCIO_DIR)), default=0)
+    return "".join(traceback.format_list(summary[start:] or summary)).rstrip()
+
+
+class LoopMonitor:
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval: float = LOOP_LAG_INTERVAL_SECONDS,
+                 threshold: float = LOOP_BLOCK_THRESHOLD_SECONDS):
+        self.loop = loop
+        self.interval = interval
+        self.threshold = threshold
+        self.max_lag = 0.0 # Maior atraso medido desde o início
+        self.stalls = 0
+        self._last_tick = time.monotonic()
+        self._reported_tick: Optional[float] = None # Tique cujo travamento já foi registrado
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    async def run(self):
+        while True:
+            scheduled = time.monotonic()
+            self._last_tick = scheduled
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - scheduled - self.interval)
+            metrics.LOOP_LAG_SECONDS.observe(lag)
+            if lag > self.max_lag: self.max_lag = lag
+            if self._reported_tick == scheduled:
+                log.warning("Event loop liberado após %.3fs de atraso.", lag, extra={"atraso_s": round(lag, 3)})
+
+    def _watch(self):
+        """Thread de vigia: lê a pilha da thread do loop enquanto um callback a mantém presa."""
+        while not self._stop.wait(self.threshold / 2):
+            tick = self._last_tick
+            overdue = time.monotonic() - tick - self.interval
+            if overdue <= self.threshold or self._reported_tick == tick: continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None: continue
+            self._reported_tick = tick
+            self.stalls += 1
+            metrics.LOOP_STALLS.inc()
+            log.warning("Event loop travado há %.3fs (limiar %.3fs). Pilha da thread do loop:\n%s",
+                        overdue, self.threshold, _format_frame_stack(frame), extra={"atraso_s": round(overdue, 3)})
+            del frame
+
+    def start(self):
+        """Inicia a task de medição e a thread de vigia. Deve ser chamado de dentro do loop."""
+        if self._task is not None and not self._task.done(): return
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stop.clear()
+        self._task = self.loop.create_task(self.run(), name="loop-monitor")
+        self._thread = threading.Thread(target=self._watch, name="loop-monitor-vigia", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try: await self._task
+            except asyncio.CancelledError: pass
+            self._task = None
+        if self._thread:
+            await asyncio.to_thread(self._thread.join, self.threshold)
+            self._thread = None
+
+
+# --- Modo estrito ---
+_strict_mode: Optional[str] = None
+_strict_loop_thread_id: Optional[int] = None
+_hook_installed = False
+_reported_sites: Set[Tuple[str, int]] = set()
+_allowed = threading.local()
+_original_sleep = time.sleep
+
+
+def _audited_sleep(seconds):
+    sys.audit("time.sleep", seconds)
+    return _original_sleep(seconds)
+
+
+def _is_blocking(event: str, args: tuple) -> bool:
+    if event == "open":
+        path = args[0]
+        return not (isinstance(path, str) and path.endswith(_CODE_SUFFIXES)) and not isinstance(path, int)
+    if event == "socket.connect":
+        return args[0].gettimeout() != 0.0 # Sockets não bloqueantes (os do asyncio) retornam na hora
+    return True
+
+
+def _audit_hook(event: str, args: tuple):
+    if _strict_mode is None or event not in _BLOCKING_EVENTS: return
+    if threading.get_ident() != _strict_loop_thread_id or asyncio._get_running_loop() is None: return
+    if getattr(_allowed, "depth", 0) or not _is_blocking(event, args): return
+    caller = sys._getframe(1)
+    if caller.f_code is _audited_sleep.__code__: caller = caller.f_back
+    if _strict_mode == "erro":
+        raise BlockingCallError(f"Chamada bloqueante '{event}' na thread do event loop ({caller.f_code.co_filename}:{caller.f_lineno}).")
+    site = (caller.f_code.co_filename, caller.f_lineno)
+    metrics.LOOP_BLOCKING_CALLS.inc(evento=event)
+    if site in _reported_sites: return
+    _reported_sites.add(site)
+    log.warning("Chamada bloqueante '%s' na thread do event loop:\n%s", event, _format_frame_stack(caller), extra={"evento": event})
+
+
+def enable_strict_mode(mode: str = "registrar"):
+    """Ativa o modo estrito para a thread do loop em execução. O audit hook é instalado uma só vez por processo."""
+    global _strict_mode, _strict_loop_thread_id, _hook_installed
+    if mode not in STRICT_MODES: raise ValueError(f"Modo estrito inválido: {mode!r} (use {' ou '.join(STRICT_MODES)}).")
+    asyncio.get_running_loop() # Só faz sentido a partir do loop que será vigiado
+    _strict_loop_thread_id = threading.get_ident()
+    _strict_mode = mode
+    if not _hook_installed:
+        sys.addaudithook(_audit_hook) # Audit hooks não podem ser removidos; disable_strict_mode só desliga a checagem
+        _hook_installed = True
+    if sys.version_info < (3, 12): time.sleep = _audited_sleep # O evento "time.sleep" só existe a partir do 3.12
+    log.info("Modo estrito do event loop ativo (%s).", mode)
+
+
+def disable_strict_mode():
+    global _strict_mode
+    _strict_mode = None
+    _reported_sites.clear()
+    time.sleep = _original_sleep
+
+
+@contextlib.contextmanager
+def allow_blocking():
+    """Isenta do modo estrito as chamadas bloqueantes feitas dentro do bloco (na thread atual)."""
+    _allowed.depth = getattr(_allowed, "depth", 0) + 1
+    try: yield
+    finally: _allowed.depth -= 1
@@ -1,27 +1,30 @@
 # main.py
+import startup_timing # Primeiro import: marca o início do processo para o relatório de inicialização
 import discord
 from discord.ext import commands, tasks
 import asyncio
 import os # For loading cogs
 import traceback # For error printing
+import hashlib
+import json
 
 # Custom module imports
 import config # For TOKEN and GUILD_ID
+import bot_logging
+bot_logging.setup_logging(config.LOG_LEVEL, config.LOG_LEVELS, config.LOG_FORMAT) # Antes dos demais imports do projeto
 import database as db # For init_db
 from constants import DB_NAME # For printing
-# Import PersistentRsvpView if its definition is here or in another accessible module
-# If it's defined inside event_cog.py, we don't import it here directly for bot.add_view
-# Instead, the cog itself should handle adding its views if necessary, or we find another way.
-# For this structure, PersistentRsvpView is in event_cog.py.
-# The recommended way for persistent views is to add them once.
-# We will add it here AFTER event_cog is loaded, assuming its definition is accessible.
-# A cleaner way would be for the cog to register its own persistent views.
-# For now, let's assume event_cog.py makes PersistentRsvpView available globally or via an import.
-# To make this work correctly, PersistentRsvpView definition should be outside any class in event_cog.py
-# or imported directly.
-# Let's adjust: we will import PersistentRsvpView from the event_cog module.
-# This means PersistentRsvpView class should be defined at the top level of event_cog.py
-from cogs.event_cog import PersistentRsvpView # Make sure this class is top-level in event_cog.py
+from sharding import ShardFilter
+from leader_election import LeaderElector
+import metrics
+from loop_monitor import LoopMonitor, enable_strict_mode
+import rsvp_log
+import date_parsing # Leve: o dateparser só é importado sob demanda (ou no warm-up em segundo plano)
+# PersistentRsvpView é importada em setup_hook, depois de os cogs serem carregados: importar
+# cogs.event_cog aqui atrasaria o login com o carregamento de todos os módulos dos cogs.
+
+STARTUP_TIMER = startup_timing.STARTUP_TIMER
+STARTUP_TIMER.record("imports do main.py", STARTUP_TIMER.elapsed())
 
 # --- Bot Setup ---
 intents = discord.Intents.default()
@@ -29,7 +32,141 @@ intents.message_content = True  # For prefix commands, if any, and potentially m
 intents.guilds = True          # Needed for guild-related events and properties
 intents.members = True         # REQUIRED for accurately fetching member details (nicks, roles) for embeds
 
-bot = commands.Bot(command_prefix="!", intents=intents) # Still define a prefix for on_command_error
+
+class EventBot(commands.AutoShardedBot):
+    """
+    A inicialização única (banco, cogs, views persistentes e sincronização de comandos) fica
+    em setup_hook, que roda uma vez após o login. on_ready pode disparar de novo a cada
+    reconexão/resume do gateway e não repete esse trabalho.
+
+    Com SHARD_IDS definido, o processo atende só um grupo de shards (ver launcher.py) e as
+    tarefas em segundo plano filtram, nas consultas SQL, apenas os servidores desses shards.
+
+    Várias instâncias podem rodar o mesmo grupo de shards (ativa/espera): todas atendem
+    interações, mas só a que detém o lease de liderança (leader_elector) roda o TasksCog.
+    """
+    leader_elector: LeaderElector | None = None
+    loop_monitor: LoopMonitor | None = None
+    metrics_server = None
+
+    async def setup_hook(self):
+        STARTUP_TIMER.end("login (até setup_hook)")
+        print("DEBUG: setup_hook INICIADO")
+        if config.SHARD_IDS is not None:
+            db.set_shard_filter(ShardFilter(config.SHARD_COUNT, config.SHARD_IDS))
+            print(f"DEBUG: Processo atendendo os shards {list(config.SHARD_IDS)} de {config.SHARD_COUNT}.")
+
+        # 1. Initialize Database
+        try:
+            with STARTUP_TIMER.phase("init_db"):
+                db.init_db() # Initialize database schema if not exists
+            print("DEBUG: Banco de dados inicializado/verificado.")
+        except Exception as e_db_init:
+            print(f"ERRO CRÍTICO ao inicializar banco de dados: {e_db_init}")
+            traceback.print_exc()
+            raise # Sem banco o bot não deve conectar
+
+        # 2. Load Cogs (o elector existe antes, para que os cogs registrem seus listeners de liderança)
+        lease_name = "tarefas" if config.SHARD_IDS is None else f"tarefas:{config.SHARD_COUNT}:{','.join(map(str, config.SHARD_IDS))}"
+        self.leader_elector = LeaderElector(lease_name, instance_id=config.INSTANCE_ID)
+        with STARTUP_TIMER.phase("carregamento dos cogs (total)"):
+            await load_cogs()
+
+        # 3. Add Persistent Views (uma única vez por processo)
+        try:
+            from cogs.event_cog import PersistentRsvpView # Já importado pelo carregamento dos cogs
+            with STARTUP_TIMER.phase("registro da PersistentRsvpView"):
+                self.add_view(PersistentRsvpView(bot_instance=self))
+            print("DEBUG: PersistentRsvpView adicionada ao bot.")
+        except Exception as e_add_view:
+            print(f"ERRO ao adicionar PersistentRsvpView: {e_add_view}")
+            traceback.print_exc()
+
+        # 4. Synchronize Slash Commands (só se a árvore mudou desde a última sincronização)
+        # Com vários processos, só o que atende o shard 0 sincroniza: a árvore é a mesma em todos.
+        if config.SHARD_IDS is None or 0 in config.SHARD_IDS:
+            with STARTUP_TIMER.phase("sincronização de comandos"):
+                await self.sync_commands_if_changed()
+
+        # 5. Monitor do event loop (depois da inicialização, que bloqueia o loop de propósito)
+        self.loop_monitor = LoopMonitor(asyncio.get_running_loop())
+        self.loop_monitor.start()
+        rsvp_log.WRITER.start() # Gravação em lote do histórico de RSVPs
+
+        # 6. Endpoint de métricas (só localhost)
+        if config.METRICS_PORT:
+            metrics.REGISTRY.register_callback("bot_log_queue_depth", "Registros de log aguardando escrita.", bot_logging.queue_depth)
+            metrics.REGISTRY.register_callback("bot_guilds", "Servidores atendidos por este processo.", lambda: len(self.guilds))
+            metrics.REGISTRY.register_callback("bot_gateway_latency_seconds", "Latência do heartbeat do gateway, por shard.",
+                                               lambda: {(str(shard_id),): latency for shard_id, latency in self.latencies if latency == latency}, ("shard",))
+            self.metrics_server = await metrics.start_server(config.METRICS_PORT)
+
+        # 7. Eleição de líder: a primeira tentativa acontece antes da conexão ao gateway
+        with STARTUP_TIMER.phase("eleição de líder"):
+            await self.leader_elector.poll()
+        self.leader_elector.start()
+
+        if config.LOOP_STRICT: enable_strict_mode(config.LOOP_STRICT)
+        STARTUP_TIMER.begin("conexão ao gateway (até on_ready)")
+        print("DEBUG: setup_hook CONCLUÍDO")
+
+    async def close(self):
+        # Libera o lease de liderança para que uma instância em espera assuma sem esperar a expiração.
+        if self.leader_elector: await self.leader_elector.stop(release=True)
+        if self.metrics_server: self.metrics_server.close()
+        if self.loop_monitor: await self.loop_monitor.stop()
+        await rsvp_log.WRITER.stop() # Grava as transições ainda acumuladas
+        await super().close()
+
+    def command_tree_hash(self, guild_obj: discord.abc.Snowflake | None) -> str:
+        """Hash estável do payload que tree.sync enviaria para o escopo (global ou servidor)."""
+        payload = sorted(
+            (command.to_dict(self.tree) for command in self.tree.get_commands(guild=guild_obj)),
+            key=lambda command: (command.get('type', 1), command['name'])
+        )
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+    async def sync_commands_if_changed(self):
+        guild_obj = None
+        sync_scope_msg = "globalmente"
+        if hasattr(config, 'GUILD_ID') and config.GUILD_ID:
+            try:
+                guild_obj = discord.Object(id=int(config.GUILD_ID)) # type: ignore
+                sync_scope_msg = f"para o servidor ID {config.GUILD_ID}"
+            except ValueError:
+                print(f"AVISO: GUILD_ID ('{config.GUILD_ID}') em config.py não é um ID numérico válido. Sincronizando globalmente.")
+                guild_obj = None # Fallback to global sync
+                sync_scope_msg = "globalmente (GUILD_ID inválido)"
+
+        # A chave inclui a aplicação: o mesmo banco pode servir a tokens/aplicações diferentes.
+        meta_key = f"command_tree_hash:{self.application_id}:{guild_obj.id if guild_obj else 'global'}"
+        tree_hash = self.command_tree_hash(guild_obj)
+        if not config.FORCE_COMMAND_SYNC and db.db_get_bot_meta(meta_key) == tree_hash:
+            print(f"DEBUG: Árvore de comandos inalterada ({tree_hash[:12]}); sincronização {sync_scope_msg} ignorada.")
+            return
+
+        try:
+            synced_commands = await self.tree.sync(guild=guild_obj)
+            db.db_set_bot_meta(meta_key, tree_hash)
+            if synced_commands:
+                print(f"Sincronizados {len(synced_commands)} comandos ({sync_scope_msg}). Nomes: {[s.name for s in synced_commands]}")
+            else:
+                print(f"AVISO: Nenhum comando foi sincronizado ({sync_scope_msg}). Verifique as definições dos comandos nos cogs.")
+        except discord.HTTPException as e_sync:
+            print(f"ERRO de HTTP ao sincronizar comandos ({sync_scope_msg}): {e_sync}")
+            if "scope" in str(e_sync).lower():
+                 print("  -> Dica: Se estiver mudando de guild sync para global (ou vice-versa), pode levar um tempo para atualizar.")
+        except Exception as e_sync_generic:
+            print(f"ERRO GENÉRICO ao sincronizar comandos ({sync_scope_msg}): {e_sync_generic}")
+            traceback.print_exc()
+
+
+bot = EventBot(
+    command_prefix="!", intents=intents, # Still define a prefix for on_command_error
+    shard_count=config.SHARD_COUNT,
+    shard_ids=list(config.SHARD_IDS) if config.SHARD_IDS is not None else None,
+    http_trace=metrics.discord_http_trace() # Duração das requisições e contagem de 429 do Discord
+)
 
 # --- Cog Loading Function ---
 async def load_cogs():
@@ -38,7 +175,8 @@ async def load_cogs():
     for filename in os.listdir('./cogs'): # Ensure this path is correct
         if filename.endswith('.py') and not filename.startswith('__'):
             try:
-                await bot.load_extension(f'cogs.{filename[:-3]}')
+                with STARTUP_TIMER.phase(f"  cog {filename[:-3]}"):
+                    await bot.load_extension(f'cogs.{filename[:-3]}')
                 print(f"  -> Cog '{filename[:-3]}' carregado com sucesso.")
                 loaded_cogs_count +=1
             except commands.ExtensionAlreadyLoaded:
@@ -49,80 +187,34 @@ async def load_cogs():
     print(f"DEBUG: Carregamento de cogs concluído. {loaded_cogs_count} cogs novos carregados.")
 
 
-@bot.event
-async def on_ready():
-    print("-" * 30)
-    print("DEBUG: Evento on_ready INICIADO")
-
-    # 1. Initialize Database
-    try:
-        db.init_db() # Initialize database schema if not exists
-        print("DEBUG: Banco de dados inicializado/verificado.")
-    except Exception as e_db_init:
-        print(f"ERRO CRÍTICO ao inicializar banco de dados: {e_db_init}")
-        traceback.print_exc()
-        return # Stop if DB fails
-
-    # 2. Load Cogs
-    await load_cogs()
-
-    # 3. Add Persistent Views
-    # Ensure PersistentRsvpView is defined in a way that it can be imported here.
-    # Typically, class definitions are at the module's top level.
+async def warm_up_dateparser():
+    """Carrega o dateparser numa thread, fora do loop, para o primeiro /agendar com data livre não esperar."""
+    started = asyncio.get_running_loop().time()
     try:
-        # Check if a view with this custom_id prefix pattern is already added
-        # This is a simplistic check; real persistent views are usually identified by their structure/items.
-        # Since we pass the bot instance, it should handle its children correctly.
-        # A better check would be specific to how discord.py manages persistent views.
-        # For now, we assume we add it once.
-        # If the view can be uniquely identified (e.g., by a unique property or checking bot.persistent_views),
-        # you could add a check. For now, we'll add it.
-        # If PersistentRsvpView is defined in event_cog, it's loaded with the cog.
-        # We add it to the bot instance here.
-        bot.add_view(PersistentRsvpView(bot_instance=bot))
-        print("DEBUG: PersistentRsvpView adicionada ao bot.")
-    except Exception as e_add_view:
-        print(f"ERRO ao adicionar PersistentRsvpView: {e_add_view}")
-        traceback.print_exc()
+        await asyncio.to_thread(date_parsing.warm_up)
+        print(f"DEBUG: Warm-up do dateparser concluído em segundo plano ({(asyncio.get_running_loop().time() - started) * 1000:.0f} ms).")
+    except Exception as e_warm_up:
+        print(f"AVISO: Falha no warm-up do dateparser: {e_warm_up}")
 
 
-    # 4. Synchronize Slash Commands
-    guild_obj = None
-    sync_scope_msg = "globalmente"
-    if hasattr(config, 'GUILD_ID') and config.GUILD_ID:
-        try:
-            guild_obj = discord.Object(id=int(config.GUILD_ID)) # type: ignore
-            sync_scope_msg = f"para o servidor ID {config.GUILD_ID}"
-        except ValueError:
-            print(f"AVISO: GUILD_ID ('{config.GUILD_ID}') em config.py não é um ID numérico válido. Sincronizando globalmente.")
-            guild_obj = None # Fallback to global sync
-            sync_scope_msg = "globalmente (GUILD_ID inválido)"
-
-    print(f"DEBUG: Aguardando bot estar totalmente pronto para sincronizar comandos {sync_scope_msg}...")
-    await bot.wait_until_ready() # Ensure internal cache is ready
+@bot.event
+async def on_ready():
+    # Dispara na primeira conexão e a cada reconexão: nada de inicialização aqui (ver EventBot.setup_hook).
+    if STARTUP_TIMER.reported:
+        print(f"DEBUG: on_ready após reconexão ({len(bot.guilds)} servidores).")
+        return
 
-    try:
-        synced_commands = await bot.tree.sync(guild=guild_obj)
-        if synced_commands:
-            print(f"Sincronizados {len(synced_commands)} comandos ({sync_scope_msg}). Nomes: {[s.name for s in synced_commands]}")
-        else:
-            print(f"AVISO: Nenhum comando foi sincronizado ({sync_scope_msg}). Verifique as definições dos comandos nos cogs.")
-    except discord.HTTPException as e_sync:
-        print(f"ERRO de HTTP ao sincronizar comandos ({sync_scope_msg}): {e_sync}")
-        if "scope" in str(e_sync).lower():
-             print("  -> Dica: Se estiver mudando de guild sync para global (ou vice-versa), pode levar um tempo para atualizar.")
-    except Exception as e_sync_generic:
-        print(f"ERRO GENÉRICO ao sincronizar comandos ({sync_scope_msg}): {e_sync_generic}")
-        traceback.print_exc()
+    STARTUP_TIMER.end("conexão ao gateway (até on_ready)")
+    asyncio.create_task(warm_up_dateparser())
 
-    # 5. Final Bot Ready Message
     if bot.user:
-        print(f'Bot {bot.user.name} (ID: {bot.user.id}) conectado e pronto!')
+        print(f'Bot {bot.user.name} (ID: {bot.user.id}) conectado e pronto! Shards: {sorted(bot.shards)} de {bot.shard_count}, {len(bot.guilds)} servidores.')
         print(f'Usando banco de dados: {DB_NAME}')
     else:
         print("ERRO CRÍTICO: bot.user não está definido em on_ready. O bot pode não ter conectado corretamente.")
 
-    print("DEBUG: Evento on_ready CONCLUÍDO")
+    STARTUP_TIMER.reported = True
+    print(STARTUP_TIMER.report())
     print("-" * 30)
 
 
@@ -144,6 +236,7 @@ async def main_async():
 
     async with bot:
         try:
+            STARTUP_TIMER.begin("login (até setup_hook)")
             await bot.start(config.TOKEN)
         except discord.LoginFailure:
             print("Falha no login: Token inválido. Verifique o token em config.py.")
@@ -168,4 +261,6 @@ if __name__ == "__main__":
     except Exception as e_global_run:
         # This catches errors if asyncio.run itself fails or other top-level exceptions
         print(f"Erro global não capturado durante a execução do main_async: {e_global_run}")
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
+    finally:
+        bot_logging.shutdown() # Esvazia a fila de logs antes de sair
\ No newline at end of file
@@ -0,0 +1,302 @@
+# metrics.py
+"""
+Métricas internas do bot (contadores, gauges e histogramas) no formato de texto do Prometheus.
+
+As métricas ficam num registro em memória, sem dependências externas. `start_server` expõe
+o registro em http://127.0.0.1:<METRICS_PORT>/metrics (só localhost): dá para consultar com
+curl ou apontar um Prometheus local. As operações são protegidas por lock, porque parte do
+código instrumentado (ex: funções do banco) roda em threads via asyncio.to_thread.
+
+Valores que já existem em outro lugar (tamanho de filas, estatísticas de lru_cache) são
+registrados com `register_callback` e lidos só no momento da coleta.
+"""
+import asyncio
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+# Segundos: de 1 ms (consultas simples ao SQLite) a 30 s (chamadas ao Discord com rate limit).
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra: pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value): return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Métrica {self.name} espera os rótulos {self.labelnames}, recebeu {tuple(labels)}.")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock: self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def collect(self) -> List[str]:
+        with self._lock: items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock: self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock: self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def collect(self) -> List[str]:
+        with self._lock: items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por combinação de rótulos: [contagem por bucket (não cumulativa)..., contagem +Inf], soma
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound: index = i; break
+        with self._lock:
+            counts, total = self._values.get(key) or self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try: yield
+        finally: self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def collect(self) -> List[str]:
+        with self._lock: items = sorted((key, (list(c), t[0])) for key, (c, t) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class _CallbackMetric(_Metric):
+    """Métrica cujo valor é lido de `callback` na coleta: retorna um número ou {valores_dos_rótulos: número}."""
+
+    def __init__(self, name: str, help_text: str, metric_type: str, callback: Callable, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self.metric_type = metric_type
+        self.callback = callback
+
+    def collect(self) -> List[str]:
+        try: result = self.callback()
+        except Exception: return []  # Uma fonte indisponível (ex: banco travado) não derruba a coleta inteira
+        if result is None: return []
+        items = sorted(result.items()) if isinstance(result, dict) else [((), result)]
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None: return existing  # Recarregar um cog não duplica a métrica
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def register_callback(self, name: str, help_text: str, callback: Callable, labelnames: Sequence[str] = (), metric_type: str = "gauge"):
+        """Registra (ou substitui, ex: ao recarregar um cog) uma métrica calculada na coleta."""
+        with self._lock: self._metrics[name] = _CallbackMetric(name, help_text, metric_type, callback, labelnames)
+
+    def render(self) -> str:
+        with self._lock: metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for metric in metrics: lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- Métricas compartilhadas pelos módulos instrumentados ---
+DB_QUERY_SECONDS = REGISTRY.histogram("bot_db_query_seconds", "Duração das funções de acesso ao banco (database.py).", ("funcao",))
+RSVP_SECONDS = REGISTRY.histogram("bot_rsvp_seconds", "Duração do tratamento de um clique de RSVP, do callback ao embed atualizado.", ("status",))
+RSVP_ACK_SECONDS = REGISTRY.histogram("bot_rsvp_ack_seconds", "Tempo entre a criação da interação de RSVP (Discord) e o defer do bot.")
+TASK_LOOP_SECONDS = REGISTRY.histogram("bot_task_loop_seconds", "Duração de cada execução das tarefas em segundo plano.", ("tarefa",))
+TASK_LOOP_ERRORS = REGISTRY.counter("bot_task_loop_errors_total", "Execuções de tarefas em segundo plano que terminaram com exceção.", ("tarefa",))
+JOBS_PROCESSED = REGISTRY.counter("bot_jobs_processed_total", "Jobs da fila durável processados, por tipo e resultado.", ("tipo", "resultado"))
+ROLE_OPERATION_SECONDS = REGISTRY.histogram("bot_role_operation_seconds", "Duração das operações de cargos temporários (role_utils).", ("operacao", "resultado"))
+ROLE_POOL_REQUESTS = REGISTRY.counter("bot_role_pool_requests_total", "Pool de cargos temporários: retiradas (acerto/falta) e devoluções (guardado/deletado).", ("operacao", "resultado"))
+RSVP_LOG_ENTRIES = REGISTRY.counter("bot_rsvp_log_entries_total", "Transições de RSVP do histórico (rsvp_log), por resultado (gravada/descartada).", ("resultado",))
+ROLE_DRIFT = REGISTRY.counter("bot_role_drift_total", "Divergências entre RSVPs e membros dos cargos temporários encontradas pela reconciliação, por tipo (faltando/sobrando) e resultado.", ("tipo", "resultado"))
+DISCORD_HTTP_SECONDS = REGISTRY.histogram("bot_discord_http_request_seconds", "Duração das requisições HTTP à API do Discord.", ("metodo", "status"))
+DISCORD_HTTP_429 = REGISTRY.counter("bot_discord_http_429_total", "Respostas 429 (rate limit) da API do Discord, por escopo.", ("escopo",))
+CACHE_REQUESTS = REGISTRY.counter("bot_cache_requests_total", "Consultas aos caches em memória, por cache e resultado (acerto/falta).", ("cache", "resultado"))
+LOOP_LAG_SECONDS = REGISTRY.histogram("bot_event_loop_lag_seconds", "Atraso do event loop: quanto uma espera curta demorou além do pedido (loop_monitor).")
+LOOP_STALLS = REGISTRY.counter("bot_event_loop_stalls_total", "Travamentos do event loop acima do limiar, com a pilha registrada no log.")
+LOOP_BLOCKING_CALLS = REGISTRY.counter("bot_event_loop_blocking_calls_total", "Chamadas bloqueantes na thread do event loop (modo estrito), por evento de auditoria.", ("evento",))
+
+
+def timed(histogram: Histogram, **labels):
+    """Decorador (função síncrona ou async) que registra a duração de cada chamada em `histogram`."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try: return await func(*args, **kwargs)
+                finally: histogram.observe(time.perf_counter() - started, **labels)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try: return func(*args, **kwargs)
+            finally: histogram.observe(time.perf_counter() - started, **labels)
+        return wrapper
+    return decorator
+
+
+def task_timed(task_name: str):
+    """Decorador dos corpos de tasks.loop: duração em TASK_LOOP_SECONDS e exceções em TASK_LOOP_ERRORS."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try: return await func(*args, **kwargs)
+            except Exception:
+                TASK_LOOP_ERRORS.inc(tarefa=task_name); raise
+            finally: TASK_LOOP_SECONDS.observe(time.perf_counter() - started, tarefa=task_name)
+        return wrapper
+    return decorator
+
+
+def db_timed(func):
+    """Decorador das funções de database.py: duração rotulada com o nome da função."""
+    return timed(DB_QUERY_SECONDS, funcao=func.__name__)(func)
+
+
+def discord_http_trace():
+    """
+    aiohttp.TraceConfig para o parâmetro http_trace do discord.Client: mede cada requisição à
+    API e conta as respostas 429 (o discord.py as trata e repete internamente, sem expô-las).
+    """
+    import aiohttp
+
+    async def on_request_start(session, context, params):
+        context.started = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        status = params.response.status
+        DISCORD_HTTP_SECONDS.observe(time.perf_counter() - context.started, metodo=params.method, status=status)
+        if status == 429:
+            scope = params.response.headers.get("X-RateLimit-Scope") or ("global" if params.response.headers.get("X-RateLimit-Global") else "rota")
+            DISCORD_HTTP_429.inc(escopo=scope)
+
+    async def on_request_exception(session, context, params):
+        DISCORD_HTTP_SECONDS.observe(time.perf_counter() - context.started, metodo=params.method, status="erro")
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
+
+
+async def _handle_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = (await asyncio.wait_for(reader.readline(), timeout=5)).decode("latin-1").split()
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""): pass
+        if len(request_line) >= 2 and request_line[0] == "GET" and request_line[1].split("?")[0] in ("/metrics", "/"):
+            body, status, content_type = REGISTRY.render().encode("utf-8"), "200 OK", "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body, status, content_type = b"Use GET /metrics\n", "404 Not Found", "text/plain; charset=utf-8"
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(port: int, host: str = "127.0.0.1") -> Optional[asyncio.AbstractServer]:
+    """Serve o registro em http://host:port/metrics. Retorna None (com aviso) se a porta não estiver disponível."""
+    try:
+        server = await asyncio.start_server(_handle_http, host, port)
+    except OSError as e:
+        print(f"WARN_METRICS: Não foi possível abrir o endpoint de métricas em {host}:{port}: {e}")
+        return None
+    print(f"INFO_METRICS: Métricas disponíveis em http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,226 @@
+# profiling.py
+"""
+Ferramentas de diagnóstico em produção usadas pelo /perfil (cogs/profiling_cog.py).
+
+- Perfil de CPU determinístico (cProfile) ou por amostragem (uma thread lê a pilha da thread
+  do event loop em intervalos fixos, com custo baixo e independente do número de chamadas).
+- Snapshots do tracemalloc e a diferença entre eles.
+- Lista das tasks do asyncio mais antigas, com a pilha de cada uma. A idade vem de uma task
+  factory instalada no loop (o asyncio não registra quando uma task foi criada).
+
+Todas as funções retornam texto, enviado como anexo pelo cog.
+"""
+import asyncio
+import cProfile
+import collections
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from typing import Dict, Optional, Tuple
+
+from constants import PROFILE_SAMPLING_INTERVAL_SECONDS, PROFILE_REPORT_TOP_N, TRACEMALLOC_FRAMES
+
+# Funções do seletor em que a thread do event loop fica enquanto espera I/O.
+_IDLE_FUNCTIONS = {("selectors.py", "select"), ("selectors.py", "poll")}
+
+FrameKey = Tuple[str, str, int]  # (arquivo, função, primeira linha)
+
+
+def _frame_label(key: FrameKey) -> str:
+    filename, name, firstlineno = key
+    return f"{name} ({_short_path(filename)}:{firstlineno})"
+
+
+def _short_path(filename: str) -> str:
+    for marker in ("site-packages" + os.sep, "lib" + os.sep + "python"):
+        if marker in filename: return filename.split(marker, 1)[1]
+    try: return os.path.relpath(filename)
+    except ValueError: return filename
+
+
+class SamplingProfiler:
+    """Amostra a pilha de `thread_id` a cada `interval` segundos numa thread à parte."""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLING_INTERVAL_SECONDS):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Dict[Tuple[FrameKey, ...], int] = collections.Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = self.stopped_at = 0.0
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="perfil-amostragem", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread: self._thread.join()
+        self.stopped_at = time.perf_counter()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None: continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_name, code.co_firstlineno))
+                frame = frame.f_back
+            self.samples += 1
+            if (os.path.basename(stack[0][0]), stack[0][1]) in _IDLE_FUNCTIONS: self.idle_samples += 1
+            self.stacks[tuple(reversed(stack))] += 1
+
+    def report(self, top: int = PROFILE_REPORT_TOP_N) -> str:
+        elapsed = (self.stopped_at or time.perf_counter()) - self.started_at
+        own: Dict[FrameKey, int] = collections.Counter()
+        inclusive: Dict[FrameKey, int] = collections.Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for key in set(stack): inclusive[key] += count
+        busy = self.samples - self.idle_samples
+        lines = [
+            f"Perfil por amostragem: {self.samples} amostras em {elapsed:.1f}s (intervalo {self.interval * 1000:.1f} ms).",
+            f"Event loop ocioso (esperando I/O) em {self.idle_samples} amostras; ocupado em {busy} ({busy / max(self.samples, 1) * 100:.1f}%).",
+            "", f"Top {top} por tempo próprio (amostras em que a função estava no topo da pilha):",
+        ]
+        lines += [f"{count:8d} {count / max(self.samples, 1) * 100:6.1f}%  {_frame_label(key)}" for key, count in own.most_common(top)]
+        lines += ["", f"Top {top} por tempo total (a função estava em algum ponto da pilha):"]
+        lines += [f"{count:8d} {count / max(self.samples, 1) * 100:6.1f}%  {_frame_label(key)}" for key, count in inclusive.most_common(top)]
+        return "\n".join(lines) + "\n"
+
+    def collapsed_stacks(self) -> str:
+        """Formato 'a;b;c N' aceito por flamegraph.pl e speedscope."""
+        return "".join(f"{';'.join(_frame_label(key) for key in stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+
+async def profile_cpu_deterministic(duration: float, stop_event: asyncio.Event, top: int = PROFILE_REPORT_TOP_N) -> str:
+    """cProfile na thread do event loop por `duration` segundos (ou até `stop_event`). Mede toda chamada: mais custo, mais detalhe."""
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        try: await asyncio.wait_for(stop_event.wait(), timeout=duration)
+        except asyncio.TimeoutError: pass
+    finally:
+        profiler.disable()
+    buffer = io.StringIO()
+    buffer.write(f"Perfil determinístico (cProfile) de {time.perf_counter() - started:.1f}s na thread do event loop.\n\n")
+    stats = pstats.Stats(profiler, stream=buffer)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    buffer.write("\n")
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(top)
+    return buffer.getvalue()
+
+
+async def profile_cpu_sampling(duration: float, stop_event: asyncio.Event, top: int = PROFILE_REPORT_TOP_N) -> Tuple[str, str]:
+    """Amostragem da thread do event loop. Retorna (relatório, pilhas no formato collapsed)."""
+    profiler = SamplingProfiler(threading.get_ident())
+    profiler.start()
+    try:
+        try: await asyncio.wait_for(stop_event.wait(), timeout=duration)
+        except asyncio.TimeoutError: pass
+    finally:
+        await asyncio.to_thread(profiler.stop)
+    return profiler.report(top), profiler.collapsed_stacks()
+
+
+class MemoryTracker:
+    """tracemalloc sob demanda: cada snapshot é comparado ao anterior (o primeiro, ao início)."""
+
+    def __init__(self):
+        self.previous: Optional[tracemalloc.Snapshot] = None
+        self.snapshot_count = 0
+
+    @property
+    def running(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing(): tracemalloc.start(TRACEMALLOC_FRAMES)
+        self.previous, self.snapshot_count = self._take(), 0
+
+    def _take(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def snapshot_diff(self, top: int = PROFILE_REPORT_TOP_N) -> str:
+        current = self._take()
+        self.snapshot_count += 1
+        traced, peak = tracemalloc.get_traced_memory()
+        lines = [f"Snapshot {self.snapshot_count}: {traced / 1024 / 1024:.1f} MiB rastreados (pico {peak / 1024 / 1024:.1f} MiB).", ""]
+        if self.previous is not None:
+            lines.append(f"Top {top} diferenças por linha desde o snapshot anterior:")
+            lines += [str(stat) for stat in current.compare_to(self.previous, "lineno")[:top]]
+            lines.append("")
+            biggest = current.compare_to(self.previous, "traceback")[:3]
+            for stat in biggest:
+                lines.append(f"Pilha de alocação: {stat.size_diff / 1024:+.1f} KiB, {stat.count_diff:+d} blocos")
+                lines += [f"    {line}" for line in stat.traceback.format()]
+            lines.append("")
+        lines.append(f"Top {top} alocações atuais por linha:")
+        lines += [str(stat) for stat in current.statistics("lineno")[:top]]
+        self.previous = current
+        return "\n".join(lines) + "\n"
+
+    def stop(self):
+        tracemalloc.stop()
+        self.previous, self.snapshot_count = None, 0
+
+
+# --- Idade das tasks do asyncio ---
+_task_created_at: "weakref.WeakKeyDictionary[asyncio.Task, float]" = weakref.WeakKeyDictionary()
+_previous_factory = None
+_installed_loop: Optional[asyncio.AbstractEventLoop] = None
+_installed_at = 0.0
+
+
+def install_task_age_tracking(loop: asyncio.AbstractEventLoop):
+    """Envolve a task factory do loop para registrar o instante de criação de cada task."""
+    global _previous_factory, _installed_loop, _installed_at
+    if _installed_loop is loop: return
+    _previous_factory, _installed_loop, _installed_at = loop.get_task_factory(), loop, time.monotonic()
+
+    def factory(loop, coro, **kwargs):
+        task = _previous_factory(loop, coro, **kwargs) if _previous_factory else asyncio.Task(coro, loop=loop, **kwargs)
+        _task_created_at[task] = time.monotonic()
+        return task
+    loop.set_task_factory(factory)
+
+
+def uninstall_task_age_tracking():
+    global _installed_loop
+    if _installed_loop is not None: _installed_loop.set_task_factory(_previous_factory)
+    _installed_loop = None
+
+
+def dump_tasks(limit: int, stack_limit: int = 8) -> str:
+    """As `limit` tasks pendentes mais antigas, com corrotina e pilha atual."""
+    now = time.monotonic()
+    tasks = [task for task in asyncio.all_tasks() if not task.done()]
+    # Tasks criadas antes da instalação da factory não têm idade conhecida: são as mais antigas.
+    def age(task): return now - _task_created_at[task] if task in _task_created_at else float("inf")
+    tasks.sort(key=age, reverse=True)
+    lines = [f"{len(tasks)} task(s) pendente(s); mostrando as {min(limit, len(tasks))} mais antigas.",
+             f"Idades medidas desde a criação; '>' = criada antes do rastreamento ({now - _installed_at:.0f}s atrás).", ""]
+    for task in tasks[:limit]:
+        task_age = age(task)
+        age_str = f">{now - _installed_at:.0f}s" if task_age == float("inf") else f"{task_age:.1f}s"
+        coro = task.get_coro()
+        lines.append(f"[{age_str}] {task.get_name()} — {getattr(coro, '__qualname__', repr(coro))}")
+        buffer = io.StringIO()
+        task.print_stack(limit=stack_limit, file=buffer)
+        lines += [f"    {line}" for line in buffer.getvalue().splitlines()[1:]]
+        lines.append("")
+    return "\n".join(lines)
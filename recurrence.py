@@ -0,0 +1,128 @@
+# recurrence.py
+"""
+Expansão de eventos recorrentes.
+
+Um template (events.is_recurring_template = 1) descreve a regra nas colunas recurrence_*;
+as instâncias são eventos comuns com parent_template_id apontando para o template.
+As ocorrências são calculadas no horário de Brasília, preservando a hora "de parede"
+do template, e só dentro de um horizonte móvel. O template guarda em
+recurrence_last_generated_utc a última ocorrência já processada (high-water mark),
+de modo que cada execução só materializa as ocorrências novas.
+
+Regras suportadas (recurrence_type):
+  - 'diaria':  a cada `recurrence_interval` dias.
+  - 'semanal': a cada `recurrence_interval` semanas, nos dias de recurrence_days_of_week
+               (CSV de 0=Segunda .. 6=Domingo; padrão: o dia da semana do template).
+  - 'mensal':  a cada `recurrence_interval` meses, no dia recurrence_day_of_month, ou na
+               N-ésima (recurrence_week_of_month: 1..5, -1 = última) ocorrência do dia da
+               semana recurrence_weekday_of_month. Meses sem a data pedida são pulados.
+"""
+import calendar
+import datetime
+import sqlite3
+from typing import Iterator, List, Optional
+
+import pytz
+
+from constants import BRAZIL_TZ
+
+RECURRENCE_TYPES = ('diaria', 'semanal', 'mensal')
+
+
+def _parse_utc(dt_str: str) -> datetime.datetime:
+    dt_utc = datetime.datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
+    return pytz.utc.localize(dt_utc) if dt_utc.tzinfo is None else dt_utc.astimezone(pytz.utc)
+
+
+def _parse_weekdays(days_csv: Optional[str], default_weekday: int) -> List[int]:
+    days = sorted({int(d) for d in (days_csv or "").split(',') if d.strip().isdigit() and 0 <= int(d) <= 6})
+    return days or [default_weekday]
+
+
+def _nth_weekday_of_month(year: int, month: int, weekday: int, nth: int) -> Optional[datetime.date]:
+    days_in_month = calendar.monthrange(year, month)[1]
+    matching = [day for day in range(1, days_in_month + 1) if datetime.date(year, month, day).weekday() == weekday]
+    if nth == -1: return datetime.date(year, month, matching[-1])
+    if 1 <= nth <= len(matching): return datetime.date(year, month, matching[nth - 1])
+    return None
+
+
+def _iter_local_dates(template: sqlite3.Row, start_local: datetime.datetime, from_date: datetime.date) -> Iterator[datetime.date]:
+    """Datas de ocorrência (em ordem) a partir do período que contém `from_date`, sem percorrer o passado."""
+    rule = template['recurrence_type']
+    interval = max(int(template['recurrence_interval'] or 1), 1)
+    start_date = start_local.date()
+    from_date = max(from_date, start_date)
+
+    if rule == 'diaria':
+        k = -(-(from_date - start_date).days // interval)  # ceil
+        while True:
+            yield start_date + datetime.timedelta(days=k * interval)
+            k += 1
+
+    elif rule == 'semanal':
+        weekdays = _parse_weekdays(template['recurrence_days_of_week'], start_date.weekday())
+        start_week = start_date - datetime.timedelta(days=start_date.weekday())
+        from_week = from_date - datetime.timedelta(days=from_date.weekday())
+        k = -(-((from_week - start_week).days // 7) // interval)
+        while True:
+            week = start_week + datetime.timedelta(weeks=k * interval)
+            for weekday in weekdays:
+                day = week + datetime.timedelta(days=weekday)
+                if day >= start_date: yield day
+            k += 1
+
+    elif rule == 'mensal':
+        months_since_start = (from_date.year - start_date.year) * 12 + (from_date.month - start_date.month)
+        k = -(-months_since_start // interval)
+        while True:
+            month_index = start_date.month - 1 + k * interval
+            year, month = start_date.year + month_index // 12, month_index % 12 + 1
+            if template['recurrence_week_of_month'] and template['recurrence_weekday_of_month'] is not None:
+                day = _nth_weekday_of_month(year, month, int(template['recurrence_weekday_of_month']), int(template['recurrence_week_of_month']))
+            else:
+                day_of_month = int(template['recurrence_day_of_month'] or start_date.day)
+                day = datetime.date(year, month, day_of_month) if day_of_month <= calendar.monthrange(year, month)[1] else None
+            if day and day >= start_date: yield day
+            k += 1
+
+
+def iter_occurrences(template: sqlite3.Row, after_utc: Optional[datetime.datetime], until_utc: datetime.datetime) -> Iterator[datetime.datetime]:
+    """
+    Ocorrências (em UTC) do template estritamente depois de `after_utc` e até `until_utc`,
+    respeitando recurrence_end_date_utc e o saldo de recurrence_count_total.
+    Com after_utc = None, a primeira ocorrência é o próprio horário do template.
+    """
+    if template['recurrence_type'] not in RECURRENCE_TYPES: return
+    start_utc = _parse_utc(template['event_time_utc'])
+    start_local = start_utc.astimezone(BRAZIL_TZ)
+    if template['recurrence_end_date_utc']:
+        until_utc = min(until_utc, _parse_utc(template['recurrence_end_date_utc']))
+    remaining = None
+    if template['recurrence_count_total']:
+        remaining = int(template['recurrence_count_total']) - int(template['recurrence_count_generated'] or 0)
+        if remaining <= 0: return
+
+    from_date = (after_utc.astimezone(BRAZIL_TZ).date() if after_utc else start_local.date())
+    for day in _iter_local_dates(template, start_local, from_date):
+        occurrence_local = BRAZIL_TZ.localize(datetime.datetime.combine(day, start_local.time().replace(tzinfo=None)))
+        occurrence_utc = occurrence_local.astimezone(pytz.utc)
+        if occurrence_utc > until_utc: return
+        if after_utc and occurrence_utc <= after_utc: continue
+        yield occurrence_utc
+        if remaining is not None:
+            remaining -= 1
+            if remaining <= 0: return
+
+
+def plan_template_instances(template: sqlite3.Row, now_utc: datetime.datetime, horizon: datetime.timedelta) -> tuple[list[datetime.datetime], Optional[datetime.datetime], int]:
+    """
+    Calcula as ocorrências novas do template até agora + horizon.
+    Retorna (ocorrências futuras a criar, novo high-water mark, ocorrências consumidas).
+    Ocorrências que já passaram (ex: bot parado) avançam o high-water mark e contam para
+    recurrence_count_total, mas não geram instâncias.
+    """
+    after_utc = _parse_utc(template['recurrence_last_generated_utc']) if template['recurrence_last_generated_utc'] else None
+    occurrences = list(iter_occurrences(template, after_utc, now_utc + horizon))
+    if not occurrences: return [], after_utc, 0
+    return [occ for occ in occurrences if occ > now_utc], occurrences[-1], len(occurrences)
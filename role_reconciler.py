@@ -0,0 +1,117 @@
+# role_reconciler.py
+"""
+Reconciliação dos cargos temporários de eventos com a tabela rsvps.
+
+Quem tem RSVP 'vou' ou 'lista_espera' num evento ativo deve ter o cargo temporário dele, e só
+essas pessoas. Uma chamada de manage_member_event_role que falha (429, permissão, queda) deixa
+o cargo divergente, e o lembrete com temp_role.mention passa a avisar as pessoas erradas.
+
+A cada execução, para cada evento ativo, compara o conjunto esperado (banco) com os membros
+reais do cargo (cache de membros do servidor) e enfileira só as operações mínimas: adicionar
+quem falta, remover quem sobra. A fila é aplicada a no máximo ROLE_RECONCILE_OPS_PER_SECOND
+operações por segundo, para não disputar o limite de taxa com os cliques de RSVP, e cada
+operação confere de novo o RSVP no banco antes de ser aplicada (o usuário pode ter mudado a
+resposta desde o diff). Servidores sem o cache de membros completo são pulados: sem ele,
+role.members não é confiável.
+"""
+import asyncio
+import collections
+import logging
+import time
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+import discord
+
+import database as db
+import role_utils
+from constants import ROLE_RECONCILE_OPS_PER_SECOND
+from metrics import ROLE_DRIFT
+
+log = logging.getLogger("bot.cargos")
+
+HOLDER_STATUSES = ('vou', 'lista_espera')
+
+
+class RoleOp(NamedTuple):
+    action: str  # "add" ou "remove", como em role_utils.manage_member_event_role
+    guild_id: int
+    event_id: int
+    role_id: int
+    user_id: int
+
+
+def plan_role_ops(expected: Dict[int, dict], bot: discord.Client) -> Tuple[List[RoleOp], dict]:
+    """Diferença entre quem deveria ter cada cargo (db_get_event_role_holders) e quem tem de fato."""
+    ops: List[RoleOp] = []
+    report = {"eventos": len(expected), "eventos_divergentes": 0, "faltando": 0, "sobrando": 0,
+              "membros_ausentes": 0, "cargos_ausentes": 0, "servidores_sem_cache": 0}
+    unchunked_guilds = set()
+    for event_id, event in expected.items():
+        guild = bot.get_guild(event['guild_id'])
+        if guild is None or not guild.chunked:
+            unchunked_guilds.add(event['guild_id']); continue
+        role = guild.get_role(event['temp_role_id'])
+        if role is None:
+            report["cargos_ausentes"] += 1; continue
+        actual = {member.id for member in role.members}
+        missing = {user_id for user_id in event['holders'] - actual if guild.get_member(user_id) is not None}
+        report["membros_ausentes"] += len(event['holders'] - actual - missing) # Saíram do servidor (ver ListenersCog)
+        extra = actual - event['holders']
+        if missing or extra: report["eventos_divergentes"] += 1
+        report["faltando"] += len(missing)
+        report["sobrando"] += len(extra)
+        ops.extend(RoleOp("add", guild.id, event_id, role.id, user_id) for user_id in sorted(missing))
+        ops.extend(RoleOp("remove", guild.id, event_id, role.id, user_id) for user_id in sorted(extra))
+    report["servidores_sem_cache"] = len(unchunked_guilds)
+    return ops, report
+
+
+class RoleReconciler:
+    def __init__(self, bot: discord.Client, ops_per_second: float = ROLE_RECONCILE_OPS_PER_SECOND):
+        self.bot = bot
+        self.interval = 1 / ops_per_second
+        self.queue: Deque[RoleOp] = collections.deque()
+        self.last_report: Optional[dict] = None
+
+    @property
+    def last_drift(self) -> int:
+        """Membros divergentes (faltando + sobrando) encontrados na última rodada."""
+        return self.last_report["faltando"] + self.last_report["sobrando"] if self.last_report else 0
+
+    async def _apply(self, op: RoleOp) -> str:
+        """Aplica uma operação se ela ainda vale. Retorna 'aplicada', 'obsoleta' ou 'falhou'."""
+        status = db.db_get_rsvp_status(op.event_id, op.user_id)
+        if (op.action == "add") != (status in HOLDER_STATUSES): return "obsoleta"
+        guild = self.bot.get_guild(op.guild_id)
+        role = guild.get_role(op.role_id) if guild else None
+        member = guild.get_member(op.user_id) if guild else None
+        if role is None or member is None: return "obsoleta"
+        if (role in member.roles) == (op.action == "add"): return "obsoleta"
+        return "aplicada" if await role_utils.manage_member_event_role(member, role, op.action, op.event_id) else "falhou"
+
+    async def _drain(self) -> Dict[str, int]:
+        """Esvazia a fila respeitando o intervalo mínimo entre operações."""
+        results: Dict[str, int] = collections.Counter()
+        while self.queue:
+            started = time.monotonic()
+            op = self.queue.popleft()
+            result = await self._apply(op)
+            results[result] += 1
+            ROLE_DRIFT.inc(tipo="faltando" if op.action == "add" else "sobrando", resultado=result)
+            if result != "obsoleta": await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+        return dict(results)
+
+    async def run(self) -> dict:
+        """Uma rodada completa: diff de todos os eventos ativos, aplicação das operações e relatório."""
+        started = time.monotonic()
+        ops, report = plan_role_ops(db.db_get_event_role_holders(HOLDER_STATUSES), self.bot)
+        self.queue.extend(ops)
+        report["operacoes"] = await self._drain()
+        report["duracao_s"] = round(time.monotonic() - started, 2)
+        self.last_report = report
+        if report["faltando"] or report["sobrando"]:
+            log.warning("Reconciliação de cargos: %s evento(s) divergente(s) de %s; %s membro(s) sem o cargo, %s com o cargo indevidamente. Operações: %s.",
+                        report["eventos_divergentes"], report["eventos"], report["faltando"], report["sobrando"], report["operacoes"], extra={"relatorio": report})
+        else:
+            log.info("Reconciliação de cargos: %s evento(s) sem divergência.", report["eventos"], extra={"relatorio": report})
+        return report
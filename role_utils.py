@@ -1,8 +1,47 @@
 # role_utils.py
 import discord
 import datetime
+import functools
+import logging
+import time
 from typing import Optional
 
+import database as db
+from constants import ROLE_POOL_MAX_PER_GUILD, ROLE_POOL_MAX_MEMBERS_TO_STRIP
+from metrics import ROLE_OPERATION_SECONDS, ROLE_POOL_REQUESTS
+
+log = logging.getLogger("bot.cargos")
+
+def _measured(operation: str):
+    """Registra a duração da operação em ROLE_OPERATION_SECONDS, com resultado ok/falhou conforme o retorno."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started, result = time.perf_counter(), None
+            try:
+                result = await func(*args, **kwargs)
+                return result
+            finally:
+                ROLE_OPERATION_SECONDS.observe(time.perf_counter() - started, operacao=operation, resultado="ok" if result else "falhou")
+        return wrapper
+    return decorator
+
+
+# IDs dos cargos temporários de eventos vistos por este processo (criados, reaproveitados ou dados a
+# membros). O ListenersCog ignora esses cargos ao receber on_member_update, sem consultar o banco.
+EVENT_ROLE_IDS: set[int] = set()
+
+
+def event_role_name(event_title: str, event_date_obj: datetime.date) -> str:
+    # Nome do cargo: "Evento: {Título (máx ~78 chars)} - {DD/MM}"
+    # Limite do Discord para nome de cargo é 100 caracteres.
+    # "Evento: " = 8 chars, " - DD/MM" = 8 chars. Total: 16 chars.
+    # Deixa 100 - 16 = 84 caracteres para o título. Truncar com alguma margem.
+    max_title_len_for_role = 80
+    return f"Evento: {event_title[:max_title_len_for_role]} - {event_date_obj.strftime('%d/%m')}"
+
+
+@_measured("criar_cargo")
 async def create_event_role(guild: discord.Guild, event_title: str, event_date_obj: datetime.date) -> Optional[discord.Role]:
     """
     Cria um cargo temporário para um evento específico.
@@ -16,13 +55,7 @@ async def create_event_role(guild: discord.Guild, event_title: str, event_date_o
         O objeto discord.Role criado, ou None se a criação falhar.
     """
     date_str_for_role = event_date_obj.strftime("%d/%m")
-    # Nome do cargo: "Evento: {Título (máx ~78 chars)} - {DD/MM}"
-    # Limite do Discord para nome de cargo é 100 caracteres.
-    # "Evento: " = 8 chars, " - DD/MM" = 8 chars. Total: 16 chars.
-    # Deixa 100 - 16 = 84 caracteres para o título. Truncar com alguma margem.
-    max_title_len_for_role = 80 
-    truncated_title = event_title[:max_title_len_for_role]
-    role_name = f"Evento: {truncated_title} - {date_str_for_role}"
+    role_name = event_role_name(event_title, event_date_obj)
 
     try:
         # Cria o cargo com permissões mínimas, apenas para ser mencionável.
@@ -33,16 +66,18 @@ async def create_event_role(guild: discord.Guild, event_title: str, event_date_o
             mentionable=True, # Importante para que @cargo funcione
             reason=f"Cargo temporário para o evento '{event_title}' agendado para {date_str_for_role}"
         )
-        print(f"DEBUG_ROLE_UTILS: Cargo temporário '{event_role.name}' (ID: {event_role.id}) criado na guild {guild.id}.")
+        log.debug("Cargo temporário '%s' (ID: %s) criado na guild %s.", event_role.name, event_role.id, guild.id)
+        EVENT_ROLE_IDS.add(event_role.id)
         return event_role
     except discord.Forbidden:
-        print(f"WARN_ROLE_UTILS: Sem permissão para criar cargos na guild {guild.id} para o evento '{event_title}'.")
+        log.warning("Sem permissão para criar cargos na guild %s para o evento '%s'.", guild.id, event_title)
     except discord.HTTPException as e:
-        print(f"WARN_ROLE_UTILS: Erro HTTP ao criar cargo para o evento '{event_title}' na guild {guild.id}: {e}")
+        log.warning("Erro HTTP ao criar cargo para o evento '%s' na guild %s: %s", event_title, guild.id, e)
     except Exception as e:
-        print(f"ERRO_ROLE_UTILS: Erro inesperado ao criar cargo para o evento '{event_title}': {e}")
+        log.error("Erro inesperado ao criar cargo para o evento '%s': %s", event_title, e)
     return None
 
+@_measured("deletar_cargo")
 async def delete_event_role(guild: discord.Guild, role_id: int, reason: str = "Evento concluído ou cancelado.") -> bool:
     """
     Deleta um cargo de evento específico.
@@ -56,26 +91,100 @@ async def delete_event_role(guild: discord.Guild, role_id: int, reason: str = "E
         True se o cargo foi deletado com sucesso, False caso contrário.
     """
     if not guild:
-        print(f"WARN_ROLE_UTILS: Tentativa de deletar cargo {role_id} mas a guild não foi fornecida ou é inválida.")
+        log.warning("Tentativa de deletar cargo %s mas a guild não foi fornecida ou é inválida.", role_id)
         return False
 
     role_to_delete = guild.get_role(role_id)
     if role_to_delete:
         try:
             await role_to_delete.delete(reason=reason)
-            print(f"DEBUG_ROLE_UTILS: Cargo temporário ID {role_id} ('{role_to_delete.name}') deletado da guild {guild.id}.")
+            log.debug("Cargo temporário ID %s ('%s') deletado da guild %s.", role_id, role_to_delete.name, guild.id)
             return True
         except discord.Forbidden:
-            print(f"WARN_ROLE_UTILS: Sem permissão para deletar o cargo ID {role_id} da guild {guild.id}.")
+            log.warning("Sem permissão para deletar o cargo ID %s da guild %s.", role_id, guild.id)
         except discord.HTTPException as e:
-            print(f"WARN_ROLE_UTILS: Erro HTTP ao deletar o cargo ID {role_id} da guild {guild.id}: {e}")
+            log.warning("Erro HTTP ao deletar o cargo ID %s da guild %s: %s", role_id, guild.id, e)
         except Exception as e:
-            print(f"ERRO_ROLE_UTILS: Erro inesperado ao deletar cargo ID {role_id}: {e}")
+            log.error("Erro inesperado ao deletar cargo ID %s: %s", role_id, e)
     else:
-        print(f"INFO_ROLE_UTILS: Cargo temporário ID {role_id} não encontrado na guild {guild.id} para deleção (pode já ter sido deletado).")
+        log.info("Cargo temporário ID %s não encontrado na guild %s para deleção (pode já ter sido deletado).", role_id, guild.id)
         return True # Considera sucesso se o cargo não existe, pois o objetivo é que ele não exista mais.
     return False
 
+# --- Pool de cargos reaproveitados ---
+# Criar e deletar cargos são chamadas caras e com limite de taxa, e servidores movimentados
+# chegam perto do limite de 250 cargos. Ao fim de um evento, o cargo volta para o pool do
+# servidor (event_role_pool, sobrevive a reinícios) sem membros; o próximo evento o retira e
+# só o renomeia. O pool tem no máximo ROLE_POOL_MAX_PER_GUILD cargos livres por servidor.
+
+@_measured("retirar_cargo_pool")
+async def checkout_event_role(guild: discord.Guild, event_title: str, event_date_obj: datetime.date) -> Optional[discord.Role]:
+    """
+    Cargo temporário para um evento: um cargo livre do pool, renomeado, ou um cargo novo se o pool
+    estiver vazio (ver create_event_role). Acertos e faltas vão para bot_role_pool_requests_total.
+    """
+    role_name = event_role_name(event_title, event_date_obj)
+    while (role_id := db.db_checkout_pooled_role(guild.id)) is not None:
+        pooled_role = guild.get_role(role_id)
+        if not pooled_role:
+            log.debug("Cargo %s do pool não existe mais na guild %s; descartado.", role_id, guild.id)
+            continue
+        try:
+            pooled_role = await pooled_role.edit(name=role_name, mentionable=True, reason=f"Cargo temporário reaproveitado para o evento '{event_title}'")
+            ROLE_POOL_REQUESTS.inc(operacao="retirar", resultado="acerto")
+            log.debug("Cargo %s do pool reaproveitado como '%s' na guild %s.", role_id, role_name, guild.id)
+            EVENT_ROLE_IDS.add(pooled_role.id)
+            return pooled_role
+        except discord.NotFound:
+            log.debug("Cargo %s do pool foi apagado na guild %s; descartado.", role_id, guild.id)
+        except (discord.Forbidden, discord.HTTPException) as e:
+            log.warning("Falha ao renomear o cargo %s do pool na guild %s: %s. Criando um cargo novo.", role_id, guild.id, e)
+            # O cargo já saiu do pool: volta para ele (falha temporária) ou é deletado, para não ficar órfão no servidor.
+            # Sem permissão para editá-lo, ele não serviria a outro evento; se nem a deleção passar, fica no pool.
+            kept = not isinstance(e, discord.Forbidden) and db.db_return_role_to_pool(guild.id, role_id, ROLE_POOL_MAX_PER_GUILD)
+            if not kept and not await delete_event_role(guild, role_id, "Cargo do pool que não pôde ser reaproveitado."):
+                db.db_return_role_to_pool(guild.id, role_id, ROLE_POOL_MAX_PER_GUILD)
+            break
+    ROLE_POOL_REQUESTS.inc(operacao="retirar", resultado="falta")
+    return await create_event_role(guild, event_title, event_date_obj)
+
+@_measured("devolver_cargo_pool")
+async def return_event_role(guild: discord.Guild, role_id: int, reason: str = "Evento concluído ou cancelado.") -> bool:
+    """
+    Encerra o uso do cargo de um evento: tira os membros e o devolve ao pool. Se o pool do servidor
+    está cheio, ou se o cargo tem mais de ROLE_POOL_MAX_MEMBERS_TO_STRIP membros (remover um a um
+    sairia mais caro que deletar e criar outro), o cargo é deletado (ver delete_event_role).
+
+    Returns:
+        True se o cargo foi devolvido ou deletado (ou já não existia), False caso contrário.
+    """
+    if not guild:
+        log.warning("Tentativa de devolver cargo %s mas a guild não foi fornecida ou é inválida.", role_id)
+        return False
+    role = guild.get_role(role_id)
+    if not role: return await delete_event_role(guild, role_id, reason)
+
+    # role.members vem do cache de membros: sem o servidor completo em cache, não dá para garantir que o cargo ficou vazio.
+    members = list(role.members)
+    if not guild.chunked or len(members) > ROLE_POOL_MAX_MEMBERS_TO_STRIP or db.db_count_pooled_roles(guild.id) >= ROLE_POOL_MAX_PER_GUILD:
+        ROLE_POOL_REQUESTS.inc(operacao="devolver", resultado="deletado")
+        return await delete_event_role(guild, role_id, reason)
+    try:
+        for member in members: await member.remove_roles(role, reason=reason)
+    except discord.NotFound:
+        return True # O cargo foi apagado no meio do caminho
+    except (discord.Forbidden, discord.HTTPException) as e:
+        log.warning("Falha ao tirar membros do cargo %s na guild %s: %s. Deletando o cargo.", role_id, guild.id, e)
+        ROLE_POOL_REQUESTS.inc(operacao="devolver", resultado="deletado")
+        return await delete_event_role(guild, role_id, reason)
+    if not db.db_return_role_to_pool(guild.id, role_id, ROLE_POOL_MAX_PER_GUILD):
+        ROLE_POOL_REQUESTS.inc(operacao="devolver", resultado="deletado") # Pool encheu enquanto os membros eram removidos
+        return await delete_event_role(guild, role_id, reason)
+    ROLE_POOL_REQUESTS.inc(operacao="devolver", resultado="guardado")
+    log.debug("Cargo %s ('%s') devolvido ao pool da guild %s (%s membro(s) removido(s)).", role_id, role.name, guild.id, len(members))
+    return True
+
+@_measured("gerenciar_membro")
 async def manage_member_event_role(member: discord.Member, role: Optional[discord.Role], action: str, event_id_for_log: int) -> bool:
     """
     Adiciona ou remove um membro de um cargo de evento.
@@ -90,35 +199,36 @@ async def manage_member_event_role(member: discord.Member, role: Optional[discor
         True se a ação foi bem-sucedida, False caso contrário.
     """
     if not role:
-        print(f"DEBUG_ROLE_UTILS: Tentativa de gerenciar cargo para usuário {member.id} no evento {event_id_for_log}, mas o cargo é None.")
+        log.debug("Tentativa de gerenciar cargo para usuário %s no evento %s, mas o cargo é None.", member.id, event_id_for_log)
         return False
 
     if not member:
-        print(f"DEBUG_ROLE_UTILS: Tentativa de gerenciar cargo {role.id} para usuário (ID não disponível) no evento {event_id_for_log}, mas o membro é None.")
+        log.debug("Tentativa de gerenciar cargo %s para usuário (ID não disponível) no evento %s, mas o membro é None.", role.id, event_id_for_log)
         return False
 
+    EVENT_ROLE_IDS.add(role.id) # Antes do add_roles: o on_member_update resultante já encontra o cargo aqui
     try:
         if action == "add":
             if role not in member.roles: # Evita erro se já tiver o cargo
                 await member.add_roles(role, reason=f"Participando do evento {event_id_for_log}")
-                print(f"DEBUG_ROLE_UTILS: Usuário {member.id} ({member.display_name}) adicionado ao cargo '{role.name}' (ID: {role.id}) para evento {event_id_for_log}.")
+                log.debug("Usuário %s (%s) adicionado ao cargo '%s' (ID: %s) para evento %s.", member.id, member.display_name, role.name, role.id, event_id_for_log)
             else:
-                print(f"DEBUG_ROLE_UTILS: Usuário {member.id} já possui o cargo '{role.name}' para evento {event_id_for_log}.")
+                log.debug("Usuário %s já possui o cargo '%s' para evento %s.", member.id, role.name, event_id_for_log)
             return True
         elif action == "remove":
             if role in member.roles: # Evita erro se não tiver o cargo
                 await member.remove_roles(role, reason=f"Não participa mais ativamente do evento {event_id_for_log}")
-                print(f"DEBUG_ROLE_UTILS: Usuário {member.id} ({member.display_name}) removido do cargo '{role.name}' (ID: {role.id}) para evento {event_id_for_log}.")
+                log.debug("Usuário %s (%s) removido do cargo '%s' (ID: %s) para evento %s.", member.id, member.display_name, role.name, role.id, event_id_for_log)
             else:
-                print(f"DEBUG_ROLE_UTILS: Usuário {member.id} não possuía o cargo '{role.name}' para evento {event_id_for_log} para ser removido.")
+                log.debug("Usuário %s não possuía o cargo '%s' para evento %s para ser removido.", member.id, role.name, event_id_for_log)
             return True
         else:
-            print(f"WARN_ROLE_UTILS: Ação desconhecida '{action}' para gerenciamento de cargo do evento {event_id_for_log}.")
+            log.warning("Ação desconhecida '%s' para gerenciamento de cargo do evento %s.", action, event_id_for_log)
             return False
     except discord.Forbidden:
-        print(f"WARN_ROLE_UTILS: Sem permissão para '{action}' cargo '{role.name}' para/de {member.display_name} (ID: {member.id}) no evento {event_id_for_log}.")
+        log.warning("Sem permissão para '%s' cargo '%s' para/de %s (ID: %s) no evento %s.", action, role.name, member.display_name, member.id, event_id_for_log)
     except discord.HTTPException as e:
-        print(f"WARN_ROLE_UTILS: Erro HTTP ao '{action}' cargo '{role.name}' para/de {member.display_name} (ID: {member.id}) no evento {event_id_for_log}: {e}")
+        log.warning("Erro HTTP ao '%s' cargo '%s' para/de %s (ID: %s) no evento %s: %s", action, role.name, member.display_name, member.id, event_id_for_log, e)
     except Exception as e:
-        print(f"ERRO_ROLE_UTILS: Erro inesperado ao '{action}' cargo para {member.display_name} (ID: {member.id}): {e}")
+        log.error("Erro inesperado ao '%s' cargo para %s (ID: %s): %s", action, member.display_name, member.id, e)
     return False
@@ -0,0 +1,125 @@
+# rsvp_log.py
+"""
+Histórico de RSVPs só de acréscimos (tabela rsvp_log), com compactação em snapshots e replay.
+
+A tabela rsvps guarda só o estado atual: o upsert sobrescreve status e rsvp_timestamp, e não dá
+para saber o que aconteceu numa disputa de vagas. Cada transição (status novo, ou None quando o
+RSVP é removido) é registrada aqui com a origem:
+- "clique": botão de RSVP; "promocao": saída da lista de espera; "lembrete": "não vou" pela DM de
+  confirmação; "saida": membro saiu do servidor; "cargo_restrito": membro ganhou cargo restrito;
+  "auditoria": correção gravada por benchmarks.rsvp_log_audit.
+
+- Ordem: cada transição leva o horário em que a mudança foi gravada em rsvps (o rsvp_timestamp
+  devolvido pelas funções do banco), e replay/compactação aplicam as transições na ordem
+  (changed_at_utc, log_id). log_id sozinho não serve: é atribuído quando o lote é gravado, e
+  cada instância segura o seu por até RSVP_LOG_FLUSH_SECONDS.
+- Escrita em lote: record() só acumula em memória. O RsvpLogWriter grava o acumulado numa única
+  transação (executemany) a cada RSVP_LOG_FLUSH_SECONDS, ou antes ao juntar RSVP_LOG_BATCH_SIZE
+  transições, e no encerramento do bot. Um processo que cai perde no máximo essa janela do
+  histórico; o estado atual (rsvps) não depende dele. Essas perdas (e os descartes com a fila
+  cheia) são encontradas por python -m benchmarks.rsvp_log_audit, que compara o replay com rsvps.
+- Compactação: compact() (TasksCog, na limpeza de hora em hora) dobra as transições mais antigas
+  que RSVP_LOG_HISTORY no snapshot do evento. O histórico recente fica completo.
+- Replay: replay_event() reconstrói os RSVPs de qualquer evento, atuais ou num instante passado
+  ainda não compactado, a partir do snapshot e das transições. Análises e auditorias leem daqui,
+  não da tabela rsvps.
+"""
+import asyncio
+import datetime
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import pytz
+
+import database as db
+from constants import RSVP_LOG_FLUSH_SECONDS, RSVP_LOG_BATCH_SIZE, RSVP_LOG_MAX_PENDING, RSVP_LOG_HISTORY, RSVP_LOG_COMPACT_MAX_ROWS
+from metrics import REGISTRY, RSVP_LOG_ENTRIES
+
+log = logging.getLogger("bot.rsvps")
+
+LogEntry = Tuple[int, int, Optional[str], str, str] # (event_id, user_id, status, origin, changed_at_utc)
+
+
+class RsvpLogWriter:
+    def __init__(self, flush_interval: float = RSVP_LOG_FLUSH_SECONDS, batch_size: int = RSVP_LOG_BATCH_SIZE,
+                 max_pending: int = RSVP_LOG_MAX_PENDING):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.pending: List[LogEntry] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, event_id: int, user_id: int, status: Optional[str], origin: str, changed_at_utc: str):
+        self.pending.append((event_id, user_id, status, origin, changed_at_utc))
+        if len(self.pending) >= self.batch_size: self.flush()
+
+    def flush(self) -> int:
+        """Grava o acumulado. Se o banco falhar, as transições voltam para a fila (até max_pending)."""
+        if not self.pending: return 0
+        batch, self.pending = self.pending, []
+        if db.db_append_rsvp_log(batch):
+            RSVP_LOG_ENTRIES.inc(len(batch), resultado="gravada")
+            return len(batch)
+        self.pending[:0] = batch
+        overflow = len(self.pending) - self.max_pending
+        if overflow > 0:
+            del self.pending[:overflow]
+            RSVP_LOG_ENTRIES.inc(overflow, resultado="descartada")
+            log.error("Histórico de RSVPs: %s transição(ões) mais antigas descartadas (banco indisponível, fila cheia).", overflow)
+        return 0
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    def start(self):
+        if self._task is not None and not self._task.done(): return
+        self._task = asyncio.get_running_loop().create_task(self.run(), name="rsvp-log-writer")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try: await self._task
+            except asyncio.CancelledError: pass
+            self._task = None
+        self.flush()
+
+
+WRITER = RsvpLogWriter()
+
+
+def record(event_id: int, user_id: int, status: Optional[str], origin: str, changed_at_utc: str):
+    """Registra uma transição já aplicada em rsvps (status None = RSVP removido), com o horário gravado pelo banco."""
+    WRITER.record(event_id, user_id, status, origin, changed_at_utc)
+
+
+def record_batch_changes(events: List[dict], origin: str):
+    """Transições dos lotes do ListenersCog (dicts com removed, promoted e changed_at_utc, na ordem em que o banco as aplicou)."""
+    for event in events:
+        for user_id in event['removed']: WRITER.record(event['event_id'], user_id, None, origin, event['changed_at_utc'])
+        for user_id in event['promoted']: WRITER.record(event['event_id'], user_id, 'vou', "promocao", event['changed_at_utc'])
+
+
+def replay_event(event_id: int, until: Optional[datetime.datetime] = None) -> Dict[str, List[int]]:
+    """
+    RSVPs do evento reconstruídos pelo histórico, no formato de db_get_rsvps_for_event, atuais
+    ou no instante `until`. Levanta ValueError se esse instante já foi compactado.
+    """
+    WRITER.flush() # Inclui as transições deste processo ainda não gravadas
+    until_utc = until.astimezone(pytz.utc).isoformat() if until else None
+    state = db.db_replay_rsvp_log(event_id, until_utc)
+    if state is None: raise ValueError(f"Histórico do evento {event_id} anterior a {until_utc} já foi compactado (ou o banco falhou).")
+    rsvps: Dict[str, List[int]] = {'vou': [], 'nao_vou': [], 'talvez': [], 'lista_espera': []}
+    for user_id, (status, _) in state.items():
+        if status in rsvps: rsvps[status].append(user_id)
+    return rsvps
+
+
+def compact(now: Optional[datetime.datetime] = None) -> Tuple[int, int]:
+    """Compacta as transições mais antigas que RSVP_LOG_HISTORY. Retorna (eventos, transições compactadas)."""
+    before = (now or datetime.datetime.now(pytz.utc)) - RSVP_LOG_HISTORY
+    return db.db_compact_rsvp_log(before.isoformat(), RSVP_LOG_COMPACT_MAX_ROWS)
+
+
+REGISTRY.register_callback("bot_rsvp_log_pending", "Transições de RSVP aguardando gravação no histórico (rsvp_log).", lambda: len(WRITER.pending))
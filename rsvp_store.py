@@ -0,0 +1,183 @@
+# rsvp_store.py
+"""
+Cache em memória, com escrita direta no banco (write-through), dos RSVPs de eventos ativos.
+
+Cada leitura dos participantes (clique de RSVP, montagem do embed, lembretes, listas) fazia uma
+consulta e montava um dict de listas. Aqui cada evento ativo fica num EventRsvps compacto: uma
+coluna array('Q') de user IDs por status, na ordem de inscrição (a mesma do ORDER BY
+rsvp_timestamp), mais um índice usuário -> status para consultas O(1).
+
+- Carga preguiçosa: o evento é lido do banco no primeiro acesso; só eventos com status 'ativo'
+  ficam guardados (os demais são servidos da consulta, sem cache).
+- Escrita direta: set_status/remove gravam no banco primeiro e só então alteram a cópia em
+  memória; se a gravação falha, a entrada é descartada. O banco continua sendo a cópia durável.
+- O clique de RSVP (apply_click) só lê daqui para exibir: a escolha entre 'vou' e 'lista_espera'
+  e a promoção da lista de espera são decididas no banco, na mesma transação da gravação.
+- Alterações em lote feitas direto no banco (saídas de membros, cargos restritos, fim e
+  cancelamento de eventos) chamam discard(). Para as feitas por outro processo (instância em
+  espera, outro grupo de shards), cada entrada é relida após RSVP_STORE_MAX_AGE_SECONDS.
+"""
+import sys
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import database as db
+import rsvp_log
+from constants import RSVP_STORE_MAX_AGE_SECONDS
+from metrics import CACHE_REQUESTS, REGISTRY
+
+RSVP_STATUSES = ('vou', 'nao_vou', 'talvez', 'lista_espera')
+_STATUS_INDEX = {status: index for index, status in enumerate(RSVP_STATUSES)}
+
+
+class EventRsvps:
+    """RSVPs de um evento: uma coluna de user IDs por status (ordem de inscrição) e o índice usuário -> status."""
+    __slots__ = ("columns", "status_by_user", "loaded_at")
+
+    def __init__(self, rows: Iterable[Tuple[int, str]] = ()):
+        self.columns = tuple(array('Q') for _ in RSVP_STATUSES)
+        self.status_by_user: Dict[int, int] = {} # user_id -> índice em RSVP_STATUSES
+        self.loaded_at = time.monotonic()
+        for user_id, status in rows: self._append(user_id, status)
+
+    def _append(self, user_id: int, status: str):
+        index = _STATUS_INDEX.get(status)
+        if index is None: return # Status desconhecido: ignorado, como em db_get_rsvps_for_event
+        self.columns[index].append(user_id)
+        self.status_by_user[user_id] = index
+
+    def status_of(self, user_id: int) -> Optional[str]:
+        index = self.status_by_user.get(user_id)
+        return RSVP_STATUSES[index] if index is not None else None
+
+    def users(self, status: str) -> List[int]:
+        return self.columns[_STATUS_INDEX[status]].tolist()
+
+    def first(self, status: str) -> Optional[int]:
+        """Primeiro inscrito no status (ex: o próximo da lista de espera)."""
+        column = self.columns[_STATUS_INDEX[status]]
+        return column[0] if column else None
+
+    def count(self, status: str) -> int:
+        return len(self.columns[_STATUS_INDEX[status]])
+
+    def set(self, user_id: int, status: str):
+        """Mesma semântica do upsert do banco: o rsvp_timestamp é renovado, então o usuário vai para o fim da coluna."""
+        self.remove(user_id)
+        self._append(user_id, status)
+
+    def remove(self, user_id: int):
+        index = self.status_by_user.pop(user_id, None)
+        if index is not None: self.columns[index].remove(user_id)
+
+    def as_dict(self) -> Dict[str, List[int]]:
+        """Formato de db_get_rsvps_for_event (aceito por utils.build_event_embed)."""
+        return {status: column.tolist() for status, column in zip(RSVP_STATUSES, self.columns)}
+
+    def nbytes(self) -> int:
+        # Inclui as chaves do índice: IDs do Discord não cabem no cache de inteiros pequenos do Python.
+        return (sys.getsizeof(self) + sys.getsizeof(self.columns) + sum(map(sys.getsizeof, self.columns))
+                + sys.getsizeof(self.status_by_user) + sum(map(sys.getsizeof, self.status_by_user)))
+
+
+# event_id -> RSVPs do evento ativo.
+_events: Dict[int, EventRsvps] = {}
+_last_sweep = time.monotonic()
+
+
+def _evict_expired(now: float):
+    """Descarta entradas vencidas (eventos encerrados por outro processo deixam de ser acessados)."""
+    global _last_sweep
+    if now - _last_sweep < RSVP_STORE_MAX_AGE_SECONDS: return
+    _last_sweep = now
+    for event_id in [event_id for event_id, entry in _events.items() if now - entry.loaded_at >= RSVP_STORE_MAX_AGE_SECONDS]:
+        del _events[event_id]
+
+
+def get_event(event_id: int) -> EventRsvps:
+    """RSVPs do evento, do cache ou (na falta, ou com a entrada vencida) do banco. Não altere o objeto retornado."""
+    now = time.monotonic()
+    entry = _events.get(event_id)
+    if entry is not None and now - entry.loaded_at < RSVP_STORE_MAX_AGE_SECONDS:
+        CACHE_REQUESTS.inc(cache="rsvps", resultado="acerto")
+        return entry
+    CACHE_REQUESTS.inc(cache="rsvps", resultado="falta")
+    event_status, rows = db.db_load_event_rsvps(event_id)
+    entry = EventRsvps(rows)
+    if event_status == 'ativo':
+        _events[event_id] = entry
+        _evict_expired(now)
+    else: _events.pop(event_id, None)
+    return entry
+
+
+def get_rsvps(event_id: int) -> Dict[str, List[int]]:
+    """Substituto de db.db_get_rsvps_for_event: {status: [user_id, ...]} em ordem de inscrição."""
+    return get_event(event_id).as_dict()
+
+
+def get_status(event_id: int, user_id: int) -> Optional[str]:
+    return get_event(event_id).status_of(user_id)
+
+
+def set_status(event_id: int, user_id: int, status: str, origin: str = "clique") -> bool:
+    """Grava o RSVP no banco e, se deu certo, na cópia em memória e no histórico (rsvp_log, com a origem)."""
+    changed_at_utc = db.db_add_or_update_rsvp(event_id, user_id, status)
+    if changed_at_utc is None:
+        discard(event_id); return False
+    rsvp_log.record(event_id, user_id, status, origin, changed_at_utc)
+    entry = _events.get(event_id)
+    if entry is not None: entry.set(user_id, status)
+    return True
+
+
+def apply_click(event_id: int, user_id: int, status: str) -> Optional[dict]:
+    """
+    Clique de RSVP: a escolha entre 'vou' e 'lista_espera' e a promoção da lista de espera são
+    decididas no banco (db_apply_rsvp_click), nunca a partir desta cópia, que pode estar até
+    RSVP_STORE_MAX_AGE_SECONDS atrasada em relação a outra instância. Atualiza a cópia e o
+    histórico com o resultado; None se a gravação falhou.
+    """
+    result = db.db_apply_rsvp_click(event_id, user_id, status)
+    if result is None:
+        discard(event_id); return None
+    promoted = result['promoted']
+    rsvp_log.record(event_id, user_id, result['status'], "clique", result['changed_at_utc'])
+    if promoted is not None: rsvp_log.record(event_id, promoted, 'vou', "promocao", result['changed_at_utc'])
+    entry = _events.get(event_id)
+    if entry is None: return result
+    if entry.status_of(user_id) != result['previous'] or (promoted is not None and entry.first('lista_espera') != promoted):
+        discard(event_id) # A cópia estava atrasada: relida no próximo acesso
+    else:
+        entry.set(user_id, result['status'])
+        if promoted is not None: entry.set(promoted, 'vou')
+    return result
+
+
+def remove(event_id: int, user_id: int, origin: str = "clique") -> bool:
+    changed_at_utc = db.db_remove_rsvp(event_id, user_id)
+    if changed_at_utc is None:
+        discard(event_id); return False
+    rsvp_log.record(event_id, user_id, None, origin, changed_at_utc)
+    entry = _events.get(event_id)
+    if entry is not None: entry.remove(user_id)
+    return True
+
+
+def discard(*event_ids: int):
+    """Esquece os eventos (RSVPs alterados direto no banco, ou evento encerrado); o próximo acesso relê do banco."""
+    for event_id in event_ids: _events.pop(event_id, None)
+
+
+def clear():
+    _events.clear()
+
+
+def memory_bytes() -> int:
+    """Memória aproximada das entradas (objetos, colunas e índices), sem contar o dict do cache."""
+    return sum(entry.nbytes() for entry in _events.values())
+
+
+REGISTRY.register_callback("bot_rsvp_store_events", "Eventos ativos com RSVPs no cache em memória (rsvp_store).", lambda: len(_events))
+REGISTRY.register_callback("bot_rsvp_store_bytes", "Memória aproximada ocupada pelo cache de RSVPs (rsvp_store).", memory_bytes)
@@ -0,0 +1,60 @@
+# sharding.py
+"""
+Particionamento dos servidores entre processos do bot.
+
+O Discord atribui cada servidor a um shard pela fórmula (guild_id >> 22) % shard_count.
+Quando o bot roda em vários processos (cada um com um grupo de shards, ver launcher.py),
+as tarefas em segundo plano de cada processo só devem tocar os servidores dos seus shards.
+O ShardFilter gera a mesma fórmula em SQL para que o filtro aconteça dentro das consultas.
+"""
+from typing import Iterable, Optional, Tuple
+
+
+def shard_id_for_guild(guild_id: int, shard_count: int) -> int:
+    return (guild_id >> 22) % shard_count
+
+
+class ShardFilter:
+    __slots__ = ('shard_count', 'shard_ids')
+
+    def __init__(self, shard_count: int, shard_ids: Iterable[int]):
+        self.shard_count = shard_count
+        self.shard_ids = tuple(sorted(set(shard_ids)))
+        if shard_count < 1 or not self.shard_ids or any(not 0 <= sid < shard_count for sid in self.shard_ids):
+            raise ValueError(f"Shards {self.shard_ids} inválidos para shard_count={shard_count}.")
+
+    @property
+    def covers_all(self) -> bool:
+        return len(self.shard_ids) == self.shard_count
+
+    def owns(self, guild_id: Optional[int]) -> bool:
+        if guild_id is None or self.covers_all: return True
+        return shard_id_for_guild(guild_id, self.shard_count) in self.shard_ids
+
+    def sql(self, column: str = "guild_id") -> Tuple[str, tuple]:
+        """
+        Trecho ' AND (...)' para acrescentar a um WHERE, e seus parâmetros. Linhas sem servidor
+        (column IS NULL) pertencem a todos os processos. Vazio se este processo cobre todos os shards.
+        """
+        if self.covers_all: return "", ()
+        placeholders = ",".join("?" * len(self.shard_ids))
+        return (f" AND ({column} IS NULL OR (({column} >> 22) % ?) IN ({placeholders}))",
+                (self.shard_count, *self.shard_ids))
+
+    def __repr__(self) -> str:
+        return f"ShardFilter(shard_count={self.shard_count}, shard_ids={list(self.shard_ids)})"
+
+
+def parse_shard_ids(shard_ids_str: Optional[str]) -> Optional[Tuple[int, ...]]:
+    """'0,1' ou '0-3' -> (0, 1) / (0, 1, 2, 3). None/vazio -> None (todos os shards)."""
+    if not shard_ids_str or not shard_ids_str.strip(): return None
+    ids = set()
+    for part in shard_ids_str.split(','):
+        part = part.strip()
+        if not part: continue
+        if '-' in part:
+            start, end = (int(x) for x in part.split('-', 1))
+            ids.update(range(start, end + 1))
+        else:
+            ids.add(int(part))
+    return tuple(sorted(ids))
@@ -0,0 +1,52 @@
+# startup_timing.py
+"""
+Relatório de tempo de inicialização do bot.
+
+Deve ser o primeiro import do main.py: o instante do import marca o início do processo.
+Cada fase (imports, conexão ao Discord, banco, cogs, sincronização de comandos...) é
+registrada com `phase()` ou `begin()`/`end()` e o relatório é impresso uma vez, ao fim
+do primeiro on_ready.
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+PROCESS_START = time.perf_counter()
+
+
+class StartupTimer:
+    def __init__(self, start: float = PROCESS_START):
+        self.start = start
+        self.phases: List[Tuple[str, float]] = []
+        self._open: Dict[str, float] = {}
+        self.reported = False
+
+    def record(self, name: str, seconds: float):
+        self.phases.append((name, seconds))
+
+    def begin(self, name: str):
+        self._open[name] = time.perf_counter()
+
+    def end(self, name: str):
+        started = self._open.pop(name, None)
+        if started is not None: self.record(name, time.perf_counter() - started)
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try: yield
+        finally: self.record(name, time.perf_counter() - started)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def report(self) -> str:
+        total = self.elapsed()
+        lines = [f"Relatório de inicialização ({total * 1000:.0f} ms desde o início do processo):"]
+        for name, seconds in self.phases:
+            share = (seconds / total * 100) if total else 0.0
+            lines.append(f"  {name:<45} {seconds * 1000:9.1f} ms  {share:5.1f}%")
+        return "\n".join(lines)
+
+
+STARTUP_TIMER = StartupTimer()
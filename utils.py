@@ -4,17 +4,18 @@ from discord import app_commands
 from discord.ext import commands
 import asyncio
 import datetime
+import logging
 import pytz
 from typing import Optional, List, Tuple, Dict, Set
 import sqlite3
-from difflib import SequenceMatcher
 
 from constants import (
-    BRAZIL_TZ, BRAZIL_TZ_STR, DIAS_SEMANA_PT_FULL, DIAS_SEMANA_PT_SHORT, MESES_PT,
-    ALL_ACTIVITIES_PT, RAID_INFO_PT, MASMORRA_INFO_PT, PVP_ACTIVITY_INFO_PT,
-    SIMILARITY_THRESHOLD
+    BRAZIL_TZ, BRAZIL_TZ_STR, DIAS_SEMANA_PT_FULL, DIAS_SEMANA_PT_SHORT, MESES_PT
 )
 import database as db
+from activity_matcher import get_guild_matcher
+
+log = logging.getLogger("bot.utils")
 
 # --- Novas Funções de Verificação de Permissão ---
 
@@ -83,8 +84,8 @@ class ConfirmAttendanceView(discord.ui.View):
             try:
                 content_to_set = new_content if new_content else self.message.content
                 await self.message.edit(content=content_to_set, view=self)
-            except discord.HTTPException as e: print(f"WARN_UTILS: Falha ao editar msg ConfirmAttendanceView (ID: {self.message.id}): {e}")
-            except AttributeError: print(f"WARN_UTILS: self.message não definido para ConfirmAttendanceView.")
+            except discord.HTTPException as e: log.warning("Falha ao editar msg ConfirmAttendanceView (ID: %s): %s", self.message.id, e)
+            except AttributeError: log.warning("self.message não definido para ConfirmAttendanceView.")
         self.stop()
 
     @discord.ui.button(label="Sim, vou comparecer!", style=discord.ButtonStyle.success, custom_id="confirm_attendance_yes")
@@ -102,7 +103,7 @@ class ConfirmAttendanceView(discord.ui.View):
 
     async def on_timeout(self):
         self.confirmed_attendance = None
-        print(f"INFO_UTILS: ConfirmAttendanceView para evento {self.event_id}, usuário {self.user_id} timed out.")
+        log.info("ConfirmAttendanceView para evento %s, usuário %s timed out.", self.event_id, self.user_id)
         await self.disable_all_items(new_content=f"Lembrete para evento ID {self.event_id} expirou sem resposta.")
         self.stop()
 
@@ -260,6 +261,14 @@ class SelectChannelView(discord.ui.View):
 def get_brazil_now() -> datetime.datetime:
     return datetime.datetime.now(BRAZIL_TZ)
 
+async def gather_with_concurrency(limit: int, *coros) -> list:
+    """Executa as corrotinas concorrentemente com no máximo `limit` em andamento; exceções são retornadas, não propagadas."""
+    semaphore = asyncio.Semaphore(limit)
+    async def _bounded(coro):
+        async with semaphore:
+            return await coro
+    return await asyncio.gather(*(_bounded(c) for c in coros), return_exceptions=True)
+
 def get_next_weekday_date(start_datetime_obj: datetime.datetime, target_weekday: int) -> datetime.date:
     days_ahead = target_weekday - start_datetime_obj.weekday()
     if days_ahead <= 0: days_ahead += 7
@@ -282,7 +291,7 @@ async def ask_question_with_format(user: discord.User, bot: commands.Bot, prompt
         resp = await bot.wait_for("message", timeout=timeout, check=lambda m: m.author.id == user.id and isinstance(m.channel, discord.DMChannel))
         return resp.content.strip()
     except (discord.Forbidden, asyncio.TimeoutError) as e:
-        if isinstance(e, discord.Forbidden): print(f"DM falhou para {user.name}: {e}")
+        if isinstance(e, discord.Forbidden): log.info("DM falhou para %s: %s", user.name, e)
         return None
 
 async def get_user_display_name_static(user_id: int, bot: commands.Bot, guild: Optional[discord.Guild]) -> str:
@@ -296,14 +305,15 @@ async def get_user_display_name_static(user_id: int, bot: commands.Bot, guild: O
             name = f"Usuário ({user_id})"
     return name or f"ID:{user_id}"
 
-def format_event_line_for_list(row: sqlite3.Row, vou_count: int, guild_id: int) -> str:
+def format_event_line_for_list(row: sqlite3.Row, guild_id: int) -> str:
+    """`row` de db_get_events_for_digest_list, que já traz vou_count e espera_count (event_rsvp_counts)."""
     dt_utc = datetime.datetime.fromisoformat(row['event_time_utc'].replace('Z', '+00:00'))
     dt_brt = dt_utc.astimezone(BRAZIL_TZ)
     date_str = f"{DIAS_SEMANA_PT_SHORT[dt_brt.weekday()]}. {dt_brt.strftime('%d/%m')}"
-    vagas_disp = row['max_attendees'] - vou_count
+    vagas_disp = row['max_attendees'] - row['vou_count']
     vagas_str = f"{vagas_disp} vagas"
     if vagas_disp <= 0:
-        espera_count = len(db.db_get_rsvps_for_event(row['event_id']).get('lista_espera', []))
+        espera_count = row['espera_count']
         vagas_str = f"Lotado (Espera: {espera_count})" if espera_count > 0 else "Lotado"
     elif vagas_disp == 1: vagas_str = "1 vaga"
     link = f"https://discord.com/channels/{guild_id}/{row['channel_id']}/{row['message_id']}" if all([row['channel_id'], row['message_id'], guild_id]) else ""
@@ -316,7 +326,7 @@ async def generate_event_list_message_content(guild_id: int, days: int, bot: com
     end_utc = (now_brt + datetime.timedelta(days=days)).replace(hour=23, minute=59, second=59, microsecond=999999).astimezone(pytz.utc)
     events = db.db_get_events_for_digest_list(guild_id, start_utc, end_utc)
     if not events: return f"Nenhum evento agendado para os próximos {days} dias."
-    lines = [format_event_line_for_list(er, len(db.db_get_rsvps_for_event(er['event_id']).get('vou', [])), guild_id) for er in events]
+    lines = [format_event_line_for_list(er, guild_id) for er in events]
     return "\n".join(lines)
 
 async def get_text_channels_for_select(guild: discord.Guild, bot_user: discord.ClientUser) -> list[discord.SelectOption]:
@@ -335,21 +345,11 @@ async def get_text_channels_for_select(guild: discord.Guild, bot_user: discord.C
                 else: break
     return options
 
-def detect_activity_details(name_input: str) -> tuple[str, str | None, int | None]:
-    name_lower = name_input.lower().strip()
-    best_match, best_type, best_spots, highest_sim = name_input.strip(), None, None, 0.0
-    for official, keywords in ALL_ACTIVITIES_PT.items():
-        sim_off = SequenceMatcher(None, name_lower, official.lower()).ratio()
-        if sim_off > highest_sim: highest_sim, best_match = sim_off, official
-        for kw in keywords:
-            sim_kw = SequenceMatcher(None, name_lower, kw.lower()).ratio()
-            if sim_kw > highest_sim: highest_sim, best_match = sim_kw, official
-        if highest_sim == 1.0 and best_match == official: break
-    if highest_sim >= SIMILARITY_THRESHOLD:
-        if best_match in RAID_INFO_PT: best_type, best_spots = "Incursão", 6
-        elif best_match in MASMORRA_INFO_PT: best_type, best_spots = "Masmorra", 3
-        elif best_match in PVP_ACTIVITY_INFO_PT: best_type, best_spots = "PvP - Desafios de Osíris", 3
-        return best_match, best_type, best_spots
+def detect_activity_details(name_input: str, guild_id: Optional[int] = None) -> tuple[str, str | None, int | None]:
+    match = get_guild_matcher(guild_id).match(name_input)
+    if match:
+        activity, _ = match
+        return activity.name, activity.activity_type, activity.spots
     return name_input.strip(), None, None
 
 def detect_and_format_event_subtype(title: str, description: Optional[str]) -> str: